@@ -0,0 +1,51 @@
+"""
+Admin API endpoints (guarded by the ADMIN_API_KEY shared secret)
+"""
+
+import hmac
+from functools import wraps
+from flask import Blueprint, request, jsonify, current_app
+from marshmallow import Schema, fields, ValidationError
+from app.services.hubspot_service import HubSpotService
+
+bp = Blueprint('admin', __name__)
+
+class MetadataInvalidateSchema(Schema):
+    user_id = fields.Int()  # Only this user's portal; omit for every portal
+    name = fields.Str()     # Key prefix, e.g. 'properties', 'pipelines:deals', 'owners'
+
+metadata_invalidate_schema = MetadataInvalidateSchema()
+
+def admin_key_required(f):
+    """Require X-Admin-Key to match ADMIN_API_KEY (endpoints are disabled when it is unset)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = current_app.config.get('ADMIN_API_KEY')
+        if not expected:
+            return jsonify({'error': 'Admin API is disabled'}), 403
+        # Compare bytes: compare_digest rejects non-ASCII str arguments with a TypeError
+        if not hmac.compare_digest(request.headers.get('X-Admin-Key', '').encode(), expected.encode()):
+            return jsonify({'error': 'Invalid admin key'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+@bp.route('/cache/metadata/invalidate', methods=['POST'])
+@admin_key_required
+def invalidate_metadata_cache():
+    """Drop cached HubSpot properties/pipelines/owners so the next call re-fetches them"""
+    try:
+        data = metadata_invalidate_schema.load(request.get_json(silent=True) or {})
+        user_id = data.get('user_id')
+
+        removed = HubSpotService.invalidate_metadata(
+            user_id=user_id, name=data.get('name'), all_portals=user_id is None
+        )
+
+        return jsonify({'message': 'Metadata cache invalidated', 'entries_removed': removed}), 200
+
+    except ValidationError as e:
+        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -6,6 +6,18 @@ from flask import Blueprint, jsonify, current_app
 from datetime import datetime
 from app.models import User
 from app.db.database import db
+from app.db.writer import sqlite_writer
+from app.services.http_pool import http_pool
+from app.services.rate_limiter import get_rate_limiter_metrics
+from app.services.log_sink import log_sink
+from app.services.hubspot_service import hubspot_token_cache, lead_analytics_cache
+from app.core.auth_body import claims_cache
+from app.services.metadata_cache import metadata_cache
+from app.services.object_cache import object_cache
+from app.services.whatsapp_service import webhook_workers
+from app.services.log_sync import log_sync
+from app.services.crm_mirror import crm_mirror
+from app.services.autocomplete import autocomplete
 from sqlalchemy import text
 
 bp = Blueprint('health', __name__)
@@ -51,4 +63,24 @@ def test_endpoint():
     return jsonify({
         'message': 'Test endpoint working!',
         'timestamp': datetime.utcnow().isoformat()
-    }), 200
\ No newline at end of file
+    }), 200
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics for connection pools and caches"""
+    return jsonify({
+        'hubspot_http_pool': http_pool.get_metrics(),
+        'hubspot_rate_limiters': get_rate_limiter_metrics(),
+        'log_sink': log_sink.get_metrics(),
+        'sqlite_writer': sqlite_writer.get_metrics(),
+        'hubspot_token_cache': hubspot_token_cache.get_metrics(),
+        'lead_analytics_cache': lead_analytics_cache.get_metrics(),
+        'auth_claims_cache': claims_cache.get_metrics(),
+        'hubspot_metadata_cache': metadata_cache.get_metrics(),
+        'hubspot_object_cache': object_cache.get_metrics(),
+        'whatsapp_queue': webhook_workers.get_metrics(),
+        'log_sync': log_sync.get_metrics(),
+        'crm_mirror': crm_mirror.get_metrics(),
+        'autocomplete': autocomplete.get_metrics(),
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
@@ -10,6 +10,8 @@ from .tasks import bp as tasks_bp
 from .activities import bp as activities_bp
 from .associations import bp as associations_bp
 from .leads import bp as leads_bp
+from .export import bp as export_bp
+from .autocomplete import bp as autocomplete_bp
 
 __all__ = [
     'contacts_bp',
@@ -19,5 +21,7 @@ __all__ = [
     'tasks_bp',
     'activities_bp',
     'associations_bp',
-    'leads_bp'
+    'leads_bp',
+    'export_bp',
+    'autocomplete_bp'
 ]
@@ -2,9 +2,13 @@
 HubSpot Activities API - Calls, Meetings, Visits with logging
 """
 
+import asyncio
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.hubspot_service import HubSpotService
+from app.services.async_hubspot_service import AsyncHubSpotService, run_blocking
+from app.api.v1.hubspot.errors import error_response
+from app.services.log_sink import log_sink
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
 from marshmallow import Schema, fields, ValidationError
@@ -38,26 +42,6 @@ activity_create_schema = ActivityCreateSchema()
 activity_update_schema = ActivityUpdateSchema()
 activity_search_schema = ActivitySearchSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== CALL OPERATIONS ==========
 
 @bp.route('/calls', methods=['GET'])
@@ -73,7 +57,7 @@ def get_calls():
         result = HubSpotService.get_calls(limit=limit, user_id=current_user_id, properties=properties)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -85,7 +69,7 @@ def get_calls():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/calls/<call_id>', methods=['GET'])
 @jwt_required()
@@ -98,7 +82,7 @@ def get_call(call_id):
         result = HubSpotService.get_call_by_id(call_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -110,7 +94,7 @@ def get_call(call_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/calls', methods=['POST'])
 @jwt_required()
@@ -141,7 +125,7 @@ def create_call():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== MEETING OPERATIONS ==========
 
@@ -158,7 +142,7 @@ def get_meetings():
         result = HubSpotService.get_meetings(limit=limit, user_id=current_user_id, properties=properties)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -170,7 +154,7 @@ def get_meetings():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/meetings/<meeting_id>', methods=['GET'])
 @jwt_required()
@@ -183,7 +167,7 @@ def get_meeting(meeting_id):
         result = HubSpotService.get_meeting_by_id(meeting_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -195,7 +179,7 @@ def get_meeting(meeting_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/meetings', methods=['POST'])
 @jwt_required()
@@ -226,7 +210,7 @@ def create_meeting():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== EMAIL OPERATIONS ==========
 
@@ -243,7 +227,7 @@ def get_emails():
         result = HubSpotService.get_emails(limit=limit, user_id=current_user_id, properties=properties)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -266,7 +250,7 @@ def get_emails():
                 'status_code': 403
             }), 403
         else:
-            return jsonify({'error': str(e)}), 500
+            return error_response(e)
 
 @bp.route('/emails/<email_id>', methods=['GET'])
 @jwt_required()
@@ -279,7 +263,7 @@ def get_email(email_id):
         result = HubSpotService.get_email_by_id(email_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -291,7 +275,7 @@ def get_email(email_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/emails', methods=['POST'])
 @jwt_required()
@@ -322,27 +306,41 @@ def create_email():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== GENERIC ACTIVITY OPERATIONS ==========
 
+# type -> AsyncHubSpotService list call
+ACTIVITY_LISTS = {
+    'calls': AsyncHubSpotService.get_calls,
+    'meetings': AsyncHubSpotService.get_meetings,
+    'emails': AsyncHubSpotService.get_emails,
+}
+
 @bp.route('/activities', methods=['GET'])
 @jwt_required()
-def get_activities():
-    """Get all activities from HubSpot"""
+async def get_activities():
+    """Get calls, meetings and emails from HubSpot (type=all fetches the three concurrently)"""
     try:
         current_user_id = get_jwt_identity()
         activity_type = request.args.get('type', 'all')
         limit = request.args.get('limit', 10, type=int)
-        
-        # Get activities from HubSpot
-        result = HubSpotService.get_activities(
-            activity_type=activity_type,
-            limit=limit
-        )
-        
+        activity_types = list(ACTIVITY_LISTS) if activity_type == 'all' else [activity_type]
+        if activity_types[0] not in ACTIVITY_LISTS:
+            return jsonify({'error': f"Unknown activity type '{activity_type}'",
+                            'valid_types': ['all', *ACTIVITY_LISTS]}), 400
+
+        try:
+            results = await asyncio.gather(*(
+                ACTIVITY_LISTS[name](limit=limit, user_id=current_user_id) for name in activity_types
+            ))
+        finally:
+            # Flask runs each async view on its own event loop; close that loop's HTTP client with it
+            await AsyncHubSpotService.close_client()
+
         # Log the operation
-        _create_log(
+        await run_blocking(
+            log_sink.write,
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -350,11 +348,11 @@ def get_activities():
             hubspot_id='multiple',
             sync_status='synced'
         )
-        
-        return jsonify(result), 200
-        
+
+        return jsonify(dict(zip(activity_types, results))), 200
+
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/activities/search', methods=['POST'])
 @jwt_required()
@@ -372,7 +370,7 @@ def search_activities():
         )
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=data['session_id'],
             message_id=data['chat_message_id'],
@@ -386,7 +384,7 @@ def search_activities():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== UPDATE OPERATIONS ==========
 
@@ -421,7 +419,7 @@ def update_activity(activity_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DELETE OPERATIONS ==========
 
@@ -451,4 +449,4 @@ def delete_activity(activity_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
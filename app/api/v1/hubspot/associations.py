@@ -5,6 +5,8 @@ HubSpot Associations API - Link objects together with logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+from app.services.log_sink import log_sink
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
 from marshmallow import Schema, fields, ValidationError
@@ -38,26 +40,6 @@ association_create_schema = AssociationCreateSchema()
 association_batch_schema = AssociationBatchSchema()
 association_search_schema = AssociationSearchSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== GET ASSOCIATION TYPES ==========
 
 @bp.route('/types', methods=['GET'])
@@ -71,7 +53,7 @@ def get_association_types():
         result = HubSpotService.get_association_types(user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -83,7 +65,7 @@ def get_association_types():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== CREATE ASSOCIATIONS ==========
 
@@ -119,7 +101,7 @@ def create_association():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/associations/batch', methods=['POST'])
 @jwt_required()
@@ -145,7 +127,7 @@ def batch_create_associations():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== GET ASSOCIATIONS ==========
 
@@ -167,7 +149,7 @@ def get_object_associations(object_type, object_id):
         )
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -179,7 +161,7 @@ def get_object_associations(object_type, object_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/associations/search', methods=['POST'])
 @jwt_required()
@@ -197,7 +179,7 @@ def search_associations():
         )
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=data['session_id'],
             message_id=data['chat_message_id'],
@@ -211,7 +193,7 @@ def search_associations():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DELETE ASSOCIATIONS ==========
 
@@ -245,7 +227,7 @@ def delete_association(object_type, object_id, to_object_type, to_object_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== SPECIFIC ASSOCIATION TYPES ==========
 
@@ -284,7 +266,7 @@ def associate_contact_deal():
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/associations/contact-company', methods=['POST'])
 @jwt_required()
@@ -321,7 +303,7 @@ def associate_contact_company():
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/associations/deal-company', methods=['POST'])
 @jwt_required()
@@ -358,7 +340,7 @@ def associate_deal_company():
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== ASSOCIATION TYPES ==========
 
@@ -374,7 +356,7 @@ def get_object_association_types(object_type):
         result = HubSpotService.get_object_association_types(object_type)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -386,4 +368,4 @@ def get_object_association_types(object_type):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
@@ -0,0 +1,46 @@
+"""
+HubSpot Autocomplete API - Typeahead over mirrored contact and company names
+"""
+
+from flask import Blueprint, request, jsonify
+from app.services.hubspot_service import HubSpotService
+from app.services.autocomplete import autocomplete, AUTOCOMPLETE_OBJECT_TYPES, MAX_RESULTS
+from app.services.crm_mirror import MirrorNotReady
+from app.core.auth_body import authenticate_from_body
+from marshmallow import Schema, fields, validate, ValidationError
+
+bp = Blueprint('hubspot_autocomplete', __name__)
+
+# Request schemas
+class AutocompleteSchema(Schema):
+    token = fields.Str(required=True)
+    q = fields.Str(required=True)  # What has been typed so far, e.g. "ahmed fa"
+    limit = fields.Int(missing=10, validate=validate.Range(min=1, max=MAX_RESULTS))
+    object_types = fields.List(fields.Str(validate=validate.OneOf(AUTOCOMPLETE_OBJECT_TYPES)),
+                               missing=list(AUTOCOMPLETE_OBJECT_TYPES))
+
+# Initialize schemas
+autocomplete_schema = AutocompleteSchema()
+
+@bp.route('', methods=['POST'])
+def autocomplete_names():
+    """Contacts and companies whose name starts with what was typed (from the local CRM mirror)"""
+    try:
+        # Authenticate from body
+        current_user_id, error_response, status_code = authenticate_from_body()
+        if error_response:
+            return error_response, status_code
+
+        data = autocomplete_schema.load(request.get_json())
+        results = autocomplete.lookup(
+            HubSpotService.get_portal_key(current_user_id), data['q'],
+            limit=data['limit'], object_types=tuple(data['object_types'])
+        )
+        return jsonify({'results': results, 'source': 'local'}), 200
+
+    except ValidationError as e:
+        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except MirrorNotReady as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
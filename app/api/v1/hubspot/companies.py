@@ -5,52 +5,18 @@ HubSpot Companies API - Complete CRUD operations with logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+from app.services.crm_mirror import MirrorNotReady
+from app.services.log_sink import log_sink
+from app.core.auth_body import authenticate_from_body
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
-from marshmallow import Schema, fields, ValidationError
+from marshmallow import Schema, fields, validate, ValidationError
 import json
 from datetime import datetime
-import jwt
-from flask import current_app
 
 bp = Blueprint('hubspot_companies', __name__)
 
-def authenticate_from_body():
-    """Authenticate user from token in request body"""
-    try:
-        # Get token from request body
-        if request.is_json:
-            token = request.json.get('token')
-        else:
-            token = request.form.get('token')
-        
-        if not token:
-            return None, jsonify({'error': 'Token is required in request body'}), 401
-        
-        # Decode JWT token directly
-        try:
-            # Get the secret key from Flask app config
-            secret_key = current_app.config.get('JWT_SECRET_KEY')
-            if not secret_key:
-                return None, jsonify({'error': 'JWT secret key not configured'}), 500
-            
-            # Decode the token
-            decoded_token = jwt.decode(token, secret_key, algorithms=['HS256'])
-            user_id = decoded_token.get('sub')  # 'sub' is the user ID in JWT
-            
-            if not user_id:
-                return None, jsonify({'error': 'Invalid token: no user ID found'}), 401
-            
-            return user_id, None, None
-            
-        except jwt.ExpiredSignatureError:
-            return None, jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError as e:
-            return None, jsonify({'error': f'Invalid token: {str(e)}'}), 401
-            
-    except Exception as e:
-        return None, jsonify({'error': f'Authentication error: {str(e)}'}), 401
-
 # Request schemas
 class CompanyCreateSchema(Schema):
     token = fields.Str(required=True)
@@ -71,6 +37,7 @@ class CompanySearchSchema(Schema):
     chat_message_id = fields.Int(missing=0)  # Optional for getters
     search_term = fields.Str(required=True)
     limit = fields.Int(missing=10)
+    source = fields.Str(missing='hubspot', validate=validate.OneOf(['hubspot', 'local']))  # local = CRM mirror
 
 class CompanyGetSchema(Schema):
     token = fields.Str(required=True)
@@ -82,6 +49,7 @@ class CompanyGetSchema(Schema):
 class CompanyGetByIdSchema(Schema):
     token = fields.Str(required=True)
     company_id = fields.Str(required=True)
+    properties = fields.List(fields.Str(), missing=None)  # HubSpot default set when omitted
     session_id = fields.Int(missing=0)  # Optional for getters
     chat_message_id = fields.Int(missing=0)  # Optional for getters
 
@@ -99,26 +67,6 @@ company_get_schema = CompanyGetSchema()
 company_get_by_id_schema = CompanyGetByIdSchema()
 company_delete_schema = CompanyDeleteSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== GET OPERATIONS ==========
 
 @bp.route('/companies', methods=['GET'])
@@ -142,7 +90,7 @@ def get_companies():
         
         # Log the operation (only if session_id and chat_message_id are provided)
         if data.get('session_id', 0) > 0 and data.get('chat_message_id', 0) > 0:
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -156,7 +104,7 @@ def get_companies():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/companies/get', methods=['POST'])
 def get_company():
@@ -172,11 +120,11 @@ def get_company():
         company_id = data['company_id']
         
         # Get company from HubSpot
-        result = HubSpotService.get_company_by_id(company_id, user_id=current_user_id)
+        result = HubSpotService.get_company_by_id(company_id, user_id=current_user_id, properties=data['properties'])
         
         # Log the operation (only if session_id and chat_message_id are provided)
         if data.get('session_id', 0) > 0 and data.get('chat_message_id', 0) > 0:
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -190,7 +138,7 @@ def get_company():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/properties', methods=['GET'])
 def get_company_properties():
@@ -208,7 +156,7 @@ def get_company_properties():
         result = HubSpotService.get_company_properties(user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -222,7 +170,7 @@ def get_company_properties():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/companies/search', methods=['POST'])
 def search_companies():
@@ -239,12 +187,13 @@ def search_companies():
         result = HubSpotService.search_companies(
             search_term=data['search_term'],
             limit=data.get('limit', 10),
-            user_id=current_user_id
+            user_id=current_user_id,
+            source=data['source']
         )
         
         # Log the operation (only if session_id and chat_message_id are provided)
         if data.get('session_id', 0) > 0 and data.get('chat_message_id', 0) > 0:
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -257,8 +206,10 @@ def search_companies():
         
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except MirrorNotReady as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== CREATE OPERATIONS ==========
 
@@ -301,7 +252,7 @@ def create_company():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== UPDATE OPERATIONS ==========
 
@@ -346,7 +297,7 @@ def update_company():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/companies/replace', methods=['POST'])
 def replace_company():
@@ -381,7 +332,7 @@ def replace_company():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DELETE OPERATIONS ==========
 
@@ -417,7 +368,7 @@ def delete_company():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== BATCH OPERATIONS ==========
 
@@ -450,7 +401,7 @@ def batch_create_companies():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/companies/batch', methods=['PATCH'])
 def batch_update_companies():
@@ -481,7 +432,7 @@ def batch_update_companies():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== PROPERTIES OPERATIONS ==========
 
@@ -506,7 +457,7 @@ def get_company_property():
         result = HubSpotService.get_company_property(property_name)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -518,4 +469,4 @@ def get_company_property():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
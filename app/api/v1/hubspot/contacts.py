@@ -4,52 +4,18 @@ HubSpot Contacts API - Complete CRUD operations with logging
 
 from flask import Blueprint, request, jsonify
 from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+from app.services.crm_mirror import MirrorNotReady
+from app.services.log_sink import log_sink
+from app.core.auth_body import authenticate_from_body
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
-from marshmallow import Schema, fields, ValidationError
+from marshmallow import Schema, fields, validate, ValidationError
 import json
 from datetime import datetime
-import jwt
-from flask import current_app
 
 bp = Blueprint('hubspot_contacts', __name__)
 
-def authenticate_from_body():
-    """Authenticate user from token in request body"""
-    try:
-        # Get token from request body
-        if request.is_json:
-            token = request.json.get('token')
-        else:
-            token = request.form.get('token')
-        
-        if not token:
-            return None, jsonify({'error': 'Token is required in request body'}), 401
-        
-        # Decode JWT token directly
-        try:
-            # Get the secret key from Flask app config
-            secret_key = current_app.config.get('JWT_SECRET_KEY')
-            if not secret_key:
-                return None, jsonify({'error': 'JWT secret key not configured'}), 500
-            
-            # Decode the token
-            decoded_token = jwt.decode(token, secret_key, algorithms=['HS256'])
-            user_id = decoded_token.get('sub')  # 'sub' is the user ID in JWT
-            
-            if not user_id:
-                return None, jsonify({'error': 'Invalid token: no user ID found'}), 401
-            
-            return user_id, None, None
-            
-        except jwt.ExpiredSignatureError:
-            return None, jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError as e:
-            return None, jsonify({'error': f'Invalid token: {str(e)}'}), 401
-            
-    except Exception as e:
-        return None, jsonify({'error': f'Authentication error: {str(e)}'}), 401
-
 # Request schemas
 class ContactCreateSchema(Schema):
     token = fields.Str(required=True)
@@ -70,6 +36,7 @@ class ContactSearchSchema(Schema):
     chat_message_id = fields.Int(missing=0)  # Optional for general queries
     search_term = fields.Str(required=True)
     limit = fields.Int(missing=10)
+    source = fields.Str(missing='hubspot', validate=validate.OneOf(['hubspot', 'local']))  # local = CRM mirror
 
 class ContactGetSchema(Schema):
     token = fields.Str(required=True)
@@ -81,6 +48,7 @@ class ContactGetSchema(Schema):
 class ContactGetByIdSchema(Schema):
     token = fields.Str(required=True)
     contact_id = fields.Str(required=True)
+    properties = fields.List(fields.Str(), missing=None)  # HubSpot default set when omitted
     session_id = fields.Int(missing=0)  # Optional for getters
     chat_message_id = fields.Int(missing=0)  # Optional for getters
 
@@ -98,26 +66,6 @@ contact_get_schema = ContactGetSchema()
 contact_get_by_id_schema = ContactGetByIdSchema()
 contact_delete_schema = ContactDeleteSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== GET OPERATIONS ==========
 
 @bp.route('/contacts/get', methods=['POST'])
@@ -138,7 +86,7 @@ def get_contacts():
         
         # Log the operation (only if session_id and chat_message_id are provided)
         if data.get('session_id', 0) > 0 and data.get('chat_message_id', 0) > 0:
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -150,7 +98,7 @@ def get_contacts():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/contacts/get-by-id', methods=['POST'])
 def get_contact():
@@ -165,11 +113,11 @@ def get_contact():
         contact_id = data['contact_id']
         
         # Get contact from HubSpot
-        result = HubSpotService.get_contact_by_id(contact_id, user_id=current_user_id)
+        result = HubSpotService.get_contact_by_id(contact_id, user_id=current_user_id, properties=data['properties'])
         
         # Log the operation (only if session_id and chat_message_id are provided)
         if data.get('session_id', 0) > 0 and data.get('chat_message_id', 0) > 0:
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -183,7 +131,7 @@ def get_contact():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/contacts/properties', methods=['POST'])
 def get_contact_properties():
@@ -198,7 +146,7 @@ def get_contact_properties():
         result = HubSpotService.get_contact_properties(user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -210,7 +158,7 @@ def get_contact_properties():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/contacts/search', methods=['POST'])
 def search_contacts():
@@ -227,12 +175,13 @@ def search_contacts():
         result = HubSpotService.search_contacts(
             search_term=data['search_term'],
             limit=data.get('limit', 10),
-            user_id=current_user_id
+            user_id=current_user_id,
+            source=data['source']
         )
         
         # Log the operation (only if session_id and chat_message_id are provided)
         if data.get('session_id', 0) > 0 and data.get('chat_message_id', 0) > 0:
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -245,8 +194,10 @@ def search_contacts():
         
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except MirrorNotReady as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== CREATE OPERATIONS ==========
 
@@ -289,7 +240,7 @@ def create_contact():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== UPDATE OPERATIONS ==========
 
@@ -334,7 +285,7 @@ def update_contact():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/contacts/replace', methods=['POST'])
 def replace_contact():
@@ -377,7 +328,7 @@ def replace_contact():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DELETE OPERATIONS ==========
 
@@ -410,7 +361,7 @@ def delete_contact():
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== BATCH OPERATIONS ==========
 
@@ -443,7 +394,7 @@ def batch_create_contacts():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/contacts/batch/update', methods=['POST'])
 def batch_update_contacts():
@@ -474,7 +425,7 @@ def batch_update_contacts():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== PROPERTIES OPERATIONS ==========
 
@@ -498,7 +449,7 @@ def get_contact_property():
         result = HubSpotService.get_contact_property(property_name, user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -510,4 +461,4 @@ def get_contact_property():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
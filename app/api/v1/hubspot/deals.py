@@ -5,6 +5,8 @@ HubSpot Deals API - Complete CRUD operations with logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+from app.services.log_sink import log_sink
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
 from marshmallow import Schema, fields, ValidationError
@@ -35,26 +37,6 @@ deal_create_schema = DealCreateSchema()
 deal_update_schema = DealUpdateSchema()
 deal_search_schema = DealSearchSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== GET OPERATIONS ==========
 
 @bp.route('/deals', methods=['GET'])
@@ -70,7 +52,7 @@ def get_deals():
         result = HubSpotService.get_deals(limit=limit, user_id=current_user_id, properties=properties)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -82,7 +64,7 @@ def get_deals():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/deals/<deal_id>', methods=['GET'])
 @jwt_required()
@@ -92,10 +74,10 @@ def get_deal(deal_id):
         current_user_id = get_jwt_identity()
         
         # Get deal from HubSpot
-        result = HubSpotService.get_deal_by_id(deal_id)
+        result = HubSpotService.get_deal_by_id(deal_id, user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -107,7 +89,7 @@ def get_deal(deal_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/pipelines', methods=['GET'])
 @jwt_required()
@@ -120,7 +102,7 @@ def get_deal_pipelines():
         result = HubSpotService.get_deal_pipelines(user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -132,7 +114,7 @@ def get_deal_pipelines():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/deals/search', methods=['POST'])
 @jwt_required()
@@ -149,7 +131,7 @@ def search_deals():
         )
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=data['session_id'],
             message_id=data['chat_message_id'],
@@ -163,7 +145,7 @@ def search_deals():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== CREATE OPERATIONS ==========
 
@@ -196,7 +178,7 @@ def create_deal():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== UPDATE OPERATIONS ==========
 
@@ -230,7 +212,7 @@ def update_deal(deal_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/deals/<deal_id>', methods=['PUT'])
 @jwt_required()
@@ -262,7 +244,7 @@ def replace_deal(deal_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DELETE OPERATIONS ==========
 
@@ -292,7 +274,7 @@ def delete_deal(deal_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== BATCH OPERATIONS ==========
 
@@ -322,7 +304,7 @@ def batch_create_deals():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/deals/batch', methods=['PATCH'])
 @jwt_required()
@@ -350,7 +332,7 @@ def batch_update_deals():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== PIPELINE OPERATIONS ==========
 
@@ -366,7 +348,7 @@ def get_deal_stages(pipeline_id):
         result = HubSpotService.get_deal_stages(pipeline_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -378,4 +360,4 @@ def get_deal_stages(pipeline_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
@@ -0,0 +1,12 @@
+"""
+Error responses shared by the HubSpot blueprints
+"""
+
+from flask import jsonify
+from app.services.rate_limiter import HubSpotRateLimitError
+
+def error_response(e, status_code=500):
+    """JSON error for a failed request: 429 with Retry-After when HubSpot rate-limit retries ran out"""
+    if isinstance(e, HubSpotRateLimitError):
+        return jsonify({'error': str(e), 'retry_after': e.retry_after}), 429, {'Retry-After': str(e.retry_after)}
+    return jsonify({'error': str(e)}), status_code
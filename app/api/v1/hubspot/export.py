@@ -0,0 +1,56 @@
+"""
+HubSpot Export API - NDJSON streaming of whole object collections
+"""
+
+import json
+from itertools import chain
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+
+bp = Blueprint('hubspot_export', __name__)
+
+EXPORTABLE_TYPES = ('contacts', 'companies', 'deals', 'notes', 'tasks', 'calls', 'meetings', 'emails')
+
+@bp.route('/<object_type>', methods=['GET'])
+@jwt_required()
+def export_objects(object_type):
+    """Stream every record of an object type as newline-delimited JSON
+
+    Query params: ``properties`` (repeatable or comma separated), ``limit``
+    (max records, default all), ``page_size`` (1-100). Records are fetched
+    page by page while the response is written, so memory use does not grow
+    with the portal size. If HubSpot fails mid-stream, the last line is
+    ``{"error": ...}``.
+    """
+    try:
+        if object_type not in EXPORTABLE_TYPES:
+            return jsonify({'error': f'Unsupported object type: {object_type}'}), 400
+
+        current_user_id = get_jwt_identity()
+        properties = [prop for value in request.args.getlist('properties') for prop in value.split(',') if prop]
+        max_records = request.args.get('limit', type=int)
+        page_size = max(1, min(request.args.get('page_size', 100, type=int), 100))
+
+        records = HubSpotService.iter_objects(
+            object_type, page_size=page_size, properties=properties or None,
+            user_id=current_user_id, max_records=max_records
+        )
+
+        # Fetch the first page before answering so auth/rate-limit errors still get a proper status
+        first = next(records, None)
+        if first is None:
+            return Response('', mimetype='application/x-ndjson'), 200
+
+        def generate():
+            try:
+                for record in chain([first], records):
+                    yield json.dumps(record) + '\n'
+            except Exception as e:
+                yield json.dumps({'error': str(e)}) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson'), 200
+
+    except Exception as e:
+        return error_response(e)
@@ -5,6 +5,8 @@ HubSpot Leads API - Lead management and qualification
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+from app.services.log_sink import log_sink
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
 from marshmallow import Schema, fields, ValidationError
@@ -45,32 +47,6 @@ lead_create_schema = LeadCreateSchema()
 lead_qualify_schema = LeadQualifySchema()
 deal_stage_update_schema = DealStageUpdateSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None, 
-                lead_status=None, deal_stage=None, lead_source=None, deal_amount=None, stage_reason=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None,
-            lead_status=lead_status,
-            deal_stage=deal_stage,
-            lead_source=lead_source,
-            deal_amount=deal_amount,
-            stage_reason=stage_reason
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== LEAD OPERATIONS ==========
 
 @bp.route('/leads', methods=['GET'])
@@ -80,6 +56,7 @@ def get_leads():
     try:
         current_user_id = get_jwt_identity()
         limit = request.args.get('limit', 10, type=int)
+        after = request.args.get('after')
         lead_status = request.args.get('lead_status', '')
         
         # Get leads from HubSpot
@@ -87,10 +64,10 @@ def get_leads():
         if lead_status:
             filters['lead_status'] = lead_status
             
-        result = HubSpotService.get_leads(limit=limit, user_id=current_user_id, **filters)
+        result = HubSpotService.get_leads(limit=limit, user_id=current_user_id, after=after, **filters)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -102,7 +79,7 @@ def get_leads():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/leads', methods=['POST'])
 @jwt_required()
@@ -122,7 +99,7 @@ def create_lead():
         
         if result['success']:
             # Log the lead creation with detailed information
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -148,7 +125,7 @@ def create_lead():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/leads/<lead_id>/qualify', methods=['POST'])
 @jwt_required()
@@ -167,7 +144,7 @@ def qualify_lead(lead_id):
         
         if result['success']:
             # Log the qualification
-            _create_log(
+            log_sink.write(
                 user_id=current_user_id,
                 session_id=data['session_id'],
                 message_id=data['chat_message_id'],
@@ -179,7 +156,7 @@ def qualify_lead(lead_id):
             
             # Log deal creation if applicable
             if result.get('deal_created') and result.get('deal_id'):
-                _create_log(
+                log_sink.write(
                     user_id=current_user_id,
                     session_id=data['session_id'],
                     message_id=data['chat_message_id'],
@@ -206,7 +183,7 @@ def qualify_lead(lead_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DEAL STAGE OPERATIONS ==========
 
@@ -226,7 +203,7 @@ def update_deal_stage(deal_id):
         )
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=data['session_id'],
             message_id=data['chat_message_id'],
@@ -248,7 +225,7 @@ def update_deal_stage(deal_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/pipelines/<pipeline_id>/stages', methods=['GET'])
 @jwt_required()
@@ -261,7 +238,7 @@ def get_deal_stages(pipeline_id):
         result = HubSpotService.get_deal_stages(pipeline_id, user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -273,7 +250,7 @@ def get_deal_stages(pipeline_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/pipelines', methods=['GET'])
 @jwt_required()
@@ -286,7 +263,7 @@ def get_deal_pipelines():
         result = HubSpotService.get_deal_pipelines(user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -298,42 +275,25 @@ def get_deal_pipelines():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== LEAD ANALYTICS ==========
 
 @bp.route('/leads/analytics', methods=['GET'])
 @jwt_required()
 def get_lead_analytics():
-    """Get lead analytics and statistics"""
+    """Get lead analytics and statistics
+
+    Counts every contact from the lead stage onwards (cached per user for
+    HUBSPOT_LEAD_ANALYTICS_TTL seconds; ?refresh=true recomputes).
+    """
     try:
         current_user_id = get_jwt_identity()
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
         
-        # Get leads for analytics
-        leads_result = HubSpotService.get_leads(limit=100, user_id=current_user_id)
-        leads = leads_result.get('results', [])
-        
-        # Calculate analytics
-        total_leads = len(leads)
-        lead_statuses = {}
-        lead_sources = {}
-        
-        for lead in leads:
-            properties = lead.get('properties', {})
-            status = properties.get('lead_status', 'UNKNOWN')
-            source = properties.get('lead_source', 'UNKNOWN')
-            
-            lead_statuses[status] = lead_statuses.get(status, 0) + 1
-            lead_sources[source] = lead_sources.get(source, 0) + 1
-        
-        analytics = {
-            'total_leads': total_leads,
-            'lead_statuses': lead_statuses,
-            'lead_sources': lead_sources,
-            'conversion_rate': 0  # This would need more complex calculation
-        }
+        analytics = HubSpotService.get_lead_analytics(user_id=current_user_id, refresh=refresh)
         
         return jsonify(analytics), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
@@ -5,9 +5,12 @@ HubSpot Notes API - Complete CRUD operations with logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+from app.services.crm_mirror import MirrorNotReady
+from app.services.log_sink import log_sink
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
-from marshmallow import Schema, fields, ValidationError
+from marshmallow import Schema, fields, validate, ValidationError
 from datetime import datetime
 
 bp = Blueprint('hubspot_notes', __name__)
@@ -29,32 +32,13 @@ class NoteSearchSchema(Schema):
     session_id = fields.Int(required=True)
     chat_message_id = fields.Int(required=True)
     search_term = fields.Str(required=True)
+    source = fields.Str(missing='hubspot', validate=validate.OneOf(['hubspot', 'local']))  # local = CRM mirror
 
 # Initialize schemas
 note_create_schema = NoteCreateSchema()
 note_update_schema = NoteUpdateSchema()
 note_search_schema = NoteSearchSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== GET OPERATIONS ==========
 
 @bp.route('/notes', methods=['GET'])
@@ -70,7 +54,7 @@ def get_notes():
         result = HubSpotService.get_notes(limit=limit, user_id=current_user_id, properties=properties)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -82,7 +66,7 @@ def get_notes():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/notes/<note_id>', methods=['GET'])
 @jwt_required()
@@ -92,10 +76,10 @@ def get_note(note_id):
         current_user_id = get_jwt_identity()
         
         # Get note from HubSpot
-        result = HubSpotService.get_note_by_id(note_id)
+        result = HubSpotService.get_note_by_id(note_id, user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -107,7 +91,7 @@ def get_note(note_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/notes/search', methods=['POST'])
 @jwt_required()
@@ -120,11 +104,13 @@ def search_notes():
         # Search notes in HubSpot
         result = HubSpotService.search_notes(
             search_term=data['search_term'],
-            limit=request.args.get('limit', 10, type=int)
+            limit=request.args.get('limit', 10, type=int),
+            user_id=current_user_id,
+            source=data['source']
         )
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=data['session_id'],
             message_id=data['chat_message_id'],
@@ -137,8 +123,10 @@ def search_notes():
         
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except MirrorNotReady as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== CREATE OPERATIONS ==========
 
@@ -171,7 +159,7 @@ def create_note():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== UPDATE OPERATIONS ==========
 
@@ -205,7 +193,7 @@ def update_note(note_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/notes/<note_id>', methods=['PUT'])
 @jwt_required()
@@ -237,7 +225,7 @@ def replace_note(note_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DELETE OPERATIONS ==========
 
@@ -267,7 +255,7 @@ def delete_note(note_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== BATCH OPERATIONS ==========
 
@@ -297,7 +285,7 @@ def batch_create_notes():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/notes/batch', methods=['PATCH'])
 @jwt_required()
@@ -325,7 +313,7 @@ def batch_update_notes():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== ASSOCIATION OPERATIONS ==========
 
@@ -340,7 +328,7 @@ def get_note_associations(note_id):
         result = HubSpotService.get_note_associations(note_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -352,7 +340,7 @@ def get_note_associations(note_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/notes/<note_id>/associations', methods=['POST'])
 @jwt_required()
@@ -384,4 +372,4 @@ def create_note_associations(note_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
@@ -5,6 +5,8 @@ HubSpot Tasks API - Complete CRUD operations with logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.hubspot_service import HubSpotService
+from app.api.v1.hubspot.errors import error_response
+from app.services.log_sink import log_sink
 from app.models import User, Log, ChatSession, ChatMessage
 from app.db.database import db
 from marshmallow import Schema, fields, ValidationError
@@ -35,26 +37,6 @@ task_create_schema = TaskCreateSchema()
 task_update_schema = TaskUpdateSchema()
 task_search_schema = TaskSearchSchema()
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for HubSpot operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        return None
-
 # ========== GET OPERATIONS ==========
 
 @bp.route('/tasks', methods=['GET'])
@@ -70,7 +52,7 @@ def get_tasks():
         result = HubSpotService.get_tasks(limit=limit, user_id=current_user_id, properties=properties)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -82,7 +64,7 @@ def get_tasks():
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/tasks/<task_id>', methods=['GET'])
 @jwt_required()
@@ -92,10 +74,10 @@ def get_task(task_id):
         current_user_id = get_jwt_identity()
         
         # Get task from HubSpot
-        result = HubSpotService.get_task_by_id(task_id)
+        result = HubSpotService.get_task_by_id(task_id, user_id=current_user_id)
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=0,
             message_id=0,
@@ -107,7 +89,7 @@ def get_task(task_id):
         return jsonify(result), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/tasks/search', methods=['POST'])
 @jwt_required()
@@ -124,7 +106,7 @@ def search_tasks():
         )
         
         # Log the operation
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=data['session_id'],
             message_id=data['chat_message_id'],
@@ -138,7 +120,7 @@ def search_tasks():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== CREATE OPERATIONS ==========
 
@@ -171,7 +153,7 @@ def create_task():
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== UPDATE OPERATIONS ==========
 
@@ -205,7 +187,7 @@ def update_task(task_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/tasks/<task_id>', methods=['PUT'])
 @jwt_required()
@@ -237,7 +219,7 @@ def replace_task(task_id):
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== DELETE OPERATIONS ==========
 
@@ -267,7 +249,7 @@ def delete_task(task_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== BATCH OPERATIONS ==========
 
@@ -297,7 +279,7 @@ def batch_create_tasks():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/tasks/batch', methods=['PATCH'])
 @jwt_required()
@@ -325,7 +307,7 @@ def batch_update_tasks():
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 # ========== STATUS OPERATIONS ==========
 
@@ -357,7 +339,7 @@ def complete_task(task_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @bp.route('/tasks/<task_id>/status', methods=['PATCH'])
 @jwt_required()
@@ -389,4 +371,4 @@ def update_task_status(task_id):
             return jsonify({'error': result.get('error')}), 400
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
@@ -2,37 +2,78 @@
 Log management API endpoints
 """
 
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from app.models import Log
 from app.db.database import db
+from app.db.pagination import keyset_page, page_size, InvalidCursor
 
 bp = Blueprint('logs', __name__)
 
+def _parse_datetime(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+
 @bp.route('', methods=['GET'])
 @jwt_required()
 def get_logs():
-    """Get all logs"""
+    """Get one page of logs, newest first
+
+    Query parameters: session_id, log_type, sync_status, since, until
+    (ISO 8601, since inclusive, until exclusive), limit (default 50, max
+    200) and cursor (``next_cursor`` of the previous page).
+    """
     try:
         current_user_id = get_jwt_identity()
         session_id = request.args.get('session_id', type=int)
-        
-        # Build query
-        query = Log.query.filter_by(user_id=current_user_id)
+        log_type = request.args.get('log_type')
+        sync_status = request.args.get('sync_status')
+        try:
+            since = _parse_datetime('since')
+            until = _parse_datetime('until')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Build query (served by ix_logs_user_created)
+        query = Log.query.filter_by(user_id=current_user_id).options(joinedload(Log.message))
         if session_id:
             query = query.filter_by(session_id=session_id)
-        
+        if log_type:
+            query = query.filter_by(log_type=log_type)
+        if sync_status:
+            query = query.filter_by(sync_status=sync_status)
+        if since:
+            query = query.filter(Log.created_at >= since)
+        if until:
+            query = query.filter(Log.created_at < until)
+
         # Get logs
-        logs = query.order_by(Log.created_at.desc()).all()
-        
+        try:
+            logs, next_cursor = keyset_page(
+                query, Log.created_at, Log.id,
+                cursor=request.args.get('cursor'),
+                limit=page_size(request.args.get('limit', type=int))
+            )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+
         # Convert to dict
         logs_data = [log.to_dict() for log in logs]
-        
+
         return jsonify({
             'logs': logs_data,
             'total': len(logs_data),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
             'message': f'Found {len(logs_data)} logs'
         }), 200
-        
+
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
@@ -3,17 +3,36 @@ Analytics and statistics API endpoints
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.stats_service import StatsService
 
 bp = Blueprint('stats', __name__)
 
 @bp.route('/overview', methods=['GET'])
 @jwt_required()
 def get_overview():
-    """Get overview statistics"""
-    return jsonify({
-        'total_sessions': 0,
-        'total_messages': 0,
-        'total_logs': 0,
-        'message': 'Stats endpoint working'
-    }), 200
\ No newline at end of file
+    """Get overview statistics
+
+    Answered from the stats_rollups table. Query parameters: days (daily
+    series length, default 30, max 366) and hours (hourly series length,
+    default 24, max 168).
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        days = max(1, min(request.args.get('days', 30, type=int), 366))
+        hours = max(1, min(request.args.get('hours', 24, type=int), 168))
+
+        overview = StatsService.get_overview(current_user_id, days=days, hours=hours)
+        user = overview['user']
+
+        return jsonify({
+            'total_sessions': user['sessions'],
+            'total_messages': user['messages'],
+            'total_logs': user['logs']['total'],
+            'user': user,
+            'global': overview['global'],
+            'message': 'Stats from rollups'
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -7,6 +7,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import User
 from app.db.database import db
 from app.core.security import SecurityService
+from app.services.hubspot_service import HubSpotService
 from marshmallow import Schema, fields, ValidationError
 
 bp = Blueprint('users', __name__)
@@ -77,7 +78,7 @@ def get_user(user_id):
         current_user_id = get_jwt_identity()
         
         # Users can only access their own data
-        if current_user_id != user_id:
+        if str(current_user_id) != str(user_id):
             return jsonify({'error': 'Access denied'}), 403
         
         user = User.query.get(user_id)
@@ -105,7 +106,7 @@ def update_user(user_id):
         current_user_id = get_jwt_identity()
         
         # Users can only update their own data
-        if current_user_id != user_id:
+        if str(current_user_id) != str(user_id):
             return jsonify({'error': 'Access denied'}), 403
         
         user = User.query.get(user_id)
@@ -130,6 +131,9 @@ def update_user(user_id):
                 user.hubspot_pat_token = data['hubspot_pat_token']
         
         db.session.commit()
+
+        if 'hubspot_pat_token' in data:
+            HubSpotService.invalidate_hubspot_token(user_id)
         
         return jsonify({
             'message': 'User updated successfully',
@@ -1,14 +1,16 @@
 """
 WhatsApp Webhook Controller for Twilio Integration
-Handles incoming WhatsApp messages and processes them with AI
+Queues incoming WhatsApp messages for the webhook workers (app.services.whatsapp_service)
 """
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import User, ChatSession, ChatMessage, Log
-from app.db.database import db
+from sqlalchemy import func, select
+from app.models import ChatSession, ChatMessage
+from app.db.pagination import keyset_page, page_size, InvalidCursor
+from app.services.log_sink import log_sink
+from app.services.whatsapp_service import WhatsAppService
 from datetime import datetime
-import json
 import logging
 
 bp = Blueprint('whatsapp', __name__)
@@ -17,26 +19,8 @@ bp = Blueprint('whatsapp', __name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def _create_log(user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error=None):
-    """Create a log entry for WhatsApp operations"""
-    try:
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type,
-            hubspot_id=hubspot_id,
-            sync_status=sync_status,
-            sync_error=sync_error,
-            synced_at=datetime.utcnow() if sync_status == 'synced' else None
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Failed to create log: {e}")
-        return None
+# Upper bound for include_last_n_messages on GET /sessions
+MAX_LAST_MESSAGES = 50
 
 @bp.route('/webhook', methods=['GET', 'POST'])
 def webhook():
@@ -51,94 +35,19 @@ def webhook():
     
     elif request.method == 'POST':
         try:
-            # Parse Twilio webhook data
-            data = request.get_json()
-            logger.info(f"Received WhatsApp webhook: {json.dumps(data, indent=2)}")
-            
-            # Extract message details
-            message_data = data.get('entry', [{}])[0].get('changes', [{}])[0].get('value', {})
-            messages = message_data.get('messages', [])
-            
-            if not messages:
-                logger.warning("No messages found in webhook data")
-                return jsonify({'status': 'no_messages'}), 200
-            
-            # Process each message
-            for message in messages:
-                process_whatsapp_message(message, message_data)
-            
-            return jsonify({'status': 'success'}), 200
+            # Store the raw body and acknowledge; the webhook workers do the processing
+            payload = request.get_data(as_text=True)
+            if not payload:
+                return jsonify({'error': 'Empty webhook body'}), 400
+            logger.info(f"Received WhatsApp webhook ({len(payload)} bytes)")
+
+            event_id = WhatsAppService.enqueue(payload)
+            return jsonify({'status': 'queued', 'event_id': event_id}), 200
             
         except Exception as e:
-            logger.error(f"Error processing WhatsApp webhook: {e}")
+            logger.error(f"Error queueing WhatsApp webhook: {e}")
             return jsonify({'error': str(e)}), 500
 
-def process_whatsapp_message(message, message_data):
-    """Process individual WhatsApp message"""
-    try:
-        # Extract message details
-        message_id = message.get('id')
-        from_number = message.get('from')
-        message_text = message.get('text', {}).get('body', '')
-        timestamp = message.get('timestamp')
-        
-        logger.info(f"Processing message {message_id} from {from_number}: {message_text}")
-        
-        # Find or create user by phone number
-        user = User.query.filter_by(phone_number=from_number).first()
-        if not user:
-            logger.warning(f"No user found for phone number: {from_number}")
-            return
-        
-        # Find or create chat session
-        session = ChatSession.query.filter_by(
-            user_id=user.id,
-            status='active'
-        ).first()
-        
-        if not session:
-            session = ChatSession(
-                user_id=user.id,
-                started_at=datetime.utcnow(),
-                status='active'
-            )
-            db.session.add(session)
-            db.session.commit()
-            logger.info(f"Created new chat session {session.id} for user {user.id}")
-        
-        # Create chat message record
-        chat_message = ChatMessage(
-            session_id=session.id,
-            message_text=message_text,
-            timestamp=datetime.fromtimestamp(int(timestamp)),
-            forwarded_from=from_number
-        )
-        db.session.add(chat_message)
-        db.session.commit()
-        
-        logger.info(f"Created chat message {chat_message.id} in session {session.id}")
-        
-        # Log the incoming message
-        _create_log(
-            user_id=user.id,
-            session_id=session.id,
-            message_id=chat_message.id,
-            log_type='whatsapp_message',
-            hubspot_id=message_id,
-            sync_status='synced'
-        )
-        
-        # Here you would typically:
-        # 1. Send message to AI for analysis
-        # 2. AI determines what HubSpot actions to take
-        # 3. Execute HubSpot API calls based on AI analysis
-        # 4. Send response back to user via Twilio
-        
-        logger.info(f"Message {message_id} processed successfully")
-        
-    except Exception as e:
-        logger.error(f"Error processing message {message_id}: {e}")
-
 @bp.route('/send', methods=['POST'])
 @jwt_required()
 def send_message():
@@ -163,7 +72,7 @@ def send_message():
         logger.info(f"Sending WhatsApp message to {to_number}: {message_text}")
         
         # Log the outgoing message
-        _create_log(
+        log_sink.write(
             user_id=current_user_id,
             session_id=session_id or 0,
             message_id=message_id or 0,
@@ -207,42 +116,117 @@ def status():
         logger.error(f"Error getting WhatsApp status: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _message_summary(message):
+    return {
+        'id': message.id,
+        'text': message.message_text,
+        'timestamp': message.timestamp.isoformat(),
+        'from': message.forwarded_from
+    }
+
+def _latest_messages(session_ids, count):
+    """The last ``count`` messages of each session, oldest first, from one window-function query"""
+    if not session_ids or count <= 0:
+        return {}
+    ranked = select(
+        ChatMessage.id,
+        func.row_number().over(
+            partition_by=ChatMessage.session_id,
+            order_by=(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        ).label('position')
+    ).where(ChatMessage.session_id.in_(session_ids)).subquery()
+    messages = (
+        ChatMessage.query.join(ranked, ranked.c.id == ChatMessage.id)
+        .filter(ranked.c.position <= count)
+        .order_by(ChatMessage.session_id, ChatMessage.timestamp, ChatMessage.id)
+        .all()
+    )
+    latest = {}
+    for message in messages:
+        latest.setdefault(message.session_id, []).append(_message_summary(message))
+    return latest
+
 @bp.route('/sessions', methods=['GET'])
 @jwt_required()
 def get_sessions():
-    """Get all chat sessions for the current user"""
+    """Get one page of the current user's chat sessions, newest first
+
+    Query parameters: status, limit (default 50, max 200), cursor
+    (``next_cursor`` of the previous page) and include_last_n_messages
+    (0-50, default 0) to embed each session's latest messages.
+    """
     try:
         current_user_id = get_jwt_identity()
-        
-        sessions = ChatSession.query.filter_by(user_id=current_user_id).order_by(
-            ChatSession.created_at.desc()
-        ).all()
-        
+        status = request.args.get('status')
+        last_n = max(0, min(request.args.get('include_last_n_messages', 0, type=int), MAX_LAST_MESSAGES))
+
+        query = ChatSession.query.filter_by(user_id=current_user_id)
+        if status:
+            query = query.filter_by(status=status)
+        try:
+            sessions, next_cursor = keyset_page(
+                query, ChatSession.created_at, ChatSession.id,
+                cursor=request.args.get('cursor'),
+                limit=page_size(request.args.get('limit', type=int))
+            )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+
+        latest = _latest_messages([session.id for session in sessions], last_n)
+
         sessions_data = []
         for session in sessions:
-            messages = ChatMessage.query.filter_by(session_id=session.id).order_by(
-                ChatMessage.timestamp
-            ).all()
-            
-            sessions_data.append({
+            session_data = {
                 'id': session.id,
                 'started_at': session.started_at.isoformat(),
                 'ended_at': session.ended_at.isoformat() if session.ended_at else None,
                 'status': session.status,
-                'message_count': len(messages),
-                'messages': [{
-                    'id': msg.id,
-                    'text': msg.message_text,
-                    'timestamp': msg.timestamp.isoformat(),
-                    'from': msg.forwarded_from
-                } for msg in messages]
-            })
+                'message_count': session.message_count,
+                'log_count': session.log_count
+            }
+            if last_n:
+                session_data['messages'] = latest.get(session.id, [])
+            sessions_data.append(session_data)
         
         return jsonify({
             'sessions': sessions_data,
-            'total': len(sessions_data)
+            'total': len(sessions_data),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         }), 200
         
     except Exception as e:
         logger.error(f"Error getting sessions: {e}")
         return jsonify({'error': str(e)}), 500
+
+@bp.route('/sessions/<int:session_id>/messages', methods=['GET'])
+@jwt_required()
+def get_session_messages(session_id):
+    """Get one page of a session's messages, newest first (limit, cursor)"""
+    try:
+        current_user_id = get_jwt_identity()
+        session = ChatSession.query.filter_by(id=session_id, user_id=current_user_id).first()
+        if not session:
+            return jsonify({'error': 'Session not found'}), 404
+
+        try:
+            messages, next_cursor = keyset_page(
+                ChatMessage.query.filter_by(session_id=session_id), ChatMessage.timestamp, ChatMessage.id,
+                cursor=request.args.get('cursor'),
+                limit=page_size(request.args.get('limit', type=int))
+            )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'session_id': session_id,
+            'messages': [_message_summary(message) for message in messages],
+            'total': len(messages),
+            'message_count': session.message_count,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error getting session messages: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -15,13 +15,85 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///data/database.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite connection profile (pragmas run on every new connection)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')  # WAL lets readers run alongside the writer
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')  # fsync at checkpoints only (safe with WAL)
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # Milliseconds to wait for a lock
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -65536))  # Pages, or KiB when negative (64 MiB)
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))  # Bytes (256 MiB)
+    SQLITE_SINGLE_WRITER = os.getenv('SQLITE_SINGLE_WRITER', 'false').lower() == 'true'  # One writer thread per process
+    SQLITE_WRITER_BATCH = int(os.getenv('SQLITE_WRITER_BATCH', 64))  # Queued writes per commit
+    DB_AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true'  # create_app creates/migrates the schema
+
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 1)))
+    AUTH_CLAIMS_CACHE_SIZE = int(os.getenv('AUTH_CLAIMS_CACHE_SIZE', 4096))  # Verified tokens kept in memory
 
     # HubSpot
     HUBSPOT_API_URL = os.getenv('HUBSPOT_API_URL', 'https://api.hubapi.com')
     HUBSPOT_ACCESS_TOKEN = os.getenv('HUBSPOT_ACCESS_TOKEN')
+    HUBSPOT_POOL_SIZE = int(os.getenv('HUBSPOT_POOL_SIZE', 10))  # Keep-alive connections per token
+    HUBSPOT_CONNECT_TIMEOUT = float(os.getenv('HUBSPOT_CONNECT_TIMEOUT', 5))  # Seconds
+    HUBSPOT_READ_TIMEOUT = float(os.getenv('HUBSPOT_READ_TIMEOUT', 30))  # Seconds
+    HUBSPOT_TOKEN_CACHE_TTL = float(os.getenv('HUBSPOT_TOKEN_CACHE_TTL', 300))  # Seconds a user's PAT stays cached
+    HUBSPOT_TOKEN_INVALIDATION_POLL = float(os.getenv('HUBSPOT_TOKEN_INVALIDATION_POLL', 5))  # Seconds between checks for token changes made by other workers
+    HUBSPOT_LEAD_ANALYTICS_TTL = float(os.getenv('HUBSPOT_LEAD_ANALYTICS_TTL', 60))  # Seconds lead analytics stay cached
+    HUBSPOT_METADATA_CACHE_TTL = float(os.getenv('HUBSPOT_METADATA_CACHE_TTL', 3600))  # Fresh for 1 hour
+    HUBSPOT_METADATA_STALE_TTL = float(os.getenv('HUBSPOT_METADATA_STALE_TTL', 86400))  # Then served stale while refreshing
+    HUBSPOT_METADATA_WARMUP = os.getenv('HUBSPOT_METADATA_WARMUP', 'false').lower() == 'true'
+    HUBSPOT_METADATA_INVALIDATION_POLL = float(os.getenv('HUBSPOT_METADATA_INVALIDATION_POLL', 5))  # Seconds between checks for other workers' invalidations
+    HUBSPOT_OBJECT_CACHE_TTL = float(os.getenv('HUBSPOT_OBJECT_CACHE_TTL', 120))  # get_*_by_id results
+    HUBSPOT_OBJECT_CACHE_NEGATIVE_TTL = float(os.getenv('HUBSPOT_OBJECT_CACHE_NEGATIVE_TTL', 30))  # Cached 404s
+    HUBSPOT_OBJECT_CACHE_SIZE = int(os.getenv('HUBSPOT_OBJECT_CACHE_SIZE', 5000))  # Records
+    HUBSPOT_OBJECT_CACHE_MAX_BYTES = int(os.getenv('HUBSPOT_OBJECT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')  # Enables /api/admin endpoints
+    HUBSPOT_ASYNC_MAX_CONNECTIONS = int(os.getenv('HUBSPOT_ASYNC_MAX_CONNECTIONS', 200))  # AsyncHubSpotService, per event loop
+    HUBSPOT_RATE_LIMIT_ENABLED = os.getenv('HUBSPOT_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    HUBSPOT_RATE_LIMIT_DB = os.getenv('HUBSPOT_RATE_LIMIT_DB', 'data/hubspot_rate_limits.db')  # Shared by all workers
+    HUBSPOT_RATE_LIMIT_MAX = int(os.getenv('HUBSPOT_RATE_LIMIT_MAX', 100))  # Requests per interval, per token
+    HUBSPOT_RATE_LIMIT_INTERVAL = float(os.getenv('HUBSPOT_RATE_LIMIT_INTERVAL', 10))  # Seconds
+    HUBSPOT_RATE_LIMIT_MAX_WAIT = float(os.getenv('HUBSPOT_RATE_LIMIT_MAX_WAIT', 60))  # Seconds
+    HUBSPOT_MAX_RETRIES = int(os.getenv('HUBSPOT_MAX_RETRIES', 5))  # Retries after a 429
+    HUBSPOT_BACKOFF_BASE = float(os.getenv('HUBSPOT_BACKOFF_BASE', 0.5))  # Seconds
+    HUBSPOT_BACKOFF_MAX = float(os.getenv('HUBSPOT_BACKOFF_MAX', 30))  # Seconds
+    HUBSPOT_BATCH_CHUNK_SIZE = int(os.getenv('HUBSPOT_BATCH_CHUNK_SIZE', 100))  # HubSpot's max inputs per batch call
+    HUBSPOT_BATCH_CONCURRENCY = int(os.getenv('HUBSPOT_BATCH_CONCURRENCY', 4))  # Chunks in flight per batch
+
+    # Audit log writer
+    LOG_SINK_SYNCHRONOUS = os.getenv('LOG_SINK_SYNCHRONOUS', 'false').lower() == 'true'  # Commit each log row inline
+    LOG_SINK_MAX_BATCH = int(os.getenv('LOG_SINK_MAX_BATCH', 200))  # Rows per bulk INSERT
+    LOG_SINK_FLUSH_INTERVAL = float(os.getenv('LOG_SINK_FLUSH_INTERVAL', 1.0))  # Seconds
+    LOG_SINK_MAX_RETRIES = int(os.getenv('LOG_SINK_MAX_RETRIES', 5))  # Flushes a batch is retried after a transient error
+
+    # Replay of failed HubSpot writes
+    LOG_SYNC_ENABLED = os.getenv('LOG_SYNC_ENABLED', 'true').lower() == 'true'  # Background worker per process
+    LOG_SYNC_INTERVAL = float(os.getenv('LOG_SYNC_INTERVAL', 30))  # Seconds between passes when idle
+    LOG_SYNC_BATCH_SIZE = int(os.getenv('LOG_SYNC_BATCH_SIZE', 200))  # Rows claimed per pass
+    LOG_SYNC_MAX_ATTEMPTS = int(os.getenv('LOG_SYNC_MAX_ATTEMPTS', 6))  # Including the original request
+    LOG_SYNC_BACKOFF_BASE = float(os.getenv('LOG_SYNC_BACKOFF_BASE', 30))  # Seconds
+    LOG_SYNC_BACKOFF_MAX = float(os.getenv('LOG_SYNC_BACKOFF_MAX', 3600))  # Seconds
+    LOG_SYNC_LEASE = int(os.getenv('LOG_SYNC_LEASE', 300))  # Seconds before a crashed worker's claim expires
+
+    # Local CRM mirror (opt-in)
+    CRM_MIRROR_ENABLED = os.getenv('CRM_MIRROR_ENABLED', 'false').lower() == 'true'  # Background sync thread per process
+    CRM_MIRROR_INTERVAL = float(os.getenv('CRM_MIRROR_INTERVAL', 300))  # Seconds between incremental syncs
+    CRM_MIRROR_MAX_AGE = float(os.getenv('CRM_MIRROR_MAX_AGE', 0))  # Serve get_*_by_id from the mirror if synced this recently (0 = never)
+    CRM_MIRROR_DELETE_SWEEP_INTERVAL = float(os.getenv('CRM_MIRROR_DELETE_SWEEP_INTERVAL', 3600))  # Seconds between archived-record sweeps
+    AUTOCOMPLETE_REFRESH_INTERVAL = float(os.getenv('AUTOCOMPLETE_REFRESH_INTERVAL', 30))  # Seconds between catch-ups of the name index with mirror syncs
+
+    # WhatsApp webhook queue
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 2))  # Worker threads per process (0 = external worker only)
+    WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', 50))  # Events claimed per batch
+    WEBHOOK_POLL_INTERVAL = float(os.getenv('WEBHOOK_POLL_INTERVAL', 1.0))  # Seconds
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', 5))  # Then the event is marked failed
+    WEBHOOK_BACKOFF_BASE = float(os.getenv('WEBHOOK_BACKOFF_BASE', 2.0))  # Seconds before the first retry, doubling after that
+    WEBHOOK_BACKOFF_MAX = float(os.getenv('WEBHOOK_BACKOFF_MAX', 300.0))  # Cap on the retry delay
+    WEBHOOK_VISIBILITY_TIMEOUT = int(os.getenv('WEBHOOK_VISIBILITY_TIMEOUT', 300))  # Seconds before a stuck claim is retried
+    WEBHOOK_RETENTION_HOURS = int(os.getenv('WEBHOOK_RETENTION_HOURS', 24))  # Processed events kept this long
+    WEBHOOK_DEDUP_CACHE_SIZE = int(os.getenv('WEBHOOK_DEDUP_CACHE_SIZE', 10000))  # Recent message ids kept in memory
+    WEBHOOK_SENDER_CACHE_SIZE = int(os.getenv('WEBHOOK_SENDER_CACHE_SIZE', 10000))  # Phone -> (user, session) entries
+    WEBHOOK_SENDER_CACHE_TTL = float(os.getenv('WEBHOOK_SENDER_CACHE_TTL', 60))  # Seconds (bounds staleness across processes)
 
     # WhatsApp (if needed)
     WHATSAPP_API_URL = os.getenv('WHATSAPP_API_URL', 'https://api.whatsapp.com')
@@ -46,6 +118,11 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    HUBSPOT_RATE_LIMIT_ENABLED = False
+    LOG_SINK_SYNCHRONOUS = True
+    WEBHOOK_WORKERS = 0
+    LOG_SYNC_ENABLED = False
+    DB_AUTO_MIGRATE = False  # Tests call db.create_all() themselves
 
 # Configuration mapping
 config = {
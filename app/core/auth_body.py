@@ -1,10 +1,102 @@
 """
-Custom authentication decorator for body-based JWT tokens
+Request authentication for body- and header-based JWT tokens
+
+``authenticate_request`` runs once per request as a ``before_request`` hook.
+It finds the token (``token`` in the JSON/form body, else the ``Authorization``
+header), verifies it, and stores the result on ``g`` for the views.
 """
 
+import hashlib
+import time
 from functools import wraps
-from flask import request, jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask import request, jsonify, g, current_app
+import jwt
+from app.services.cache import TTLCache
+
+# Verified claims keyed by token digest, each entry living until the token's exp
+claims_cache = TTLCache(maxsize=4096, ttl=300)
+
+def register_authentication(app):
+    """Install the authentication stage on an application"""
+    app.config.setdefault('AUTH_CLAIMS_CACHE_SIZE', 4096)
+    claims_cache.maxsize = app.config['AUTH_CLAIMS_CACHE_SIZE']
+    app.before_request(authenticate_request)
+
+def _read_token():
+    if request.is_json:
+        # get_json caches the parsed body, so the view's request.get_json() does not parse it again
+        body = request.get_json(silent=True)
+        token = body.get('token') if isinstance(body, dict) else None
+    else:
+        token = request.form.get('token')
+    if token:
+        return token
+
+    header = request.headers.get('Authorization', '')
+    if header[:7].lower() == 'bearer ':
+        return header[7:].strip()
+    return None
+
+def _verify(token):
+    """Decode a token, reusing claims already verified in this process"""
+    secret_key = current_app.config.get('JWT_SECRET_KEY')
+    if not secret_key:
+        raise LookupError('JWT secret key not configured')
+
+    key = hashlib.sha256(f'{secret_key}\0{token}'.encode()).digest()
+    claims = claims_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(token, secret_key, algorithms=['HS256'])
+    exp = claims.get('exp')
+    ttl = exp - time.time() if exp else None
+    if ttl is None or ttl > 0:
+        claims_cache.set(key, claims, ttl=ttl)
+    return claims
+
+def authenticate_request():
+    """before_request hook: resolve the caller once and stash it on ``g``"""
+    g.auth_user_id = None
+    g.auth_error = None
+
+    try:
+        token = _read_token()
+        if not token:
+            g.auth_error = ('Token is required in request body', 401)
+            return None
+
+        try:
+            claims = _verify(token)
+        except LookupError as e:
+            g.auth_error = (str(e), 500)
+            return None
+        except jwt.ExpiredSignatureError:
+            g.auth_error = ('Token has expired', 401)
+            return None
+        except jwt.InvalidTokenError as e:
+            g.auth_error = (f'Invalid token: {str(e)}', 401)
+            return None
+
+        user_id = claims.get('sub')  # 'sub' is the user ID in JWT
+        if not user_id:
+            g.auth_error = ('Invalid token: no user ID found', 401)
+            return None
+        g.auth_user_id = user_id
+
+    except Exception as e:
+        g.auth_error = (f'Authentication error: {str(e)}', 401)
+    return None
+
+def authenticate_from_body():
+    """Return ``(user_id, error_response, status_code)`` for the current request"""
+    if 'auth_error' not in g:
+        # Hook not installed (e.g. a bare test app)
+        authenticate_request()
+    if g.auth_error:
+        message, status_code = g.auth_error
+        return None, jsonify({'error': message}), status_code
+    return g.auth_user_id, None, None
 
 def jwt_required_body():
     """
@@ -13,42 +105,14 @@ def jwt_required_body():
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            try:
-                # Get token from request body
-                if request.is_json:
-                    token = request.json.get('token')
-                else:
-                    # Try to get from form data
-                    token = request.form.get('token')
-                
-                if not token:
-                    return jsonify({'error': 'Token is required in request body'}), 401
-                
-                # Create a temporary request with Authorization header for JWT verification
-                original_headers = request.headers
-                request.headers = request.headers.copy()
-                request.headers['Authorization'] = f'Bearer {token}'
-                
-                try:
-                    # Verify the JWT token
-                    verify_jwt_in_request()
-                    user_id = get_jwt_identity()
-                    
-                    # Store user_id in request context for easy access
-                    request.user_id = user_id
-                    
-                    return f(*args, **kwargs)
-                    
-                except Exception as e:
-                    return jsonify({'error': f'Invalid token: {str(e)}'}), 401
-                    
-                finally:
-                    # Restore original headers
-                    request.headers = original_headers
-                    
-            except Exception as e:
-                return jsonify({'error': f'Authentication error: {str(e)}'}), 401
-                
+            user_id, error_response, status_code = authenticate_from_body()
+            if error_response:
+                return error_response, status_code
+
+            # Store user_id in request context for easy access
+            request.user_id = user_id
+            return f(*args, **kwargs)
+
         return decorated_function
     return decorator
 
@@ -56,4 +120,4 @@ def get_current_user_id():
     """
     Get current user ID from request context
     """
-    return getattr(request, 'user_id', None)
+    return g.get('auth_user_id')
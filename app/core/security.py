@@ -2,11 +2,17 @@
 Security utilities for token encryption and validation
 """
 
+import hashlib
+import re
 import secrets
 import string
 from cryptography.fernet import Fernet
 from flask import current_app
 
+# Canonical phone form: '+' and 10-15 digits, country code first (E.164)
+E164_PATTERN = re.compile(r'^\+[1-9]\d{9,14}$')
+_PHONE_FORMATTING = re.compile(r'[\s\-().]')
+
 class SecurityService:
     """Security service for encryption and validation"""
 
@@ -38,6 +44,30 @@ class SecurityService:
 
         return f.decrypt(encrypted_token.encode()).decode()
 
+    @staticmethod
+    def token_fingerprint(token):
+        """Stable, non-reversible key for a token (safe to use in caches and metrics)"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def normalize_phone_number(phone_number):
+        """Canonical E.164 form of a phone number, or None if it is not one
+
+        Accepts what users and providers send: formatting characters, a
+        ``00`` international prefix, Twilio's ``whatsapp:`` prefix and
+        WhatsApp's bare digits without ``+``.
+        """
+        if not phone_number:
+            return None
+        number = _PHONE_FORMATTING.sub('', str(phone_number))
+        if number.lower().startswith('whatsapp:'):
+            number = number[len('whatsapp:'):]
+        if number.startswith('00'):
+            number = '+' + number[2:]
+        elif not number.startswith('+'):
+            number = '+' + number
+        return number if E164_PATTERN.match(number) else None
+
     @staticmethod
     def validate_phone_number(phone_number):
         """Validate phone number format"""
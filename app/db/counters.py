@@ -0,0 +1,116 @@
+"""
+Denormalized child counters
+
+``chat_sessions.message_count``, ``chat_sessions.log_count`` and
+``chat_messages.log_count`` are maintained by SQLite triggers, so every
+write path (ORM flushes, bulk ``insert(Log)`` from log_sink and the
+webhook ingester, raw SQL) updates them in its own transaction. After a
+flush the ORM expires the counters of parents it has loaded, so the next
+read sees the new value.
+"""
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.db.database import db
+
+COUNTER_TRIGGERS = {
+    'trg_logs_counters_insert': '''
+        CREATE TRIGGER IF NOT EXISTS trg_logs_counters_insert AFTER INSERT ON logs
+        BEGIN
+            UPDATE chat_messages SET log_count = log_count + 1 WHERE id = NEW.chat_message_id;
+            UPDATE chat_sessions SET log_count = log_count + 1 WHERE id = NEW.session_id;
+        END''',
+    'trg_logs_counters_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_logs_counters_delete AFTER DELETE ON logs
+        BEGIN
+            UPDATE chat_messages SET log_count = log_count - 1 WHERE id = OLD.chat_message_id;
+            UPDATE chat_sessions SET log_count = log_count - 1 WHERE id = OLD.session_id;
+        END''',
+    'trg_logs_counters_move': '''
+        CREATE TRIGGER IF NOT EXISTS trg_logs_counters_move AFTER UPDATE OF chat_message_id, session_id ON logs
+        WHEN OLD.chat_message_id IS NOT NEW.chat_message_id OR OLD.session_id IS NOT NEW.session_id
+        BEGIN
+            UPDATE chat_messages SET log_count = log_count - 1 WHERE id = OLD.chat_message_id;
+            UPDATE chat_messages SET log_count = log_count + 1 WHERE id = NEW.chat_message_id;
+            UPDATE chat_sessions SET log_count = log_count - 1 WHERE id = OLD.session_id;
+            UPDATE chat_sessions SET log_count = log_count + 1 WHERE id = NEW.session_id;
+        END''',
+    'trg_chat_messages_counters_insert': '''
+        CREATE TRIGGER IF NOT EXISTS trg_chat_messages_counters_insert AFTER INSERT ON chat_messages
+        BEGIN
+            UPDATE chat_sessions SET message_count = message_count + 1 WHERE id = NEW.session_id;
+        END''',
+    'trg_chat_messages_counters_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_chat_messages_counters_delete AFTER DELETE ON chat_messages
+        BEGIN
+            UPDATE chat_sessions SET message_count = message_count - 1 WHERE id = OLD.session_id;
+        END''',
+    'trg_chat_messages_counters_move': '''
+        CREATE TRIGGER IF NOT EXISTS trg_chat_messages_counters_move AFTER UPDATE OF session_id ON chat_messages
+        WHEN OLD.session_id IS NOT NEW.session_id
+        BEGIN
+            UPDATE chat_sessions SET message_count = message_count - 1 WHERE id = OLD.session_id;
+            UPDATE chat_sessions SET message_count = message_count + 1 WHERE id = NEW.session_id;
+        END''',
+}
+
+# (table, counter column, child table, child foreign key)
+COUNTERS = (
+    ('chat_sessions', 'message_count', 'chat_messages', 'session_id'),
+    ('chat_sessions', 'log_count', 'logs', 'session_id'),
+    ('chat_messages', 'log_count', 'logs', 'chat_message_id'),
+)
+
+def install_counter_triggers(connection):
+    """Create the missing counter triggers; returns the names created"""
+    if connection.dialect.name != 'sqlite':
+        return []
+    existing = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+    missing = [name for name in COUNTER_TRIGGERS if name not in existing]
+    for name in missing:
+        connection.execute(text(COUNTER_TRIGGERS[name]))
+    return missing
+
+def _actual(table, child, foreign_key):
+    return f'(SELECT COUNT(*) FROM {child} WHERE {child}.{foreign_key} = {table}.id)'
+
+def count_drift(connection):
+    """Number of rows whose stored counter disagrees with a recount, per counter"""
+    return {
+        f'{table}.{column}': connection.execute(text(
+            f'SELECT COUNT(*) FROM {table} WHERE {column} IS NOT {_actual(table, child, foreign_key)}'
+        )).scalar()
+        for table, column, child, foreign_key in COUNTERS
+    }
+
+def repair_counters(connection):
+    """Recompute every counter that drifted; returns the rows fixed per counter"""
+    fixed = {}
+    for table, column, child, foreign_key in COUNTERS:
+        actual = _actual(table, child, foreign_key)
+        result = connection.execute(text(
+            f'UPDATE {table} SET {column} = {actual} WHERE {column} IS NOT {actual}'
+        ))
+        fixed[f'{table}.{column}'] = result.rowcount
+    return fixed
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_on_create(target, connection, **kw):
+    install_counter_triggers(connection)
+
+@event.listens_for(Session, 'after_flush')
+def _expire_parent_counters(session, flush_context):
+    """The triggers changed these columns behind the ORM's back"""
+    from app.models import ChatSession, ChatMessage, Log
+
+    expired = {}
+    for instance in list(session.new) + list(session.deleted):
+        if isinstance(instance, ChatMessage):
+            expired.setdefault((ChatSession, instance.session_id), set()).add('message_count')
+        elif isinstance(instance, Log):
+            expired.setdefault((ChatSession, instance.session_id), set()).add('log_count')
+            expired.setdefault((ChatMessage, instance.chat_message_id), set()).add('log_count')
+    for (model, key), attributes in expired.items():
+        parent = session.identity_map.get(session.identity_key(model, key)) if key is not None else None
+        if parent is not None and parent not in session.deleted:
+            session.expire(parent, list(attributes))
@@ -3,6 +3,7 @@ Database connection and session management
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 class Base(DeclarativeBase):
@@ -19,3 +20,69 @@ def get_db():
 def create_session():
     """Create a new database session"""
     return db.session
+
+def configure_engine(app):
+    """Engine tweaks that have to be installed per application
+
+    Ordinary connections keep pysqlite's transaction handling: reads run
+    outside a transaction and a deferred BEGIN is emitted before the first
+    DML, so a read followed by a write never fails on a stale snapshot. A
+    connection that sets the ``sqlite_begin`` execution option (e.g.
+    ``BEGIN IMMEDIATE`` for the single writer) instead opens every
+    transaction with that statement, so it holds the write lock up front
+    and its savepoints nest inside a real transaction. Sessions get the
+    same with ``begin_write``.
+
+    Every new connection also gets the ``SQLITE_*`` pragmas: WAL so readers
+    never block the writer, ``synchronous=NORMAL`` (durable at checkpoints,
+    safe with WAL), a busy timeout instead of an immediate "database is
+    locked", and larger page cache and mmap windows.
+    """
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, 'connect')
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _begin(connection):
+        begin = connection.get_execution_options().get('sqlite_begin')
+        if begin:
+            _begin_if_idle(connection, begin)
+
+def begin_write(session, begin='BEGIN IMMEDIATE'):
+    """Open the session's SQLite transaction as a write transaction, unless one is open already
+
+    For read-then-write paths that use ``session.begin_nested()``: without
+    it the first SAVEPOINT would start the transaction and its RELEASE
+    would commit it.
+    """
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite':
+        _begin_if_idle(connection, begin)
+
+def _begin_if_idle(connection, begin):
+    # An in-memory database shares one DBAPI connection across checkouts
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql(begin)
+
+def sqlite_pragmas(config):
+    """``(name, value)`` pragmas applied to every SQLite connection, from the ``SQLITE_*`` settings"""
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        ('cache_size', config.get('SQLITE_CACHE_SIZE', -65536)),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE', 268435456))
+    ]
+    return [(name, value) for name, value in pragmas if value not in (None, '')]
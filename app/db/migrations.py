@@ -0,0 +1,196 @@
+"""
+Idempotent schema migrations for existing databases
+
+``db.create_all()`` creates missing tables but never alters existing ones.
+Each step here checks the live schema first, so ``upgrade_database`` is safe
+to call on every start: ``create_app`` does unless ``DB_AUTO_MIGRATE`` is
+off, and scripts/init_db.py always does. Both transactions open with
+``BEGIN IMMEDIATE``, so workers starting together take turns and each step
+is applied once.
+"""
+
+import logging
+from sqlalchemy import inspect, text
+from app.db.database import db
+
+logger = logging.getLogger(__name__)
+
+def _columns(connection, table):
+    inspector = inspect(connection)
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+def add_columns(table, columns):
+    """Step: ``ALTER TABLE ... ADD COLUMN`` for each missing ``(name, ddl_type)``"""
+    def step(connection):
+        existing = _columns(connection, table)
+        if existing is None:
+            return False
+        missing = [(name, ddl) for name, ddl in columns if name not in existing]
+        for name, ddl in missing:
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+        return bool(missing)
+    return step
+
+def create_index(name, table, columns, unique=False):
+    """Step: ``CREATE [UNIQUE] INDEX IF NOT EXISTS``"""
+    def step(connection):
+        if _columns(connection, table) is None:
+            return False
+        inspector = inspect(connection)
+        if name in {index['name'] for index in inspector.get_indexes(table)}:
+            return False
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        connection.execute(text(f'CREATE {kind} IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'))
+        return True
+    return step
+
+def backfill_phone_numbers(connection):
+    """Step: fill users.phone_number_normalized for rows written before the column existed"""
+    from app.core.security import SecurityService
+
+    if 'phone_number_normalized' not in (_columns(connection, 'users') or ()):
+        return False
+    rows = connection.execute(text(
+        'SELECT id, phone_number FROM users WHERE phone_number_normalized IS NULL'
+    )).all()
+    updates = [
+        {'id': user_id, 'normalized': SecurityService.normalize_phone_number(phone_number)}
+        for user_id, phone_number in rows
+    ]
+    updates = [row for row in updates if row['normalized']]
+    if updates:
+        connection.execute(text('UPDATE users SET phone_number_normalized = :normalized WHERE id = :id'), updates)
+    return bool(updates)
+
+def install_counters(connection):
+    """Step: create the counter triggers, then recount once if any were missing"""
+    from app.db.counters import install_counter_triggers, repair_counters
+
+    if any(_columns(connection, table) is None for table in ('chat_sessions', 'chat_messages', 'logs')):
+        return False
+    if install_counter_triggers(connection):
+        repair_counters(connection)
+        return True
+    return False
+
+def install_rollups(connection):
+    """Step: create the stats rollup triggers, then backfill once if any were missing"""
+    from app.db.rollups import install_rollup_triggers, rebuild_rollups
+
+    if any(_columns(connection, table) is None for table in ('stats_rollups', 'chat_sessions', 'chat_messages', 'logs')):
+        return False
+    if install_rollup_triggers(connection):
+        rebuild_rollups(connection)
+        return True
+    return False
+
+def install_search(connection):
+    """Step: create the CRM full-text index and its triggers, then index existing records once"""
+    from app.db.search import install_search_index, rebuild_search_index
+
+    if _columns(connection, 'crm_records') is None:
+        return False
+    if install_search_index(connection):
+        rebuild_search_index(connection)
+        return True
+    return False
+
+# Applied in order; append new steps at the end
+MIGRATIONS = [
+    ('logs: lead and deal stage columns', add_columns('logs', [
+        ('lead_status', 'VARCHAR(50)'),
+        ('deal_stage', 'VARCHAR(50)'),
+        ('lead_source', 'VARCHAR(50)'),
+        ('deal_amount', 'VARCHAR(20)'),
+        ('stage_reason', 'TEXT')
+    ])),
+    ('chat_messages: external_message_id', add_columns('chat_messages', [
+        ('external_message_id', 'VARCHAR(128)')
+    ])),
+    ('chat_messages: unique external_message_id', create_index(
+        'ux_chat_messages_external_message_id', 'chat_messages', ['external_message_id'], unique=True
+    )),
+    ('users: phone_number_normalized', add_columns('users', [
+        ('phone_number_normalized', 'VARCHAR(20)')
+    ])),
+    ('users: phone_number_normalized index', create_index(
+        'ix_users_phone_number_normalized', 'users', ['phone_number_normalized']
+    )),
+    ('users: backfill phone_number_normalized', backfill_phone_numbers),
+    ('logs: sync outbox columns', add_columns('logs', [
+        ('sync_attempts', 'INTEGER NOT NULL DEFAULT 0'),
+        ('next_retry_at', 'DATETIME'),
+        ('sync_object_type', 'VARCHAR(30)'),
+        ('sync_operation', 'VARCHAR(20)'),
+        ('sync_payload', 'TEXT'),
+        ('sync_claim', 'VARCHAR(32)')
+    ])),
+    ('logs: sync queue index', create_index('ix_logs_sync_queue', 'logs', ['sync_status', 'next_retry_at'])),
+    ('logs: user timeline index', create_index('ix_logs_user_created', 'logs', ['user_id', 'created_at', 'id'])),
+    ('logs: session timeline index', create_index('ix_logs_session_created', 'logs', ['session_id', 'created_at'])),
+    ('logs: chat_message_id index', create_index('ix_logs_chat_message_id', 'logs', ['chat_message_id'])),
+    ('logs: created_at index', create_index('ix_logs_created_at', 'logs', ['created_at'])),
+    ('logs: hubspot_id index', create_index('ix_logs_hubspot_id', 'logs', ['hubspot_id'])),
+    ('logs: sync_claim index', create_index('ix_logs_sync_claim', 'logs', ['sync_claim'])),
+    ('chat_messages: session timeline index', create_index(
+        'ix_chat_messages_session_timestamp', 'chat_messages', ['session_id', 'timestamp'])),
+    ('chat_messages: timestamp index', create_index('ix_chat_messages_timestamp', 'chat_messages', ['timestamp'])),
+    ('chat_sessions: user and status index', create_index(
+        'ix_chat_sessions_user_status', 'chat_sessions', ['user_id', 'status'])),
+    ('chat_sessions: status index', create_index('ix_chat_sessions_status', 'chat_sessions', ['status'])),
+    ('webhook_events: status index', create_index('ix_webhook_events_status_id', 'webhook_events', ['status', 'id'])),
+    ('webhook_events: claim_token index', create_index(
+        'ix_webhook_events_claim_token', 'webhook_events', ['claim_token'])),
+    ('chat_sessions: message and log counters', add_columns('chat_sessions', [
+        ('message_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('log_count', 'INTEGER NOT NULL DEFAULT 0')
+    ])),
+    ('chat_messages: log counter', add_columns('chat_messages', [
+        ('log_count', 'INTEGER NOT NULL DEFAULT 0')
+    ])),
+    ('counter triggers', install_counters),
+    ('chat_sessions: user timeline index', create_index(
+        'ix_chat_sessions_user_created', 'chat_sessions', ['user_id', 'created_at'])),
+    ('stats_rollups: unique key', create_index(
+        'ux_stats_rollups_key', 'stats_rollups',
+        ['granularity', 'user_id', 'metric', 'bucket_start', 'log_type', 'sync_status'], unique=True)),
+    ('stats rollup triggers', install_rollups),
+    ('crm_records: unique key', create_index(
+        'ux_crm_records_key', 'crm_records', ['portal_key', 'object_type', 'hubspot_id'], unique=True)),
+    ('crm_records: modification index', create_index(
+        'ix_crm_records_updated', 'crm_records', ['portal_key', 'object_type', 'hubspot_updated_at'])),
+    ('crm_sync_state: unique key', create_index(
+        'ux_crm_sync_state_key', 'crm_sync_state', ['portal_key', 'object_type'], unique=True)),
+    ('crm full-text search index', install_search),
+    ('crm_records: sync time index', create_index(
+        'ix_crm_records_synced', 'crm_records', ['portal_key', 'object_type', 'synced_at'])),
+    ('webhook_events: retry backoff', add_columns('webhook_events', [
+        ('next_attempt_at', 'DATETIME')
+    ])),
+]
+
+def _write_transaction(engine):
+    return engine.execution_options(sqlite_begin='BEGIN IMMEDIATE').begin()
+
+def create_tables(engine=None):
+    """``db.create_all()`` inside a write transaction"""
+    with _write_transaction(engine or db.engine) as connection:
+        db.metadata.create_all(connection)
+
+def run_migrations(engine=None):
+    """Apply every pending step in one transaction; returns the names of the steps that changed something"""
+    engine = engine or db.engine
+    applied = []
+    with _write_transaction(engine) as connection:
+        for name, step in MIGRATIONS:
+            if step(connection):
+                logger.info(f"Applied migration: {name}")
+                applied.append(name)
+    return applied
+
+def upgrade_database(engine=None):
+    """Create missing tables, then apply pending steps; returns the names of the applied steps"""
+    create_tables(engine)
+    return run_migrations(engine)
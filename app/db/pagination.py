@@ -0,0 +1,59 @@
+"""
+Keyset (cursor) pagination helpers
+
+A page is ordered newest first on ``(timestamp column, id)``; the cursor
+is the sort key of the last row served. The next page starts strictly
+below it, so the database seeks into a composite index instead of
+counting past an OFFSET, and rows inserted meanwhile never shift pages.
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded"""
+
+def encode_cursor(timestamp, row_id):
+    """Opaque, URL-safe cursor for a ``(timestamp, id)`` sort key"""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ``InvalidCursor``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+def page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a requested page size into ``1..maximum``"""
+    if value is None:
+        return default
+    return max(1, min(value, maximum))
+
+def keyset_page(query, timestamp_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return ``(rows, next_cursor)`` for one newest-first page of ``query``
+
+    ``next_cursor`` is None on the last page. One extra row is fetched to
+    tell whether another page exists, so no COUNT query is needed.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        # The redundant ``<=`` gives the planner an index range to seek to
+        query = query.filter(timestamp_column <= timestamp, or_(
+            timestamp_column < timestamp,
+            and_(timestamp_column == timestamp, id_column < row_id)
+        ))
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
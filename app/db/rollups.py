@@ -0,0 +1,162 @@
+"""
+Incremental stats rollups
+
+Every insert, delete or status change of a session, message or log
+adjusts ``stats_rollups`` through SQLite triggers, in the same
+transaction as the write. Logs of synced creates are also counted under
+the ``objects`` metric, one per HubSpot object written. Triggers only
+keep the owning user's rows at the granularities the stats endpoint
+reads for that metric (``GRAINS``): one upsert per session or message,
+two per log and one more for a synced create. All-user figures are
+summed over the users' rows at read time, so the endpoint still reads a
+handful of rows per user instead of counting the source tables.
+``rebuild_rollups`` recomputes everything from scratch (backfill, or
+repair after writes that bypassed the triggers).
+"""
+
+from sqlalchemy import event, text
+from app.db.database import db
+
+# Bucket starts use SQLAlchemy's SQLite DateTime format so they compare correctly with bound datetimes
+TOTAL_BUCKET = '1970-01-01 00:00:00.000000'
+
+# granularity -> SQLite expression for the bucket start of the timestamp {t}
+BUCKETS = {
+    'hour': "strftime('%Y-%m-%d %H:00:00.000000', {t})",
+    'day': "strftime('%Y-%m-%d 00:00:00.000000', {t})",
+    'total': f"'{TOTAL_BUCKET}'",
+}
+
+# metric -> granularities its triggers maintain (what StatsService reads)
+GRAINS = {
+    'sessions': ('total',),
+    'messages': ('total',),
+    'logs': ('hour', 'total'),
+    'objects': ('day',),
+}
+
+UPSERT = '''
+            INSERT INTO stats_rollups (granularity, bucket_start, user_id, metric, log_type, sync_status, count)
+            VALUES {values}
+            ON CONFLICT (granularity, user_id, metric, bucket_start, log_type, sync_status)
+            DO UPDATE SET count = count + excluded.count;'''
+
+def _upsert(metric, timestamp, user_id, delta, log_type="''", sync_status="''"):
+    values = ',\n                   '.join(
+        f"('{granularity}', {BUCKETS[granularity].format(t=timestamp)}, {user_id}, '{metric}', {log_type}, "
+        f"{sync_status}, {delta})"
+        for granularity in GRAINS[metric]
+    )
+    return UPSERT.format(values=values)
+
+def _trigger(name, when, body):
+    return f'CREATE TRIGGER IF NOT EXISTS {name} {when}\n        BEGIN{"".join(body)}\n        END'
+
+def _log(row, delta):
+    return _upsert('logs', f'{row}.created_at', f'{row}.user_id', delta,
+                   f"COALESCE({row}.log_type, '')", f"COALESCE({row}.sync_status, '')")
+
+def _object(row, delta):
+    return _upsert('objects', f'{row}.created_at', f'{row}.user_id', delta, f"COALESCE({row}.log_type, '')")
+
+def _creates_object(row):
+    return f"{row}.sync_operation = 'create' AND {row}.sync_status = 'synced'"
+
+def _message(row, delta):
+    owner = f'(SELECT user_id FROM chat_sessions WHERE id = {row}.session_id)'
+    return _upsert('messages', f'{row}.created_at', owner, delta)
+
+# A log row moves between objects buckets when any of these change (e.g. a replayed create becomes synced)
+OBJECT_CHANGED = ('(OLD.sync_status IS NOT NEW.sync_status OR OLD.sync_operation IS NOT NEW.sync_operation '
+                  'OR OLD.log_type IS NOT NEW.log_type OR OLD.user_id IS NOT NEW.user_id '
+                  'OR OLD.created_at IS NOT NEW.created_at)')
+
+ROLLUP_TRIGGERS = {
+    'trg_stats_sessions_insert': _trigger(
+        'trg_stats_sessions_insert', 'AFTER INSERT ON chat_sessions',
+        [_upsert('sessions', 'NEW.created_at', 'NEW.user_id', 1)]),
+    'trg_stats_sessions_delete': _trigger(
+        'trg_stats_sessions_delete', 'AFTER DELETE ON chat_sessions',
+        [_upsert('sessions', 'OLD.created_at', 'OLD.user_id', -1)]),
+    'trg_stats_messages_insert': _trigger(
+        'trg_stats_messages_insert', 'AFTER INSERT ON chat_messages', [_message('NEW', 1)]),
+    # BEFORE DELETE: the owning session may be deleted in the same transaction
+    'trg_stats_messages_delete': _trigger(
+        'trg_stats_messages_delete', 'BEFORE DELETE ON chat_messages', [_message('OLD', -1)]),
+    'trg_stats_logs_insert': _trigger(
+        'trg_stats_logs_insert', 'AFTER INSERT ON logs', [_log('NEW', 1)]),
+    'trg_stats_logs_delete': _trigger(
+        'trg_stats_logs_delete', 'AFTER DELETE ON logs', [_log('OLD', -1)]),
+    'trg_stats_logs_update': _trigger(
+        'trg_stats_logs_update',
+        'AFTER UPDATE OF sync_status, log_type, user_id, created_at ON logs\n        '
+        'WHEN OLD.sync_status IS NOT NEW.sync_status OR OLD.log_type IS NOT NEW.log_type '
+        'OR OLD.user_id IS NOT NEW.user_id OR OLD.created_at IS NOT NEW.created_at',
+        [_log('OLD', -1), _log('NEW', 1)]),
+    # objects: synced creates only (reads, updates and deletes are logged too but write no new object)
+    'trg_stats_objects_insert': _trigger(
+        'trg_stats_objects_insert', f"AFTER INSERT ON logs WHEN {_creates_object('NEW')}", [_object('NEW', 1)]),
+    'trg_stats_objects_delete': _trigger(
+        'trg_stats_objects_delete', f"AFTER DELETE ON logs WHEN {_creates_object('OLD')}", [_object('OLD', -1)]),
+    'trg_stats_objects_update_old': _trigger(
+        'trg_stats_objects_update_old', f"AFTER UPDATE ON logs WHEN {_creates_object('OLD')} AND {OBJECT_CHANGED}",
+        [_object('OLD', -1)]),
+    'trg_stats_objects_update_new': _trigger(
+        'trg_stats_objects_update_new', f"AFTER UPDATE ON logs WHEN {_creates_object('NEW')} AND {OBJECT_CHANGED}",
+        [_object('NEW', 1)]),
+}
+
+def install_rollup_triggers(connection):
+    """Create missing rollup triggers and replace outdated ones; returns the names (re)created"""
+    if connection.dialect.name != 'sqlite':
+        return []
+    existing = dict(connection.execute(
+        text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_stats_%'")
+    ).all())
+    # SQLite stores the statement without its IF NOT EXISTS
+    stale = [name for name in ROLLUP_TRIGGERS
+             if existing.get(name) != ROLLUP_TRIGGERS[name].replace(' IF NOT EXISTS', '', 1)]
+    for name in (set(existing) - set(ROLLUP_TRIGGERS)) | set(stale):
+        connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+    for name in stale:
+        # exec_driver_sql: text() would read the ':00' in the strftime formats as bind parameters
+        connection.exec_driver_sql(ROLLUP_TRIGGERS[name])
+    return stale
+
+# metric -> (source SELECT producing user_id, timestamp, log_type, sync_status)
+SOURCES = {
+    'sessions': "SELECT user_id, created_at AS ts, '' AS log_type, '' AS sync_status FROM chat_sessions",
+    'messages': "SELECT s.user_id, m.created_at AS ts, '' AS log_type, '' AS sync_status "
+                "FROM chat_messages m JOIN chat_sessions s ON s.id = m.session_id",
+    'logs': "SELECT user_id, created_at AS ts, COALESCE(log_type, '') AS log_type, "
+            "COALESCE(sync_status, '') AS sync_status FROM logs",
+    'objects': "SELECT user_id, created_at AS ts, COALESCE(log_type, '') AS log_type, '' AS sync_status FROM logs "
+               "WHERE sync_operation = 'create' AND sync_status = 'synced'",
+}
+
+def rebuild_rollups(connection):
+    """Recompute every rollup row from the source tables; returns the rows written"""
+    connection.execute(text('DELETE FROM stats_rollups'))
+    written = 0
+    for metric, source in SOURCES.items():
+        for granularity in GRAINS[metric]:
+            result = connection.exec_driver_sql(f'''
+                INSERT INTO stats_rollups (granularity, bucket_start, user_id, metric, log_type, sync_status, count)
+                SELECT '{granularity}', {BUCKETS[granularity].format(t='ts')} AS bucket, user_id, '{metric}',
+                       log_type, sync_status, COUNT(*)
+                FROM ({source})
+                GROUP BY bucket, user_id, log_type, sync_status
+            ''')
+            written += result.rowcount
+    return written
+
+def prune_hourly(connection, before):
+    """Drop hourly rows older than ``before`` (totals are kept); returns rows deleted"""
+    return connection.execute(
+        text("DELETE FROM stats_rollups WHERE granularity = 'hour' AND bucket_start < :before"),
+        {'before': before.strftime('%Y-%m-%d %H:%M:%S.%f')}
+    ).rowcount
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_on_create(target, connection, **kw):
+    install_rollup_triggers(connection)
@@ -0,0 +1,179 @@
+"""
+Full-text indexes over the local CRM mirror (SQLite FTS5)
+
+Each searchable object type has its own FTS5 table (``crm_search_contacts``,
+``crm_search_companies``, ``crm_search_notes``) holding one row per live
+record of ``crm_records`` (same rowid), with the searchable fields pulled
+out of the properties JSON. Triggers on crm_records keep them current,
+including the upserts of the mirror sync; archived records are removed.
+Results are ranked by BM25 with per-column weights, name matches first.
+BM25 costs time per matching row, so a broad term (a common first name) is
+ranked among its RANK_CANDIDATES matches with the highest rowids (the
+records first mirrored last; a re-synced record keeps its rowid) instead
+of all of them, and the search reports that it was truncated.
+"""
+
+import re
+from sqlalchemy import event, text
+from app.db.database import db
+
+def _prop(row, name):
+    return f"COALESCE(json_extract({row}.properties, '$.{name}'), '')"
+
+def _phone(row):
+    # The number as typed, all its digits, and its last 9 digits (local number without country or trunk prefix)
+    digits = _prop(row, 'phone')
+    for char in (' ', '-', '(', ')', '+', '.'):
+        digits = f"replace({digits}, '{char}', '')"
+    return f"{_prop(row, 'phone')} || ' ' || {digits} || ' ' || substr({digits}, -9)"
+
+# object type -> {column: (value for the crm_records row {row}, bm25 weight)}
+SEARCH_INDEXES = {
+    'contacts': {
+        'name': (lambda row: f"trim({_prop(row, 'firstname')} || ' ' || {_prop(row, 'lastname')})", 10.0),
+        'email': (lambda row: _prop(row, 'email'), 5.0),
+        'phone': (_phone, 5.0),
+        'company': (lambda row: _prop(row, 'company'), 3.0),
+    },
+    'companies': {
+        'name': (lambda row: _prop(row, 'name'), 10.0),
+        'domain': (lambda row: _prop(row, 'domain'), 5.0),
+        'phone': (_phone, 5.0),
+    },
+    'notes': {
+        'body': (lambda row: _prop(row, 'hs_note_body'), 1.0),
+    },
+}
+
+SEARCHABLE_OBJECT_TYPES = tuple(SEARCH_INDEXES)
+
+RANK_CANDIDATES = 200
+
+def search_table(object_type):
+    return f'crm_search_{object_type}'
+
+def _create_table(object_type):
+    return f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {search_table(object_type)} USING fts5(
+            {", ".join(SEARCH_INDEXES[object_type])},
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )'''
+
+def _index(object_type, row, where):
+    columns = SEARCH_INDEXES[object_type]
+    values = ', '.join(value(row) for value, _ in columns.values())
+    return (f'INSERT INTO {search_table(object_type)} (rowid, {", ".join(columns)}) '
+            f'SELECT {row}.id, {values} {where}')
+
+def _reindex_new():
+    return ''.join(
+        '\n            ' + _index(object_type, 'NEW', f"WHERE NEW.archived = 0 AND NEW.object_type = '{object_type}'") + ';'
+        for object_type in SEARCH_INDEXES
+    )
+
+def _unindex_old():
+    return ''.join(
+        f'\n            DELETE FROM {search_table(object_type)} WHERE rowid = OLD.id;' for object_type in SEARCH_INDEXES
+    )
+
+SEARCH_TRIGGERS = {
+    'trg_crm_search_insert': f'''CREATE TRIGGER IF NOT EXISTS trg_crm_search_insert AFTER INSERT ON crm_records
+        BEGIN{_reindex_new()}
+        END''',
+    'trg_crm_search_update': f'''CREATE TRIGGER IF NOT EXISTS trg_crm_search_update AFTER UPDATE ON crm_records
+        BEGIN{_unindex_old()}{_reindex_new()}
+        END''',
+    'trg_crm_search_delete': f'''CREATE TRIGGER IF NOT EXISTS trg_crm_search_delete AFTER DELETE ON crm_records
+        BEGIN{_unindex_old()}
+        END''',
+}
+
+def install_search_index(connection):
+    """Create the FTS tables and their triggers if missing; returns what was created"""
+    if connection.dialect.name != 'sqlite':
+        return []
+    existing = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")).scalars())
+    created = []
+    for object_type in SEARCH_INDEXES:
+        if search_table(object_type) not in existing:
+            connection.exec_driver_sql(_create_table(object_type))
+            created.append(search_table(object_type))
+    for name, ddl in SEARCH_TRIGGERS.items():
+        if name not in existing:
+            connection.exec_driver_sql(ddl)
+            created.append(name)
+    return created
+
+def rebuild_search_index(connection):
+    """Re-index every live searchable record; returns the rows indexed"""
+    indexed = 0
+    for object_type in SEARCH_INDEXES:
+        connection.exec_driver_sql(f'DELETE FROM {search_table(object_type)}')
+        indexed += connection.exec_driver_sql(
+            _index(object_type, 'r', f"FROM crm_records r WHERE r.archived = 0 AND r.object_type = '{object_type}'")
+        ).rowcount
+    return indexed
+
+def match_expression(term):
+    """FTS5 query for a user's search term, or None if it has no words
+
+    Every word must match; the last one (still being typed) as a prefix
+    when it is two characters or more. An email is matched as a phrase,
+    and a term that is only a phone number on its last 9 digits.
+    """
+    stripped = term.strip()
+    digits = re.sub(r'\D', '', stripped)
+    if len(digits) >= 7 and re.fullmatch(r'[\d\s()+.-]+', stripped):
+        return f'"{digits[-9:]}"*'
+
+    words = re.findall(r'\w+', stripped.lower())
+    if not words:
+        return None
+    if '@' in stripped:
+        return f'"{" ".join(words)}"*'
+    last = f'"{words[-1]}"*' if len(words[-1]) > 1 else f'"{words[-1]}"'
+    return ' '.join([f'"{word}"' for word in words[:-1]] + [last])
+
+def _ranked(connection, object_type, query, portal, candidates):
+    """``[(crm_records.id, score)]`` of the newest ``candidates`` matches, best first, and whether there were more"""
+    table = search_table(object_type)
+    weights = ', '.join(str(weight) for _, weight in SEARCH_INDEXES[object_type].values())
+    # One pass in rowid order, so bm25() is only computed for the window; sorted here rather than by a second query
+    rows = connection.execute(
+        text(f'SELECT {table}.rowid, bm25({table}, {weights}) FROM {table} JOIN crm_records r ON r.id = {table}.rowid '
+             f'WHERE {table} MATCH :query AND r.portal_key = :portal ORDER BY {table}.rowid DESC LIMIT :window'),
+        {'query': query, 'portal': portal, 'window': candidates + 1}
+    ).all()
+    ranked = sorted(rows[:candidates], key=lambda row: row[1])
+    return [(row_id, -score) for row_id, score in ranked], len(rows) > candidates
+
+def search_ids(connection, portal, object_type, term, limit=10, candidates=RANK_CANDIDATES):
+    """Best-ranked ``([(crm_records.id, score)], truncated)`` for a search term in one portal
+
+    Records matching on their name come first, ranked among themselves, so
+    a name match is not crowded out of the window by newer email or company
+    matches; the other matches fill the rest. ``truncated`` is True when a
+    window left matches unranked.
+    """
+    query = match_expression(term)
+    if query is None or object_type not in SEARCH_INDEXES:
+        return [], False
+    if 'name' not in SEARCH_INDEXES[object_type]:
+        ranked, truncated = _ranked(connection, object_type, query, portal, candidates)
+        return ranked[:limit], truncated
+
+    ranked, truncated = _ranked(connection, object_type, f'name : ({query})', portal, candidates)
+    if len(ranked) < limit:
+        others, others_truncated = _ranked(connection, object_type, f'({query}) NOT name : ({query})', portal, candidates)
+        ranked, truncated = ranked + others, truncated or others_truncated
+    return ranked[:limit], truncated
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_on_create(target, connection, **kw):
+    install_search_index(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_with_tables(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for object_type in SEARCH_INDEXES:
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {search_table(object_type)}')
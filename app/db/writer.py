@@ -0,0 +1,173 @@
+"""
+Optional single-writer queue for SQLite
+
+SQLite allows one writer at a time per database file. When many threads
+each commit their own small transaction they queue on the file lock, and
+a deferred transaction that has to upgrade to a write lock can fail with
+"database is locked" without waiting at all. With ``SQLITE_SINGLE_WRITER``
+the process instead hands its writes to one thread that owns one
+connection: queued jobs are applied back to back, each in its own
+savepoint, inside a single ``BEGIN IMMEDIATE`` transaction (group commit).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sqlalchemy.engine import make_url
+from app.db.database import db
+
+logger = logging.getLogger(__name__)
+
+class SQLiteWriter:
+    """Serializes a process's SQLite writes through one connection
+
+    ``submit(fn)`` queues ``fn(connection)`` and returns a Future with its
+    result; ``run(fn)`` waits for it. A job that raises is rolled back to
+    its savepoint without affecting the other jobs in the same commit.
+    Disabled (``enabled`` False) for in-memory databases, whose single
+    shared connection cannot be handed to another thread.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.transactions = 0
+        self.failed_transactions = 0
+        self.wait_ms_total = 0.0
+        self.commit_ms_total = 0.0
+        self.max_batch = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the writer to an application"""
+        app.config.setdefault('SQLITE_SINGLE_WRITER', False)
+        app.config.setdefault('SQLITE_WRITER_BATCH', 64)
+        app.extensions['sqlite_writer'] = self
+        if self.app is None:
+            atexit.register(self.stop)
+        self.app = app
+
+    @property
+    def enabled(self):
+        if self.app is None or not self.app.config.get('SQLITE_SINGLE_WRITER'):
+            return False
+        url = make_url(self.app.config['SQLALCHEMY_DATABASE_URI'])
+        return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+    def submit(self, fn):
+        """Queue ``fn(connection)``; returns a Future"""
+        self._check_fork()
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((fn, future, time.perf_counter()))
+        return future
+
+    def run(self, fn, timeout=None):
+        """Queue ``fn(connection)`` and wait for its result (re-raises its exception)"""
+        return self.submit(fn).result(timeout)
+
+    def stop(self, timeout=5):
+        """Finish the queued jobs and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # Jobs queued before the fork belong to the parent process
+            self._queue = queue.Queue()
+            self._thread = None
+            self._pid = os.getpid()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            engine = db.engine
+        connection = engine.connect().execution_options(sqlite_begin='BEGIN IMMEDIATE')
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                jobs = [job]
+                while len(jobs) < self.app.config['SQLITE_WRITER_BATCH']:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        self._queue.put(None)  # Stop after this batch
+                        break
+                    jobs.append(job)
+                self._execute(connection, jobs)
+        finally:
+            connection.close()
+
+    def _execute(self, connection, jobs):
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            with connection.begin():
+                for fn, future, queued_at in jobs:
+                    self.wait_ms_total += (time.perf_counter() - queued_at) * 1000
+                    try:
+                        with connection.begin_nested():
+                            outcomes.append((future, fn(connection), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            logger.error(f"SQLite writer commit failed for {len(jobs)} jobs: {e}")
+            self.failed_transactions += 1
+            self.failed_jobs += len(jobs)
+            for _, future, _ in jobs:
+                future.set_exception(e)
+            return
+        finally:
+            self.transactions += 1
+            self.jobs += len(jobs)
+            self.max_batch = max(self.max_batch, len(jobs))
+            self.commit_ms_total += (time.perf_counter() - started) * 1000
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                self.failed_jobs += 1
+                future.set_exception(error)
+
+    def get_metrics(self):
+        """Writer counters for this process"""
+        return {
+            'enabled': self.enabled,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queued': self._queue.qsize(),
+            'jobs': self.jobs,
+            'failed_jobs': self.failed_jobs,
+            'transactions': self.transactions,
+            'failed_transactions': self.failed_transactions,
+            'avg_jobs_per_commit': round(self.jobs / self.transactions, 2) if self.transactions else 0,
+            'max_jobs_per_commit': self.max_batch,
+            'avg_queue_wait_ms': round(self.wait_ms_total / self.jobs, 3) if self.jobs else 0,
+            'avg_commit_ms': round(self.commit_ms_total / self.transactions, 3) if self.transactions else 0
+        }
+
+# One writer per process
+sqlite_writer = SQLiteWriter()
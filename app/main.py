@@ -21,7 +21,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import database instance from the centralized location
-from app.db.database import db
+from app.db.database import db, configure_engine
 
 # Initialize extensions
 jwt = JWTManager()
@@ -48,17 +48,90 @@ def create_app(config_class=None):
             app.config['SQLALCHEMY_DATABASE_URI'] = db_url
             
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+        app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+        app.config['SQLITE_BUSY_TIMEOUT'] = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))
+        app.config['SQLITE_CACHE_SIZE'] = int(os.getenv('SQLITE_CACHE_SIZE', -65536))
+        app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+        app.config['SQLITE_SINGLE_WRITER'] = os.getenv('SQLITE_SINGLE_WRITER', 'false').lower() == 'true'
+        app.config['SQLITE_WRITER_BATCH'] = int(os.getenv('SQLITE_WRITER_BATCH', 64))
+        app.config['DB_AUTO_MIGRATE'] = os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true'
         app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
         app.config['JWT_ACCESS_TOKEN_EXPIRES'] = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))
+        app.config['AUTH_CLAIMS_CACHE_SIZE'] = int(os.getenv('AUTH_CLAIMS_CACHE_SIZE', 4096))
         
         # HubSpot Configuration
         app.config['HUBSPOT_API_URL'] = os.getenv('HUBSPOT_API_URL', 'https://api.hubapi.com')
         app.config['HUBSPOT_ACCESS_TOKEN'] = os.getenv('HUBSPOT_ACCESS_TOKEN')
+        app.config['HUBSPOT_POOL_SIZE'] = int(os.getenv('HUBSPOT_POOL_SIZE', 10))
+        app.config['HUBSPOT_CONNECT_TIMEOUT'] = float(os.getenv('HUBSPOT_CONNECT_TIMEOUT', 5))
+        app.config['HUBSPOT_READ_TIMEOUT'] = float(os.getenv('HUBSPOT_READ_TIMEOUT', 30))
+        app.config['HUBSPOT_TOKEN_CACHE_TTL'] = float(os.getenv('HUBSPOT_TOKEN_CACHE_TTL', 300))
+        app.config['HUBSPOT_TOKEN_INVALIDATION_POLL'] = float(os.getenv('HUBSPOT_TOKEN_INVALIDATION_POLL', 5))
+        app.config['HUBSPOT_LEAD_ANALYTICS_TTL'] = float(os.getenv('HUBSPOT_LEAD_ANALYTICS_TTL', 60))
+        app.config['HUBSPOT_METADATA_CACHE_TTL'] = float(os.getenv('HUBSPOT_METADATA_CACHE_TTL', 3600))
+        app.config['HUBSPOT_METADATA_STALE_TTL'] = float(os.getenv('HUBSPOT_METADATA_STALE_TTL', 86400))
+        app.config['HUBSPOT_METADATA_WARMUP'] = os.getenv('HUBSPOT_METADATA_WARMUP', 'false').lower() == 'true'
+        app.config['HUBSPOT_METADATA_INVALIDATION_POLL'] = float(os.getenv('HUBSPOT_METADATA_INVALIDATION_POLL', 5))
+        app.config['HUBSPOT_OBJECT_CACHE_TTL'] = float(os.getenv('HUBSPOT_OBJECT_CACHE_TTL', 120))
+        app.config['HUBSPOT_OBJECT_CACHE_NEGATIVE_TTL'] = float(os.getenv('HUBSPOT_OBJECT_CACHE_NEGATIVE_TTL', 30))
+        app.config['HUBSPOT_OBJECT_CACHE_SIZE'] = int(os.getenv('HUBSPOT_OBJECT_CACHE_SIZE', 5000))
+        app.config['HUBSPOT_OBJECT_CACHE_MAX_BYTES'] = int(os.getenv('HUBSPOT_OBJECT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        app.config['ADMIN_API_KEY'] = os.getenv('ADMIN_API_KEY')
+        app.config['HUBSPOT_ASYNC_MAX_CONNECTIONS'] = int(os.getenv('HUBSPOT_ASYNC_MAX_CONNECTIONS', 200))
+        app.config['HUBSPOT_RATE_LIMIT_ENABLED'] = os.getenv('HUBSPOT_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+        app.config['HUBSPOT_RATE_LIMIT_DB'] = os.getenv(
+            'HUBSPOT_RATE_LIMIT_DB', str(Path(__file__).parent.parent / 'data' / 'hubspot_rate_limits.db')
+        )
+        app.config['HUBSPOT_RATE_LIMIT_MAX'] = int(os.getenv('HUBSPOT_RATE_LIMIT_MAX', 100))
+        app.config['HUBSPOT_RATE_LIMIT_INTERVAL'] = float(os.getenv('HUBSPOT_RATE_LIMIT_INTERVAL', 10))
+        app.config['HUBSPOT_RATE_LIMIT_MAX_WAIT'] = float(os.getenv('HUBSPOT_RATE_LIMIT_MAX_WAIT', 60))
+        app.config['HUBSPOT_MAX_RETRIES'] = int(os.getenv('HUBSPOT_MAX_RETRIES', 5))
+        app.config['HUBSPOT_BACKOFF_BASE'] = float(os.getenv('HUBSPOT_BACKOFF_BASE', 0.5))
+        app.config['HUBSPOT_BACKOFF_MAX'] = float(os.getenv('HUBSPOT_BACKOFF_MAX', 30))
+        app.config['HUBSPOT_BATCH_CHUNK_SIZE'] = int(os.getenv('HUBSPOT_BATCH_CHUNK_SIZE', 100))
+        app.config['HUBSPOT_BATCH_CONCURRENCY'] = int(os.getenv('HUBSPOT_BATCH_CONCURRENCY', 4))
+
+        # Audit log writer
+        app.config['LOG_SINK_SYNCHRONOUS'] = os.getenv('LOG_SINK_SYNCHRONOUS', 'false').lower() == 'true'
+        app.config['LOG_SINK_MAX_BATCH'] = int(os.getenv('LOG_SINK_MAX_BATCH', 200))
+        app.config['LOG_SINK_FLUSH_INTERVAL'] = float(os.getenv('LOG_SINK_FLUSH_INTERVAL', 1.0))
+        app.config['LOG_SINK_MAX_RETRIES'] = int(os.getenv('LOG_SINK_MAX_RETRIES', 5))
+
+        # Replay of failed HubSpot writes
+        app.config['LOG_SYNC_ENABLED'] = os.getenv('LOG_SYNC_ENABLED', 'true').lower() == 'true'
+        app.config['LOG_SYNC_INTERVAL'] = float(os.getenv('LOG_SYNC_INTERVAL', 30))
+        app.config['LOG_SYNC_BATCH_SIZE'] = int(os.getenv('LOG_SYNC_BATCH_SIZE', 200))
+        app.config['LOG_SYNC_MAX_ATTEMPTS'] = int(os.getenv('LOG_SYNC_MAX_ATTEMPTS', 6))
+        app.config['LOG_SYNC_BACKOFF_BASE'] = float(os.getenv('LOG_SYNC_BACKOFF_BASE', 30))
+        app.config['LOG_SYNC_BACKOFF_MAX'] = float(os.getenv('LOG_SYNC_BACKOFF_MAX', 3600))
+        app.config['LOG_SYNC_LEASE'] = int(os.getenv('LOG_SYNC_LEASE', 300))
+
+        # Local CRM mirror (opt-in)
+        app.config['CRM_MIRROR_ENABLED'] = os.getenv('CRM_MIRROR_ENABLED', 'false').lower() == 'true'
+        app.config['CRM_MIRROR_INTERVAL'] = float(os.getenv('CRM_MIRROR_INTERVAL', 300))
+        app.config['CRM_MIRROR_MAX_AGE'] = float(os.getenv('CRM_MIRROR_MAX_AGE', 0))
+        app.config['CRM_MIRROR_DELETE_SWEEP_INTERVAL'] = float(os.getenv('CRM_MIRROR_DELETE_SWEEP_INTERVAL', 3600))
+        app.config['AUTOCOMPLETE_REFRESH_INTERVAL'] = float(os.getenv('AUTOCOMPLETE_REFRESH_INTERVAL', 30))
+
+        # WhatsApp webhook queue
+        app.config['WEBHOOK_WORKERS'] = int(os.getenv('WEBHOOK_WORKERS', 2))
+        app.config['WEBHOOK_BATCH_SIZE'] = int(os.getenv('WEBHOOK_BATCH_SIZE', 50))
+        app.config['WEBHOOK_POLL_INTERVAL'] = float(os.getenv('WEBHOOK_POLL_INTERVAL', 1.0))
+        app.config['WEBHOOK_MAX_ATTEMPTS'] = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', 5))
+        app.config['WEBHOOK_BACKOFF_BASE'] = float(os.getenv('WEBHOOK_BACKOFF_BASE', 2.0))
+        app.config['WEBHOOK_BACKOFF_MAX'] = float(os.getenv('WEBHOOK_BACKOFF_MAX', 300.0))
+        app.config['WEBHOOK_VISIBILITY_TIMEOUT'] = int(os.getenv('WEBHOOK_VISIBILITY_TIMEOUT', 300))
+        app.config['WEBHOOK_RETENTION_HOURS'] = int(os.getenv('WEBHOOK_RETENTION_HOURS', 24))
+        app.config['WEBHOOK_DEDUP_CACHE_SIZE'] = int(os.getenv('WEBHOOK_DEDUP_CACHE_SIZE', 10000))
+        app.config['WEBHOOK_SENDER_CACHE_SIZE'] = int(os.getenv('WEBHOOK_SENDER_CACHE_SIZE', 10000))
+        app.config['WEBHOOK_SENDER_CACHE_TTL'] = float(os.getenv('WEBHOOK_SENDER_CACHE_TTL', 60))
     else:
         app.config.from_object(config_class)
 
     # Initialize extensions
     db.init_app(app)
+    configure_engine(app)
     jwt.init_app(app)
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}})
 
@@ -66,11 +139,51 @@ def create_app(config_class=None):
     migrate.init_app(app, db)
 
     # Import models first to ensure they're registered with SQLAlchemy
-    from app.models import User, ChatSession, ChatMessage, Log
+    from app.models import User, ChatSession, ChatMessage, Log, WebhookEvent, StatsRollup, CrmRecord, CrmSyncState
+
+    # Bring an existing database up to the current schema before anything queries it
+    if app.config.get('DB_AUTO_MIGRATE', True):
+        from app.db.migrations import upgrade_database
+        with app.app_context():
+            try:
+                upgrade_database()
+            except Exception as e:
+                raise RuntimeError(
+                    f"Database schema upgrade failed ({e}); fix the database or run "
+                    f"scripts/init_db.py, or set DB_AUTO_MIGRATE=false to start anyway"
+                ) from e
+
+    # Optional single-writer queue for SQLite
+    from app.db.writer import sqlite_writer
+    sqlite_writer.init_app(app)
+
+    # Buffered audit log writer shared by all blueprints
+    from app.services.log_sink import log_sink
+    log_sink.init_app(app)
+
+    # Outbox replay of failed HubSpot writes (started on the first request)
+    from app.services.log_sync import log_sync
+    log_sync.init_app(app)
+
+    # Read-through cache for HubSpot records fetched by id
+    from app.services.object_cache import object_cache
+    object_cache.init_app(app)
+
+    # Opt-in local copy of CRM records (synced on the first request when enabled)
+    from app.services.crm_mirror import crm_mirror
+    crm_mirror.init_app(app)
+
+    # Typeahead over mirrored contact and company names (built on first use)
+    from app.services.autocomplete import autocomplete
+    autocomplete.init_app(app)
+
+    # Single-pass JWT authentication (results on flask.g)
+    from app.core.auth_body import register_authentication
+    register_authentication(app)
     
     # Register blueprints (models are already imported above)
-    from app.api.v1 import auth, users, sessions, messages, logs, stats, health, help, whatsapp
-    from app.api.v1.hubspot import contacts_bp, companies_bp, deals_bp, notes_bp, tasks_bp, activities_bp, associations_bp, leads_bp
+    from app.api.v1 import auth, users, sessions, messages, logs, stats, health, help, whatsapp, admin
+    from app.api.v1.hubspot import contacts_bp, companies_bp, deals_bp, notes_bp, tasks_bp, activities_bp, associations_bp, leads_bp, export_bp, autocomplete_bp
     
     # Core API blueprints
     app.register_blueprint(auth.bp, url_prefix='/api/auth')
@@ -82,6 +195,7 @@ def create_app(config_class=None):
     app.register_blueprint(health.bp, url_prefix='/api/health')
     app.register_blueprint(help.bp, url_prefix='/api/help')
     app.register_blueprint(whatsapp.bp, url_prefix='/api/whatsapp')
+    app.register_blueprint(admin.bp, url_prefix='/api/admin')
     
     # Legacy HubSpot blueprint (for backward compatibility)
     try:
@@ -99,6 +213,13 @@ def create_app(config_class=None):
     app.register_blueprint(activities_bp, url_prefix='/api/hubspot/activities')
     app.register_blueprint(associations_bp, url_prefix='/api/hubspot/associations')
     app.register_blueprint(leads_bp, url_prefix='/api/hubspot/leads')
+    app.register_blueprint(export_bp, url_prefix='/api/hubspot/export')
+    app.register_blueprint(autocomplete_bp, url_prefix='/api/hubspot/autocomplete')
+
+    # Optional HubSpot metadata warm-up (background thread, does not delay startup)
+    if app.config.get('HUBSPOT_METADATA_WARMUP'):
+        from app.services.hubspot_service import HubSpotService
+        HubSpotService.warm_metadata_in_background(app)
 
     # Error handlers
     @app.errorhandler(404)
@@ -114,17 +235,8 @@ def create_app(config_class=None):
 # Create app instance for direct running
 app = create_app()
 
-# Initialize database tables when running directly
+# Run directly (create_app has already brought the database up to date)
 if __name__ == '__main__':
-    with app.app_context():
-        try:
-            # Models are already imported in create_app()
-            db.create_all()
-            print("[OK] Database tables created successfully!")
-        except Exception as e:
-            print(f"[ERROR] Database initialization error: {e}")
-            print("[INFO] Continuing without database initialization...")
-    
     print("[START] Starting Flask application...")
     print("[INFO] Server will be available at: http://127.0.0.1:5000")
     print("[INFO] Health check: http://127.0.0.1:5000/api/health")
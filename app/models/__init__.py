@@ -6,5 +6,12 @@ from .user import User
 from .session import ChatSession
 from .message import ChatMessage
 from .log import Log
+from .webhook_event import WebhookEvent
+from .stats_rollup import StatsRollup
+from .crm_record import CrmRecord, CrmSyncState
+from .metadata_invalidation import MetadataInvalidation
+from .token_invalidation import TokenInvalidation
+from app.db import counters, rollups, search  # noqa: F401  (install their triggers on create_all)
 
-__all__ = ['User', 'ChatSession', 'ChatMessage', 'Log']
\ No newline at end of file
+__all__ = ['User', 'ChatSession', 'ChatMessage', 'Log', 'WebhookEvent', 'StatsRollup', 'CrmRecord', 'CrmSyncState',
+           'MetadataInvalidation', 'TokenInvalidation']
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+Local CRM mirror models
+"""
+
+import json
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
+from app.db.database import db
+
+class CrmRecord(db.Model):
+    """Copy of one HubSpot record, kept current by the CRM mirror (see app.services.crm_mirror)"""
+    __tablename__ = 'crm_records'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    portal_key = Column(String(16), nullable=False)  # Token fingerprint of the portal it came from
+    object_type = Column(String(20), nullable=False)  # contacts, companies, deals, notes, tasks
+    hubspot_id = Column(String(32), nullable=False)
+    properties = Column(Text, nullable=False, default='{}')  # JSON, as HubSpot returned it
+    hubspot_created_at = Column(DateTime, nullable=True)
+    hubspot_updated_at = Column(DateTime, nullable=True)  # lastmodifieddate / hs_lastmodifieddate
+    archived = Column(Boolean, nullable=False, default=False, server_default='0')  # Deleted in HubSpot
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Start of the last sync that wrote it (upsert or archive), or time of a write made through this app
+
+    __table_args__ = (
+        Index('ux_crm_records_key', 'portal_key', 'object_type', 'hubspot_id', unique=True),
+        Index('ix_crm_records_updated', 'portal_key', 'object_type', 'hubspot_updated_at'),
+        Index('ix_crm_records_synced', 'portal_key', 'object_type', 'synced_at'),
+    )
+
+    def to_record(self):
+        """The record in HubSpot's API shape"""
+        return {
+            'id': self.hubspot_id,
+            'properties': json.loads(self.properties or '{}'),
+            'createdAt': self.hubspot_created_at.isoformat() + 'Z' if self.hubspot_created_at else None,
+            'updatedAt': self.hubspot_updated_at.isoformat() + 'Z' if self.hubspot_updated_at else None,
+            'archived': self.archived
+        }
+
+    def __repr__(self):
+        return f'<CrmRecord {self.object_type} {self.hubspot_id}>'
+
+class CrmSyncState(db.Model):
+    """High-water mark and freshness of the mirror for one portal and object type"""
+    __tablename__ = 'crm_sync_state'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    portal_key = Column(String(16), nullable=False)
+    object_type = Column(String(20), nullable=False)
+    high_water_mark = Column(DateTime, nullable=True)  # Newest modification time pulled so far
+    last_full_sync_at = Column(DateTime, nullable=True)
+    last_synced_at = Column(DateTime, nullable=True)  # End of the last successful sync (full or incremental)
+    last_delete_sweep_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ux_crm_sync_state_key', 'portal_key', 'object_type', unique=True),
+    )
+
+    def to_dict(self):
+        """Convert sync state to dictionary"""
+        return {
+            'object_type': self.object_type,
+            'high_water_mark': self.high_water_mark.isoformat() if self.high_water_mark else None,
+            'last_full_sync_at': self.last_full_sync_at.isoformat() if self.last_full_sync_at else None,
+            'last_synced_at': self.last_synced_at.isoformat() if self.last_synced_at else None,
+            'last_delete_sweep_at': self.last_delete_sweep_at.isoformat() if self.last_delete_sweep_at else None,
+            'last_error': self.last_error
+        }
+
+    def __repr__(self):
+        return f'<CrmSyncState {self.object_type} {self.high_water_mark}>'
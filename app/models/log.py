@@ -3,7 +3,7 @@ Log model for HubSpot activities
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import db
 
@@ -25,6 +25,14 @@ class Log(db.Model):
     sync_status = Column(String(20), default='pending', nullable=False)  # pending, synced, failed
     sync_error = Column(Text, nullable=True)
     synced_at = Column(DateTime, nullable=True)
+
+    # Outbox replay of failed writes (app.services.log_sync)
+    sync_attempts = Column(Integer, default=0, nullable=False)
+    next_retry_at = Column(DateTime, nullable=True)  # NULL = nothing left to retry
+    sync_object_type = Column(String(30), nullable=True)  # contacts, deals, ...
+    sync_operation = Column(String(20), nullable=True)  # create, update, archive (batch endpoint); set on synced creates too
+    sync_payload = Column(Text, nullable=True)  # JSON batch input
+    sync_claim = Column(String(32), nullable=True)  # Set while a sync worker replays the row
     
     # Additional tracking fields for leads and deal stages
     lead_status = Column(String(50), nullable=True)  # NEW, CONTACTED, QUALIFIED, UNQUALIFIED, CONVERTED
@@ -33,6 +41,16 @@ class Log(db.Model):
     deal_amount = Column(String(20), nullable=True)  # Deal amount for financial tracking
     stage_reason = Column(Text, nullable=True)  # Reason for stage change
 
+    __table_args__ = (
+        Index('ix_logs_sync_queue', 'sync_status', 'next_retry_at'),
+        Index('ix_logs_user_created', 'user_id', 'created_at', 'id'),  # GET /api/logs keyset pages
+        Index('ix_logs_session_created', 'session_id', 'created_at'),
+        Index('ix_logs_chat_message_id', 'chat_message_id'),
+        Index('ix_logs_created_at', 'created_at'),
+        Index('ix_logs_hubspot_id', 'hubspot_id'),
+        Index('ix_logs_sync_claim', 'sync_claim'),
+    )
+
     # Relationships
     user = relationship('User', backref='logs')
     session = relationship('ChatSession', back_populates='logs')
@@ -44,6 +62,7 @@ class Log(db.Model):
         self.hubspot_id = hubspot_id
         self.synced_at = datetime.utcnow()
         self.sync_error = None
+        self.next_retry_at = None
 
     def mark_as_failed(self, error_message):
         """Mark log as failed"""
@@ -55,6 +74,8 @@ class Log(db.Model):
         self.sync_status = 'pending'
         self.sync_error = None
         self.synced_at = None
+        if self.sync_payload:
+            self.next_retry_at = datetime.utcnow()
 
     def to_dict(self):
         """Convert log to dictionary"""
@@ -69,6 +90,8 @@ class Log(db.Model):
             'sync_status': self.sync_status,
             'sync_error': self.sync_error,
             'synced_at': self.synced_at.isoformat() if self.synced_at else None,
+            'sync_attempts': self.sync_attempts,
+            'next_retry_at': self.next_retry_at.isoformat() if self.next_retry_at else None,
             'lead_status': self.lead_status,
             'deal_stage': self.deal_stage,
             'lead_source': self.lead_source,
@@ -3,7 +3,7 @@ Chat message model
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import db
 
@@ -16,7 +16,15 @@ class ChatMessage(db.Model):
     message_text = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     forwarded_from = Column(String(100), nullable=True)  # Phone number or contact name
+    external_message_id = Column(String(128), nullable=True)  # Provider message id (e.g. wamid), unique when set
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    log_count = Column(Integer, default=0, server_default='0', nullable=False)  # Maintained by triggers (app.db.counters)
+
+    __table_args__ = (
+        Index('ux_chat_messages_external_message_id', 'external_message_id', unique=True),
+        Index('ix_chat_messages_session_timestamp', 'session_id', 'timestamp'),
+        Index('ix_chat_messages_timestamp', 'timestamp'),
+    )
 
     # Relationships
     session = relationship('ChatSession', back_populates='messages')
@@ -25,12 +33,7 @@ class ChatMessage(db.Model):
     @property
     def has_logs(self):
         """Check if message has associated logs"""
-        return len(self.logs) > 0
-
-    @property
-    def log_count(self):
-        """Get log count"""
-        return len(self.logs)
+        return self.log_count > 0
 
     def to_dict(self):
         """Convert message to dictionary"""
@@ -40,6 +43,7 @@ class ChatMessage(db.Model):
             'message_text': self.message_text,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'forwarded_from': self.forwarded_from,
+            'external_message_id': self.external_message_id,
             'has_logs': self.has_logs,
             'log_count': self.log_count,
             'created_at': self.created_at.isoformat() if self.created_at else None
@@ -0,0 +1,19 @@
+"""
+Metadata cache invalidation model
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.database import db
+
+class MetadataInvalidation(db.Model):
+    """One admin invalidation of the metadata cache, replayed by every process (see HubSpotService.get_metadata)"""
+    __tablename__ = 'metadata_invalidations'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    portal_key = Column(String(16), nullable=True)  # Token fingerprint; NULL = every portal
+    name = Column(String(100), nullable=True)  # Key prefix; NULL = every metadata type
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<MetadataInvalidation {self.id} {self.portal_key} {self.name}>'
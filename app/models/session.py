@@ -3,7 +3,7 @@ Chat session model
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import db
 
@@ -18,21 +18,21 @@ class ChatSession(db.Model):
     status = Column(String(20), default='active', nullable=False)  # active, closed
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    # Maintained by database triggers (app.db.counters)
+    message_count = Column(Integer, default=0, server_default='0', nullable=False)
+    log_count = Column(Integer, default=0, server_default='0', nullable=False)
+
+    __table_args__ = (
+        Index('ix_chat_sessions_user_status', 'user_id', 'status'),
+        Index('ix_chat_sessions_status', 'status'),
+        Index('ix_chat_sessions_user_created', 'user_id', 'created_at'),  # Keyset pages (rowid is the id tie-break)
+    )
+
     # Relationships
     user = relationship('User', backref='sessions')
     messages = relationship('ChatMessage', back_populates='session', cascade='all, delete-orphan')
     logs = relationship('Log', back_populates='session', cascade='all, delete-orphan')
 
-    @property
-    def message_count(self):
-        """Get message count"""
-        return len(self.messages)
-
-    @property
-    def log_count(self):
-        """Get log count"""
-        return len(self.logs)
-
     @property
     def duration_minutes(self):
         """Get session duration in minutes"""
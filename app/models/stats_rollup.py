@@ -0,0 +1,39 @@
+"""
+Stats rollup model
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.db.database import db
+
+class StatsRollup(db.Model):
+    """Pre-aggregated activity counts per time bucket (maintained by triggers, see app.db.rollups)"""
+    __tablename__ = 'stats_rollups'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    granularity = Column(String(5), nullable=False)  # hour, day, total
+    bucket_start = Column(DateTime, nullable=False)  # Start of the hour/day (UTC); 1970-01-01 for total
+    user_id = Column(Integer, nullable=False)  # All-user figures are summed at read time
+    metric = Column(String(20), nullable=False)  # sessions, messages, logs, objects (synced creates)
+    log_type = Column(String(50), nullable=False, default='', server_default='')  # '' unless metric is logs or objects
+    sync_status = Column(String(20), nullable=False, default='', server_default='')  # '' unless metric is logs
+    count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        Index('ux_stats_rollups_key', 'granularity', 'user_id', 'metric', 'bucket_start', 'log_type', 'sync_status',
+              unique=True),
+    )
+
+    def to_dict(self):
+        """Convert rollup row to dictionary"""
+        return {
+            'granularity': self.granularity,
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'user_id': self.user_id,
+            'metric': self.metric,
+            'log_type': self.log_type,
+            'sync_status': self.sync_status,
+            'count': self.count
+        }
+
+    def __repr__(self):
+        return f'<StatsRollup {self.granularity} {self.bucket_start} {self.metric} {self.count}>'
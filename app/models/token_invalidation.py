@@ -0,0 +1,18 @@
+"""
+HubSpot token cache invalidation model
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime
+from app.db.database import db
+
+class TokenInvalidation(db.Model):
+    """One change of a user's HubSpot token, replayed by every process (see HubSpotService.get_hubspot_token)"""
+    __tablename__ = 'token_invalidations'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<TokenInvalidation {self.id} {self.user_id}>'
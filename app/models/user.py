@@ -4,7 +4,8 @@ User model for salesmen
 
 import bcrypt
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index
+from sqlalchemy.orm import validates
 from app.db.database import db
 
 class User(db.Model):
@@ -16,12 +17,17 @@ class User(db.Model):
     username = Column(String(50), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     phone_number = Column(String(20), unique=True, nullable=False)
+    phone_number_normalized = Column(String(20), nullable=True)  # E.164, kept in sync with phone_number
     hubspot_pat_token = Column(Text, nullable=False)  # Encrypted at application level
     email = Column(String(100), unique=True, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        Index('ix_users_phone_number_normalized', 'phone_number_normalized'),
+    )
+
     def __init__(self, name, username, password, phone_number, hubspot_pat_token, email=None):
         self.name = name
         self.username = username
@@ -30,6 +36,14 @@ class User(db.Model):
         self.hubspot_pat_token = hubspot_pat_token
         self.email = email
 
+    @validates('phone_number')
+    def _normalize_phone_number(self, key, phone_number):
+        """Keep the indexed E.164 copy used for inbound message lookups"""
+        from app.core.security import SecurityService  # app.core imports the models
+
+        self.phone_number_normalized = SecurityService.normalize_phone_number(phone_number)
+        return phone_number
+
     @property
     def password(self):
         """Password property (read-only)"""
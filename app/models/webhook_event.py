@@ -0,0 +1,44 @@
+"""
+Webhook event queue model
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from app.db.database import db
+
+class WebhookEvent(db.Model):
+    """Raw inbound webhook payload waiting for (or done with) background processing"""
+    __tablename__ = 'webhook_events'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String(20), default='whatsapp', nullable=False)
+    payload = Column(Text, nullable=False)  # Request body exactly as received
+    status = Column(String(20), default='pending', nullable=False)  # pending, processing, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    claim_token = Column(String(32), nullable=True)  # Set by the worker that claimed the event
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = Column(DateTime, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # A failed event is not claimed again before this
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_webhook_events_status_id', 'status', 'id'),
+        Index('ix_webhook_events_claim_token', 'claim_token'),
+    )
+
+    def to_dict(self):
+        """Convert event to dictionary"""
+        return {
+            'id': self.id,
+            'source': self.source,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+
+    def __repr__(self):
+        return f'<WebhookEvent {self.id} - {self.status}>'
@@ -0,0 +1,437 @@
+"""
+Asynchronous HubSpot API integration service
+
+asyncio counterpart of HubSpotService with the same method surface, for async
+Flask views that fan out several HubSpot calls (see GET
+/api/hubspot/activities/activities). All coroutines running on one event loop
+share a single pooled ``httpx.AsyncClient``, so the calls are in flight at the
+same time. Token lookups, the rate limiter, the caches and audit logs are
+blocking database work; they run off the event loop through ``run_blocking``.
+Records by id and schema metadata go through the same object, mirror and
+metadata caches as HubSpotService (a metadata miss loads on that thread).
+
+Optional dependencies: ``pip install httpx asgiref`` (asgiref is also what
+Flask needs to run async views).
+"""
+
+import asyncio
+import weakref
+from flask import current_app
+from app.services.hubspot_service import HubSpotService
+from app.services.rate_limiter import HubSpotRateLimitError, backoff_delay
+
+try:
+    import httpx
+    from asgiref.sync import sync_to_async
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call (database, rate limiter, log sink) without stalling the event loop
+
+    Thread-sensitive: these calls run one at a time on one thread, the
+    request's own thread inside an async Flask view, so they keep its app
+    context and database session.
+    """
+    return await sync_to_async(fn, thread_sensitive=True)(*args, **kwargs)
+
+class AsyncHubSpotService:
+    """Async service for HubSpot API interactions"""
+
+    _clients = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def get_client():
+        """Get the shared HTTP client for the running event loop"""
+        if httpx is None:
+            raise RuntimeError('AsyncHubSpotService requires httpx and asgiref (pip install httpx asgiref)')
+
+        loop = asyncio.get_running_loop()
+        client = AsyncHubSpotService._clients.get(loop)
+        if client is None or client.is_closed:
+            config = current_app.config
+            max_connections = config.get('HUBSPOT_ASYNC_MAX_CONNECTIONS', 200)
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                ),
+                timeout=httpx.Timeout(
+                    config.get('HUBSPOT_READ_TIMEOUT', 30),
+                    connect=config.get('HUBSPOT_CONNECT_TIMEOUT', 5),
+                    pool=None
+                )
+            )
+            AsyncHubSpotService._clients[loop] = client
+        return client
+
+    @staticmethod
+    async def close_client():
+        """Close the running loop's HTTP client"""
+        client = AsyncHubSpotService._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    @staticmethod
+    async def make_request(method, endpoint, data=None, params=None, user_id=None):
+        """Make authenticated request to HubSpot API (same retry rules as HubSpotService)"""
+        config = current_app.config
+        url = f"{HubSpotService.get_base_url()}{endpoint}"
+        client = AsyncHubSpotService.get_client()
+        token, limiter = await run_blocking(
+            lambda: (HubSpotService.get_hubspot_token(user_id), HubSpotService.get_rate_limiter())
+        )
+        headers = HubSpotService.get_headers(token=token)
+        max_retries = config.get('HUBSPOT_MAX_RETRIES', 5)
+
+        for attempt in range(max_retries + 1):
+            if limiter:
+                waited = 0.0
+                wait = await run_blocking(limiter.reserve, token)
+                while wait > 0:
+                    if waited + wait > limiter.max_wait:
+                        raise HubSpotRateLimitError('HubSpot rate limit: no request slot available', retry_after=wait)
+                    await asyncio.sleep(wait)
+                    waited += wait
+                    wait = await run_blocking(limiter.reserve, token)
+
+            response = await client.request(method, url, headers=headers, json=data, params=params)
+
+            if limiter:
+                await run_blocking(limiter.observe, token, response.headers)
+            if response.status_code != 429:
+                return response
+
+            delay = backoff_delay(
+                attempt,
+                retry_after=response.headers.get('Retry-After'),
+                base=config.get('HUBSPOT_BACKOFF_BASE', 0.5),
+                cap=config.get('HUBSPOT_BACKOFF_MAX', 30)
+            )
+            if attempt == max_retries:
+                break
+            if limiter:
+                await run_blocking(limiter.penalize, token, delay)
+            else:
+                await asyncio.sleep(delay)
+
+        raise HubSpotRateLimitError(f"HubSpot rate limit exceeded: {response.text}", retry_after=delay)
+
+    # ========== SHARED HELPERS ==========
+
+    @staticmethod
+    async def _get_json(endpoint, params=None, user_id=None):
+        """GET an endpoint and return its JSON body"""
+        response = await AsyncHubSpotService.make_request('GET', endpoint, params=params, user_id=user_id)
+        if response.status_code == 200:
+            return response.json()
+        raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+
+    @staticmethod
+    async def _list(object_type, limit=10, user_id=None, **filters):
+        params = {'limit': limit}
+        if filters:
+            params.update(filters)
+        return await AsyncHubSpotService._get_json(f'/crm/v3/objects/{object_type}', params=params, user_id=user_id)
+
+    @staticmethod
+    async def _search(object_type, property_name, search_term, limit=10, user_id=None):
+        search_data = {
+            "query": search_term,
+            "limit": limit,
+            "filterGroups": [
+                {
+                    "filters": [
+                        {
+                            "propertyName": property_name,
+                            "operator": "CONTAINS_TOKEN",
+                            "value": search_term
+                        }
+                    ]
+                }
+            ]
+        }
+        response = await AsyncHubSpotService.make_request(
+            'POST', f'/crm/v3/objects/{object_type}/search', data=search_data, user_id=user_id
+        )
+        if response.status_code == 200:
+            return response.json()
+        raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+
+    @staticmethod
+    async def _get_by_id(object_type, object_id, properties=None, user_id=None, max_age=None):
+        """GET one record through the object cache and CRM mirror, like HubSpotService.get_object_by_id"""
+        portal, record = await run_blocking(
+            HubSpotService._find_cached_object, object_type, object_id, properties, user_id, max_age
+        )
+        if record is not None:
+            return record
+
+        params = None
+        if properties:
+            params = {'properties': properties if isinstance(properties, str) else ','.join(properties)}
+        response = await AsyncHubSpotService.make_request(
+            'GET', f'/crm/v3/objects/{object_type}/{object_id}', params=params, user_id=user_id
+        )
+        return HubSpotService._fetched_object(portal, object_type, object_id, properties, response)
+
+    @staticmethod
+    async def _write(method, endpoint, payload, log_type, description, session_id=None, message_id=None, user_id=None):
+        """Create/update an object and log the outcome like HubSpotService does"""
+        parts = endpoint.split('/')
+        object_type = parts[4]
+        if method == 'POST':
+            operation, batch_input = 'create', payload
+        else:
+            operation, batch_input = 'update', {**payload, 'id': parts[5]}
+
+        try:
+            response = await AsyncHubSpotService.make_request(method, endpoint, payload, user_id=user_id)
+        except HubSpotRateLimitError as e:
+            await run_blocking(
+                HubSpotService._create_failed_log, user_id, session_id, message_id, log_type, str(e),
+                replay=HubSpotService._replay(e, object_type, operation, batch_input)
+            )
+            raise
+
+        if response.status_code in [200, 201]:
+            record = response.json()
+            hubspot_id = record.get('id')
+
+            def record_success():
+                HubSpotService._cache_written_object(object_type, record, user_id=user_id, created=method == 'POST')
+                HubSpotService._create_success_log(
+                    user_id, session_id, message_id, log_type, hubspot_id, description,
+                    operation='create' if method == 'POST' else None
+                )
+
+            await run_blocking(record_success)
+            return {'success': True, 'hubspot_id': hubspot_id, 'data': record}
+        else:
+            error_msg = response.text
+            await run_blocking(
+                HubSpotService._create_failed_log, user_id, session_id, message_id, log_type, error_msg,
+                replay=HubSpotService._replay(response, object_type, operation, batch_input)
+            )
+            return {'success': False, 'error': error_msg}
+
+    @staticmethod
+    async def _delete(object_type, object_id, log_type, label, session_id=None, message_id=None, user_id=None):
+        response = await AsyncHubSpotService.make_request(
+            'DELETE', f'/crm/v3/objects/{object_type}/{object_id}', user_id=user_id
+        )
+
+        if response.status_code in [200, 204]:
+            def record_success():
+                HubSpotService._forget_object(object_type, object_id, user_id=user_id)
+                HubSpotService._create_success_log(
+                    user_id, session_id, message_id, log_type, object_id, f"{label} deleted: {object_id}"
+                )
+
+            await run_blocking(record_success)
+            return {'success': True, 'hubspot_id': object_id, 'message': f'{label} deleted successfully'}
+        else:
+            error_msg = response.text
+            await run_blocking(
+                HubSpotService._create_failed_log, user_id, session_id, message_id, log_type, error_msg,
+                replay=HubSpotService._replay(response, object_type, 'archive', {'id': str(object_id)})
+            )
+            return {'success': False, 'error': error_msg}
+
+    # ========== CONTACT OPERATIONS ==========
+
+    @staticmethod
+    async def get_contacts(limit=10, user_id=None, **filters):
+        """Get HubSpot contacts"""
+        return await AsyncHubSpotService._list('contacts', limit, user_id, **filters)
+
+    @staticmethod
+    async def get_contact_by_id(contact_id, user_id=None, properties=None, max_age=None):
+        """Get specific contact by ID"""
+        return await AsyncHubSpotService._get_by_id('contacts', contact_id, properties, user_id, max_age)
+
+    @staticmethod
+    async def search_contacts(search_term, limit=10, user_id=None):
+        """Search contacts in HubSpot"""
+        return await AsyncHubSpotService._search('contacts', 'email', search_term, limit, user_id)
+
+    @staticmethod
+    async def create_contact(contact_data, session_id=None, message_id=None, user_id=None):
+        """Create contact in HubSpot"""
+        return await AsyncHubSpotService._write(
+            'POST', '/crm/v3/objects/contacts', {'properties': contact_data}, 'contact_action',
+            f"Contact created: {contact_data.get('email', 'N/A')}", session_id, message_id, user_id
+        )
+
+    @staticmethod
+    async def update_contact(contact_id, contact_data, session_id=None, message_id=None, user_id=None):
+        """Update contact in HubSpot"""
+        return await AsyncHubSpotService._write(
+            'PATCH', f'/crm/v3/objects/contacts/{contact_id}', {'properties': contact_data}, 'contact_action',
+            f"Contact updated: {contact_data.get('email', 'N/A')}", session_id, message_id, user_id
+        )
+
+    @staticmethod
+    async def delete_contact(contact_id, session_id=None, message_id=None, user_id=None):
+        """Delete contact from HubSpot"""
+        return await AsyncHubSpotService._delete(
+            'contacts', contact_id, 'contact_action', 'Contact', session_id, message_id, user_id
+        )
+
+    @staticmethod
+    async def get_contact_properties(user_id=None):
+        """Get contact properties"""
+        return await run_blocking(HubSpotService.get_contact_properties, user_id=user_id)
+
+    # ========== COMPANY OPERATIONS ==========
+
+    @staticmethod
+    async def get_companies(limit=10, user_id=None, **filters):
+        """Get HubSpot companies"""
+        return await AsyncHubSpotService._list('companies', limit, user_id, **filters)
+
+    @staticmethod
+    async def get_company_by_id(company_id, user_id=None, properties=None, max_age=None):
+        """Get specific company by ID"""
+        return await AsyncHubSpotService._get_by_id('companies', company_id, properties, user_id, max_age)
+
+    @staticmethod
+    async def search_companies(search_term, limit=10, user_id=None):
+        """Search HubSpot companies"""
+        return await AsyncHubSpotService._search('companies', 'name', search_term, limit, user_id)
+
+    @staticmethod
+    async def create_company(company_data, session_id=None, message_id=None, user_id=None):
+        """Create company in HubSpot"""
+        return await AsyncHubSpotService._write(
+            'POST', '/crm/v3/objects/companies', {'properties': company_data}, 'contact_action',
+            f"Company created: {company_data.get('name', 'N/A')}", session_id, message_id, user_id
+        )
+
+    @staticmethod
+    async def update_company(company_id, company_data, session_id=None, message_id=None, user_id=None):
+        """Update company in HubSpot"""
+        return await AsyncHubSpotService._write(
+            'PATCH', f'/crm/v3/objects/companies/{company_id}', {'properties': company_data}, 'company_action',
+            f"Company updated: {company_data.get('name', 'N/A')}", session_id, message_id, user_id
+        )
+
+    @staticmethod
+    async def delete_company(company_id, session_id=None, message_id=None, user_id=None):
+        """Delete company from HubSpot"""
+        return await AsyncHubSpotService._delete(
+            'companies', company_id, 'company_action', 'Company', session_id, message_id, user_id
+        )
+
+    @staticmethod
+    async def get_company_properties(user_id=None):
+        """Get company properties"""
+        return await run_blocking(HubSpotService.get_company_properties, user_id=user_id)
+
+    # ========== DEAL OPERATIONS ==========
+
+    @staticmethod
+    async def get_deals(limit=10, user_id=None, **filters):
+        """Get HubSpot deals"""
+        return await AsyncHubSpotService._list('deals', limit, user_id, **filters)
+
+    @staticmethod
+    async def get_deal_by_id(deal_id, user_id=None, properties=None, max_age=None):
+        """Get specific deal by ID"""
+        return await AsyncHubSpotService._get_by_id('deals', deal_id, properties, user_id, max_age)
+
+    @staticmethod
+    async def create_deal(deal_data, associations=None, session_id=None, message_id=None, user_id=None):
+        """Create deal in HubSpot"""
+        payload = {'properties': deal_data}
+        if associations:
+            payload['associations'] = associations
+        return await AsyncHubSpotService._write(
+            'POST', '/crm/v3/objects/deals', payload, 'deal',
+            f"Deal created: {deal_data.get('dealname', 'N/A')}", session_id, message_id, user_id
+        )
+
+    @staticmethod
+    async def update_deal_stage(deal_id, new_stage, user_id=None):
+        """Update deal stage"""
+        payload = {'properties': {'dealstage': new_stage}}
+        response = await AsyncHubSpotService.make_request(
+            'PATCH', f'/crm/v3/objects/deals/{deal_id}', payload, user_id=user_id
+        )
+        if response.status_code == 200:
+            await run_blocking(HubSpotService._cache_written_object, 'deals', response.json(), user_id=user_id)
+            return response.json()
+        raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+
+    @staticmethod
+    async def get_deal_pipelines(user_id=None):
+        """Get deal pipelines"""
+        return await run_blocking(HubSpotService.get_deal_pipelines, user_id=user_id)
+
+    @staticmethod
+    async def get_deal_stages(pipeline_id, user_id=None):
+        """Get deal stages for a specific pipeline"""
+        return await run_blocking(HubSpotService.get_deal_stages, pipeline_id, user_id=user_id)
+
+    # ========== NOTE OPERATIONS ==========
+
+    @staticmethod
+    async def get_notes(limit=10, user_id=None, **filters):
+        """Get HubSpot notes"""
+        return await AsyncHubSpotService._list('notes', limit, user_id, **filters)
+
+    @staticmethod
+    async def get_note_by_id(note_id, user_id=None, properties=None, max_age=None):
+        """Get specific note by ID"""
+        return await AsyncHubSpotService._get_by_id('notes', note_id, properties, user_id, max_age)
+
+    @staticmethod
+    async def create_note(note_data, associations=None, session_id=None, message_id=None, user_id=None):
+        """Create note in HubSpot"""
+        payload = {'properties': note_data}
+        if associations:
+            payload['associations'] = associations
+        return await AsyncHubSpotService._write(
+            'POST', '/crm/v3/objects/notes', payload, 'note',
+            f"Note created: {note_data.get('hs_note_body', 'N/A')[:50]}...", session_id, message_id, user_id
+        )
+
+    # ========== TASK OPERATIONS ==========
+
+    @staticmethod
+    async def get_tasks(limit=10, user_id=None, **filters):
+        """Get HubSpot tasks"""
+        return await AsyncHubSpotService._list('tasks', limit, user_id, **filters)
+
+    @staticmethod
+    async def get_task_by_id(task_id, user_id=None, properties=None, max_age=None):
+        """Get specific task by ID"""
+        return await AsyncHubSpotService._get_by_id('tasks', task_id, properties, user_id, max_age)
+
+    @staticmethod
+    async def create_task(task_data, associations=None, session_id=None, message_id=None, user_id=None):
+        """Create task in HubSpot"""
+        payload = {'properties': task_data}
+        if associations:
+            payload['associations'] = associations
+        return await AsyncHubSpotService._write(
+            'POST', '/crm/v3/objects/tasks', payload, 'task',
+            f"Task created: {task_data.get('hs_task_subject', 'N/A')}", session_id, message_id, user_id
+        )
+
+    # ========== ACTIVITY OPERATIONS ==========
+
+    @staticmethod
+    async def get_calls(limit=10, user_id=None, **filters):
+        """Get HubSpot calls"""
+        return await AsyncHubSpotService._list('calls', limit, user_id, **filters)
+
+    @staticmethod
+    async def get_meetings(limit=10, user_id=None, **filters):
+        """Get HubSpot meetings"""
+        return await AsyncHubSpotService._list('meetings', limit, user_id, **filters)
+
+    @staticmethod
+    async def get_emails(limit=10, user_id=None, **filters):
+        """Get HubSpot emails"""
+        return await AsyncHubSpotService._list('emails', limit, user_id, **filters)
@@ -0,0 +1,289 @@
+"""
+In-memory typeahead over contact and company names from the local CRM mirror
+"""
+
+import json
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from sqlalchemy import select
+from app.db.database import db
+from app.models import CrmRecord, CrmSyncState
+from app.services.crm_mirror import MirrorNotReady
+
+AUTOCOMPLETE_OBJECT_TYPES = ('contacts', 'companies')
+
+# Properties a display name is built from, in order
+NAME_PROPERTIES = {
+    'contacts': ('firstname', 'lastname', 'email'),
+    'companies': ('name', 'domain'),
+}
+
+MAX_RESULTS = 25
+
+# A name is also found by its later words ("farouk" finds "Ahmed Farouk"), up to this many
+MAX_NAME_WORDS = 4
+
+# Keys examined per lookup; a one-letter prefix matches a large share of the names
+SCAN_LIMIT = 200
+
+def normalize(text):
+    """Lowercase, accent-free words separated by single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ' '.join(re.findall(r'\w+', ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()))
+
+def display_name(object_type, parts):
+    """Name shown for a record: first and last name (or email) for contacts, name (or domain) for companies"""
+    if object_type == 'contacts':
+        firstname, lastname, email = parts
+        return f'{firstname or ""} {lastname or ""}'.strip() or (email or '')
+    name, domain = parts
+    return (name or domain or '').strip()
+
+def name_keys(name):
+    """Sorted-array keys of a name: the whole name, then from each later word on"""
+    words = normalize(name).split()[:MAX_NAME_WORDS]
+    return tuple(' '.join(words[i:]) for i in range(len(words)))
+
+def _insert(keys, owners, key, owner):
+    i = bisect_left(keys, key)
+    keys.insert(i, key)
+    owners.insert(i, owner)
+
+def _delete(keys, owners, key, owner):
+    i = bisect_left(keys, key)
+    while i < len(keys) and keys[i] == key:
+        if owners[i] == owner:
+            del keys[i]
+            del owners[i]
+            return
+        i += 1
+
+def _scan(keys, owners, prefix):
+    """Owners of at most SCAN_LIMIT keys that start with ``prefix``"""
+    start = bisect_left(keys, prefix)
+    end = min(bisect_left(keys, prefix + '\uffff', start), start + SCAN_LIMIT)
+    return owners[start:end]
+
+class PortalIndex:
+    """Names of one portal as two pairs of parallel sorted arrays
+
+    ``whole_keys`` holds each whole name and ``word_keys`` the names from
+    each later word on; ``whole_owners[i]`` / ``word_owners[i]`` is the
+    ``(object_type, hubspot_id)`` whose name produced the key. A prefix
+    lookup bisects to both ends of the run of keys that start with the
+    prefix and ranks at most SCAN_LIMIT of them, from the whole names
+    first, so later-word matches never crowd out whole-name matches.
+    """
+
+    def __init__(self):
+        self.whole_keys = []
+        self.whole_owners = []
+        self.word_keys = []
+        self.word_owners = []
+        self.names = {}  # (object_type, hubspot_id) -> (display name, name property values)
+        self.synced = {}  # object_type -> mirror last_synced_at this index has caught up with
+        self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self.whole_keys) + len(self.word_keys)
+
+    def load(self, rows):
+        """Bulk-fill an empty index from ``(object_type, hubspot_id, properties)`` rows"""
+        wholes, words = [], []
+        for object_type, hubspot_id, properties in rows:
+            owner = (object_type, hubspot_id)
+            parts = tuple(properties.get(prop) for prop in NAME_PROPERTIES[object_type])
+            name = display_name(object_type, parts)
+            keys = name_keys(name)
+            self.names[owner] = (name, parts)
+            if keys:
+                wholes.append((keys[0], owner))
+                words.extend((key, owner) for key in keys[1:])
+        wholes.sort()
+        words.sort()
+        self.whole_keys = [key for key, _ in wholes]
+        self.whole_owners = [owner for _, owner in wholes]
+        self.word_keys = [key for key, _ in words]
+        self.word_owners = [owner for _, owner in words]
+
+    def put(self, object_type, hubspot_id, properties):
+        """Add or rename a record; properties missing from a partial update keep their value"""
+        owner = (object_type, str(hubspot_id))
+        previous = self.names.get(owner)
+        parts = tuple(
+            properties[prop] if prop in properties else (previous[1][i] if previous else None)
+            for i, prop in enumerate(NAME_PROPERTIES[object_type])
+        )
+        if previous is not None and previous[1] == parts:
+            return
+        self.remove(object_type, hubspot_id)
+        name = display_name(object_type, parts)
+        keys = name_keys(name)
+        self.names[owner] = (name, parts)
+        if keys:
+            _insert(self.whole_keys, self.whole_owners, keys[0], owner)
+        for key in keys[1:]:
+            _insert(self.word_keys, self.word_owners, key, owner)
+
+    def remove(self, object_type, hubspot_id):
+        owner = (object_type, str(hubspot_id))
+        previous = self.names.pop(owner, None)
+        if previous is None:
+            return
+        keys = name_keys(previous[0])
+        if keys:
+            _delete(self.whole_keys, self.whole_owners, keys[0], owner)
+        for key in keys[1:]:
+            _delete(self.word_keys, self.word_owners, key, owner)
+
+    def lookup(self, prefix, limit, object_types):
+        """Top ``limit`` records whose name (or a later word of it) starts with ``prefix``
+
+        Names that start with the prefix come first, then shorter names.
+        """
+        names = self.names
+        whole = {owner for owner in _scan(self.whole_keys, self.whole_owners, prefix) if owner[0] in object_types}
+        ranked = sorted(whole, key=lambda owner: (len(names[owner][0]), names[owner][0]))
+        if len(ranked) < limit:
+            words = {owner for owner in _scan(self.word_keys, self.word_owners, prefix)
+                     if owner[0] in object_types and owner not in whole}
+            ranked += sorted(words, key=lambda owner: (len(names[owner][0]), names[owner][0]))
+        return [{'id': hubspot_id, 'object_type': object_type, 'name': names[(object_type, hubspot_id)][0]}
+                for object_type, hubspot_id in ranked[:limit]]
+
+class Autocomplete:
+    """Per-portal name indexes, built from the CRM mirror on first use
+
+    Records this process creates, updates or deletes through HubSpotService
+    are applied at once. Changes written by a mirror sync (this process or
+    scripts/sync_crm_mirror.py) are caught up every
+    AUTOCOMPLETE_REFRESH_INTERVAL seconds: when a sync finished since the
+    last check, the records it wrote (``synced_at`` after the previous sync)
+    are re-read, archived ones removed.
+    """
+
+    def __init__(self, app=None):
+        self.refresh_interval = 30.0
+        self._portals = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.catch_ups = 0
+        self.lookups = 0
+        self.writes = 0
+        self.last_build_ms = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the refresh interval from the application config"""
+        app.config.setdefault('AUTOCOMPLETE_REFRESH_INTERVAL', 30.0)
+        self.refresh_interval = app.config['AUTOCOMPLETE_REFRESH_INTERVAL']
+        app.extensions['autocomplete'] = self
+
+    @staticmethod
+    def _sync_times(portal):
+        states = CrmSyncState.query.filter(
+            CrmSyncState.portal_key == portal, CrmSyncState.object_type.in_(AUTOCOMPLETE_OBJECT_TYPES)
+        ).all()
+        return {state.object_type: state.last_synced_at for state in states if state.last_synced_at}
+
+    @staticmethod
+    def _rows(portal, object_type, since=None):
+        query = select(CrmRecord.hubspot_id, CrmRecord.properties, CrmRecord.archived).where(
+            CrmRecord.portal_key == portal, CrmRecord.object_type == object_type
+        )
+        query = query.where(CrmRecord.synced_at > since) if since else query.where(CrmRecord.archived == False)
+        return db.session.execute(query)
+
+    def _build(self, portal):
+        started = time.perf_counter()
+        synced = self._sync_times(portal)
+        if not synced:
+            raise MirrorNotReady("The CRM mirror has not synced contacts or companies yet")
+
+        index = PortalIndex()
+        index.load(
+            (object_type, hubspot_id, json.loads(properties))
+            for object_type in AUTOCOMPLETE_OBJECT_TYPES
+            for hubspot_id, properties, _ in self._rows(portal, object_type)
+        )
+        index.synced = synced
+        index.refreshed_at = time.monotonic()
+        self.builds += 1
+        self.last_build_ms = (time.perf_counter() - started) * 1000
+        return index
+
+    def _catch_up(self, index, portal):
+        synced = self._sync_times(portal)
+        for object_type, last_synced_at in synced.items():
+            since = index.synced.get(object_type)
+            if last_synced_at == since:
+                continue
+            for hubspot_id, properties, archived in self._rows(portal, object_type, since):
+                if archived:
+                    index.remove(object_type, hubspot_id)
+                else:
+                    index.put(object_type, hubspot_id, json.loads(properties))
+        index.synced = synced
+        index.refreshed_at = time.monotonic()
+        self.catch_ups += 1
+
+    def lookup(self, portal, prefix, limit=10, object_types=AUTOCOMPLETE_OBJECT_TYPES):
+        """Best name matches for a typed prefix (needs an app context on first use and to catch up)
+
+        Raises MirrorNotReady if the mirror never synced contacts or companies.
+        """
+        prefix = normalize(prefix)
+        with self._lock:
+            index = self._portals.get(portal)
+            if index is None:
+                index = self._portals[portal] = self._build(portal)
+            elif time.monotonic() - index.refreshed_at >= self.refresh_interval:
+                self._catch_up(index, portal)
+            self.lookups += 1
+            if not prefix:
+                return []
+            return index.lookup(prefix, min(limit, MAX_RESULTS), object_types)
+
+    def record_written(self, portal, object_type, record):
+        """Apply a record HubSpot returned from a create/update (if this portal is indexed)"""
+        index = self._portals.get(portal)
+        if index is None or object_type not in AUTOCOMPLETE_OBJECT_TYPES or not record.get('id'):
+            return
+        with self._lock:
+            index.put(object_type, record['id'], record.get('properties') or {})
+            self.writes += 1
+
+    def forget(self, portal, object_type, object_id):
+        """Drop a deleted record (if this portal is indexed)"""
+        index = self._portals.get(portal)
+        if index is None or object_type not in AUTOCOMPLETE_OBJECT_TYPES:
+            return
+        with self._lock:
+            index.remove(object_type, object_id)
+            self.writes += 1
+
+    def clear(self):
+        with self._lock:
+            self._portals.clear()
+
+    def get_metrics(self):
+        """Index sizes and counters for this process"""
+        with self._lock:
+            portals = list(self._portals.values())
+        return {
+            'portals': len(portals),
+            'names': sum(len(index.names) for index in portals),
+            'keys': sum(len(index) for index in portals),
+            'builds': self.builds,
+            'catch_ups': self.catch_ups,
+            'lookups': self.lookups,
+            'writes': self.writes,
+            'last_build_ms': round(self.last_build_ms, 3)
+        }
+
+# Shared by every request in this process
+autocomplete = Autocomplete()
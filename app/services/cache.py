@@ -0,0 +1,161 @@
+"""
+In-process caching primitives
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL
+
+    Each process has its own copy. ``apply_invalidations`` replays the
+    invalidations other processes recorded (see MetadataCache).
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.remote_invalidations = 0
+        self._invalidation_id = 0  # Newest recorded invalidation applied here
+        self._invalidations_checked_at = None
+
+    def get(self, key, default=None):
+        """Return a live value (refreshing its LRU position) or ``default``"""
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING or entry[1] <= time.monotonic():
+                if entry is not self._MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """Store a value for ``ttl`` seconds (defaults to the cache TTL)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop one key"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drop every entry for which ``predicate(key, value)`` is true"""
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(key, value)]:
+                del self._data[key]
+
+    def apply_invalidations(self, load_since, interval):
+        """Drop keys invalidated after the last invalidation seen, checking at most every ``interval`` seconds
+
+        ``load_since(last_id)`` returns ``(id, key)`` rows with a larger id, oldest first.
+        """
+        now = time.monotonic()
+        with self._lock:
+            checked_at = self._invalidations_checked_at
+            if checked_at is not None and now - checked_at < interval:
+                return
+            self._invalidations_checked_at = now
+            since = self._invalidation_id
+
+        for invalidation_id, key in load_since(since):
+            with self._lock:
+                self._data.pop(key, None)
+                self._invalidation_id = max(self._invalidation_id, invalidation_id)
+                self.remote_invalidations += 1
+
+    def clear(self):
+        """Drop everything"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_metrics(self):
+        """Hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'remote_invalidations': self.remote_invalidations
+            }
+
+class RecentIdFilter:
+    """Thread-safe bounded LRU set of recently seen ids
+
+    Answers "definitely seen recently" without a database round trip; a
+    miss means "unknown", so callers still need a durable check behind it.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.late_duplicates = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._ids:
+                self._ids.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key):
+        """Remember an id"""
+        with self._lock:
+            self._ids[key] = None
+            self._ids.move_to_end(key)
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+    def mark_duplicate(self, key):
+        """Remember an id whose duplicate was only caught by the durable check"""
+        self.add(key)
+        with self._lock:
+            self.late_duplicates += 1
+
+    def clear(self):
+        """Forget everything"""
+        with self._lock:
+            self._ids.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def get_metrics(self):
+        """Filter counters"""
+        with self._lock:
+            return {
+                'size': len(self._ids),
+                'maxsize': self.maxsize,
+                'filtered': self.hits,
+                'passed': self.misses,
+                'caught_by_database': self.late_duplicates
+            }
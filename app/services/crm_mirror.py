@@ -0,0 +1,409 @@
+"""
+Opt-in local mirror of HubSpot CRM records, kept current by lastmodifieddate
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert
+from app.db.database import db
+from app.db.search import search_ids
+from app.models import User, CrmRecord, CrmSyncState
+from app.services.object_cache import ObjectCache, ALWAYS_RETURNED
+
+logger = logging.getLogger(__name__)
+
+MIRRORED_OBJECT_TYPES = ('contacts', 'companies', 'deals', 'notes', 'tasks')
+
+# Properties kept locally (HubSpot also returns hs_object_id, createdate and the modification date)
+MIRROR_PROPERTIES = {
+    'contacts': ['firstname', 'lastname', 'email', 'phone', 'company', 'lifecyclestage',
+                 'lead_status', 'lead_source', 'hubspot_owner_id', 'lastmodifieddate'],
+    'companies': ['name', 'domain', 'phone', 'city', 'industry', 'hubspot_owner_id', 'hs_lastmodifieddate'],
+    'deals': ['dealname', 'amount', 'dealstage', 'pipeline', 'closedate', 'hubspot_owner_id', 'hs_lastmodifieddate'],
+    'notes': ['hs_note_body', 'hs_timestamp', 'hubspot_owner_id', 'hs_lastmodifieddate'],
+    'tasks': ['hs_task_subject', 'hs_task_body', 'hs_task_status', 'hs_task_priority', 'hs_timestamp',
+              'hubspot_owner_id', 'hs_lastmodifieddate'],
+}
+
+# Search lags behind writes; each incremental pull re-reads this much before the high-water mark
+SEARCH_LAG = timedelta(minutes=5)
+
+UPSERT_CHUNK = 500
+
+class MirrorNotReady(Exception):
+    """The mirror has not synced the requested object type yet"""
+
+def modified_property(object_type):
+    """The searchable last-modified property of an object type"""
+    return 'lastmodifieddate' if object_type == 'contacts' else 'hs_lastmodifieddate'
+
+def parse_hubspot_time(value):
+    """HubSpot timestamp (ISO 8601 or epoch milliseconds) as a naive UTC datetime"""
+    if not value:
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc).replace(tzinfo=None)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def epoch_ms(moment):
+    """Naive UTC datetime as the epoch-milliseconds string the search API compares dates with"""
+    return str(int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000))
+
+class CrmMirror:
+    """Copies contacts, companies, deals, notes and tasks into crm_records
+
+    The first sync of a portal and object type is a full cursor sweep;
+    records the sweep did not see are marked archived. Later syncs search
+    for records modified since the high-water mark (minus SEARCH_LAG) and
+    upsert them. Deletions are picked up by listing archived records every
+    CRM_MIRROR_DELETE_SWEEP_INTERVAL seconds. Creates, updates and deletes
+    made through this app are applied at once (``record_written``,
+    ``forget``), so reads see them. Reads are only answered from
+    the mirror when its last successful sync is younger than the caller's
+    max_age; otherwise they fall through to HubSpot.
+    """
+
+    def __init__(self, app=None):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._pid = os.getpid()
+        self.runs = 0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.upserted = 0
+        self.archived = 0
+        self.errors = 0
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.local_writes = 0
+        self.last_run_ms = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read settings and start the sync thread lazily on the first request (if enabled)"""
+        app.config.setdefault('CRM_MIRROR_ENABLED', False)
+        app.config.setdefault('CRM_MIRROR_INTERVAL', 300.0)
+        app.config.setdefault('CRM_MIRROR_MAX_AGE', 0)
+        app.config.setdefault('CRM_MIRROR_DELETE_SWEEP_INTERVAL', 3600.0)
+        app.extensions['crm_mirror'] = self
+        if app.config['CRM_MIRROR_ENABLED']:
+            app.before_request(lambda: self.start(app))
+
+    def start(self, app):
+        """Start the sync thread for this process (no-op if it is running)"""
+        if self._thread is not None and self._thread.is_alive() and os.getpid() == self._pid:
+            return
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Threads do not survive fork; the child starts its own
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, args=(app,), name='crm-mirror', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the sync thread"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self, app):
+        while not self._stopping:
+            with app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"CRM mirror error: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            self._wakeup.wait(app.config['CRM_MIRROR_INTERVAL'])
+            self._wakeup.clear()
+
+    @staticmethod
+    def targets():
+        """One user id per HubSpot portal: the env token (None) and every active user's PAT"""
+        from app.services.hubspot_service import HubSpotService
+
+        candidates = [None] if current_app.config.get('HUBSPOT_ACCESS_TOKEN') else []
+        users = User.query.filter(User.is_active == True, User.hubspot_pat_token.isnot(None)).all()
+        candidates += [user.id for user in users]
+
+        portals = {}
+        for user_id in candidates:
+            portals.setdefault(HubSpotService.get_portal_key(user_id), user_id)
+        return portals
+
+    def run_once(self):
+        """Sync every portal once (needs an app context); returns {portal: results}"""
+        started = time.perf_counter()
+        results = {portal: self.sync(user_id) for portal, user_id in self.targets().items()}
+        self.runs += 1
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        return results
+
+    def sync(self, user_id=None, object_types=None, full=False):
+        """Bring the mirror of one portal up to date; returns {object_type: result}"""
+        from app.services.hubspot_service import HubSpotService
+
+        portal = HubSpotService.get_portal_key(user_id)
+        results = {}
+        for object_type in object_types or MIRRORED_OBJECT_TYPES:
+            state = CrmSyncState.query.filter_by(portal_key=portal, object_type=object_type).first()
+            if state is None:
+                state = CrmSyncState(portal_key=portal, object_type=object_type)
+                db.session.add(state)
+                db.session.commit()
+            try:
+                results[object_type] = self._sync_type(portal, object_type, user_id, state, full)
+            except Exception as e:
+                db.session.rollback()
+                self.errors += 1
+                state.last_error = str(e)
+                db.session.commit()
+                logger.warning(f"CRM mirror sync of {object_type} failed: {e}")
+                results[object_type] = {'error': str(e)}
+        return results
+
+    def _sync_type(self, portal, object_type, user_id, state, full):
+        from app.services.hubspot_service import HubSpotService
+
+        started = datetime.utcnow()
+        properties = MIRROR_PROPERTIES[object_type]
+        if full or state.last_full_sync_at is None or state.high_water_mark is None:
+            mode = 'full'
+            records = HubSpotService.iter_objects(object_type, properties=properties, user_id=user_id)
+        else:
+            mode = 'incremental'
+            since = {'propertyName': modified_property(object_type), 'operator': 'GTE',
+                     'value': epoch_ms(state.high_water_mark - SEARCH_LAG)}
+            records = HubSpotService.iter_search_all(
+                object_type, filter_groups=[{'filters': [since]}], properties=properties, user_id=user_id
+            )
+
+        upserted, newest = self._apply(portal, object_type, records, started)
+        archived = 0
+        if mode == 'full':
+            # Anything the sweep did not touch is gone from HubSpot
+            archived = db.session.execute(
+                update(CrmRecord)
+                .where(CrmRecord.portal_key == portal, CrmRecord.object_type == object_type,
+                       CrmRecord.archived == False, CrmRecord.synced_at < started)
+                .values(archived=True, synced_at=started)
+            ).rowcount
+            state.last_full_sync_at = started
+            state.last_delete_sweep_at = started
+            # Records changed while the sweep ran are newer than its start
+            state.high_water_mark = started
+            self.full_syncs += 1
+        else:
+            sweep_interval = current_app.config.get('CRM_MIRROR_DELETE_SWEEP_INTERVAL', 3600.0)
+            if state.last_delete_sweep_at is None or state.last_delete_sweep_at <= started - timedelta(seconds=sweep_interval):
+                archived = self._sweep_deletes(portal, object_type, user_id, started)
+                state.last_delete_sweep_at = started
+            if newest is not None:
+                state.high_water_mark = max(state.high_water_mark, min(newest, started))
+            self.incremental_syncs += 1
+
+        state.last_synced_at = started
+        state.last_error = None
+        db.session.commit()
+        self.upserted += upserted
+        self.archived += archived
+        return {'mode': mode, 'upserted': upserted, 'archived': archived}
+
+    @staticmethod
+    def _apply(portal, object_type, records, seen_at):
+        """Upsert records in chunks; returns (count, newest modification time)"""
+        count = 0
+        newest = None
+        chunk = []
+
+        def flush():
+            statement = insert(CrmRecord).values(chunk)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=['portal_key', 'object_type', 'hubspot_id'],
+                set_={name: statement.excluded[name] for name in
+                      ('properties', 'hubspot_created_at', 'hubspot_updated_at', 'archived', 'synced_at')}
+            ))
+            db.session.commit()
+            chunk.clear()
+
+        for record in records:
+            properties = record.get('properties') or {}
+            updated_at = parse_hubspot_time(record.get('updatedAt') or properties.get(modified_property(object_type)))
+            chunk.append({
+                'portal_key': portal,
+                'object_type': object_type,
+                'hubspot_id': str(record['id']),
+                'properties': json.dumps(properties),
+                'hubspot_created_at': parse_hubspot_time(record.get('createdAt') or properties.get('createdate')),
+                'hubspot_updated_at': updated_at,
+                'archived': False,
+                'synced_at': seen_at
+            })
+            if updated_at is not None and (newest is None or updated_at > newest):
+                newest = updated_at
+            count += 1
+            if len(chunk) >= UPSERT_CHUNK:
+                flush()
+        if chunk:
+            flush()
+        return count, newest
+
+    @staticmethod
+    def _sweep_deletes(portal, object_type, user_id, seen_at):
+        """Mark every record HubSpot lists as archived; returns the rows changed"""
+        from app.services.hubspot_service import HubSpotService
+
+        archived = 0
+        for page in HubSpotService.iter_pages(object_type, properties=['hs_object_id'], user_id=user_id, archived='true'):
+            archived += db.session.execute(
+                update(CrmRecord)
+                .where(CrmRecord.portal_key == portal, CrmRecord.object_type == object_type,
+                       CrmRecord.archived == False, CrmRecord.hubspot_id.in_([str(r['id']) for r in page]))
+                .values(archived=True, synced_at=seen_at)
+            ).rowcount
+        return archived
+
+    def get(self, portal, object_type, object_id, properties=None, max_age=0):
+        """Return ``('hit', record)``, ``('not_found', message)`` or ``('miss', None)``
+
+        Only answers when the mirror of this object type synced within
+        ``max_age`` seconds and holds every requested property.
+        """
+        if not max_age or object_type not in MIRRORED_OBJECT_TYPES:
+            return 'miss', None
+
+        state = CrmSyncState.query.filter_by(portal_key=portal, object_type=object_type).first()
+        if state is None or state.last_synced_at is None or \
+                state.last_synced_at < datetime.utcnow() - timedelta(seconds=max_age):
+            self.stale += 1
+            return 'miss', None
+
+        row = CrmRecord.query.filter_by(portal_key=portal, object_type=object_type, hubspot_id=str(object_id)).first()
+        if row is None:
+            self.misses += 1
+            return 'miss', None
+        if row.archived:
+            self.hits += 1
+            return 'not_found', f'{object_id} was deleted'
+
+        record = row.to_record()
+        wanted = ObjectCache.property_key(properties)
+        if wanted is not None:
+            props = record['properties']
+            if not all(prop in props for prop in wanted):
+                self.misses += 1
+                return 'miss', None
+            record['properties'] = {k: v for k, v in props.items() if k in wanted or k in ALWAYS_RETURNED}
+        self.hits += 1
+        return 'hit', record
+
+    def record_written(self, portal, object_type, record, created=False):
+        """Apply a record HubSpot returned from a create/update, so mirror reads see the write
+
+        Updates only echo the changed properties, which are merged into the
+        stored row; a new record is added if this object type is mirrored.
+        """
+        if object_type not in MIRRORED_OBJECT_TYPES or not record.get('id'):
+            return
+        properties = record.get('properties') or {}
+        try:
+            row = CrmRecord.query.filter_by(portal_key=portal, object_type=object_type,
+                                            hubspot_id=str(record['id'])).first()
+            if row is None:
+                if not created or CrmSyncState.query.filter_by(portal_key=portal, object_type=object_type).first() is None:
+                    return  # The next sync brings it in with every mirrored property
+                row = CrmRecord(portal_key=portal, object_type=object_type, hubspot_id=str(record['id']),
+                                hubspot_created_at=parse_hubspot_time(record.get('createdAt')))
+                db.session.add(row)
+            else:
+                properties = {**json.loads(row.properties or '{}'), **properties}
+            row.properties = json.dumps(properties)
+            row.hubspot_updated_at = parse_hubspot_time(
+                record.get('updatedAt') or properties.get(modified_property(object_type))
+            ) or row.hubspot_updated_at
+            row.archived = False
+            row.synced_at = datetime.utcnow()
+            db.session.commit()
+            self.local_writes += 1
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Could not apply a write to the mirrored {object_type} {record['id']}: {e}")
+
+    def forget(self, portal, object_type, object_id):
+        """Mark a record deleted through this app as archived"""
+        if object_type not in MIRRORED_OBJECT_TYPES:
+            return
+        try:
+            changed = db.session.execute(
+                update(CrmRecord)
+                .where(CrmRecord.portal_key == portal, CrmRecord.object_type == object_type,
+                       CrmRecord.hubspot_id == str(object_id), CrmRecord.archived == False)
+                .values(archived=True, synced_at=datetime.utcnow())
+            ).rowcount
+            db.session.commit()
+            self.local_writes += changed
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Could not archive the mirrored {object_type} {object_id}: {e}")
+
+    def search(self, portal, object_type, term, limit=10):
+        """Full-text search of the mirrored records (BM25-ranked, prefix matching)
+
+        Returns HubSpot's search response shape plus each record's score,
+        when the mirror last synced and whether a broad term was ranked
+        among its newest matches only (see app.db.search).
+        """
+        state = CrmSyncState.query.filter_by(portal_key=portal, object_type=object_type).first()
+        if state is None or state.last_synced_at is None:
+            raise MirrorNotReady(f"The CRM mirror has not synced {object_type} yet")
+
+        ranked, truncated = search_ids(db.session.connection(), portal, object_type, term, limit=limit)
+        rows = {row.id: row for row in CrmRecord.query.filter(CrmRecord.id.in_([row_id for row_id, _ in ranked]))}
+        results = [{**rows[row_id].to_record(), 'score': round(score, 4)} for row_id, score in ranked if row_id in rows]
+        return {
+            'results': results,
+            'source': 'local',
+            'synced_at': state.last_synced_at.isoformat(),
+            'truncated': truncated
+        }
+
+    def get_metrics(self):
+        """Sync counters and read outcomes (this process) and sync state (database)"""
+        metrics = {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'runs': self.runs,
+            'full_syncs': self.full_syncs,
+            'incremental_syncs': self.incremental_syncs,
+            'upserted': self.upserted,
+            'archived': self.archived,
+            'errors': self.errors,
+            'reads': {'hits': self.hits, 'stale': self.stale, 'misses': self.misses},
+            'local_writes': self.local_writes,
+            'last_run_ms': round(self.last_run_ms, 3)
+        }
+        try:
+            metrics['state'] = [state.to_dict() for state in CrmSyncState.query.order_by(CrmSyncState.id).all()]
+        except Exception as e:
+            metrics['state'] = {'error': str(e)}
+        return metrics
+
+# Shared by every request in this process
+crm_mirror = CrmMirror()
@@ -0,0 +1,129 @@
+"""
+Pooled keep-alive HTTP sessions for HubSpot API calls
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.security import SecurityService
+
+class HubSpotSessionPool:
+    """Per-process, per-token pool of persistent HTTP sessions
+
+    Each token keeps one keep-alive session so HubSpot calls reuse TCP/TLS
+    connections. Sessions are reset after a fork and evicted LRU-first.
+    """
+
+    def __init__(self, max_sessions=100):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._pid = os.getpid()
+        self._requests_total = 0
+        self._errors_total = 0
+        self._sessions_created = 0
+        self._sessions_evicted = 0
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+    def _new_session(self, pool_size):
+        """Create a session whose pools hold ``pool_size`` keep-alive connections"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # Sessions are shared between threads, so never carry cookies across calls
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get_session(self, token, pool_size=10):
+        """Get (or create) the pooled session for a token"""
+        key = SecurityService.token_fingerprint(token or '')
+
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked worker: sockets belong to the parent, start fresh
+                self._sessions = OrderedDict()
+                self._pid = os.getpid()
+
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                return session
+
+            session = self._new_session(pool_size)
+            self._sessions[key] = session
+            self._sessions_created += 1
+
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                evicted.close()
+                self._sessions_evicted += 1
+
+            return session
+
+    def request(self, method, url, token=None, pool_size=10, timeout=None, **kwargs):
+        """Send a request through the token's pooled session"""
+        session = self.get_session(token, pool_size=pool_size)
+
+        with self._lock:
+            self._requests_total += 1
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+        try:
+            return session.request(method=method, url=url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._errors_total += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def close(self):
+        """Close every pooled session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = OrderedDict()
+
+    def get_metrics(self):
+        """Pool usage counters"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            metrics = {
+                'sessions': len(sessions),
+                'max_sessions': self.max_sessions,
+                'sessions_created': self._sessions_created,
+                'sessions_evicted': self._sessions_evicted,
+                'requests_total': self._requests_total,
+                'errors_total': self._errors_total,
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight
+            }
+
+        connections_opened = 0
+        for session in sessions:
+            # The same adapter is mounted for http and https, so count it once
+            adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+            for adapter in adapters.values():
+                for pool_key in list(adapter.poolmanager.pools.keys()):
+                    pool = adapter.poolmanager.pools.get(pool_key)
+                    if pool is not None:
+                        connections_opened += pool.num_connections
+
+        metrics['connections_opened'] = connections_opened
+        metrics['connection_reuse_ratio'] = (
+            round(1 - metrics['connections_opened'] / metrics['requests_total'], 4)
+            if metrics['requests_total'] else 0
+        )
+        return metrics
+
+# Process-wide pool used by HubSpotService
+http_pool = HubSpotSessionPool()
@@ -2,14 +2,39 @@
 HubSpot API integration service
 """
 
-import requests
+import json
+import threading
 import time
-from datetime import datetime
-from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import requests
+from urllib3.exceptions import NewConnectionError
+from flask import current_app, g, has_app_context
 from app.core.security import SecurityService
-from app.models import User, Log, ChatSession, ChatMessage
+from app.services.http_pool import http_pool
+from app.services.rate_limiter import HubSpotRateLimitError, get_rate_limiter, backoff_delay
+from app.services.log_sink import log_sink
+from app.services.cache import TTLCache
+from app.services.metadata_cache import metadata_cache
+from app.services.object_cache import object_cache, CACHED_OBJECT_TYPES
+from app.services.crm_mirror import crm_mirror
+from app.services.autocomplete import autocomplete
+from app.models import User, Log, ChatSession, ChatMessage, MetadataInvalidation, TokenInvalidation
 from app.db.database import db
 
+# user_id -> HubSpot PAT, shared by every request in this process
+hubspot_token_cache = TTLCache(maxsize=1024, ttl=300)
+
+# user_id -> computed lead analytics (see get_lead_analytics)
+lead_analytics_cache = TTLCache(maxsize=1024, ttl=60)
+
+# HubSpot's search API stops paging after this many results per query
+SEARCH_RESULT_LIMIT = 10000
+
+# Lifecycle stages from first lead to customer, in funnel order
+LEAD_FUNNEL = ('lead', 'marketingqualifiedlead', 'salesqualifiedlead', 'opportunity', 'customer', 'evangelist')
+
 class HubSpotService:
     """Service for HubSpot API interactions"""
 
@@ -17,12 +42,29 @@ class HubSpotService:
     def get_hubspot_token(user_id=None):
         """Get HubSpot PAT from user or environment"""
         if user_id:
-            # Get token from user's database record
-            user = User.query.get(user_id)
-            if user and user.hubspot_pat_token:
-                return user.hubspot_pat_token
-            else:
-                raise ValueError(f'User {user_id} does not have a HubSpot token configured')
+            key = str(user_id)
+
+            # At most one lookup per HTTP request, even if the shared entry expires mid-request
+            memo = g.setdefault('hubspot_tokens', {}) if has_app_context() else {}
+            if key in memo:
+                return memo[key]
+
+            hubspot_token_cache.apply_invalidations(
+                HubSpotService._load_token_invalidations,
+                current_app.config.get('HUBSPOT_TOKEN_INVALIDATION_POLL', 5)
+            )
+            token = hubspot_token_cache.get(key)
+            if token is None:
+                # Get token from user's database record
+                user = User.query.get(user_id)
+                if user and user.hubspot_pat_token:
+                    token = user.hubspot_pat_token
+                    hubspot_token_cache.set(key, token, ttl=current_app.config.get('HUBSPOT_TOKEN_CACHE_TTL', 300))
+                else:
+                    raise ValueError(f'User {user_id} does not have a HubSpot token configured')
+
+            memo[key] = token
+            return token
         else:
             # Fallback to environment variable for backward compatibility
             token = current_app.config.get('HUBSPOT_ACCESS_TOKEN')
@@ -30,35 +72,456 @@ class HubSpotService:
                 raise ValueError('HUBSPOT_ACCESS_TOKEN not configured in environment')
             return token
 
+    @staticmethod
+    def invalidate_hubspot_token(user_id):
+        """Forget a user's cached token in every process (call after it changes)
+
+        This process forgets it at once; the others apply the recorded
+        invalidation on their next check, see get_hubspot_token.
+        """
+        hubspot_token_cache.invalidate(str(user_id))
+        if not has_app_context():
+            return
+        g.get('hubspot_tokens', {}).pop(str(user_id), None)
+        # Older rows can only match entries that have expired anyway
+        horizon = timedelta(seconds=current_app.config.get('HUBSPOT_TOKEN_CACHE_TTL', 300))
+        try:
+            TokenInvalidation.query.filter(
+                TokenInvalidation.created_at < datetime.utcnow() - horizon
+            ).delete(synchronize_session=False)
+            db.session.add(TokenInvalidation(user_id=int(user_id)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def _load_token_invalidations(since_id):
+        """(id, cache key) of the token invalidations recorded after ``since_id``"""
+        try:
+            rows = db.session.query(TokenInvalidation.id, TokenInvalidation.user_id).filter(
+                TokenInvalidation.id > since_id
+            ).order_by(TokenInvalidation.id).all()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Could not check for token invalidations: {e}")
+            return []
+        return [(invalidation_id, str(user_id)) for invalidation_id, user_id in rows]
+
     @staticmethod
     def get_base_url():
         """Get HubSpot base URL"""
         return current_app.config.get('HUBSPOT_API_URL', 'https://api.hubapi.com')
 
     @staticmethod
-    def get_headers(user_id=None):
+    def get_headers(user_id=None, token=None):
         """Get standard HubSpot API headers"""
-        token = HubSpotService.get_hubspot_token(user_id)
+        if token is None:
+            token = HubSpotService.get_hubspot_token(user_id)
         return {
             'Authorization': f'Bearer {token}',
             'Content-Type': 'application/json'
         }
 
+    @staticmethod
+    def get_rate_limiter():
+        """Get the shared token-bucket limiter, or None when disabled"""
+        config = current_app.config
+        if not config.get('HUBSPOT_RATE_LIMIT_ENABLED', True):
+            return None
+        return get_rate_limiter(
+            config.get('HUBSPOT_RATE_LIMIT_DB', 'data/hubspot_rate_limits.db'),
+            capacity=config.get('HUBSPOT_RATE_LIMIT_MAX', 100),
+            interval_seconds=config.get('HUBSPOT_RATE_LIMIT_INTERVAL', 10),
+            max_wait=config.get('HUBSPOT_RATE_LIMIT_MAX_WAIT', 60)
+        )
+
     @staticmethod
     def make_request(method, endpoint, data=None, params=None, user_id=None):
-        """Make authenticated request to HubSpot API"""
+        """Make authenticated request to HubSpot API
+
+        Requests wait for a slot in the token's shared bucket, and 429
+        responses are retried with jittered exponential backoff that honors
+        Retry-After. Raises HubSpotRateLimitError when retries run out.
+        """
+        config = current_app.config
         url = f"{HubSpotService.get_base_url()}{endpoint}"
-        headers = HubSpotService.get_headers(user_id)
-
-        response = requests.request(
-            method=method,
-            url=url,
-            headers=headers,
-            json=data,
-            params=params
+        token = HubSpotService.get_hubspot_token(user_id)
+        headers = HubSpotService.get_headers(token=token)
+        limiter = HubSpotService.get_rate_limiter()
+        max_retries = config.get('HUBSPOT_MAX_RETRIES', 5)
+
+        for attempt in range(max_retries + 1):
+            if limiter:
+                limiter.acquire(token)
+
+            response = http_pool.request(
+                method=method,
+                url=url,
+                token=token,
+                pool_size=config.get('HUBSPOT_POOL_SIZE', 10),
+                timeout=(
+                    config.get('HUBSPOT_CONNECT_TIMEOUT', 5),
+                    config.get('HUBSPOT_READ_TIMEOUT', 30)
+                ),
+                headers=headers,
+                json=data,
+                params=params
+            )
+
+            if limiter:
+                limiter.observe(token, response.headers)
+            if response.status_code != 429:
+                return response
+
+            delay = backoff_delay(
+                attempt,
+                retry_after=response.headers.get('Retry-After'),
+                base=config.get('HUBSPOT_BACKOFF_BASE', 0.5),
+                cap=config.get('HUBSPOT_BACKOFF_MAX', 30)
+            )
+            if attempt == max_retries:
+                break
+            if limiter:
+                limiter.penalize(token, delay)  # next acquire() waits it out, fleet-wide
+            else:
+                time.sleep(delay)
+
+        raise HubSpotRateLimitError(f"HubSpot rate limit exceeded: {response.text}", retry_after=delay)
+
+    # ========== METADATA (cached) ==========
+
+    @staticmethod
+    def get_portal_key(user_id=None):
+        """Cache scope for a user's HubSpot portal (fingerprint of their token)"""
+        return SecurityService.token_fingerprint(HubSpotService.get_hubspot_token(user_id))
+
+    @staticmethod
+    def get_metadata(name, endpoint, params=None, user_id=None):
+        """GET schema metadata through the portal-scoped metadata cache"""
+        def load():
+            response = HubSpotService.make_request('GET', endpoint, params=params, user_id=user_id)
+            if response.status_code == 200:
+                return response.json()
+            else:
+                raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+
+        config = current_app.config
+        metadata_cache.apply_invalidations(
+            HubSpotService._load_metadata_invalidations,
+            config.get('HUBSPOT_METADATA_INVALIDATION_POLL', 5)
+        )
+        return metadata_cache.get_or_load(
+            HubSpotService.get_portal_key(user_id), name, load,
+            ttl=config.get('HUBSPOT_METADATA_CACHE_TTL', 3600),
+            stale_ttl=config.get('HUBSPOT_METADATA_STALE_TTL', 86400)
         )
 
-        return response
+    @staticmethod
+    def invalidate_metadata(user_id=None, name=None, all_portals=False):
+        """Drop cached metadata for the user's portal (or every portal) in every process
+
+        This process drops its entries at once (the returned count); the others
+        apply the recorded invalidation on their next check, see get_metadata.
+        """
+        portal = None if all_portals else HubSpotService.get_portal_key(user_id)
+        config = current_app.config
+        # Older rows can only match entries that have expired anyway
+        horizon = timedelta(seconds=config.get('HUBSPOT_METADATA_CACHE_TTL', 3600)
+                            + config.get('HUBSPOT_METADATA_STALE_TTL', 86400))
+        try:
+            MetadataInvalidation.query.filter(
+                MetadataInvalidation.created_at < datetime.utcnow() - horizon
+            ).delete(synchronize_session=False)
+            db.session.add(MetadataInvalidation(portal_key=portal, name=name))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return metadata_cache.invalidate(portal=portal, name=name)
+
+    @staticmethod
+    def _load_metadata_invalidations(since_id):
+        """(id, portal, name) of the invalidations recorded after ``since_id``"""
+        if not has_app_context():
+            return []
+        try:
+            return db.session.query(
+                MetadataInvalidation.id, MetadataInvalidation.portal_key, MetadataInvalidation.name
+            ).filter(MetadataInvalidation.id > since_id).order_by(MetadataInvalidation.id).all()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Could not check for metadata invalidations: {e}")
+            return []
+
+    @staticmethod
+    def warm_metadata(user_id=None):
+        """Pre-load the metadata the write paths look up"""
+        HubSpotService.get_contact_properties(user_id=user_id)
+        HubSpotService.get_company_properties(user_id=user_id)
+        HubSpotService.get_deal_pipelines(user_id=user_id)
+        HubSpotService.get_owners(user_id=user_id)
+
+    @staticmethod
+    def warm_metadata_in_background(app):
+        """Warm the cache for the env token and every active user's portal without blocking startup"""
+        def warm():
+            with app.app_context():
+                targets = [None] if app.config.get('HUBSPOT_ACCESS_TOKEN') else []
+                try:
+                    users = User.query.filter(User.is_active == True, User.hubspot_pat_token.isnot(None)).all()
+                    targets += [user.id for user in users]
+                except Exception as e:
+                    current_app.logger.warning(f"Metadata warm-up could not list users: {e}")
+
+                portals = set()
+                for user_id in targets:
+                    try:
+                        portal = HubSpotService.get_portal_key(user_id)
+                        if portal not in portals:
+                            portals.add(portal)
+                            HubSpotService.warm_metadata(user_id=user_id)
+                    except Exception as e:
+                        current_app.logger.warning(f"Metadata warm-up failed for user {user_id}: {e}")
+
+        thread = threading.Thread(target=warm, name='hubspot-metadata-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    # ========== OBJECT CACHE ==========
+
+    @staticmethod
+    def get_object_by_id(object_type, object_id, properties=None, user_id=None, max_age=None):
+        """Get one CRM record, served from the object cache when possible
+
+        Then from the local CRM mirror, if it synced within ``max_age``
+        seconds (default CRM_MIRROR_MAX_AGE; 0 = always ask HubSpot).
+        """
+        portal, record = HubSpotService._find_cached_object(object_type, object_id, properties, user_id, max_age)
+        if record is not None:
+            return record
+
+        kwargs = {'user_id': user_id}
+        if properties:
+            kwargs['params'] = {'properties': properties if isinstance(properties, str) else ','.join(properties)}
+        response = HubSpotService.make_request('GET', f'/crm/v3/objects/{object_type}/{object_id}', **kwargs)
+        return HubSpotService._fetched_object(portal, object_type, object_id, properties, response)
+
+    @staticmethod
+    def _find_cached_object(object_type, object_id, properties, user_id, max_age):
+        """``(portal, record)`` from the object cache or the CRM mirror; record is None on a miss"""
+        config = current_app.config
+        portal = HubSpotService.get_portal_key(user_id)
+
+        status, cached = object_cache.get(portal, object_type, object_id, properties)
+        if status == 'hit':
+            return portal, cached
+        if status == 'not_found':
+            raise Exception(f"HubSpot API error: 404 - {cached}")
+
+        max_age = config.get('CRM_MIRROR_MAX_AGE', 0) if max_age is None else max_age
+        status, mirrored = crm_mirror.get(portal, object_type, object_id, properties, max_age=max_age)
+        if status == 'hit':
+            return portal, mirrored
+        if status == 'not_found':
+            raise Exception(f"HubSpot API error: 404 - {mirrored}")
+        return portal, None
+
+    @staticmethod
+    def _fetched_object(portal, object_type, object_id, properties, response):
+        """Cache HubSpot's answer to a GET by id and return the record (raises on an error response)"""
+        config = current_app.config
+        if response.status_code == 200:
+            record = response.json()
+            object_cache.put(
+                portal, object_type, object_id, record,
+                ttl=config.get('HUBSPOT_OBJECT_CACHE_TTL', 120), properties=properties
+            )
+            return record
+        if response.status_code == 404:
+            object_cache.put_not_found(
+                portal, object_type, object_id, response.text,
+                ttl=config.get('HUBSPOT_OBJECT_CACHE_NEGATIVE_TTL', 30)
+            )
+        raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+
+    @staticmethod
+    def _cache_written_object(object_type, record, user_id=None, created=False):
+        """Write-through: keep the record HubSpot returned from a create/update/replace"""
+        object_id = record.get('id')
+        if object_type not in CACHED_OBJECT_TYPES or not object_id or not has_app_context():
+            return
+
+        portal = HubSpotService.get_portal_key(user_id)
+        ttl = current_app.config.get('HUBSPOT_OBJECT_CACHE_TTL', 120)
+        if created:
+            # A new record holds exactly what was sent, so it also answers default-property reads
+            object_cache.put(portal, object_type, object_id, record, ttl=ttl)
+        else:
+            # Updates only echo the changed properties; older variants are now stale
+            object_cache.invalidate(portal, object_type, object_id)
+            object_cache.put(portal, object_type, object_id, record, ttl=ttl,
+                             properties=list(record.get('properties') or {}))
+        crm_mirror.record_written(portal, object_type, record, created=created)
+        autocomplete.record_written(portal, object_type, record)
+
+    @staticmethod
+    def _forget_object(object_type, object_id, user_id=None):
+        """Drop a deleted record and remember that it is gone"""
+        if object_type not in CACHED_OBJECT_TYPES or not has_app_context():
+            return
+        portal = HubSpotService.get_portal_key(user_id)
+        object_cache.put_not_found(
+            portal, object_type, object_id, f'{object_id} was deleted',
+            ttl=current_app.config.get('HUBSPOT_OBJECT_CACHE_NEGATIVE_TTL', 30)
+        )
+        crm_mirror.forget(portal, object_type, object_id)
+        autocomplete.forget(portal, object_type, object_id)
+
+    # ========== PAGINATION ==========
+
+    @staticmethod
+    def iter_pages(object_type, page_size=100, properties=None, user_id=None, max_records=None, **filters):
+        """Yield one page (list of records) at a time, following paging.next.after
+
+        Pages are fetched lazily, so only the current page is held in memory.
+        """
+        params = dict(filters)
+        if properties:
+            params['properties'] = properties if isinstance(properties, str) else ','.join(properties)
+        endpoint = f'/crm/v3/objects/{object_type}'
+        after = params.pop('after', None)
+        remaining = max_records
+
+        while remaining is None or remaining > 0:
+            params['limit'] = min(page_size, 100) if remaining is None else min(page_size, 100, remaining)
+            if after:
+                params['after'] = after
+
+            response = HubSpotService.make_request('GET', endpoint, params=params, user_id=user_id)
+            if response.status_code != 200:
+                raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+
+            body = response.json()
+            results = body.get('results', [])
+            if results:
+                yield results
+            if remaining is not None:
+                remaining -= len(results)
+
+            after = ((body.get('paging') or {}).get('next') or {}).get('after')
+            if not after or not results:
+                return
+
+    @staticmethod
+    def iter_search(object_type, filter_groups=None, properties=None, sorts=None, page_size=100,
+                    user_id=None, max_records=None):
+        """Yield records matching a CRM search, following the search cursor
+
+        HubSpot stops search paging at 10,000 results; use iter_objects for full exports.
+        """
+        payload = {'filterGroups': filter_groups or [], 'limit': min(page_size, 100)}
+        if properties:
+            payload['properties'] = list(properties)
+        if sorts:
+            payload['sorts'] = sorts
+        endpoint = f'/crm/v3/objects/{object_type}/search'
+        remaining = max_records
+
+        while remaining is None or remaining > 0:
+            if remaining is not None:
+                payload['limit'] = min(payload['limit'], remaining)
+
+            response = HubSpotService.make_request('POST', endpoint, payload, user_id=user_id)
+            if response.status_code != 200:
+                raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+
+            body = response.json()
+            results = body.get('results', [])
+            yield from results
+            if remaining is not None:
+                remaining -= len(results)
+
+            after = ((body.get('paging') or {}).get('next') or {}).get('after')
+            if not after or not results:
+                return
+            payload['after'] = after
+
+    @staticmethod
+    def iter_search_all(object_type, filter_groups=None, properties=None, page_size=100, user_id=None):
+        """Yield every record matching a CRM search, past the 10,000-result search limit
+
+        Results are sorted by hs_object_id; when a query reaches the limit, the
+        next one continues from the last id seen (hs_object_id GT last).
+        """
+        sorts = [{'propertyName': 'hs_object_id', 'direction': 'ASCENDING'}]
+        last_id = None
+
+        while True:
+            groups = filter_groups or [{'filters': []}]
+            if last_id is not None:
+                after_last = {'propertyName': 'hs_object_id', 'operator': 'GT', 'value': last_id}
+                groups = [{**group, 'filters': group.get('filters', []) + [after_last]} for group in groups]
+
+            seen = 0
+            for record in HubSpotService.iter_search(
+                object_type, filter_groups=groups, properties=properties, sorts=sorts,
+                page_size=page_size, user_id=user_id, max_records=SEARCH_RESULT_LIMIT
+            ):
+                seen += 1
+                last_id = record['id']
+                yield record
+            if seen < SEARCH_RESULT_LIMIT:
+                return
+
+    @staticmethod
+    def iter_objects(object_type, page_size=100, properties=None, user_id=None, max_records=None, **filters):
+        """Yield every record of an object type, one at a time, in constant memory"""
+        for page in HubSpotService.iter_pages(
+            object_type, page_size=page_size, properties=properties, user_id=user_id,
+            max_records=max_records, **filters
+        ):
+            yield from page
+
+    @staticmethod
+    def iter_contacts(user_id=None, **kwargs):
+        """Iterate over every HubSpot contact (see iter_objects)"""
+        return HubSpotService.iter_objects('contacts', user_id=user_id, **kwargs)
+
+    @staticmethod
+    def iter_companies(user_id=None, **kwargs):
+        """Iterate over every HubSpot company (see iter_objects)"""
+        return HubSpotService.iter_objects('companies', user_id=user_id, **kwargs)
+
+    @staticmethod
+    def iter_deals(user_id=None, **kwargs):
+        """Iterate over every HubSpot deal (see iter_objects)"""
+        return HubSpotService.iter_objects('deals', user_id=user_id, **kwargs)
+
+    @staticmethod
+    def iter_notes(user_id=None, **kwargs):
+        """Iterate over every HubSpot note (see iter_objects)"""
+        return HubSpotService.iter_objects('notes', user_id=user_id, **kwargs)
+
+    @staticmethod
+    def iter_tasks(user_id=None, **kwargs):
+        """Iterate over every HubSpot task (see iter_objects)"""
+        return HubSpotService.iter_objects('tasks', user_id=user_id, **kwargs)
+
+    @staticmethod
+    def iter_calls(user_id=None, **kwargs):
+        """Iterate over every HubSpot call (see iter_objects)"""
+        return HubSpotService.iter_objects('calls', user_id=user_id, **kwargs)
+
+    @staticmethod
+    def iter_meetings(user_id=None, **kwargs):
+        """Iterate over every HubSpot meeting (see iter_objects)"""
+        return HubSpotService.iter_objects('meetings', user_id=user_id, **kwargs)
+
+    @staticmethod
+    def iter_emails(user_id=None, **kwargs):
+        """Iterate over every HubSpot email (see iter_objects)"""
+        return HubSpotService.iter_objects('emails', user_id=user_id, **kwargs)
 
     # ========== CONTACT OPERATIONS ==========
 
@@ -78,29 +541,35 @@ class HubSpotService:
     @staticmethod
     def create_contact(contact_data, session_id=None, message_id=None, user_id=None):
         """Create contact in HubSpot"""
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/contacts', {'properties': contact_data}, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'contact_action', 'contacts', 'create', {'properties': contact_data}):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/contacts', {'properties': contact_data}, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('contacts', response.json(), user_id=user_id, created=True)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'contact_action', hubspot_id,
-                f"Contact created: {contact_data.get('email', 'N/A')}"
+                f"Contact created: {contact_data.get('email', 'N/A')}",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'contact_action', error_msg
+                user_id, session_id, message_id, 'contact_action', error_msg,
+                replay=HubSpotService._replay(response, 'contacts', 'create', {'properties': contact_data})
             )
             return {'success': False, 'error': error_msg}
 
     @staticmethod
     def update_contact(contact_id, contact_data, session_id=None, message_id=None, user_id=None):
         """Update contact in HubSpot"""
-        response = HubSpotService.make_request('PATCH', f'/crm/v3/objects/contacts/{contact_id}', {'properties': contact_data}, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'contact_action', 'contacts', 'update', {'id': str(contact_id), 'properties': contact_data}):
+            response = HubSpotService.make_request('PATCH', f'/crm/v3/objects/contacts/{contact_id}', {'properties': contact_data}, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('contacts', response.json(), user_id=user_id)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'contact_action', hubspot_id,
                 f"Contact updated: {contact_data.get('email', 'N/A')}"
@@ -109,29 +578,29 @@ class HubSpotService:
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'contact_action', error_msg
+                user_id, session_id, message_id, 'contact_action', error_msg,
+                replay=HubSpotService._replay(response, 'contacts', 'update', {'id': str(contact_id), 'properties': contact_data})
             )
             return {'success': False, 'error': error_msg}
 
-    @staticmethod
-    def get_contact_properties():
-        """Get available contact properties"""
-        response = HubSpotService.make_request('GET', '/crm/v3/properties/contacts')
-        return response
-
     @staticmethod
     def get_contact_property(property_name, user_id=None):
         """Get specific contact property schema"""
-        response = HubSpotService.make_request('GET', f'/crm/v3/properties/contacts/{property_name}', user_id=user_id)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        for prop in HubSpotService.get_contact_properties(user_id=user_id).get('results', []):
+            if prop.get('name') == property_name:
+                return prop
+
+        # Not in the cached list (e.g. created since) - ask HubSpot directly
+        return HubSpotService.get_metadata(
+            f'properties:contacts:{property_name}', f'/crm/v3/properties/contacts/{property_name}', user_id=user_id
+        )
 
     @staticmethod
-    def search_contacts(search_term, limit=10, user_id=None):
-        """Search contacts in HubSpot"""
+    def search_contacts(search_term, limit=10, user_id=None, source='hubspot'):
+        """Search contacts in HubSpot, or in the local CRM mirror with source='local'"""
+        if source == 'local':
+            return crm_mirror.search(HubSpotService.get_portal_key(user_id), 'contacts', search_term, limit=limit)
+
         # Use the search API endpoint
         search_data = {
             "query": search_term,
@@ -159,9 +628,11 @@ class HubSpotService:
     @staticmethod
     def delete_contact(contact_id, session_id=None, message_id=None, user_id=None):
         """Delete contact from HubSpot"""
-        response = HubSpotService.make_request('DELETE', f'/crm/v3/objects/contacts/{contact_id}', user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'contact_action', 'contacts', 'archive', {'id': str(contact_id)}):
+            response = HubSpotService.make_request('DELETE', f'/crm/v3/objects/contacts/{contact_id}', user_id=user_id)
 
         if response.status_code in [200, 204]:
+            HubSpotService._forget_object('contacts', contact_id, user_id=user_id)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'contact_action', contact_id,
                 f"Contact deleted: {contact_id}"
@@ -170,17 +641,20 @@ class HubSpotService:
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'contact_action', error_msg
+                user_id, session_id, message_id, 'contact_action', error_msg,
+                replay=HubSpotService._replay(response, 'contacts', 'archive', {'id': str(contact_id)})
             )
             return {'success': False, 'error': error_msg}
 
     @staticmethod
     def replace_contact(contact_id, contact_data, session_id=None, message_id=None, user_id=None):
         """Replace contact in HubSpot (full update)"""
-        response = HubSpotService.make_request('PUT', f'/crm/v3/objects/contacts/{contact_id}', {'properties': contact_data}, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'contact_action', 'contacts', 'update', {'id': str(contact_id), 'properties': contact_data}):
+            response = HubSpotService.make_request('PUT', f'/crm/v3/objects/contacts/{contact_id}', {'properties': contact_data}, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('contacts', response.json(), user_id=user_id)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'contact_action', hubspot_id,
                 f"Contact replaced: {contact_data.get('firstname', 'N/A')} {contact_data.get('lastname', 'N/A')}"
@@ -189,28 +663,266 @@ class HubSpotService:
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'contact_action', error_msg
+                user_id, session_id, message_id, 'contact_action', error_msg,
+                replay=HubSpotService._replay(response, 'contacts', 'update', {'id': str(contact_id), 'properties': contact_data})
             )
             return {'success': False, 'error': error_msg}
 
+    # ========== BATCH OPERATIONS ==========
+
+    # Log type used for each object type's batch rows
+    BATCH_LOG_TYPES = {
+        'contacts': 'contact_action',
+        'companies': 'contact_action',
+        'deals': 'deal',
+        'notes': 'note',
+        'tasks': 'task'
+    }
+
+    @staticmethod
+    def run_batch(groups, log_type, session_id=None, message_id=None, user_id=None, match_key=None,
+                  object_type=None, created=False, write_logs=True):
+        """Send batch inputs in API-sized chunks, concurrently, and merge per-item outcomes
+
+        ``groups`` is a list of ``(endpoint, [(index, input), ...])``. Each group is
+        split into chunks of ``HUBSPOT_BATCH_CHUNK_SIZE`` that are dispatched on up to
+        ``HUBSPOT_BATCH_CONCURRENCY`` threads (every request still waits for the
+        shared rate limiter). ``match_key(item_or_record)`` pairs returned records
+        with inputs; without it, records are paired by ``objectWriteTraceId`` and
+        then by position. Returns per-item results in input order and writes all
+        Log rows in one bulk insert (unless ``write_logs`` is false). Failed creates
+        that HubSpot may have applied anyway are marked ``final``: resending them
+        could duplicate the records.
+        """
+        config = current_app.config
+        chunk_size = config.get('HUBSPOT_BATCH_CHUNK_SIZE', 100)
+        chunks = [
+            (endpoint, items[start:start + chunk_size])
+            for endpoint, items in groups
+            for start in range(0, len(items), chunk_size)
+        ]
+        total = sum(len(items) for _, items in chunks)
+        results = [None] * total
+        if not chunks:
+            return {'success': True, 'total': 0, 'succeeded': 0, 'failed': 0, 'chunks': 0, 'results': []}
+
+        app = current_app._get_current_object()
+
+        def send(chunk):
+            endpoint, items = chunk
+            try:
+                with app.app_context():
+                    response = HubSpotService.make_request(
+                        'POST', endpoint, {'inputs': [item for _, item in items]}, user_id=user_id
+                    )
+                if response.status_code not in [200, 201, 207]:
+                    return items, None, response.text, created and HubSpotService._resend_would_duplicate(response)
+                return items, response.json(), None, False
+            except Exception as e:
+                return items, None, str(e), created and HubSpotService._resend_would_duplicate(e)
+
+        workers = max(1, min(config.get('HUBSPOT_BATCH_CONCURRENCY', 4), len(chunks)))
+        if workers == 1:
+            outcomes = [send(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hubspot-batch') as executor:
+                outcomes = list(executor.map(send, chunks))
+
+        for items, body, error, unsafe in outcomes:
+            HubSpotService._merge_batch_chunk(items, body, error, results, match_key)
+            if unsafe:
+                # HubSpot may have created these already; sending them again could duplicate them
+                for index, _ in items:
+                    results[index]['final'] = True
+
+        rows = []
+        for item in results:
+            if item['success'] and object_type:
+                HubSpotService._cache_written_object(object_type, item['data'], user_id=user_id, created=created)
+            if user_id and write_logs:
+                rows.append(log_sink.build_row(
+                    user_id, session_id, message_id, log_type,
+                    hubspot_id=item.get('id'),
+                    sync_status='synced' if item['success'] else 'failed',
+                    sync_error=None if item['success'] else item['error'],
+                    sync_operation='create' if created else None
+                ))
+        log_sink.write_many(rows)
+
+        succeeded = sum(1 for item in results if item['success'])
+        return {
+            'success': succeeded == total,
+            'total': total,
+            'succeeded': succeeded,
+            'failed': total - succeeded,
+            'chunks': len(chunks),
+            'results': results
+        }
+
+    @staticmethod
+    def _merge_batch_chunk(items, body, error, results, match_key):
+        """Place one chunk's records and errors at their inputs' positions"""
+        if body is None:
+            for index, _ in items:
+                results[index] = {'index': index, 'success': False, 'error': error}
+            return
+
+        records = list(body.get('results', []))
+        failed = {}
+        unplaced_errors = []
+        for err in body.get('errors', []):
+            message = err.get('message') or err.get('category') or 'Batch item failed'
+            trace_ids = (err.get('context') or {}).get('objectWriteTraceId') or []
+            if trace_ids:
+                for trace_id in trace_ids:
+                    failed[str(trace_id)] = message
+            else:
+                unplaced_errors.append(message)
+
+        if match_key:
+            by_key = {match_key(record): record for record in records}
+            for index, item in items:
+                record = by_key.get(match_key(item))
+                if record is not None:
+                    results[index] = {'index': index, 'success': True, 'id': record.get('id'), 'data': record}
+                else:
+                    message = failed.get(str(index)) or '; '.join(unplaced_errors) or 'No result returned'
+                    results[index] = {'index': index, 'success': False, 'error': message}
+            return
+
+        # Creates: HubSpot returns new records in input order, minus the inputs named in errors
+        pending = iter(records)
+        ambiguous = bool(unplaced_errors) and len(records) != len(items) - len(failed)
+        for index, item in items:
+            trace_id = str(item.get('objectWriteTraceId', index))
+            if trace_id in failed:
+                results[index] = {'index': index, 'success': False, 'error': failed[trace_id]}
+                continue
+            record = None if ambiguous else next(pending, None)
+            if record is not None:
+                results[index] = {'index': index, 'success': True, 'id': record.get('id'), 'data': record}
+            else:
+                message = '; '.join(unplaced_errors) or 'No result returned'
+                results[index] = {'index': index, 'success': False, 'error': message}
+
+    @staticmethod
+    def _batch_inputs(items, with_id=False):
+        """Accept ``{'properties': {...}}`` or bare property dicts (``id`` kept separate for updates)"""
+        inputs = []
+        for index, item in enumerate(items):
+            if 'properties' in item:
+                entry = dict(item)
+            else:
+                entry = {'properties': {k: v for k, v in item.items() if k != 'id'}}
+                if 'id' in item:
+                    entry['id'] = item['id']
+            if with_id:
+                entry['id'] = str(entry.get('id', ''))
+            else:
+                entry.setdefault('objectWriteTraceId', str(index))
+            inputs.append((index, entry))
+        return inputs
+
+    @staticmethod
+    def batch_create_objects(object_type, objects_data, session_id=None, message_id=None, user_id=None):
+        """Batch create any CRM object type (chunked, concurrent)"""
+        return HubSpotService.run_batch(
+            [(f'/crm/v3/objects/{object_type}/batch/create', HubSpotService._batch_inputs(objects_data))],
+            HubSpotService.BATCH_LOG_TYPES.get(object_type, object_type),
+            session_id, message_id, user_id,
+            object_type=object_type, created=True
+        )
+
+    @staticmethod
+    def batch_update_objects(object_type, objects_data, session_id=None, message_id=None, user_id=None):
+        """Batch update any CRM object type; every input needs an ``id``"""
+        return HubSpotService.run_batch(
+            [(f'/crm/v3/objects/{object_type}/batch/update', HubSpotService._batch_inputs(objects_data, with_id=True))],
+            HubSpotService.BATCH_LOG_TYPES.get(object_type, object_type),
+            session_id, message_id, user_id,
+            match_key=lambda entry: str(entry.get('id')),
+            object_type=object_type
+        )
+
     @staticmethod
     def batch_create_contacts(contacts_data, session_id=None, message_id=None, user_id=None):
         """Batch create contacts in HubSpot"""
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/contacts/batch/create', {'inputs': contacts_data}, user_id=user_id)
+        return HubSpotService.batch_create_objects('contacts', contacts_data, session_id, message_id, user_id)
 
-        if response.status_code in [200, 201]:
-            result = response.json()
-            HubSpotService._create_success_log(
-                user_id, session_id, message_id, 'contact_action', 'batch_create',
-                f"Batch created {len(contacts_data)} contacts"
-            )
-            return {'success': True, 'data': result}
-        else:
-            error_msg = response.text
-            HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'contact_action', error_msg
-            )
-            return {'success': False, 'error': error_msg}
+    @staticmethod
+    def batch_update_contacts(contacts_data, session_id=None, message_id=None, user_id=None):
+        """Batch update contacts in HubSpot"""
+        return HubSpotService.batch_update_objects('contacts', contacts_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_create_companies(companies_data, session_id=None, message_id=None, user_id=None):
+        """Batch create companies in HubSpot"""
+        return HubSpotService.batch_create_objects('companies', companies_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_update_companies(companies_data, session_id=None, message_id=None, user_id=None):
+        """Batch update companies in HubSpot"""
+        return HubSpotService.batch_update_objects('companies', companies_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_create_deals(deals_data, session_id=None, message_id=None, user_id=None):
+        """Batch create deals in HubSpot"""
+        return HubSpotService.batch_create_objects('deals', deals_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_update_deals(deals_data, session_id=None, message_id=None, user_id=None):
+        """Batch update deals in HubSpot"""
+        return HubSpotService.batch_update_objects('deals', deals_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_create_notes(notes_data, session_id=None, message_id=None, user_id=None):
+        """Batch create notes in HubSpot"""
+        return HubSpotService.batch_create_objects('notes', notes_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_update_notes(notes_data, session_id=None, message_id=None, user_id=None):
+        """Batch update notes in HubSpot"""
+        return HubSpotService.batch_update_objects('notes', notes_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_create_tasks(tasks_data, session_id=None, message_id=None, user_id=None):
+        """Batch create tasks in HubSpot"""
+        return HubSpotService.batch_create_objects('tasks', tasks_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_update_tasks(tasks_data, session_id=None, message_id=None, user_id=None):
+        """Batch update tasks in HubSpot"""
+        return HubSpotService.batch_update_objects('tasks', tasks_data, session_id, message_id, user_id)
+
+    @staticmethod
+    def batch_create_associations(associations, session_id=None, message_id=None, user_id=None):
+        """Batch create default associations
+
+        Each item needs ``from_object_type``, ``from_object_id``, ``to_object_type``
+        and ``to_object_id``; items are grouped per object-type pair (one v4
+        batch endpoint each).
+        """
+        groups = {}
+        for index, association in enumerate(associations):
+            pair = (association['from_object_type'], association['to_object_type'])
+            groups.setdefault(pair, []).append((index, {
+                'from': {'id': str(association['from_object_id'])},
+                'to': {'id': str(association['to_object_id'])}
+            }))
+
+        def match_key(entry):
+            if 'from' in entry:
+                return (entry['from']['id'], entry['to']['id'])
+            return (str(entry.get('fromObjectId')), str(entry.get('toObjectId')))
+
+        return HubSpotService.run_batch(
+            [
+                (f'/crm/v4/associations/{from_type}/{to_type}/batch/associate/default', items)
+                for (from_type, to_type), items in groups.items()
+            ],
+            'association', session_id, message_id, user_id,
+            match_key=match_key
+        )
 
     # ========== DEAL OPERATIONS ==========
 
@@ -234,28 +946,26 @@ class HubSpotService:
         if associations:
             payload['associations'] = associations
 
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/deals', payload, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'deal', 'deals', 'create', payload):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/deals', payload, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('deals', response.json(), user_id=user_id, created=True)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'deal', hubspot_id,
-                f"Deal created: {deal_data.get('dealname', 'N/A')}"
+                f"Deal created: {deal_data.get('dealname', 'N/A')}",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'deal', error_msg
+                user_id, session_id, message_id, 'deal', error_msg,
+                replay=HubSpotService._replay(response, 'deals', 'create', payload)
             )
             return {'success': False, 'error': error_msg}
 
-    @staticmethod
-    def get_deal_pipelines():
-        """Get deal pipelines"""
-        response = HubSpotService.make_request('GET', '/crm/v3/pipelines/deals')
-        return response
-
     # ========== NOTE OPERATIONS ==========
 
     @staticmethod
@@ -278,19 +988,23 @@ class HubSpotService:
         if associations:
             payload['associations'] = associations
 
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/notes', payload, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'note', 'notes', 'create', payload):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/notes', payload, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('notes', response.json(), user_id=user_id, created=True)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'note', hubspot_id,
-                f"Note created: {note_data.get('hs_note_body', 'N/A')[:50]}..."
+                f"Note created: {note_data.get('hs_note_body', 'N/A')[:50]}...",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'note', error_msg
+                user_id, session_id, message_id, 'note', error_msg,
+                replay=HubSpotService._replay(response, 'notes', 'create', payload)
             )
             return {'success': False, 'error': error_msg}
 
@@ -325,16 +1039,19 @@ class HubSpotService:
             raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
 
     @staticmethod
-    def search_companies(search_term, limit=10, user_id=None):
-        """Search HubSpot companies"""
+    def search_notes(search_term, limit=10, user_id=None, source='hubspot'):
+        """Search HubSpot notes by body, or the local CRM mirror with source='local'"""
+        if source == 'local':
+            return crm_mirror.search(HubSpotService.get_portal_key(user_id), 'notes', search_term, limit=limit)
+
         search_data = {
-            "query": search_term,
             "limit": limit,
+            "properties": ["hs_note_body", "hs_timestamp"],
             "filterGroups": [
                 {
                     "filters": [
                         {
-                            "propertyName": "name",
+                            "propertyName": "hs_note_body",
                             "operator": "CONTAINS_TOKEN",
                             "value": search_term
                         }
@@ -343,92 +1060,90 @@ class HubSpotService:
             ]
         }
 
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/companies/search', data=search_data, user_id=user_id)
+        response = HubSpotService.make_request('POST', '/crm/v3/objects/notes/search', data=search_data, user_id=user_id)
         if response.status_code == 200:
             return response.json()
         else:
             raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
 
     @staticmethod
-    def get_company_by_id(company_id, user_id=None):
-        """Get specific company by ID"""
-        response = HubSpotService.make_request('GET', f'/crm/v3/objects/companies/{company_id}', user_id=user_id)
+    def search_companies(search_term, limit=10, user_id=None, source='hubspot'):
+        """Search HubSpot companies, or the local CRM mirror with source='local'"""
+        if source == 'local':
+            return crm_mirror.search(HubSpotService.get_portal_key(user_id), 'companies', search_term, limit=limit)
+
+        search_data = {
+            "query": search_term,
+            "limit": limit,
+            "filterGroups": [
+                {
+                    "filters": [
+                        {
+                            "propertyName": "name",
+                            "operator": "CONTAINS_TOKEN",
+                            "value": search_term
+                        }
+                    ]
+                }
+            ]
+        }
+
+        response = HubSpotService.make_request('POST', '/crm/v3/objects/companies/search', data=search_data, user_id=user_id)
         if response.status_code == 200:
             return response.json()
         else:
             raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
 
     @staticmethod
-    def get_contact_by_id(contact_id, user_id=None):
+    def get_company_by_id(company_id, user_id=None, properties=None, max_age=None):
+        """Get specific company by ID"""
+        return HubSpotService.get_object_by_id('companies', company_id, properties=properties, user_id=user_id, max_age=max_age)
+
+    @staticmethod
+    def get_contact_by_id(contact_id, user_id=None, properties=None, max_age=None):
         """Get specific contact by ID"""
-        response = HubSpotService.make_request('GET', f'/crm/v3/objects/contacts/{contact_id}', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        return HubSpotService.get_object_by_id('contacts', contact_id, properties=properties, user_id=user_id, max_age=max_age)
 
     @staticmethod
-    def get_deal_by_id(deal_id, user_id=None):
+    def get_deal_by_id(deal_id, user_id=None, properties=None, max_age=None):
         """Get specific deal by ID"""
-        response = HubSpotService.make_request('GET', f'/crm/v3/objects/deals/{deal_id}', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        return HubSpotService.get_object_by_id('deals', deal_id, properties=properties, user_id=user_id, max_age=max_age)
 
     @staticmethod
-    def get_note_by_id(note_id, user_id=None):
+    def get_note_by_id(note_id, user_id=None, properties=None, max_age=None):
         """Get specific note by ID"""
-        response = HubSpotService.make_request('GET', f'/crm/v3/objects/notes/{note_id}', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        return HubSpotService.get_object_by_id('notes', note_id, properties=properties, user_id=user_id, max_age=max_age)
 
     @staticmethod
-    def get_task_by_id(task_id, user_id=None):
+    def get_task_by_id(task_id, user_id=None, properties=None, max_age=None):
         """Get specific task by ID"""
-        response = HubSpotService.make_request('GET', f'/crm/v3/objects/tasks/{task_id}', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        return HubSpotService.get_object_by_id('tasks', task_id, properties=properties, user_id=user_id, max_age=max_age)
 
     @staticmethod
     def get_contact_properties(user_id=None):
         """Get contact properties"""
-        response = HubSpotService.make_request('GET', '/crm/v3/properties/contacts', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        return HubSpotService.get_metadata('properties:contacts', '/crm/v3/properties/contacts', user_id=user_id)
 
     @staticmethod
     def get_company_properties(user_id=None):
         """Get company properties"""
-        response = HubSpotService.make_request('GET', '/crm/v3/properties/companies', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        return HubSpotService.get_metadata('properties:companies', '/crm/v3/properties/companies', user_id=user_id)
 
     @staticmethod
     def get_deal_pipelines(user_id=None):
         """Get deal pipelines"""
-        response = HubSpotService.make_request('GET', '/crm/v3/pipelines/deals', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        return HubSpotService.get_metadata('pipelines:deals', '/crm/v3/pipelines/deals', user_id=user_id)
 
     @staticmethod
     def get_deal_stages(pipeline_id, user_id=None):
         """Get deal stages for a specific pipeline"""
-        response = HubSpotService.make_request('GET', f'/crm/v3/pipelines/deals/{pipeline_id}', user_id=user_id)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
+        for pipeline in HubSpotService.get_deal_pipelines(user_id=user_id).get('results', []):
+            if str(pipeline.get('id')) == str(pipeline_id):
+                return pipeline
+
+        return HubSpotService.get_metadata(
+            f'pipelines:deals:{pipeline_id}', f'/crm/v3/pipelines/deals/{pipeline_id}', user_id=user_id
+        )
 
     @staticmethod
     def update_deal_stage(deal_id, new_stage, user_id=None):
@@ -436,6 +1151,7 @@ class HubSpotService:
         payload = {'properties': {'dealstage': new_stage}}
         response = HubSpotService.make_request('PATCH', f'/crm/v3/objects/deals/{deal_id}', payload, user_id=user_id)
         if response.status_code == 200:
+            HubSpotService._cache_written_object('deals', response.json(), user_id=user_id)
             return response.json()
         else:
             raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
@@ -457,19 +1173,24 @@ class HubSpotService:
             'lifecyclestage': 'lead'
         }
         
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/contacts', {'properties': lead_properties}, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'contact_action', 'contacts', 'create', {'properties': lead_properties}):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/contacts', {'properties': lead_properties}, user_id=user_id)
         
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('contacts', response.json(), user_id=user_id, created=True)
+            lead_analytics_cache.invalidate(str(user_id))
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'contact_action', hubspot_id,
-                f"Lead created: {lead_data.get('email', 'N/A')}"
+                f"Lead created: {lead_data.get('email', 'N/A')}",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'contact_action', error_msg
+                user_id, session_id, message_id, 'contact_action', error_msg,
+                replay=HubSpotService._replay(response, 'contacts', 'create', {'properties': lead_properties})
             )
             return {'success': False, 'error': error_msg}
 
@@ -487,6 +1208,8 @@ class HubSpotService:
         response = HubSpotService.make_request('PATCH', f'/crm/v3/objects/contacts/{contact_id}', update_payload, user_id=user_id)
         
         if response.status_code == 200:
+            HubSpotService._cache_written_object('contacts', response.json(), user_id=user_id)
+            lead_analytics_cache.invalidate(str(user_id))
             # If qualification includes deal creation
             if qualification_data.get('create_deal'):
                 deal_data = {
@@ -515,28 +1238,95 @@ class HubSpotService:
             raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
 
     @staticmethod
-    def get_leads(limit=10, user_id=None, **filters):
-        """Get leads (contacts with lead status)"""
-        params = {
-            'limit': limit,
-            'properties': 'firstname,lastname,email,phone,company,lead_status,lead_source,lifecyclestage',
-            'filterGroups': [{
-                'filters': [{
-                    'propertyName': 'lifecyclestage',
-                    'operator': 'EQ',
-                    'value': 'lead'
-                }]
-            }]
+    def get_leads(limit=10, user_id=None, after=None, **filters):
+        """Get one page of leads (contacts in the lead lifecycle stage)
+
+        Uses the search API: the list endpoint ignores filterGroups. Extra
+        keyword filters become EQ filters (e.g. lead_status='NEW').
+        """
+        conditions = [{'propertyName': 'lifecyclestage', 'operator': 'EQ', 'value': 'lead'}]
+        conditions += [{'propertyName': name, 'operator': 'EQ', 'value': value} for name, value in filters.items()]
+        payload = {
+            'filterGroups': [{'filters': conditions}],
+            'properties': ['firstname', 'lastname', 'email', 'phone', 'company',
+                           'lead_status', 'lead_source', 'lifecyclestage'],
+            'limit': min(limit, 100)
         }
-        if filters:
-            params.update(filters)
+        if after:
+            payload['after'] = after
 
-        response = HubSpotService.make_request('GET', '/crm/v3/objects/contacts', params=params, user_id=user_id)
+        response = HubSpotService.make_request('POST', '/crm/v3/objects/contacts/search', payload, user_id=user_id)
         if response.status_code == 200:
             return response.json()
         else:
             raise Exception(f"HubSpot API error: {response.status_code} - {response.text}")
 
+    @staticmethod
+    def get_lead_analytics(user_id=None, refresh=False):
+        """Lead counts by status/source and a lifecycle-stage conversion funnel
+
+        Walks every contact from the lead stage onwards, fetching only the
+        three properties needed. total_leads and the status/source counts
+        cover contacts currently in the lead stage, as before; the later
+        stages only feed the funnel. A contact counts as having reached
+        every stage up to its current one (HubSpot lifecycle stages only
+        move forward by default). The result is cached per user for
+        HUBSPOT_LEAD_ANALYTICS_TTL seconds; refresh=True recomputes it.
+        """
+        key = str(user_id)
+        if not refresh:
+            cached = lead_analytics_cache.get(key)
+            if cached is not None:
+                return cached
+
+        stages = {stage: 0 for stage in LEAD_FUNNEL}
+        lead_statuses = {}
+        lead_sources = {}
+        contacts = HubSpotService.iter_search_all(
+            'contacts',
+            filter_groups=[{'filters': [{'propertyName': 'lifecyclestage', 'operator': 'IN', 'values': list(LEAD_FUNNEL)}]}],
+            properties=['lifecyclestage', 'lead_status', 'lead_source'],
+            user_id=user_id
+        )
+        for contact in contacts:
+            properties = contact.get('properties') or {}
+            stage = properties.get('lifecyclestage')
+            if stage in stages:
+                stages[stage] += 1
+            if stage != 'lead':
+                continue
+            status = properties.get('lead_status') or 'UNKNOWN'
+            source = properties.get('lead_source') or 'UNKNOWN'
+            lead_statuses[status] = lead_statuses.get(status, 0) + 1
+            lead_sources[source] = lead_sources.get(source, 0) + 1
+
+        funnel = []
+        reached = sum(stages.values())
+        previous = None
+        for stage in LEAD_FUNNEL:
+            funnel.append({
+                'stage': stage,
+                'current': stages[stage],
+                'reached': reached,
+                'conversion_from_previous': round(reached / previous, 4) if previous else None
+            })
+            previous = reached
+            reached -= stages[stage]
+
+        total = funnel[0]['reached']
+        customers = next(step['reached'] for step in funnel if step['stage'] == 'customer')
+        analytics = {
+            'total_leads': stages['lead'],
+            'lead_statuses': lead_statuses,
+            'lead_sources': lead_sources,
+            'funnel': funnel,
+            'conversion_rate': round(customers / total, 4) if total else 0,
+            'generated_at': datetime.utcnow().isoformat()
+        }
+        ttl = current_app.config.get('HUBSPOT_LEAD_ANALYTICS_TTL', 60) if has_app_context() else None
+        lead_analytics_cache.set(key, analytics, ttl=ttl)
+        return analytics
+
     @staticmethod
     def get_calls(limit=10, user_id=None, **filters):
         """Get HubSpot calls"""
@@ -618,19 +1408,23 @@ class HubSpotService:
         if associations:
             payload['associations'] = associations
 
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/tasks', payload, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'task', 'tasks', 'create', payload):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/tasks', payload, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('tasks', response.json(), user_id=user_id, created=True)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'task', hubspot_id,
-                f"Task created: {task_data.get('hs_task_subject', 'N/A')}"
+                f"Task created: {task_data.get('hs_task_subject', 'N/A')}",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'task', error_msg
+                user_id, session_id, message_id, 'task', error_msg,
+                replay=HubSpotService._replay(response, 'tasks', 'create', payload)
             )
             return {'success': False, 'error': error_msg}
 
@@ -644,19 +1438,23 @@ class HubSpotService:
         if associations:
             payload['associations'] = associations
 
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/meetings', payload, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'call_meeting', 'meetings', 'create', payload):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/meetings', payload, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('meetings', response.json(), user_id=user_id, created=True)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'call_meeting', hubspot_id,
-                f"Meeting created: {meeting_data.get('hs_meeting_title', 'N/A')}"
+                f"Meeting created: {meeting_data.get('hs_meeting_title', 'N/A')}",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'call_meeting', error_msg
+                user_id, session_id, message_id, 'call_meeting', error_msg,
+                replay=HubSpotService._replay(response, 'meetings', 'create', payload)
             )
             return {'success': False, 'error': error_msg}
 
@@ -667,19 +1465,23 @@ class HubSpotService:
         if associations:
             payload['associations'] = associations
 
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/calls', payload, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'call_meeting', 'calls', 'create', payload):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/calls', payload, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('calls', response.json(), user_id=user_id, created=True)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'call_meeting', hubspot_id,
-                f"Call created: {call_data.get('hs_call_title', 'N/A')}"
+                f"Call created: {call_data.get('hs_call_title', 'N/A')}",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'call_meeting', error_msg
+                user_id, session_id, message_id, 'call_meeting', error_msg,
+                replay=HubSpotService._replay(response, 'calls', 'create', payload)
             )
             return {'success': False, 'error': error_msg}
 
@@ -689,28 +1491,34 @@ class HubSpotService:
     @staticmethod
     def create_company(company_data, session_id=None, message_id=None, user_id=None):
         """Create company in HubSpot"""
-        response = HubSpotService.make_request('POST', '/crm/v3/objects/companies', {'properties': company_data}, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'contact_action', 'companies', 'create', {'properties': company_data}):
+            response = HubSpotService.make_request('POST', '/crm/v3/objects/companies', {'properties': company_data}, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('companies', response.json(), user_id=user_id, created=True)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'contact_action', hubspot_id,
-                f"Company created: {company_data.get('name', 'N/A')}"
+                f"Company created: {company_data.get('name', 'N/A')}",
+                operation='create'
             )
             return {'success': True, 'hubspot_id': hubspot_id, 'data': response.json()}
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'contact_action', error_msg
+                user_id, session_id, message_id, 'contact_action', error_msg,
+                replay=HubSpotService._replay(response, 'companies', 'create', {'properties': company_data})
             )
             return {'success': False, 'error': error_msg}
 
     @staticmethod
     def delete_company(company_id, session_id=None, message_id=None, user_id=None):
         """Delete company from HubSpot"""
-        response = HubSpotService.make_request('DELETE', f'/crm/v3/objects/companies/{company_id}', user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'company_action', 'companies', 'archive', {'id': str(company_id)}):
+            response = HubSpotService.make_request('DELETE', f'/crm/v3/objects/companies/{company_id}', user_id=user_id)
 
         if response.status_code in [200, 204]:
+            HubSpotService._forget_object('companies', company_id, user_id=user_id)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'company_action', company_id,
                 f"Company deleted: {company_id}"
@@ -719,17 +1527,20 @@ class HubSpotService:
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'company_action', error_msg
+                user_id, session_id, message_id, 'company_action', error_msg,
+                replay=HubSpotService._replay(response, 'companies', 'archive', {'id': str(company_id)})
             )
             return {'success': False, 'error': error_msg}
 
     @staticmethod
     def update_company(company_id, company_data, session_id=None, message_id=None, user_id=None):
         """Update company in HubSpot"""
-        response = HubSpotService.make_request('PATCH', f'/crm/v3/objects/companies/{company_id}', {'properties': company_data}, user_id=user_id)
+        with HubSpotService._replay_on_error(user_id, session_id, message_id, 'company_action', 'companies', 'update', {'id': str(company_id), 'properties': company_data}):
+            response = HubSpotService.make_request('PATCH', f'/crm/v3/objects/companies/{company_id}', {'properties': company_data}, user_id=user_id)
 
         if response.status_code in [200, 201]:
             hubspot_id = response.json().get('id')
+            HubSpotService._cache_written_object('companies', response.json(), user_id=user_id)
             HubSpotService._create_success_log(
                 user_id, session_id, message_id, 'company_action', hubspot_id,
                 f"Company updated: {company_data.get('name', 'N/A')}"
@@ -738,63 +1549,120 @@ class HubSpotService:
         else:
             error_msg = response.text
             HubSpotService._create_failed_log(
-                user_id, session_id, message_id, 'company_action', error_msg
+                user_id, session_id, message_id, 'company_action', error_msg,
+                replay=HubSpotService._replay(response, 'companies', 'update', {'id': str(company_id), 'properties': company_data})
             )
             return {'success': False, 'error': error_msg}
 
     # ========== OWNER OPERATIONS ==========
 
     @staticmethod
-    def get_owners(limit=10):
+    def get_owners(limit=10, user_id=None):
         """Get HubSpot owners"""
         params = {'limit': limit}
-        response = HubSpotService.make_request('GET', '/crm/v3/owners', params=params)
-        return response
+        return HubSpotService.get_metadata(f'owners:{limit}', '/crm/v3/owners', params=params, user_id=user_id)
 
     # ========== LOGGING OPERATIONS ==========
 
     @staticmethod
-    def _create_success_log(user_id, session_id, message_id, log_type, hubspot_id, description=None):
-        """Create successful sync log"""
+    def _create_success_log(user_id, session_id, message_id, log_type, hubspot_id, description=None, operation=None):
+        """Queue successful sync log (``operation='create'`` counts it as a new object in the stats)"""
         if not user_id:
             return  # Skip if no user context
 
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type
+        # Description is stored in sync_error field for reference
+        log_sink.write(
+            user_id, session_id, message_id, log_type,
+            hubspot_id=hubspot_id, sync_status='synced', sync_error=description, sync_operation=operation
         )
-        log.mark_as_synced(hubspot_id)
-
-        if description:
-            log.sync_error = description  # Store description in sync_error field for reference
-
-        db.session.add(log)
-        try:
-            db.session.commit()
-        except Exception as e:
-            print(f"Failed to save success log: {e}")
 
     @staticmethod
-    def _create_failed_log(user_id, session_id, message_id, log_type, error_message):
-        """Create failed sync log"""
+    def _create_failed_log(user_id, session_id, message_id, log_type, error_message, replay=None):
+        """Queue failed sync log
+
+        ``replay`` (from ``_replay``) stores the write so the log sync
+        outbox can retry it later through the batch endpoints.
+        """
         if not user_id:
             return  # Skip if no user context
 
-        log = Log(
-            user_id=user_id,
-            session_id=session_id,
-            chat_message_id=message_id,
-            log_type=log_type
+        fields = {}
+        if replay:
+            fields = dict(
+                replay,
+                sync_attempts=1,
+                next_retry_at=datetime.utcnow() + timedelta(seconds=backoff_delay(
+                    1,
+                    base=current_app.config.get('LOG_SYNC_BACKOFF_BASE', 30),
+                    cap=current_app.config.get('LOG_SYNC_BACKOFF_MAX', 3600)
+                ))
+            )
+        log_sink.write(
+            user_id, session_id, message_id, log_type,
+            sync_status='failed', sync_error=error_message, **fields
         )
-        log.mark_as_failed(error_message)
 
-        db.session.add(log)
+    @staticmethod
+    @contextmanager
+    def _replay_on_error(user_id, session_id, message_id, log_type, object_type, operation, batch_input):
+        """Around a write's make_request: log a retryable exception with replay instructions, then re-raise it"""
         try:
-            db.session.commit()
-        except Exception as e:
-            print(f"Failed to save failed log: {e}")
+            yield
+        except HubSpotService.RETRYABLE_ERRORS as e:
+            HubSpotService._create_failed_log(
+                user_id, session_id, message_id, log_type, str(e),
+                replay=HubSpotService._replay(e, object_type, operation, batch_input)
+            )
+            raise
+
+    # Failures worth retrying later; other 4xx responses will not succeed on replay
+    RETRYABLE_STATUS_CODES = (408, 423, 429)
+
+    # Raised instead of a response: 429 retries ran out, the request timed out or the connection failed
+    RETRYABLE_ERRORS = (HubSpotRateLimitError, requests.Timeout, requests.ConnectionError)
+
+    # Answers that mean HubSpot did not process the request, so a create can be sent again
+    UNPROCESSED_STATUS_CODES = RETRYABLE_STATUS_CODES + (503,)
+
+    @staticmethod
+    def _replay(response, object_type, operation, batch_input):
+        """Replay instructions for a failed write (``None`` if retrying cannot help)
+
+        ``response`` is the error response, or the exception raised instead of
+        one. ``operation`` is the batch endpoint (create, update or archive)
+        and ``batch_input`` the entry to send in its ``inputs``. Updates and
+        archives are idempotent; a create is only replayed when HubSpot
+        cannot have created the record (see ``_resend_would_duplicate``).
+        """
+        if not isinstance(response, HubSpotService.RETRYABLE_ERRORS):
+            status_code = getattr(response, 'status_code', None)
+            if not (isinstance(status_code, int) and (status_code >= 500 or status_code in HubSpotService.RETRYABLE_STATUS_CODES)):
+                return None
+        if operation == 'create' and HubSpotService._resend_would_duplicate(response):
+            return None
+        return {
+            'sync_object_type': object_type,
+            'sync_operation': operation,
+            'sync_payload': json.dumps(batch_input)
+        }
+
+    @staticmethod
+    def _resend_would_duplicate(response):
+        """Whether a failed create may have been applied anyway
+
+        Safe to resend: a 408/423/429/503 answer, or an exception raised
+        before the request reached HubSpot (local rate limit, connect
+        timeout, refused connection). After a read timeout, a dropped
+        connection or any other 5xx the record may already exist.
+        """
+        if isinstance(response, (HubSpotRateLimitError, requests.ConnectTimeout)):
+            return False
+        if isinstance(response, requests.ConnectionError):
+            reason = getattr(response.args[0], 'reason', None) if response.args else None
+            return not isinstance(reason, NewConnectionError)
+        if isinstance(response, Exception):
+            return True
+        return getattr(response, 'status_code', None) not in HubSpotService.UNPROCESSED_STATUS_CODES
 
     # ========== UTILITY OPERATIONS ==========
 
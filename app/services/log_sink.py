@@ -0,0 +1,245 @@
+"""
+Write-behind sink for audit Log rows
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from flask import has_app_context
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.db.database import db
+from app.db.writer import sqlite_writer
+from app.models import Log
+
+logger = logging.getLogger(__name__)
+
+# Every row carries every column so the whole batch is one executemany INSERT
+LOG_COLUMNS = (
+    'user_id', 'session_id', 'chat_message_id', 'log_type', 'created_at',
+    'hubspot_id', 'sync_status', 'sync_error', 'synced_at',
+    'lead_status', 'deal_stage', 'lead_source', 'deal_amount', 'stage_reason',
+    'sync_attempts', 'next_retry_at', 'sync_object_type', 'sync_operation', 'sync_payload'
+)
+
+class LogSink:
+    """Queues Log rows in memory and writes them in bulk INSERTs
+
+    Rows are flushed by a background thread once ``LOG_SINK_MAX_BATCH`` rows
+    are queued or ``LOG_SINK_FLUSH_INTERVAL`` seconds have passed, and once
+    more at interpreter exit. With ``LOG_SINK_SYNCHRONOUS`` every write is
+    inserted and committed immediately (used by tests). Rows are written on
+    their own connection, so a write never commits or discards pending work
+    of the caller's session.
+
+    A batch that hits a transient error ("database is locked") is queued
+    again for the next flush, up to ``LOG_SINK_MAX_RETRIES`` times; in
+    synchronous mode the error is raised to the caller instead. A batch
+    that violates a constraint is retried row by row, so only the bad
+    rows are dropped.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._buffer = []
+        self._retries = []  # (attempts so far, rows) written again on the next flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = os.getpid()
+        self._enqueued = 0
+        self._written = 0
+        self._failed = 0
+        self._retried = 0
+        self._flushes = 0
+        self._last_flush_ms = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the sink to an application"""
+        app.config.setdefault('LOG_SINK_SYNCHRONOUS', False)
+        app.config.setdefault('LOG_SINK_MAX_BATCH', 200)
+        app.config.setdefault('LOG_SINK_FLUSH_INTERVAL', 1.0)
+        app.config.setdefault('LOG_SINK_MAX_RETRIES', 5)
+        app.extensions['log_sink'] = self
+        if self.app is None:
+            atexit.register(self.shutdown)
+        self.app = app
+
+    @property
+    def synchronous(self):
+        return self.app is None or self.app.config.get('LOG_SINK_SYNCHRONOUS', False)
+
+    @staticmethod
+    def build_row(user_id, session_id, message_id, log_type, hubspot_id=None, sync_status='synced',
+                  sync_error=None, **fields):
+        """Build a Log row dict (same defaults the blueprints' _create_log used)"""
+        now = datetime.utcnow()
+        row = dict.fromkeys(LOG_COLUMNS)
+        row.update(
+            user_id=user_id,
+            session_id=session_id,
+            chat_message_id=message_id,
+            log_type=log_type,
+            created_at=now,
+            hubspot_id=hubspot_id,
+            sync_status=sync_status,
+            sync_error=sync_error,
+            synced_at=now if sync_status == 'synced' else None,
+            sync_attempts=0
+        )
+        for key, value in fields.items():
+            if key not in LOG_COLUMNS:
+                raise TypeError(f'Unknown Log column: {key}')
+            row[key] = value
+        return row
+
+    def write(self, user_id, session_id, message_id, log_type, hubspot_id=None, sync_status='synced',
+              sync_error=None, **fields):
+        """Queue one Log row"""
+        self.write_many([self.build_row(
+            user_id, session_id, message_id, log_type, hubspot_id, sync_status, sync_error, **fields
+        )])
+
+    def write_many(self, rows):
+        """Queue several Log rows (one bulk INSERT when written synchronously)"""
+        if not rows:
+            return
+        if self.synchronous:
+            if self.app is None and not has_app_context():
+                raise RuntimeError('LogSink is not bound to an app (call init_app) and no app context is active')
+            self._insert(rows)
+            return
+
+        self._check_fork()
+        with self._lock:
+            self._buffer.extend(rows)
+            self._enqueued += len(rows)
+            full = len(self._buffer) >= self.app.config['LOG_SINK_MAX_BATCH']
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write everything queued so far"""
+        with self._flush_lock:
+            with self._lock:
+                retries, self._retries = self._retries, []
+                rows, self._buffer = self._buffer, []
+            for attempts, batch in retries:
+                self._insert(batch, attempts)
+            if rows:
+                self._insert(rows)
+
+    def shutdown(self):
+        """Stop the flusher thread and write what is left"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _insert(self, rows, attempts=0):
+        started = time.perf_counter()
+        written = failed = 0
+        done = 0  # rows written or dropped so far
+        try:
+            try:
+                self._in_app_context(self._execute, rows)
+                written = done = len(rows)
+            except IntegrityError as e:
+                # One bad row (e.g. a NULL session_id) must not take the rest of the batch with it
+                logger.warning(f"Log batch of {len(rows)} rows rejected ({e.orig}); writing it row by row")
+                for row in rows:
+                    try:
+                        self._in_app_context(self._execute, [row])
+                        written += 1
+                    except IntegrityError as row_error:
+                        failed += 1
+                        logger.error(f"Dropped {row['log_type']} log row of user {row['user_id']}: {row_error.orig}")
+                    done += 1
+        except OperationalError as e:
+            left = rows[done:]
+            if self.synchronous:
+                failed += len(left)
+                raise
+            if attempts < self.app.config.get('LOG_SINK_MAX_RETRIES', 5):
+                with self._lock:
+                    self._retries.append((attempts + 1, left))
+                    self._retried += len(left)
+                logger.warning(f"Log write failed ({e}); retrying {len(left)} rows on the next flush")
+            else:
+                failed += len(left)
+                logger.error(f"Dropped {len(left)} log rows after {attempts + 1} attempts: {e}")
+        except Exception as e:
+            failed += len(rows) - done
+            logger.error(f"Failed to write {len(rows) - done} log rows: {e}")
+        finally:
+            with self._lock:
+                self._written += written
+                self._failed += failed
+                self._flushes += 1
+                self._last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _in_app_context(self, fn, *args):
+        if has_app_context():
+            return fn(*args)
+        with self.app.app_context():
+            return fn(*args)
+
+    @staticmethod
+    def _execute(rows):
+        if sqlite_writer.enabled:
+            sqlite_writer.run(lambda connection: connection.execute(insert(Log), rows))
+            return
+        # Own connection and transaction: never commits or rolls back the caller's db.session
+        with db.engine.begin() as connection:
+            connection.execute(insert(Log), rows)
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # Rows queued before the fork belong to the parent process
+            with self._lock:
+                self._buffer = []
+                self._retries = []
+            self._thread = None
+            self._pid = os.getpid()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='log-sink-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        interval = self.app.config['LOG_SINK_FLUSH_INTERVAL']
+        while not self._stopping:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def get_metrics(self):
+        """Sink counters"""
+        with self._lock:
+            return {
+                'synchronous': self.synchronous,
+                'queued': len(self._buffer) + sum(len(rows) for _, rows in self._retries),
+                'enqueued': self._enqueued,
+                'written': self._written,
+                'failed': self._failed,
+                'retried': self._retried,
+                'flushes': self._flushes,
+                'last_flush_ms': round(self._last_flush_ms, 3)
+            }
+
+# Shared sink for every blueprint and service
+log_sink = LogSink()
@@ -0,0 +1,239 @@
+"""
+Outbox worker that replays failed HubSpot writes recorded on Log rows
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, func
+from app.db.database import db
+from app.models import Log
+from app.services.rate_limiter import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+class LogSyncWorker:
+    """Retries failed HubSpot writes through the batch endpoints
+
+    A failed create/update/delete that is worth retrying keeps its batch
+    input on the Log row (``sync_payload``) with a ``next_retry_at``. Each
+    pass claims due rows with one UPDATE (``ix_logs_sync_queue``), groups
+    them by user, object type and operation, and replays every group as
+    one batch call. Failures are rescheduled with jittered exponential
+    backoff until ``LOG_SYNC_MAX_ATTEMPTS``; then ``next_retry_at`` is
+    cleared and the row stays ``failed``.
+    """
+
+    def __init__(self, app=None):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._pid = os.getpid()
+        self._synced_at = deque(maxlen=10000)
+        self.replayed = 0
+        self.synced = 0
+        self.failed = 0
+        self.exhausted = 0
+        self.runs = 0
+        self.last_run_ms = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read settings and start the worker lazily on the first request"""
+        app.config.setdefault('LOG_SYNC_ENABLED', True)
+        app.config.setdefault('LOG_SYNC_INTERVAL', 30.0)
+        app.config.setdefault('LOG_SYNC_BATCH_SIZE', 200)
+        app.config.setdefault('LOG_SYNC_MAX_ATTEMPTS', 6)
+        app.config.setdefault('LOG_SYNC_BACKOFF_BASE', 30.0)
+        app.config.setdefault('LOG_SYNC_BACKOFF_MAX', 3600.0)
+        app.config.setdefault('LOG_SYNC_LEASE', 300)
+        app.extensions['log_sync'] = self
+        if app.config['LOG_SYNC_ENABLED']:
+            app.before_request(lambda: self.start(app))
+
+    def start(self, app):
+        """Start the replay thread for this process (no-op if it is running)"""
+        if self._thread is not None and self._thread.is_alive() and os.getpid() == self._pid:
+            return
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Threads do not survive fork; the child starts its own
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, args=(app,), name='log-sync', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the replay thread"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self, app):
+        while not self._stopping:
+            with app.app_context():
+                try:
+                    claimed = self.run_once(app)
+                except Exception as e:
+                    logger.error(f"Log sync error: {e}")
+                    db.session.rollback()
+                    claimed = 0
+                finally:
+                    db.session.remove()
+            if claimed < app.config['LOG_SYNC_BATCH_SIZE']:
+                self._wakeup.wait(app.config['LOG_SYNC_INTERVAL'])
+                self._wakeup.clear()
+
+    @staticmethod
+    def claim_due(limit, lease_seconds):
+        """Atomically claim up to ``limit`` rows whose retry is due"""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        due = (
+            select(Log.id)
+            .where(Log.sync_status.in_(('pending', 'failed')), Log.next_retry_at <= now)
+            .order_by(Log.next_retry_at)
+            .limit(limit)
+        )
+        # Pushing next_retry_at out is the lease: a crashed worker's rows come back after it
+        db.session.execute(
+            update(Log)
+            .where(Log.id.in_(due.scalar_subquery()))
+            .values(sync_claim=token, next_retry_at=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return Log.query.filter_by(sync_claim=token).order_by(Log.id).all()
+
+    def run_once(self, app=None):
+        """Claim and replay one batch of due rows (needs an app context); returns the count"""
+        config = (app or current_app).config
+        started = time.perf_counter()
+        rows = self.claim_due(config.get('LOG_SYNC_BATCH_SIZE', 200), config.get('LOG_SYNC_LEASE', 300))
+
+        groups = {}
+        for row in rows:
+            groups.setdefault((row.user_id, row.sync_object_type, row.sync_operation), []).append(row)
+        for (user_id, object_type, operation), group in groups.items():
+            outcomes = self._replay(user_id, object_type, operation, group)
+            self._record(group, outcomes, config)
+        db.session.commit()
+
+        self.runs += 1
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        return len(rows)
+
+    @staticmethod
+    def _replay(user_id, object_type, operation, rows):
+        """Send one group through its batch endpoint; returns one result dict per row"""
+        from app.services.hubspot_service import HubSpotService
+
+        try:
+            inputs = [json.loads(row.sync_payload) for row in rows]
+        except (TypeError, ValueError) as e:
+            return [{'success': False, 'error': f'Unreadable sync payload: {e}'} for _ in rows]
+
+        if operation == 'archive':
+            try:
+                response = HubSpotService.make_request(
+                    'POST', f'/crm/v3/objects/{object_type}/batch/archive', {'inputs': inputs}, user_id=user_id
+                )
+            except Exception as e:
+                return [{'success': False, 'error': str(e)} for _ in rows]
+            if response.status_code not in [200, 204]:
+                return [{'success': False, 'error': response.text} for _ in rows]
+            for entry in inputs:
+                HubSpotService._forget_object(object_type, entry.get('id'), user_id=user_id)
+            return [{'success': True, 'id': entry.get('id')} for entry in inputs]
+
+        if operation == 'create':
+            items = [(index, {**entry, 'objectWriteTraceId': str(index)}) for index, entry in enumerate(inputs)]
+            match_key = None
+        else:
+            items = list(enumerate(inputs))
+            match_key = lambda entry: str(entry.get('id'))
+
+        return HubSpotService.run_batch(
+            [(f'/crm/v3/objects/{object_type}/batch/{operation}', items)],
+            None, user_id=user_id, match_key=match_key,
+            object_type=object_type, created=operation == 'create', write_logs=False
+        )['results']
+
+    def _record(self, rows, outcomes, config):
+        now = datetime.utcnow()
+        for row, outcome in zip(rows, outcomes):
+            row.sync_claim = None
+            row.sync_attempts = (row.sync_attempts or 0) + 1
+            self.replayed += 1
+            if outcome['success']:
+                row.mark_as_synced(outcome.get('id') or row.hubspot_id)
+                self.synced += 1
+                self._synced_at.append(time.monotonic())
+                continue
+
+            row.sync_status = 'failed'
+            row.sync_error = outcome.get('error')
+            self.failed += 1
+            if outcome.get('final') or row.sync_attempts >= config.get('LOG_SYNC_MAX_ATTEMPTS', 6):
+                row.next_retry_at = None
+                self.exhausted += 1
+                logger.warning(f"Giving up on log {row.id} after {row.sync_attempts} attempts: {row.sync_error}")
+            else:
+                base = config.get('LOG_SYNC_BACKOFF_BASE', 30.0)
+                delay = max(base, backoff_delay(row.sync_attempts, base=base, cap=config.get('LOG_SYNC_BACKOFF_MAX', 3600.0)))
+                row.next_retry_at = now + timedelta(seconds=delay)
+
+    @staticmethod
+    def get_backlog():
+        """Rows waiting for a retry, by state and object type"""
+        now = datetime.utcnow()
+        retrying = Log.sync_status.in_(('pending', 'failed'))
+        due = db.session.query(func.count(Log.id)).filter(retrying, Log.next_retry_at <= now).scalar()
+        scheduled = dict(
+            db.session.query(Log.sync_object_type, func.count(Log.id))
+            .filter(retrying, Log.next_retry_at > now)
+            .group_by(Log.sync_object_type).all()
+        )
+        exhausted = db.session.query(func.count(Log.id)).filter(
+            Log.sync_status == 'failed', Log.sync_payload.isnot(None), Log.next_retry_at.is_(None)
+        ).scalar()
+        return {
+            'due': due,
+            'scheduled': sum(scheduled.values()),
+            'scheduled_by_object_type': scheduled,
+            'exhausted': exhausted
+        }
+
+    def get_metrics(self):
+        """Replay throughput (this process) and backlog size (database)"""
+        cutoff = time.monotonic() - 60
+        metrics = {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'runs': self.runs,
+            'replayed': self.replayed,
+            'synced': self.synced,
+            'failed_attempts': self.failed,
+            'exhausted': self.exhausted,
+            'synced_last_minute': sum(1 for at in self._synced_at if at >= cutoff),
+            'last_run_ms': round(self.last_run_ms, 3)
+        }
+        try:
+            metrics['backlog'] = self.get_backlog()
+        except Exception as e:
+            metrics['backlog'] = {'error': str(e)}
+        return metrics
+
+# Shared by every request in this process
+log_sync = LogSyncWorker()
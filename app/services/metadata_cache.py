@@ -0,0 +1,155 @@
+"""
+Portal-scoped cache for HubSpot schema metadata (properties, pipelines, owners)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+class MetadataCache:
+    """TTL cache with stale-while-revalidate, keyed by (portal, name)
+
+    ``portal`` is the token fingerprint, so every user sharing a HubSpot
+    token shares one copy. Within ``ttl`` an entry is served as-is; for a
+    further ``stale_ttl`` it is still served, but a background thread
+    re-fetches it. After that the caller waits for a fresh load. Failed
+    loads are never cached. Cached values are shared, treat them as read-only.
+
+    Each process has its own copy. ``apply_invalidations`` replays the
+    invalidations other processes recorded, so an admin invalidation reaches
+    every worker, not just the one that served it.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.remote_invalidations = 0
+        self._invalidation_id = 0  # Newest recorded invalidation applied here
+        self._invalidations_checked_at = None
+
+    def get_or_load(self, portal, name, loader, ttl, stale_ttl=0):
+        """Return the cached value for (portal, name), calling ``loader()`` when needed"""
+        key = (portal, name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < ttl + stale_ttl:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    refresh = key not in self._refreshing
+                    if refresh:
+                        self._refreshing.add(key)
+                else:
+                    refresh = None
+            else:
+                refresh = None
+            if refresh is None:
+                self.misses += 1
+
+        if refresh is None:
+            value = loader()
+            self._store(key, value)
+            return value
+
+        if refresh:
+            self._refresh_in_background(key, loader)
+        return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _refresh_in_background(self, key, loader):
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    value = loader()
+                self._store(key, value)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning(f"Metadata refresh failed for {key[1]}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name='hubspot-metadata-refresh', daemon=True).start()
+
+    def invalidate(self, portal=None, name=None):
+        """Drop entries for one portal and/or names starting with ``name``; returns the count"""
+        with self._lock:
+            keys = [
+                key for key in self._data
+                if (portal is None or key[0] == portal) and (name is None or key[1].startswith(name))
+            ]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def apply_invalidations(self, load_since, interval):
+        """Apply invalidations recorded after the last one seen, checking at most every ``interval`` seconds
+
+        ``load_since(last_id)`` returns ``(id, portal, name)`` rows with a larger id, oldest first.
+        Returns the number of entries dropped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            checked_at = self._invalidations_checked_at
+            if checked_at is not None and now - checked_at < interval:
+                return 0
+            self._invalidations_checked_at = now
+            since = self._invalidation_id
+
+        removed = 0
+        for invalidation_id, portal, name in load_since(since):
+            removed += self.invalidate(portal=portal, name=name)
+            with self._lock:
+                self._invalidation_id = max(self._invalidation_id, invalidation_id)
+                self.remote_invalidations += 1
+        return removed
+
+    def clear(self):
+        """Drop everything"""
+        self.invalidate()
+
+    def get_metrics(self):
+        """Cache counters"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._data),
+                'portals': len({key[0] for key in self._data}),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0,
+                'background_refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures,
+                'remote_invalidations': self.remote_invalidations
+            }
+
+# Shared by every request in this process
+metadata_cache = MetadataCache()
@@ -0,0 +1,164 @@
+"""
+Read-through cache for HubSpot CRM records (get_*_by_id)
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Object types whose records are read back by id
+CACHED_OBJECT_TYPES = ('contacts', 'companies', 'deals', 'notes', 'tasks')
+
+# Properties HubSpot returns whatever property list was requested
+ALWAYS_RETURNED = ('hs_object_id', 'createdate', 'lastmodifieddate', 'hs_lastmodifieddate')
+
+_NOT_FOUND = 'not_found'
+
+class ObjectCache:
+    """LRU/TTL cache of CRM records keyed by (portal, object type, id, property set)
+
+    Every record keeps one variant per property set it was fetched with
+    (``None`` = HubSpot's default set). A request for explicit properties is
+    also answered from any variant that holds all of them. A 404 is stored
+    as a negative entry. Bounded by record count and by approximate JSON size.
+    """
+
+    def __init__(self, app=None):
+        self.maxsize = 5000
+        self.max_bytes = 64 * 1024 * 1024
+        self._objects = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read size limits from the application config"""
+        app.config.setdefault('HUBSPOT_OBJECT_CACHE_TTL', 120)
+        app.config.setdefault('HUBSPOT_OBJECT_CACHE_NEGATIVE_TTL', 30)
+        app.config.setdefault('HUBSPOT_OBJECT_CACHE_SIZE', 5000)
+        app.config.setdefault('HUBSPOT_OBJECT_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        self.maxsize = app.config['HUBSPOT_OBJECT_CACHE_SIZE']
+        self.max_bytes = app.config['HUBSPOT_OBJECT_CACHE_MAX_BYTES']
+        app.extensions['hubspot_object_cache'] = self
+
+    @staticmethod
+    def property_key(properties):
+        """Normalized property set (None means HubSpot's defaults)"""
+        if not properties:
+            return None
+        if isinstance(properties, str):
+            properties = properties.split(',')
+        return tuple(sorted({prop.strip() for prop in properties if prop.strip()}))
+
+    def get(self, portal, object_type, object_id, properties=None):
+        """Return ``('hit', record)``, ``('not_found', message)`` or ``('miss', None)``"""
+        key = (portal, object_type, str(object_id))
+        wanted = self.property_key(properties)
+        now = time.monotonic()
+        with self._lock:
+            variants = self._objects.get(key)
+            if variants:
+                for prop_key in [k for k, (_, expires_at, _) in variants.items() if expires_at <= now]:
+                    self._bytes -= variants.pop(prop_key)[2]
+                if not variants:
+                    del self._objects[key]
+
+            if variants:
+                if _NOT_FOUND in variants:
+                    self._objects.move_to_end(key)
+                    self.negative_hits += 1
+                    return _NOT_FOUND, variants[_NOT_FOUND][0]
+
+                record = self._find(variants, wanted)
+                if record is not None:
+                    self._objects.move_to_end(key)
+                    self.hits += 1
+                    return 'hit', record
+
+            self.misses += 1
+            return 'miss', None
+
+    @staticmethod
+    def _find(variants, wanted):
+        if wanted in variants:
+            record = variants[wanted][0]
+            return {**record, 'properties': dict(record.get('properties') or {})}
+        if wanted is None:
+            return None
+
+        # Any variant holding every requested property can answer, trimmed to what was asked for
+        for record, _, _ in variants.values():
+            props = record.get('properties') or {}
+            if all(prop in props for prop in wanted):
+                return {
+                    **record,
+                    'properties': {k: v for k, v in props.items() if k in wanted or k in ALWAYS_RETURNED}
+                }
+        return None
+
+    def put(self, portal, object_type, object_id, record, ttl, properties=None):
+        """Store a record fetched (or written) with ``properties``"""
+        self._store((portal, object_type, str(object_id)), self.property_key(properties), record, ttl)
+
+    def put_not_found(self, portal, object_type, object_id, message, ttl):
+        """Remember that a record does not exist (replaces any cached variants)"""
+        key = (portal, object_type, str(object_id))
+        self.invalidate(portal, object_type, object_id)
+        self._store(key, _NOT_FOUND, message, ttl)
+
+    def _store(self, key, prop_key, value, ttl):
+        size = len(json.dumps(value, default=str))
+        with self._lock:
+            variants = self._objects.setdefault(key, {})
+            if prop_key != _NOT_FOUND and _NOT_FOUND in variants:
+                self._bytes -= variants.pop(_NOT_FOUND)[2]
+            old = variants.get(prop_key)
+            if old is not None:
+                self._bytes -= old[2]
+            variants[prop_key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            self._objects.move_to_end(key)
+
+            while self._objects and (len(self._objects) > self.maxsize or self._bytes > self.max_bytes):
+                _, evicted = self._objects.popitem(last=False)
+                self._bytes -= sum(entry[2] for entry in evicted.values())
+                self.evictions += 1
+
+    def invalidate(self, portal, object_type, object_id):
+        """Drop every cached variant of one record"""
+        with self._lock:
+            variants = self._objects.pop((portal, object_type, str(object_id)), None)
+            if variants:
+                self._bytes -= sum(entry[2] for entry in variants.values())
+
+    def clear(self):
+        """Drop everything"""
+        with self._lock:
+            self._objects.clear()
+            self._bytes = 0
+
+    def get_metrics(self):
+        """Hit rate and memory footprint"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'objects': len(self._objects),
+                'variants': sum(len(variants) for variants in self._objects.values()),
+                'maxsize': self.maxsize,
+                'approx_bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0,
+                'evictions': self.evictions
+            }
+
+# Shared by every request in this process
+object_cache = ObjectCache()
@@ -0,0 +1,236 @@
+"""
+Client-side rate limiting for HubSpot API calls
+"""
+
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from app.core.security import SecurityService
+
+class HubSpotRateLimitError(Exception):
+    """HubSpot rate limit still exceeded after backing off"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = int(math.ceil(retry_after)) if retry_after else 1
+
+class TokenBucketRateLimiter:
+    """Token bucket per HubSpot token, shared by every worker process
+
+    Bucket state lives in a small SQLite file; each reservation runs inside a
+    ``BEGIN IMMEDIATE`` transaction so all gunicorn workers draw from the same
+    bucket instead of each one guessing at the portal limit.
+    """
+
+    def __init__(self, db_path, capacity=100, interval_seconds=10.0, max_wait=60.0):
+        self.db_path = str(db_path)
+        self.capacity = float(capacity)
+        self.refill_rate = float(capacity) / float(interval_seconds)
+        self.max_wait = max_wait
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._acquired = 0
+        self._throttled = 0
+        self._wait_seconds = 0.0
+        self._penalties = 0
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS hubspot_rate_buckets (
+                    bucket_key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    capacity REAL NOT NULL,
+                    refill_rate REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    blocked_until REAL NOT NULL DEFAULT 0
+                )
+            ''')
+
+    def _connection(self):
+        """Per-thread (and per-process) SQLite connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return _Transaction(conn)
+
+    @staticmethod
+    def _key(token):
+        return SecurityService.token_fingerprint(token or '')
+
+    def _load(self, conn, key, now):
+        row = conn.execute(
+            'SELECT tokens, capacity, refill_rate, updated_at, blocked_until '
+            'FROM hubspot_rate_buckets WHERE bucket_key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            conn.execute(
+                'INSERT INTO hubspot_rate_buckets (bucket_key, tokens, capacity, refill_rate, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)', (key, self.capacity, self.capacity, self.refill_rate, now)
+            )
+            return self.capacity, self.capacity, self.refill_rate, 0.0
+
+        tokens, capacity, refill_rate, updated_at, blocked_until = row
+        tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_rate)
+        return tokens, capacity, refill_rate, blocked_until
+
+    def reserve(self, token):
+        """Take one request slot; returns seconds to wait first (0 means go)"""
+        key = self._key(token)
+        with self._connection() as conn:
+            now = time.time()
+            tokens, capacity, refill_rate, blocked_until = self._load(conn, key, now)
+
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / refill_rate
+
+            conn.execute(
+                'UPDATE hubspot_rate_buckets SET tokens = ?, updated_at = ? WHERE bucket_key = ?',
+                (tokens, now, key)
+            )
+            return wait
+
+    def acquire(self, token):
+        """Block until the token's bucket allows another request"""
+        waited = 0.0
+        while True:
+            wait = self.reserve(token)
+            if wait <= 0:
+                with self._stats_lock:
+                    self._acquired += 1
+                    self._wait_seconds += waited
+                    if waited:
+                        self._throttled += 1
+                return waited
+            if waited + wait > self.max_wait:
+                raise HubSpotRateLimitError(
+                    f'HubSpot rate limit: would wait more than {self.max_wait:.0f}s for a request slot',
+                    retry_after=wait
+                )
+            time.sleep(wait)
+            waited += wait
+
+    def observe(self, token, headers):
+        """Adopt HubSpot's X-HubSpot-RateLimit-* view of the bucket"""
+        maximum = _header_number(headers, 'X-HubSpot-RateLimit-Max')
+        interval_ms = _header_number(headers, 'X-HubSpot-RateLimit-Interval-Milliseconds')
+        remaining = _header_number(headers, 'X-HubSpot-RateLimit-Remaining')
+        if maximum is None and remaining is None:
+            return
+
+        key = self._key(token)
+        with self._connection() as conn:
+            now = time.time()
+            tokens, capacity, refill_rate, _ = self._load(conn, key, now)
+            if maximum:
+                capacity = maximum
+                if interval_ms:
+                    refill_rate = maximum / (interval_ms / 1000.0)
+            if remaining is not None:
+                # The server is authoritative, but only ever tighten our estimate
+                tokens = min(tokens, remaining)
+            conn.execute(
+                'UPDATE hubspot_rate_buckets SET tokens = ?, capacity = ?, refill_rate = ?, updated_at = ? '
+                'WHERE bucket_key = ?', (min(tokens, capacity), capacity, refill_rate, now, key)
+            )
+
+    def penalize(self, token, delay):
+        """Pause every worker using this token for ``delay`` seconds (after a 429)"""
+        key = self._key(token)
+        with self._connection() as conn:
+            now = time.time()
+            self._load(conn, key, now)
+            conn.execute(
+                'UPDATE hubspot_rate_buckets SET tokens = 0, updated_at = ?, '
+                'blocked_until = MAX(blocked_until, ?) WHERE bucket_key = ?',
+                (now, now + delay, key)
+            )
+        with self._stats_lock:
+            self._penalties += 1
+
+    def get_metrics(self):
+        """Limiter counters for this process"""
+        with self._stats_lock:
+            return {
+                'acquired': self._acquired,
+                'throttled': self._throttled,
+                'wait_seconds_total': round(self._wait_seconds, 3),
+                'rate_limited_responses': self._penalties,
+                'capacity': self.capacity,
+                'refill_per_second': self.refill_rate
+            }
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` around a block"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+def _header_number(headers, name):
+    value = headers.get(name) if headers else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, retry_after=None, base=0.5, cap=30.0):
+    """Jittered exponential backoff, never shorter than Retry-After"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    server_delay = parse_retry_after(retry_after)
+    if server_delay is not None:
+        delay = server_delay + random.uniform(0, base)
+    return delay
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(db_path, capacity=100, interval_seconds=10.0, max_wait=60.0):
+    """Shared limiter instance for a state file"""
+    with _limiters_lock:
+        limiter = _limiters.get(str(db_path))
+        if limiter is None:
+            limiter = TokenBucketRateLimiter(db_path, capacity, interval_seconds, max_wait)
+            _limiters[str(db_path)] = limiter
+        return limiter
+
+def get_rate_limiter_metrics():
+    """Metrics for every limiter created in this process"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [dict(limiter.get_metrics(), state_file=Path(limiter.db_path).name) for limiter in limiters]
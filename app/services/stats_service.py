@@ -0,0 +1,103 @@
+"""
+Dashboard statistics served from the stats_rollups table
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.db.database import db
+from app.models import StatsRollup
+from app.db.rollups import TOTAL_BUCKET
+
+class StatsService:
+    """Reads pre-aggregated counts (see app.db.rollups)
+
+    Every query is bounded by the number of buckets asked for, the number
+    of users and the number of log types/statuses, never by the size of
+    the source tables. The rollups only hold per-user rows; each query
+    sums them into the user's and everyone's figures in one pass.
+    """
+
+    @staticmethod
+    def _empty():
+        return {
+            'sessions': 0,
+            'messages': 0,
+            'logs': {'total': 0, 'by_type': {}, 'by_status': {}, 'success_rate': None},
+            'hubspot_objects_per_day': [],
+            'logs_per_hour': []
+        }
+
+    @staticmethod
+    def _add_totals(summary, metric, log_type, sync_status, count):
+        if metric in ('sessions', 'messages'):
+            summary[metric] += count
+            return
+        logs = summary['logs']
+        logs['total'] += count
+        logs['by_type'][log_type] = logs['by_type'].get(log_type, 0) + count
+        logs['by_status'][sync_status] = logs['by_status'].get(sync_status, 0) + count
+
+    @staticmethod
+    def _summed(user_id, granularity, columns, where=()):
+        """``(scopes, *columns, count)`` rows: counts summed for ``user_id`` and for everyone else
+
+        ``scopes`` names the summaries a row adds to: ('user', 'global') or ('global',).
+        """
+        mine = (StatsRollup.user_id == user_id).label('mine')
+        rows = db.session.query(mine, *columns, func.sum(StatsRollup.count)).filter(
+            StatsRollup.granularity == granularity, *where
+        ).group_by(mine, *columns).all()
+        return [(('user', 'global') if row[0] else ('global',), *row[1:]) for row in rows]
+
+    @staticmethod
+    def get_overview(user_id, days=30, hours=24, now=None):
+        """Totals, log breakdowns and recent series for one user and for all users"""
+        now = now or datetime.utcnow()
+        user_id = int(user_id)
+        summaries = {'user': StatsService._empty(), 'global': StatsService._empty()}
+
+        totals = StatsService._summed(
+            user_id, 'total', (StatsRollup.metric, StatsRollup.log_type, StatsRollup.sync_status),
+            where=(StatsRollup.bucket_start == datetime.fromisoformat(TOTAL_BUCKET),)
+        )
+        for scopes, metric, log_type, sync_status, count in totals:
+            for name in scopes:
+                StatsService._add_totals(summaries[name], metric, log_type, sync_status, count)
+
+        for summary in summaries.values():
+            logs = summary['logs']
+            synced = logs['by_status'].get('synced', 0)
+            failed = logs['by_status'].get('failed', 0)
+            logs['success_rate'] = round(synced / (synced + failed), 4) if synced + failed else None
+
+        # HubSpot objects created per day (synced creates; reads, updates and deletes are not counted)
+        first_day = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        daily = StatsService._summed(
+            user_id, 'day', (StatsRollup.bucket_start, StatsRollup.log_type),
+            where=(StatsRollup.metric == 'objects', StatsRollup.bucket_start >= first_day)
+        )
+        per_day = {name: {} for name in summaries}
+        for scopes, bucket_start, log_type, count in daily:
+            for name in scopes:
+                day = per_day[name].setdefault(bucket_start, {'date': bucket_start.date().isoformat(),
+                                                              'total': 0, 'by_type': {}})
+                day['total'] += count
+                day['by_type'][log_type] = day['by_type'].get(log_type, 0) + count
+
+        first_hour = (now - timedelta(hours=hours - 1)).replace(minute=0, second=0, microsecond=0)
+        hourly = StatsService._summed(
+            user_id, 'hour', (StatsRollup.bucket_start,),
+            where=(StatsRollup.metric == 'logs', StatsRollup.bucket_start >= first_hour)
+        )
+        per_hour = {name: {} for name in summaries}
+        for scopes, bucket_start, count in hourly:
+            for name in scopes:
+                per_hour[name][bucket_start] = per_hour[name].get(bucket_start, 0) + count
+
+        for name, summary in summaries.items():
+            summary['hubspot_objects_per_day'] = [day for _, day in sorted(per_day[name].items()) if day['total']]
+            summary['logs_per_hour'] = [
+                {'hour': hour.isoformat(), 'count': count} for hour, count in sorted(per_hour[name].items()) if count
+            ]
+
+        return summaries
@@ -0,0 +1,449 @@
+"""
+WhatsApp webhook ingestion: a durable event queue drained by background workers
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, update, select, delete, func, or_, and_, event, inspect
+from sqlalchemy.exc import IntegrityError
+from app.core.security import SecurityService
+from app.db.database import db, begin_write
+from app.models import User, ChatSession, ChatMessage, Log, WebhookEvent
+from app.services.cache import RecentIdFilter, TTLCache
+from app.services.log_sink import log_sink
+from app.services.rate_limiter import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+# Provider message ids already stored by this process (skips most redelivered duplicates)
+recent_message_ids = RecentIdFilter(maxsize=10000)
+
+# E.164 phone -> (user_id, active session_id); (None, None) remembers unknown senders
+sender_cache = TTLCache(maxsize=10000, ttl=60)
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_user(mapper, connection, user):
+    """Drop cached lookups for a user's old and new numbers"""
+    history = inspect(user).attrs.phone_number_normalized.history
+    for phone in {user.phone_number_normalized, *(history.deleted or ())} - {None}:
+        sender_cache.invalidate(phone)
+    sender_cache.invalidate_where(lambda phone, entry: entry[0] == user.id)
+
+@event.listens_for(ChatSession, 'after_update')
+@event.listens_for(ChatSession, 'after_delete')
+def _forget_session(mapper, connection, session):
+    """Drop cached lookups pointing at a session that was closed or removed"""
+    sender_cache.invalidate_where(lambda phone, entry: entry[1] == session.id)
+
+class WhatsAppService:
+    """Service for WhatsApp webhook ingestion"""
+
+    @staticmethod
+    def enqueue(payload, source='whatsapp'):
+        """Store a raw webhook body with one INSERT/commit and wake the workers"""
+        result = db.session.execute(insert(WebhookEvent).values(
+            source=source,
+            payload=payload,
+            status='pending',
+            attempts=0,
+            received_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        webhook_workers.notify(current_app._get_current_object())
+        return result.inserted_primary_key[0]
+
+    @staticmethod
+    def claim_batch(limit, visibility_timeout):
+        """Atomically claim up to ``limit`` due events (also re-claims ones a dead worker left behind)"""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        candidates = select(WebhookEvent.id).where(or_(
+            and_(
+                WebhookEvent.status == 'pending',
+                or_(WebhookEvent.next_attempt_at.is_(None), WebhookEvent.next_attempt_at <= now)
+            ),
+            and_(
+                WebhookEvent.status == 'processing',
+                WebhookEvent.claimed_at < now - timedelta(seconds=visibility_timeout)
+            )
+        )).order_by(WebhookEvent.id).limit(limit)
+
+        # Single UPDATE statement, so two workers (or processes) never claim the same row
+        db.session.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(candidates.scalar_subquery()))
+            .values(status='processing', claim_token=token, claimed_at=now, attempts=WebhookEvent.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return WebhookEvent.query.filter_by(claim_token=token).order_by(WebhookEvent.id).all()
+
+    @staticmethod
+    def process_batch(events, max_attempts=5, backoff_base=2.0, backoff_max=300.0):
+        """Process claimed events; returns ``(done, failed, lags_in_seconds)``
+
+        A failed event goes back to pending with a ``next_attempt_at`` after a
+        jittered exponential backoff (at least ``backoff_base`` seconds), so a
+        persistent error does not burn through ``max_attempts`` in one go.
+        """
+        done, failed, lags = 0, 0, []
+        for event in events:
+            try:
+                WhatsAppService.process_event(event)
+                event.status = 'done'
+                event.error = None
+                event.processed_at = datetime.utcnow()
+                lags.append((event.processed_at - event.received_at).total_seconds())
+                done += 1
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error processing WhatsApp webhook event {event.id}: {e}")
+                event.error = str(e)
+                if event.attempts >= max_attempts:
+                    event.status = 'failed'
+                    event.next_attempt_at = None
+                else:
+                    event.status = 'pending'
+                    delay = max(backoff_base, backoff_delay(event.attempts, base=backoff_base, cap=backoff_max))
+                    event.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                failed += 1
+            event.claim_token = None
+            # Finalize each event on its own so a later failure cannot roll it back
+            db.session.commit()
+        return done, failed, lags
+
+    @staticmethod
+    def process_event(event):
+        """Process every message in one stored webhook payload"""
+        data = json.loads(event.payload)
+        messages = [
+            message
+            for entry in data.get('entry', [])
+            for change in entry.get('changes', [])
+            for message in change.get('value', {}).get('messages', [])
+        ]
+
+        if not messages:
+            logger.warning(f"No messages found in webhook event {event.id}")
+            return
+
+        stats = WhatsAppService.ingest_messages(messages)
+        if stats['failed']:
+            # Stored messages are deduplicated on retry, so only the failed ones are redone
+            raise ValueError(f"{stats['failed']} of {len(messages)} messages failed")
+
+    @staticmethod
+    def ingest_messages(messages):
+        """Store a payload's messages in one transaction
+
+        Senders and their active sessions come from ``sender_cache``; the
+        ones it does not know are resolved with one query each. Messages
+        are inserted together inside a savepoint; if that fails (e.g. a
+        redelivery the in-memory filter forgot), each one is retried in its
+        own savepoint so one bad message cannot sink the rest. Returns counts of
+        ``stored``, ``duplicates``, ``unknown_sender`` and ``failed``.
+        """
+        stats = {'stored': 0, 'duplicates': 0, 'unknown_sender': 0, 'failed': 0}
+
+        # Repeats inside the payload and recently stored ids never reach the database
+        batch, batch_ids = [], set()
+        for message in messages:
+            message_id = message.get('id')
+            if message_id and (message_id in batch_ids or message_id in recent_message_ids):
+                stats['duplicates'] += 1
+                continue
+            if message_id:
+                batch_ids.add(message_id)
+            batch.append(message)
+
+        # Take the write lock before the lookups; the savepoints below need a real transaction
+        begin_write(db.session)
+
+        # Resolve senders to (user, active session): cache first, one query each for the rest
+        phones = {SecurityService.normalize_phone_number(message.get('from')) for message in batch} - {None}
+        senders = {}
+        for phone in phones:
+            entry = sender_cache.get(phone)
+            if entry is not None:
+                senders[phone] = entry
+
+        missing = phones - set(senders)
+        if missing:
+            user_ids = dict(db.session.execute(
+                select(User.phone_number_normalized, User.id).where(User.phone_number_normalized.in_(missing))
+            ).all())
+            session_ids = {}
+            if user_ids:
+                for session_id, user_id in db.session.execute(
+                    select(ChatSession.id, ChatSession.user_id)
+                    .where(ChatSession.user_id.in_(set(user_ids.values())), ChatSession.status == 'active')
+                    .order_by(ChatSession.id)
+                ):
+                    session_ids.setdefault(user_id, session_id)
+            for phone in missing:
+                user_id = user_ids.get(phone)
+                if user_id is None:
+                    logger.warning(f"No user found for phone number: {phone}")
+                senders[phone] = (user_id, session_ids.get(user_id))
+
+        # Create an active chat session for senders that have none
+        new_sessions = {
+            user_id: ChatSession(user_id=user_id, started_at=datetime.utcnow(), status='active')
+            for user_id, session_id in senders.values() if user_id is not None and session_id is None
+        }
+        if new_sessions:
+            db.session.add_all(new_sessions.values())
+            db.session.flush()
+            for phone, (user_id, session_id) in senders.items():
+                if user_id in new_sessions:
+                    senders[phone] = (user_id, new_sessions[user_id].id)
+            for session in new_sessions.values():
+                logger.info(f"Created new chat session {session.id} for user {session.user_id}")
+
+        # Build message rows; bad input is isolated here already
+        rows = []
+        for message in batch:
+            user_id, session_id = senders.get(SecurityService.normalize_phone_number(message.get('from')), (None, None))
+            if user_id is None:
+                stats['unknown_sender'] += 1
+                continue
+            try:
+                rows.append((user_id, session_id, {
+                    'session_id': session_id,
+                    'message_text': message.get('text', {}).get('body', ''),
+                    'timestamp': datetime.fromtimestamp(int(message.get('timestamp'))),
+                    'forwarded_from': message.get('from'),
+                    'external_message_id': message.get('id')
+                }))
+            except (TypeError, ValueError, AttributeError) as e:
+                logger.error(f"Invalid WhatsApp message {message.get('id')}: {e}")
+                stats['failed'] += 1
+
+        stored = WhatsAppService._insert_messages(rows, stats)
+
+        # Log the incoming messages in the same transaction
+        if stored:
+            db.session.execute(insert(Log), [
+                log_sink.build_row(
+                    user_id=user_id,
+                    session_id=session_id,
+                    message_id=chat_message.id,
+                    log_type='whatsapp_message',
+                    hubspot_id=chat_message.external_message_id,
+                    sync_status='synced'
+                )
+                for user_id, session_id, chat_message in stored
+            ])
+        db.session.commit()
+
+        for phone, entry in senders.items():
+            sender_cache.set(phone, entry)
+        for _, _, chat_message in stored:
+            if chat_message.external_message_id:
+                recent_message_ids.add(chat_message.external_message_id)
+        stats['stored'] = len(stored)
+
+        # Here you would typically:
+        # 1. Send message to AI for analysis
+        # 2. AI determines what HubSpot actions to take
+        # 3. Execute HubSpot API calls based on AI analysis
+        # 4. Send response back to user via Twilio
+        return stats
+
+    @staticmethod
+    def _insert_messages(rows, stats):
+        """Insert ChatMessage rows: all at once, else one savepoint per message"""
+        try:
+            with db.session.begin_nested():
+                messages = [ChatMessage(**values) for _, _, values in rows]
+                db.session.add_all(messages)
+                db.session.flush()
+            return [(user_id, session_id, message) for (user_id, session_id, _), message in zip(rows, messages)]
+        except Exception as e:
+            logger.info(f"Bulk insert of {len(rows)} messages failed ({e}), retrying one by one")
+
+        stored = []
+        for user_id, session_id, values in rows:
+            message_id = values['external_message_id']
+            try:
+                with db.session.begin_nested():
+                    chat_message = ChatMessage(**values)
+                    db.session.add(chat_message)
+                    db.session.flush()
+                stored.append((user_id, session_id, chat_message))
+            except IntegrityError:
+                # The unique index caught a delivery stored by another worker
+                recent_message_ids.mark_duplicate(message_id)
+                logger.info(f"Skipping duplicate message {message_id}")
+                stats['duplicates'] += 1
+            except Exception as e:
+                logger.error(f"Error storing WhatsApp message {message_id}: {e}")
+                stats['failed'] += 1
+        return stored
+
+    @staticmethod
+    def purge_processed(retention_hours):
+        """Delete finished events older than the retention window"""
+        cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+        result = db.session.execute(
+            delete(WebhookEvent)
+            .where(WebhookEvent.status == 'done', WebhookEvent.processed_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def get_queue_stats():
+        """Queue depth per status and age of the oldest pending event"""
+        counts = dict(
+            db.session.query(WebhookEvent.status, func.count(WebhookEvent.id))
+            .group_by(WebhookEvent.status).all()
+        )
+        oldest = db.session.query(func.min(WebhookEvent.received_at)).filter(
+            WebhookEvent.status == 'pending'
+        ).scalar()
+        return {
+            'pending': counts.get('pending', 0),
+            'processing': counts.get('processing', 0),
+            'failed': counts.get('failed', 0),
+            'done': counts.get('done', 0),
+            'oldest_pending_age_seconds': round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0
+        }
+
+class WebhookWorkerPool:
+    """Background threads that drain the webhook queue in batches
+
+    Started lazily by the first enqueue in each process (``WEBHOOK_WORKERS``
+    threads; 0 disables them, e.g. when ``scripts/run_webhook_worker.py``
+    runs as a separate process).
+    """
+
+    def __init__(self):
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._pid = os.getpid()
+        self._lags = deque(maxlen=1000)
+        self._last_purge = 0.0
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        atexit.register(self.stop)
+
+    def notify(self, app):
+        """Make sure workers are running and wake one up"""
+        self.start(app)
+        self._wakeup.set()
+
+    def start(self, app, workers=None):
+        """Start the worker threads for this process (no-op if already running)"""
+        workers = app.config.get('WEBHOOK_WORKERS', 2) if workers is None else workers
+        if workers <= 0:
+            return
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Threads do not survive fork; the child starts its own
+                self._threads = []
+                self._pid = os.getpid()
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            self._stopping = False
+            while len(self._threads) < workers:
+                thread = threading.Thread(
+                    target=self._run, args=(app,), name=f'webhook-worker-{len(self._threads)}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Ask the workers to finish their current batch and exit"""
+        self._stopping = True
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _run(self, app):
+        poll_interval = app.config.get('WEBHOOK_POLL_INTERVAL', 1.0)
+        while not self._stopping:
+            with app.app_context():
+                try:
+                    handled = self.run_once(app)
+                except Exception as e:
+                    logger.error(f"Webhook worker error: {e}")
+                    db.session.rollback()
+                    handled = 0
+                finally:
+                    db.session.remove()
+            if not handled:
+                self._wakeup.wait(poll_interval)
+                self._wakeup.clear()
+
+    def run_once(self, app=None):
+        """Claim and process one batch (needs an app context); returns the batch size"""
+        config = (app or current_app).config
+        recent_message_ids.maxsize = config.get('WEBHOOK_DEDUP_CACHE_SIZE', 10000)
+        sender_cache.maxsize = config.get('WEBHOOK_SENDER_CACHE_SIZE', 10000)
+        sender_cache.ttl = config.get('WEBHOOK_SENDER_CACHE_TTL', 60)
+        events = WhatsAppService.claim_batch(
+            config.get('WEBHOOK_BATCH_SIZE', 50),
+            config.get('WEBHOOK_VISIBILITY_TIMEOUT', 300)
+        )
+        if events:
+            done, failed, lags = WhatsAppService.process_batch(
+                events, config.get('WEBHOOK_MAX_ATTEMPTS', 5),
+                backoff_base=config.get('WEBHOOK_BACKOFF_BASE', 2.0),
+                backoff_max=config.get('WEBHOOK_BACKOFF_MAX', 300.0)
+            )
+            self.processed += done
+            self.failed += failed
+            self.batches += 1
+            self._lags.extend(lags)
+
+        if time.monotonic() - self._last_purge > 600:
+            self._last_purge = time.monotonic()
+            WhatsAppService.purge_processed(config.get('WEBHOOK_RETENTION_HOURS', 24))
+        return len(events)
+
+    def drain(self, app=None):
+        """Process until the queue is empty (tests and one-off scripts)"""
+        total = 0
+        while True:
+            handled = self.run_once(app)
+            if not handled:
+                return total
+            total += handled
+
+    def get_metrics(self):
+        """Queue depth (from the database) and processing lag (this process)"""
+        lags = sorted(self._lags)
+        metrics = {
+            'workers': sum(1 for thread in self._threads if thread.is_alive()),
+            'processed': self.processed,
+            'failed_attempts': self.failed,
+            'batches': self.batches,
+            'lag_p50_seconds': round(lags[len(lags) // 2], 3) if lags else 0,
+            'lag_p95_seconds': round(lags[int(len(lags) * 0.95)], 3) if lags else 0,
+            'lag_max_seconds': round(lags[-1], 3) if lags else 0
+        }
+        metrics['dedup'] = recent_message_ids.get_metrics()
+        metrics['sender_cache'] = sender_cache.get_metrics()
+        try:
+            metrics['queue'] = WhatsAppService.get_queue_stats()
+        except Exception as e:
+            metrics['queue'] = {'error': str(e)}
+        return metrics
+
+# Shared by the webhook blueprint and the standalone worker script
+webhook_workers = WebhookWorkerPool()
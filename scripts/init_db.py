@@ -14,6 +14,7 @@ if str(parent_dir) not in sys.path:
 
 from app.main import create_app
 from app.db.database import db
+from app.db.migrations import upgrade_database
 from app.models import User, ChatSession, ChatMessage, Log
 
 def init_db():
@@ -21,8 +22,9 @@ def init_db():
     app = create_app()
 
     with app.app_context():
-        # Create all tables
-        db.create_all()
+        # Create all tables, then bring existing ones up to date
+        for step in upgrade_database():
+            print(f"Migrated: {step}")
 
         # Check if we need to create a test user
         if not User.query.filter_by(username='testuser').first():
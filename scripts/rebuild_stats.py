@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Rebuild the stats rollups behind GET /api/stats/overview
+
+The rollups are kept up to date by triggers; this recomputes them from
+the sessions, messages and logs tables (first backfill of an existing
+database, or repair after an import that bypassed the triggers).
+Use --prune-hourly-days to drop hourly rows older than N days.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to Python path so we can import app modules
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.main import create_app
+from app.db.database import db
+from app.db.migrations import run_migrations
+from app.db.rollups import rebuild_rollups, prune_hourly
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the stats rollup tables')
+    parser.add_argument('--prune-hourly-days', type=int, default=None,
+                        help='Only drop hourly rows older than this many days (no rebuild)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        with db.engine.begin() as connection:
+            if args.prune_hourly_days is not None:
+                before = datetime.utcnow() - timedelta(days=args.prune_hourly_days)
+                print(f"hourly rollups: {prune_hourly(connection, before)} rows pruned")
+                return
+            print(f"stats rollups: {rebuild_rollups(connection)} rows written")
+
+if __name__ == '__main__':
+    main()
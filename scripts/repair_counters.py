@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Recompute the denormalized message/log counters
+
+The counters on chat_sessions and chat_messages are kept up to date by
+triggers; this recounts them from the child tables after manual edits
+or an import that bypassed the triggers. Use --check to only report.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to Python path so we can import app modules
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.main import create_app
+from app.db.database import db
+from app.db.migrations import run_migrations
+from app.db.counters import count_drift, repair_counters
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute chat session and message counters')
+    parser.add_argument('--check', action='store_true', help='Report drifted rows without fixing them')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        with db.engine.begin() as connection:
+            if args.check:
+                drift = count_drift(connection)
+                for counter, rows in drift.items():
+                    print(f"{counter}: {rows} rows out of date")
+                sys.exit(1 if any(drift.values()) else 0)
+            for counter, rows in repair_counters(connection).items():
+                print(f"{counter}: {rows} rows fixed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Standalone WhatsApp webhook worker
+
+Drains the webhook_events queue outside the web process. Run it with
+WEBHOOK_WORKERS=0 on the web servers, or use --once from cron.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to Python path so we can import app modules
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.main import create_app
+from app.db.database import db
+from app.db.migrations import run_migrations
+from app.services.whatsapp_service import webhook_workers
+
+def main():
+    parser = argparse.ArgumentParser(description='Process queued WhatsApp webhook events')
+    parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+    args = parser.parse_args()
+
+    app = create_app()
+    poll_interval = app.config.get('WEBHOOK_POLL_INTERVAL', 1.0)
+
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        if args.once:
+            print(f"Processed {webhook_workers.drain(app)} webhook events")
+            return
+
+        print("Webhook worker running (Ctrl+C to stop)")
+        try:
+            while True:
+                if not webhook_workers.run_once(app):
+                    time.sleep(poll_interval)
+                db.session.remove()
+        except KeyboardInterrupt:
+            print("Stopped")
+
+if __name__ == '__main__':
+    main()
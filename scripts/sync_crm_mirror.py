@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Sync the local CRM mirror
+
+Without options, brings every portal (the HUBSPOT_ACCESS_TOKEN portal and
+every active user's) up to date: a full sweep the first time, then only
+records modified since the last sync. Use --full to re-sweep.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to Python path so we can import app modules
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.main import create_app
+from app.db.database import db
+from app.db.migrations import run_migrations
+from app.services.crm_mirror import crm_mirror, MIRRORED_OBJECT_TYPES
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync HubSpot records into the local CRM mirror')
+    parser.add_argument('--full', action='store_true', help='Full sweep instead of an incremental pull')
+    parser.add_argument('--object-type', action='append', choices=MIRRORED_OBJECT_TYPES,
+                        help='Object type to sync (repeatable; default all)')
+    parser.add_argument('--user-id', type=int, default=None, help="Only this user's portal")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        targets = {None: args.user_id} if args.user_id else crm_mirror.targets()
+        failed = False
+        for user_id in targets.values():
+            results = crm_mirror.sync(user_id, object_types=args.object_type, full=args.full)
+            for object_type, result in results.items():
+                if 'error' in result:
+                    failed = True
+                    print(f"user {user_id} {object_type}: failed - {result['error']}")
+                else:
+                    print(f"user {user_id} {object_type}: {result['mode']}, "
+                          f"{result['upserted']} upserted, {result['archived']} archived")
+        sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: AsyncHubSpotService vs thread-per-call HubSpotService
+
+Runs a local asyncio stand-in HubSpot server that answers every request after
+a fixed latency, then measures throughput at several concurrency levels for
+    - sync:  HubSpotService.get_contact_by_id on a worker thread pool
+    - async: AsyncHubSpotService.get_contact_by_id, all calls on one event loop
+
+Usage:
+    python testers/bench_async_hubspot.py [--latency-ms 150] [--levels 50,200,500] [--threads 16]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.config import TestingConfig
+from app.main import create_app
+from app.services.hubspot_service import HubSpotService
+from app.services.async_hubspot_service import AsyncHubSpotService
+from app.services.object_cache import object_cache
+
+BODY = json.dumps({'id': '1', 'properties': {'email': 'bench@example.com'}}).encode()
+
+async def handle_connection(reader, writer, latency):
+    """Minimal HTTP/1.1 keep-alive responder"""
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(latency)
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                b'Content-Length: ' + str(len(BODY)).encode() + b'\r\n\r\n' + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+def start_stand_in_server(latency):
+    """Run the stand-in server on its own loop/thread and return its port"""
+    ready = threading.Event()
+    state = {}
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(asyncio.start_server(
+            lambda r, w: handle_connection(r, w, latency), '127.0.0.1', 0, backlog=2048
+        ))
+        state['port'] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return state['port']
+
+def bench_sync(app, concurrency, threads):
+    def one_call(i):
+        with app.app_context():
+            HubSpotService.get_contact_by_id(str(i))
+
+    object_cache.clear()  # every call goes to the stand-in server
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_call, range(concurrency)))
+    return concurrency / (time.perf_counter() - start)
+
+def bench_async(app, concurrency):
+    async def run_all():
+        calls = [AsyncHubSpotService.get_contact_by_id(str(i)) for i in range(concurrency)]
+        start = time.perf_counter()
+        await asyncio.gather(*calls)
+        elapsed = time.perf_counter() - start
+        await AsyncHubSpotService.close_client()
+        return concurrency / elapsed
+
+    object_cache.clear()
+    with app.app_context():
+        return asyncio.run(run_all())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=150.0)
+    parser.add_argument('--levels', default='50,200,500')
+    parser.add_argument('--threads', type=int, default=16, help='worker threads for the sync baseline')
+    args = parser.parse_args()
+
+    port = start_stand_in_server(args.latency_ms / 1000)
+
+    class BenchConfig(TestingConfig):
+        HUBSPOT_API_URL = f'http://127.0.0.1:{port}'
+        HUBSPOT_ACCESS_TOKEN = 'pat-bench-token'
+        HUBSPOT_RATE_LIMIT_ENABLED = False
+        HUBSPOT_POOL_SIZE = args.threads
+        HUBSPOT_ASYNC_MAX_CONNECTIONS = 500
+
+    app = create_app(BenchConfig)
+
+    print(f"stand-in latency {args.latency_ms}ms, sync baseline uses {args.threads} threads\n")
+    print(f"{'concurrent':>10}  {'sync req/s':>12}  {'async req/s':>12}  {'speedup':>8}")
+    for level in [int(level) for level in args.levels.split(',')]:
+        sync_rps = bench_sync(app, level, args.threads)
+        async_rps = bench_async(app, level)
+        print(f"{level:>10}  {sync_rps:>12.1f}  {async_rps:>12.1f}  {async_rps / sync_rps:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
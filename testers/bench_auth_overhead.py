@@ -0,0 +1,81 @@
+"""
+Benchmark: per-request authentication overhead
+
+Compares, inside a Flask test request context carrying a JSON body:
+    - before: the old per-blueprint authenticate_from_body (parse body, HS256 decode every call)
+    - after:  the before_request stage (parse once, verified-claims LRU keyed by token digest)
+
+Usage:
+    python testers/bench_auth_overhead.py [--requests 20000] [--tokens 50]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+import jwt
+from flask import Flask, request, current_app
+from app.core.auth_body import register_authentication, authenticate_from_body, claims_cache
+
+SECRET = 'bench-jwt-secret'
+
+def legacy_authenticate_from_body():
+    """The copy that used to live in contacts.py / companies.py"""
+    token = request.json.get('token') if request.is_json else request.form.get('token')
+    if not token:
+        return None
+    decoded = jwt.decode(token, current_app.config.get('JWT_SECRET_KEY'), algorithms=['HS256'])
+    return decoded.get('sub')
+
+def run(app, bodies, authenticate, hook):
+    timings = []
+    for body in bodies:
+        start = time.perf_counter()
+        with app.test_request_context('/', method='POST', json=body):
+            if hook:
+                app.preprocess_request()
+            user_id = authenticate()
+            request.get_json()  # the view parses the body too
+        timings.append(time.perf_counter() - start)
+        assert user_id
+    timings.sort()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--tokens', type=int, default=50, help='distinct users/tokens in the traffic mix')
+    args = parser.parse_args()
+
+    exp = int(time.time()) + 3600
+    tokens = [jwt.encode({'sub': str(i), 'exp': exp}, SECRET, algorithm='HS256') for i in range(args.tokens)]
+    bodies = [{'token': tokens[i % args.tokens], 'limit': 10, 'properties': ['email']} for i in range(args.requests)]
+
+    before_app = Flask('before')
+    before_app.config['JWT_SECRET_KEY'] = SECRET
+
+    after_app = Flask('after')
+    after_app.config['JWT_SECRET_KEY'] = SECRET
+    register_authentication(after_app)
+    claims_cache.clear()
+
+    before = run(before_app, bodies, legacy_authenticate_from_body, hook=False)
+    after = run(after_app, bodies, lambda: authenticate_from_body()[0], hook=True)
+
+    def pct(timings, p):
+        return timings[min(len(timings) - 1, int(len(timings) * p))] * 1e6
+
+    print(f"{args.requests} requests, {args.tokens} distinct tokens (includes test request context setup)\n")
+    print(f"{'':>8}  {'mean us':>9}  {'p50 us':>9}  {'p99 us':>9}")
+    for name, timings in (('before', before), ('after', after)):
+        mean = sum(timings) / len(timings) * 1e6
+        print(f"{name:>8}  {mean:>9.1f}  {pct(timings, 0.5):>9.1f}  {pct(timings, 0.99):>9.1f}")
+    print(f"\nclaims cache: {claims_cache.get_metrics()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: memory and latency of the autocomplete name index
+
+Builds a PortalIndex from --names synthetic mirrored records (80% contacts,
+20% companies) and reports
+    - build time and memory held by the index (tracemalloc), total and per 100k names
+    - lookup latency (p50 / p99 / max) for 1, 2, 3 and 5 character prefixes,
+      a full name and a two-word prefix
+    - latency of an incremental put (rename) and remove
+
+Usage:
+    python testers/bench_autocomplete.py [--names 100000] [--lookups 2000]
+"""
+
+import argparse
+import gc
+import random
+import string
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.services.autocomplete import PortalIndex, AUTOCOMPLETE_OBJECT_TYPES
+
+FIRST = ['Ahmed', 'Mohamed', 'Sara', 'Omar', 'Fatma', 'John', 'Maria', 'Youssef', 'Nour', 'Karim',
+         'Laila', 'Hassan', 'Mona', 'Tarek', 'Dina', 'Ali', 'Salma', 'Mahmoud', 'Hana', 'Ziad']
+WORDS = ['Nile', 'Delta', 'Cairo', 'Pyramid', 'Lotus', 'Falcon', 'Oasis', 'Sphinx', 'Papyrus', 'Horizon']
+
+def surname():
+    return ''.join(random.choice('bcdfghklmnprstvz') + random.choice('aeiou') for _ in range(3)).title()
+
+def rows(count):
+    for i in range(count):
+        if i % 5:
+            first, last = random.choice(FIRST), surname()
+            yield 'contacts', str(i + 1), {'firstname': first, 'lastname': last, 'email': f'{first.lower()}.{last.lower()}@example.com'}
+        else:
+            name = f'{random.choice(WORDS)} {surname()} {random.choice(["Trading", "Group", "LLC"])}'
+            yield 'companies', str(i + 1), {'name': name, 'domain': f'{name.split()[1].lower()}.com'}
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000, samples[-1] * 1000)
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--names', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    data = list(rows(args.names))
+    gc.collect()
+
+    started = time.perf_counter()
+    PortalIndex().load((object_type, hubspot_id, dict(properties)) for object_type, hubspot_id, properties in data)
+    build_s = time.perf_counter() - started
+    gc.collect()
+
+    # Built again under tracemalloc (slower) to measure what the index keeps
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    index = PortalIndex()
+    index.load((object_type, hubspot_id, dict(properties)) for object_type, hubspot_id, properties in data)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f"{args.names} names -> {len(index)} keys, built in {build_s:.2f} s")
+    print(f"  memory held by the index: {held / 2**20:.1f} MiB "
+          f"({held / 2**20 * 100000 / args.names:.1f} MiB per 100k names, {held / args.names:.0f} bytes per name)")
+
+    names = [index.names[(object_type, hubspot_id)][0] for object_type, hubspot_id, _ in random.sample(data, 200)]
+    queries = (
+        ('1 char', lambda: random.choice(string.ascii_lowercase)),
+        ('2 chars', lambda: random.choice(names).lower()[:2]),
+        ('3 chars', lambda: random.choice(names).lower()[:3]),
+        ('5 chars', lambda: random.choice(names).lower()[:5]),
+        ('full name', lambda: random.choice(names).lower()),
+        ('two-word prefix', lambda: ' '.join(random.choice(names).lower().split()[:2])[:-2]),
+    )
+    for label, make in queries:
+        p50, p99, worst = timed(index.lookup, [(make(), 10, AUTOCOMPLETE_OBJECT_TYPES) for _ in range(args.lookups)])
+        print(f"  lookup {label:<16} p50 {p50:6.3f} ms   p99 {p99:6.3f} ms   max {worst:6.3f} ms")
+
+    renames = [('contacts', str(i), {'lastname': surname()}) for i in random.sample(range(1, args.names, 5), 500) if i % 5]
+    p50, p99, worst = timed(index.put, renames)
+    print(f"  put (rename)            p50 {p50:6.3f} ms   p99 {p99:6.3f} ms   max {worst:6.3f} ms")
+    p50, p99, worst = timed(index.remove, [(object_type, hubspot_id) for object_type, hubspot_id, _ in renames])
+    print(f"  remove                  p50 {p50:6.3f} ms   p99 {p99:6.3f} ms   max {worst:6.3f} ms")
+
+if __name__ == '__main__':
+    main()
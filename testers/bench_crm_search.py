@@ -0,0 +1,124 @@
+"""
+Benchmark: local CRM search (FTS5) vs. a LIKE scan of the mirror
+
+Seeds --records mirrored records (80% contacts, 15% companies, 5% notes)
+in a fresh SQLite file, indexed by the full-text search triggers, and reports
+per-query latency of
+    - like: the naive local alternative, LIKE '%term%' over the properties JSON
+    - fts5: CrmMirror.search() (BM25-ranked, prefix matching, top 10)
+for a selective full name, a name prefix, an email, a phone number, a
+common first name and a common company-name word.
+
+Usage:
+    python testers/bench_crm_search.py [--records 1000000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from sqlalchemy import insert, text
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.models import CrmRecord, CrmSyncState
+from app.services.crm_mirror import crm_mirror
+
+PORTAL = 'a1b2c3d4e5f60718'
+FIRST = ['Ahmed', 'Mohamed', 'Sara', 'Omar', 'Fatma', 'John', 'Maria', 'Youssef', 'Nour', 'Karim',
+         'Laila', 'Hassan', 'Mona', 'Tarek', 'Dina', 'Ali', 'Salma', 'Mahmoud', 'Hana', 'Ziad']
+WORDS = ['nile', 'delta', 'cairo', 'pyramid', 'lotus', 'falcon', 'oasis', 'sphinx', 'papyrus', 'horizon',
+         'atlas', 'sahara', 'cedar', 'harbor', 'summit', 'zenith', 'crescent', 'marina', 'vertex', 'orbit']
+
+def surname(i):
+    return ''.join(random.choice('bcdfghklmnprstvz') + random.choice('aeiou') for _ in range(3)) + str(i % 97)
+
+def rows(count):
+    now = datetime.utcnow()
+    for i in range(count):
+        kind = i % 20
+        if kind < 16:
+            first, last = random.choice(FIRST), surname(i)
+            object_type, properties = 'contacts', {
+                'firstname': first, 'lastname': last, 'email': f'{first.lower()}.{last}@example.com',
+                'phone': f'+20 1{random.randrange(10**8, 10**9)}', 'company': f'{random.choice(WORDS).title()} {surname(i)}'}
+        elif kind < 19:
+            name = f'{random.choice(WORDS).title()} {surname(i)}'
+            object_type, properties = 'companies', {'name': name, 'domain': f'{name.split()[1]}.com'}
+        else:
+            object_type, properties = 'notes', {'hs_note_body': ' '.join(random.choices(WORDS, k=20))}
+        yield {'portal_key': PORTAL, 'object_type': object_type, 'hubspot_id': str(i + 1),
+               'properties': json.dumps(properties), 'archived': False, 'synced_at': now}
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    random.seed(0)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            batch = []
+            for row in rows(args.records):
+                batch.append(row)
+                if len(batch) == 10000:
+                    db.session.execute(insert(CrmRecord), batch)
+                    batch.clear()
+            if batch:
+                db.session.execute(insert(CrmRecord), batch)
+            for object_type in ('contacts', 'companies', 'notes'):
+                db.session.add(CrmSyncState(portal_key=PORTAL, object_type=object_type, last_synced_at=datetime.utcnow()))
+            db.session.commit()
+            print(f"{args.records} records seeded and indexed in {time.perf_counter() - started:.1f} s")
+
+            sample = json.loads(db.session.execute(text(
+                "SELECT properties FROM crm_records WHERE object_type = 'contacts' AND id = :id"),
+                {'id': args.records // 2 + 1}).scalar())
+            queries = (
+                ('full name', 'contacts', f"{sample['firstname']} {sample['lastname']}", sample['lastname']),
+                ('name prefix', 'contacts', sample['lastname'][:4], sample['lastname'][:4]),
+                ('email', 'contacts', sample['email'], sample['email']),
+                ('phone', 'contacts', '0' + sample['phone'].split()[1], sample['phone'].split()[1]),
+                ('common first name', 'contacts', 'ahmed', 'ahmed'),
+                ('company word', 'companies', 'nile', 'nile'),
+            )
+            like = text("SELECT id FROM crm_records WHERE portal_key = :portal AND object_type = :object_type "
+                        "AND archived = 0 AND properties LIKE :pattern LIMIT 10")
+            for name, object_type, term, pattern in queries:
+                hits = len(crm_mirror.search(PORTAL, object_type, term)['results'])
+                scan = timed(lambda: db.session.execute(
+                    like, {'portal': PORTAL, 'object_type': object_type, 'pattern': f'%{pattern}%'}).all(), 3)
+                fts = timed(lambda: crm_mirror.search(PORTAL, object_type, term), args.repeat)
+                print(f"  {name:<18} like {scan:9.2f} ms   fts5 {fts:7.2f} ms  ({hits} results)")
+            db.session.remove()
+    finally:
+        os.unlink(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: pooled keep-alive sessions vs one connection per HubSpot call
+
+Starts a local stand-in HubSpot server and reports p50/p99 latency for
+    - before: module-level requests.request() (new connection every call)
+    - after:  HubSpotSessionPool (persistent per-token sessions)
+
+The stand-in server sleeps on every new connection to model the TCP+TLS
+handshake cost of api.hubapi.com.
+
+Usage:
+    python testers/bench_http_pool.py [--requests 500] [--handshake-ms 40] [--threads 8]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+import requests
+from app.services.http_pool import HubSpotSessionPool
+
+TOKEN = 'pat-bench-token'
+BODY = json.dumps({'results': [{'id': '1', 'properties': {'email': 'bench@example.com'}}]}).encode()
+
+def make_handler(handshake_seconds):
+    class StandInHubSpotHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            # Called once per connection, not once per request
+            time.sleep(handshake_seconds)
+            super().setup()
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHubSpotHandler
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run(label, send, total, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def one_call(_):
+        start = time.perf_counter()
+        response = send()
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_call, range(total)))
+    wall = time.perf_counter() - started
+
+    print(f"{label:<28} p50={percentile(latencies, 50):7.2f}ms  "
+          f"p99={percentile(latencies, 99):7.2f}ms  "
+          f"mean={statistics.mean(latencies):7.2f}ms  "
+          f"throughput={total / wall:8.1f} req/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--handshake-ms', type=float, default=40.0)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.handshake_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/crm/v3/objects/contacts'
+    headers = {'Authorization': f'Bearer {TOKEN}', 'Content-Type': 'application/json'}
+
+    print(f"{args.requests} calls, {args.threads} threads, {args.handshake_ms}ms simulated handshake\n")
+
+    run('before: requests.request', lambda: requests.request('GET', url, headers=headers, timeout=(5, 30)),
+        args.requests, args.threads)
+
+    pool = HubSpotSessionPool()
+    run('after: HubSpotSessionPool', lambda: pool.request('GET', url, token=TOKEN, pool_size=args.threads,
+                                                           timeout=(5, 30), headers=headers),
+        args.requests, args.threads)
+
+    print(f"\npool metrics: {json.dumps(pool.get_metrics())}")
+    pool.close()
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: GET /api/logs for a user with a large log history
+
+Seeds N logs (one message per 5 logs) into a fresh SQLite file and
+reports latency and query count for
+    - legacy: every log with ``.all()`` and lazy-loaded embedded messages
+      (skipped above --legacy-max rows, it only gets slower)
+    - keyset: the first page, and a page deep in the history reached by cursor
+both with and without the ix_logs_user_created index.
+
+Usage:
+    python testers/bench_log_pagination.py [--logs 100000] [--page-size 50] [--legacy-max 20000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert, text
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.db.pagination import encode_cursor
+from app.models import User, ChatSession, ChatMessage, Log
+
+def seed(count):
+    user = User(name='Bench', username='bench', password='bench',
+                phone_number='+15551234567', hubspot_pat_token='token')
+    db.session.add(user)
+    db.session.flush()
+    session = ChatSession(user_id=user.id, status='active')
+    db.session.add(session)
+    db.session.flush()
+    start = datetime(2024, 1, 1)
+    db.session.execute(insert(ChatMessage), [
+        {'session_id': session.id, 'message_text': f'message {i}', 'timestamp': start, 'created_at': start}
+        for i in range(count // 5 + 1)
+    ])
+    first_message = db.session.query(db.func.min(ChatMessage.id)).scalar()
+    for offset in range(0, count, 10000):
+        db.session.execute(insert(Log), [
+            {'user_id': user.id, 'session_id': session.id, 'chat_message_id': first_message + i // 5,
+             'log_type': ('contact', 'deal', 'note')[i % 3], 'sync_status': 'synced',
+             'created_at': start + timedelta(seconds=i), 'sync_attempts': 0}
+            for i in range(offset, min(offset + 10000, count))
+        ])
+    db.session.commit()
+    return user.id, start
+
+def timed(app, statements, path, token):
+    statements.clear()
+    started = time.perf_counter()
+    response = app.test_client().get(path, headers={'Authorization': f'Bearer {token}'})
+    elapsed = (time.perf_counter() - started) * 1000
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return elapsed, len(statements)
+
+def legacy(user_id):
+    logs = Log.query.filter_by(user_id=user_id).order_by(Log.created_at.desc()).all()
+    return [log.to_dict() for log in logs]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--legacy-max', type=int, default=20000)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    statements = []
+    try:
+        with app.app_context():
+            db.create_all()
+            user_id, start = seed(args.logs)
+            token = create_access_token(identity=str(user_id))
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+            deep = encode_cursor(start + timedelta(seconds=args.logs // 10), args.logs // 10 + 1)
+            first_path = f'/api/logs?limit={args.page_size}'
+            deep_path = f'{first_path}&cursor={deep}'
+            print(f"{args.logs} logs, page size {args.page_size}")
+
+            for label in ('with index', 'without index'):
+                if label == 'without index':
+                    db.session.execute(text('DROP INDEX ix_logs_user_created'))
+                    db.session.commit()
+                for name, page in (('first page', first_path), ('deep page', deep_path)):
+                    elapsed, queries = timed(app, statements, page, token)
+                    print(f"  keyset {name:<11} {label:<14} {elapsed:9.2f} ms  {queries:6} queries")
+
+            if args.logs <= args.legacy_max:
+                db.session.expunge_all()
+                statements.clear()
+                started = time.perf_counter()
+                rows = legacy(user_id)
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"  legacy .all() + to_dict()          {elapsed:9.2f} ms  {len(statements):6} queries  "
+                      f"({len(rows)} rows)")
+            db.session.remove()
+    finally:
+        os.unlink(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: serializing chat sessions and messages with large histories
+
+Seeds --sessions sessions with --messages messages each (one log per
+message) in a fresh SQLite file and reports latency and query count for
+    - legacy: counts computed by loading every child row (len(session.messages),
+      len(session.logs), len(message.logs)), as the old properties did
+    - counters: the trigger-maintained counter columns read by to_dict()
+for listing every session of a user and for a 200-message page.
+
+Usage:
+    python testers/bench_session_listing.py [--sessions 20] [--messages 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from sqlalchemy import event, insert, select
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.models import User, ChatSession, ChatMessage, Log
+
+def seed(sessions, messages):
+    user = User(name='Bench', username='bench', password='bench',
+                phone_number='+15551234567', hubspot_pat_token='token')
+    db.session.add(user)
+    db.session.flush()
+    now = datetime.utcnow()
+    db.session.execute(insert(ChatSession), [
+        {'user_id': user.id, 'status': 'closed', 'started_at': now, 'created_at': now} for _ in range(sessions)
+    ])
+    session_ids = db.session.execute(select(ChatSession.id)).scalars().all()
+    for session_id in session_ids:
+        db.session.execute(insert(ChatMessage), [
+            {'session_id': session_id, 'message_text': f'message {i}', 'timestamp': now, 'created_at': now}
+            for i in range(messages)
+        ])
+    db.session.execute(insert(Log), [
+        {'user_id': user.id, 'session_id': session_id, 'chat_message_id': message_id, 'log_type': 'note',
+         'sync_status': 'synced', 'created_at': now, 'sync_attempts': 0}
+        for message_id, session_id in db.session.execute(select(ChatMessage.id, ChatMessage.session_id))
+    ])
+    db.session.commit()
+    return user.id, session_ids[0]
+
+def legacy_session(session):
+    return {'id': session.id, 'message_count': len(session.messages), 'log_count': len(session.logs)}
+
+def legacy_message(message):
+    return {'id': message.id, 'has_logs': len(message.logs) > 0, 'log_count': len(message.logs)}
+
+def measure(statements, fn):
+    db.session.expunge_all()
+    statements.clear()
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000, len(statements)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=2000)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    statements = []
+    try:
+        with app.app_context():
+            db.create_all()
+            user_id, session_id = seed(args.sessions, args.messages)
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+            sessions = lambda: ChatSession.query.filter_by(user_id=user_id).all()
+            page = lambda: ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).limit(200).all()
+
+            cases = (
+                ('list sessions', 'legacy', lambda: [legacy_session(s) for s in sessions()]),
+                ('list sessions', 'counters', lambda: [s.to_dict() for s in sessions()]),
+                ('200-message page', 'legacy', lambda: [legacy_message(m) for m in page()]),
+                ('200-message page', 'counters', lambda: [m.to_dict() for m in page()]),
+            )
+            print(f"{args.sessions} sessions x {args.messages} messages (one log each)")
+            for name, variant, fn in cases:
+                elapsed, queries = measure(statements, fn)
+                print(f"  {name:<17} {variant:<9} {elapsed:9.2f} ms  {queries:5} queries")
+            db.session.remove()
+    finally:
+        os.unlink(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: concurrent audit-log writes against one SQLite file
+
+Forks --processes workers (like gunicorn), each running --threads threads
+that write --writes Log rows one commit at a time through log_sink (the
+path every _create_log takes). Reports throughput, per-write latency
+(time spent waiting for the write lock plus the commit) and failed
+writes ("database is locked") for
+    - legacy:  rollback journal, synchronous=FULL, SQLite defaults
+    - wal:     the SQLITE_* production profile
+    - wal + single writer: the profile plus SQLITE_SINGLE_WRITER
+
+Usage:
+    python testers/bench_sqlite_writes.py [--processes 4] [--threads 8] [--writes 100]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.models import Log
+
+PROFILES = {
+    'legacy': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_BUSY_TIMEOUT': '',
+               'SQLITE_CACHE_SIZE': '', 'SQLITE_MMAP_SIZE': ''},
+    'wal': {},
+    'wal + single writer': {'SQLITE_SINGLE_WRITER': True},
+}
+
+def make_config(path, overrides):
+    return type('BenchConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', **overrides})
+
+def worker(path, overrides, threads, writes, results):
+    from app.services.log_sink import log_sink
+
+    app = create_app(make_config(path, overrides))
+    latencies = []
+
+    def write_rows():
+        with app.app_context():
+            for i in range(writes):
+                started = time.perf_counter()
+                log_sink.write(1, 1, 1, 'note', hubspot_id=str(i))
+                latencies.append((time.perf_counter() - started) * 1000)
+            db.session.remove()
+
+    pool = [threading.Thread(target=write_rows) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((latencies, log_sink.get_metrics()['failed']))
+
+def run(profile, args):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    overrides = PROFILES[profile]
+    try:
+        app = create_app(make_config(path, overrides))
+        with app.app_context():
+            db.create_all()
+            db.session.remove()
+            db.engine.dispose()
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(path, overrides, args.threads, args.writes, results))
+                     for _ in range(args.processes)]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for batch, _ in collected for latency in batch)
+        failed = sum(count for _, count in collected)
+        with app.app_context():
+            stored = Log.query.count()
+            db.session.remove()
+        return {
+            'elapsed': elapsed,
+            'stored': stored,
+            'failed': failed,
+            'p50': statistics.median(latencies),
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+            'lock_wait_s': sum(latencies) / 1000
+        }
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=100)
+    args = parser.parse_args()
+
+    total = args.processes * args.threads * args.writes
+    print(f"{args.processes} processes x {args.threads} threads x {args.writes} writes = {total} log rows")
+    for profile in PROFILES:
+        result = run(profile, args)
+        print(f"  {profile:<20} {result['stored'] / result['elapsed']:8.0f} writes/s  "
+              f"p50 {result['p50']:7.2f} ms  p99 {result['p99']:8.2f} ms  "
+              f"write time {result['lock_wait_s']:7.1f}s  failed {result['failed']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: dashboard stats from the source tables vs. the rollups
+
+Seeds --logs logs (spread over 30 days, a few log types and statuses)
+in a fresh SQLite file and reports
+    - live: COUNT(*) ... GROUP BY over logs for the same totals, breakdowns
+      and daily/hourly series that /api/stats/overview returns
+    - rollups: StatsService.get_overview()
+and the cost the rollup triggers add to inserting --insert logs.
+
+Usage:
+    python testers/bench_stats_overview.py [--logs 100000] [--insert 5000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from sqlalchemy import func, insert
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.db.rollups import ROLLUP_TRIGGERS, install_rollup_triggers
+from app.models import User, ChatSession, ChatMessage, Log
+from app.services.stats_service import StatsService
+
+LOG_TYPES = ('contact', 'deal', 'note', 'task')
+STATUSES = ('synced', 'synced', 'synced', 'failed', 'pending')
+
+def log_rows(user_id, session_id, message_id, count, now):
+    return [
+        {'user_id': user_id, 'session_id': session_id, 'chat_message_id': message_id, 'log_type': random.choice(LOG_TYPES),
+         'sync_status': random.choice(STATUSES), 'sync_attempts': 0,
+         'created_at': now - timedelta(seconds=random.randrange(30 * 86400))}
+        for _ in range(count)
+    ]
+
+def live_overview(user_id, now):
+    """What the endpoint would have to compute without the rollups"""
+    logs = Log.query.filter(Log.user_id == user_id)
+    first_day = (now - timedelta(days=29)).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_hour = (now - timedelta(hours=23)).replace(minute=0, second=0, microsecond=0)
+    return (
+        db.session.query(Log.log_type, Log.sync_status, func.count()).filter(Log.user_id == user_id)
+        .group_by(Log.log_type, Log.sync_status).all(),
+        db.session.query(func.date(Log.created_at), Log.log_type, func.count())
+        .filter(Log.user_id == user_id, Log.sync_status == 'synced', Log.created_at >= first_day)
+        .group_by(func.date(Log.created_at), Log.log_type).all(),
+        db.session.query(func.strftime('%Y-%m-%d %H', Log.created_at), func.count())
+        .filter(Log.user_id == user_id, Log.created_at >= first_hour)
+        .group_by(func.strftime('%Y-%m-%d %H', Log.created_at)).all(),
+        logs.count(),
+    )
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', type=int, default=100000)
+    parser.add_argument('--insert', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    random.seed(0)
+    now = datetime.utcnow()
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(name='Bench', username='bench', password='bench',
+                        phone_number='+15551234567', hubspot_pat_token='token')
+            db.session.add(user)
+            db.session.flush()
+            session = ChatSession(user_id=user.id, status='active')
+            db.session.add(session)
+            db.session.flush()
+            message = ChatMessage(session_id=session.id, message_text='bench')
+            db.session.add(message)
+            db.session.commit()
+            db.session.execute(insert(Log), log_rows(user.id, session.id, message.id, args.logs, now))
+            db.session.commit()
+
+            print(f"{args.logs} logs over 30 days")
+            print(f"  overview  live     {timed(lambda: live_overview(user.id, now), args.repeat):9.2f} ms")
+            print(f"  overview  rollups  {timed(lambda: StatsService.get_overview(user.id, now=now), args.repeat):9.2f} ms")
+
+            rows = log_rows(user.id, session.id, message.id, args.insert, now)
+            for variant in ('triggers', 'none'):
+                if variant == 'none':
+                    for name in ROLLUP_TRIGGERS:
+                        db.session.execute(db.text(f'DROP TRIGGER {name}'))
+                    db.session.commit()
+                started = time.perf_counter()
+                for row in rows:
+                    db.session.execute(insert(Log), [row])
+                    db.session.commit()
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"  insert    {variant:<8} {elapsed / args.insert:9.3f} ms/log ({args.insert} single-row commits)")
+            install_rollup_triggers(db.session.connection())
+            db.session.commit()
+            db.session.remove()
+    finally:
+        os.unlink(path)
+
+if __name__ == '__main__':
+    main()
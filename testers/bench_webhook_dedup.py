@@ -0,0 +1,92 @@
+"""
+Benchmark: WhatsApp webhook processing with a high duplicate (redelivery) rate
+
+Queues N webhook deliveries, a given share of which repeat an earlier
+message id, then drains the queue and reports messages/second for
+    - before: unique index only (every duplicate is inserted and rolled back)
+    - after:  recent-id filter in front of the unique index
+
+Both runs use a fresh SQLite file so commit costs are realistic.
+
+Usage:
+    python testers/bench_webhook_dedup.py [--deliveries 2000] [--duplicate-rate 0.7]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.models import User, ChatMessage
+from app.services.whatsapp_service import WhatsAppService, webhook_workers, recent_message_ids
+
+PHONE = '15551234567'
+
+def deliveries(count, duplicate_rate, seed=7):
+    rng = random.Random(seed)
+    sent = []
+    for i in range(count):
+        if sent and rng.random() < duplicate_rate:
+            message_id = rng.choice(sent[-200:])  # providers retry recent messages
+        else:
+            message_id = f'wamid.{i}'
+            sent.append(message_id)
+        yield json.dumps({'entry': [{'changes': [{'value': {'messages': [{
+            'id': message_id, 'from': PHONE, 'timestamp': '1700000000', 'text': {'body': f'message {i}'}
+        }]}}]}]})
+
+def run(payloads, filter_size):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        WEBHOOK_DEDUP_CACHE_SIZE = filter_size
+
+    app = create_app(BenchConfig)
+    recent_message_ids.clear()
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(name='Bench', username='bench', password='bench',
+                                phone_number=PHONE, hubspot_pat_token='token'))
+            db.session.commit()
+            for payload in payloads:
+                WhatsAppService.enqueue(payload)
+
+            start = time.perf_counter()
+            webhook_workers.drain(app)
+            elapsed = time.perf_counter() - start
+            stored = ChatMessage.query.count()
+            db.session.remove()
+        return elapsed, stored
+    finally:
+        os.unlink(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deliveries', type=int, default=2000)
+    parser.add_argument('--duplicate-rate', type=float, default=0.7)
+    args = parser.parse_args()
+
+    payloads = list(deliveries(args.deliveries, args.duplicate_rate))
+    print(f"{args.deliveries} deliveries, {args.duplicate_rate:.0%} duplicates")
+    for label, filter_size in (('unique index only', 0), ('filter + unique index', 10000)):
+        elapsed, stored = run(payloads, filter_size)
+        print(f"  {label:<22} {elapsed:7.2f}s  {args.deliveries / elapsed:8.0f} deliveries/s  "
+              f"{stored} messages stored")
+    print(recent_message_ids.get_metrics())
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 """
 Database migration script to update log schema for leads and deal stages
+
+The schema changes live in app/db/migrations.py (also applied by
+scripts/init_db.py); this script runs them and can add sample data.
 """
 
 import os
@@ -13,6 +16,7 @@ if str(parent_dir) not in sys.path:
 
 from app.main import create_app
 from app.db.database import db
+from app.db.migrations import run_migrations
 from sqlalchemy import text
 
 def migrate_log_schema():
@@ -24,41 +28,13 @@ def migrate_log_schema():
         try:
             print("Starting log schema migration...")
             
-            # Check if new columns already exist
-            inspector = db.inspect(db.engine)
-            existing_columns = [col['name'] for col in inspector.get_columns('logs')]
-            
-            new_columns = [
-                ('lead_status', 'VARCHAR(50)'),
-                ('deal_stage', 'VARCHAR(50)'),
-                ('lead_source', 'VARCHAR(50)'),
-                ('deal_amount', 'VARCHAR(20)'),
-                ('stage_reason', 'TEXT')
-            ]
+            # Columns and indexes are managed by app.db.migrations; this only runs them
+            applied = run_migrations()
+            for step in applied:
+                print(f"[OK] Applied: {step}")
+            if not applied:
+                print("[OK] Schema already up to date")
             
-            # Add new columns if they don't exist
-            for column_name, column_type in new_columns:
-                if column_name not in existing_columns:
-                    try:
-                        db.session.execute(text(f"ALTER TABLE logs ADD COLUMN {column_name} {column_type}"))
-                        print(f"[OK] Added column: {column_name}")
-                    except Exception as e:
-                        print(f"[ERROR] Failed to add column {column_name}: {e}")
-                else:
-                    print(f"[OK] Column {column_name} already exists")
-            
-            # Update log_type comment to reflect new types
-            try:
-                # Note: SQLite doesn't support ALTER COLUMN COMMENT, so we'll just document it
-                print("[OK] Log schema updated with new log types:")
-                print("  - lead: Lead creation and management")
-                print("  - lead_qualification: Lead qualification process")
-                print("  - deal_stage_update: Deal stage transitions")
-            except Exception as e:
-                print(f"Note: Could not update column comment: {e}")
-            
-            # Commit changes
-            db.session.commit()
             print("[OK] Database migration completed successfully!")
             
             # Verify the migration
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures: an app on an in-memory database, the test user and HubSpot stand-ins
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from flask_jwt_extended import create_access_token
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.models import User, ChatSession, ChatMessage
+from app.services.hubspot_service import HubSpotService
+
+PORTAL = 'a1b2c3d4e5f60718'
+
+@pytest.fixture
+def app():
+    """App (TestingConfig) with its tables created, inside an app context"""
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    """The test user (id 1)"""
+    user = User(name='Test User', username='testuser', password='testpass123',
+                phone_number='+15551234567', hubspot_pat_token='test-token')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def chat_message(user):
+    """An active chat session of the test user with one message (both id 1)"""
+    session = ChatSession(user_id=user.id, status='active')
+    db.session.add(session)
+    db.session.flush()
+    message = ChatMessage(session_id=session.id, message_text='hi')
+    db.session.add(message)
+    db.session.commit()
+    return message
+
+@pytest.fixture
+def access_token(user):
+    """JWT access token of the test user"""
+    return create_access_token(identity=str(user.id))
+
+@pytest.fixture
+def auth_headers(access_token):
+    """Authorization header carrying ``access_token``"""
+    return {'Authorization': f'Bearer {access_token}'}
+
+@pytest.fixture
+def portal(monkeypatch):
+    """Fixed portal key returned by HubSpotService.get_portal_key"""
+    monkeypatch.setattr(HubSpotService, 'get_portal_key', staticmethod(lambda user_id=None: PORTAL))
+    return PORTAL
+
+@pytest.fixture
+def hubspot_token():
+    """HubSpotService.get_hubspot_token answers without a user lookup"""
+    with patch('app.services.hubspot_service.HubSpotService.get_hubspot_token', return_value='pat-test'):
+        yield 'pat-test'
+
+@pytest.fixture
+def hubspot_response():
+    """Factory for ``requests`` response stand-ins: ``hubspot_response(status_code, body, text)``"""
+    def make(status_code=200, body=None, text='', headers=None):
+        response = Mock(status_code=status_code, text=text, headers=headers or {})
+        response.json.return_value = body
+        return response
+    return make
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the admin API
+"""
+
+import pytest
+from app.models import MetadataInvalidation
+from app.services.hubspot_service import HubSpotService
+from app.services.metadata_cache import MetadataCache, metadata_cache
+
+URL = '/api/admin/cache/metadata/invalidate'
+
+@pytest.fixture(autouse=True)
+def admin(app, portal):
+    """An admin key, a fixed portal and an empty metadata cache"""
+    app.config['ADMIN_API_KEY'] = 'secret'
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
+
+class TestAdminAPI:
+    """Test class for the admin endpoints"""
+
+    def test_wrong_key_is_rejected(self, app):
+        """Test that a wrong or non-ASCII key is a 401, not a 500"""
+        client = app.test_client()
+        for key in ('wrong', 'clé-secrète'):
+            response = client.post(URL, json={}, headers={'X-Admin-Key': key.encode('utf-8').decode('latin-1')})
+            assert response.status_code == 401
+
+    def test_invalidation_reaches_other_processes(self, app, portal):
+        """Test that an invalidation is recorded and replayed by another process's cache"""
+        other = MetadataCache()  # Stands in for another gunicorn worker
+        other.get_or_load(portal, 'pipelines:deals', lambda: 'old', ttl=60)
+        other.get_or_load(portal, 'owners:100', lambda: 'owners', ttl=60)
+
+        response = app.test_client().post(URL, json={'user_id': 1, 'name': 'pipelines'},
+                                          headers={'X-Admin-Key': 'secret'})
+
+        assert response.status_code == 200
+        assert MetadataInvalidation.query.one().portal_key == portal
+        assert other.apply_invalidations(HubSpotService._load_metadata_invalidations, interval=5) == 1
+        assert other.get_or_load(portal, 'pipelines:deals', lambda: 'new', ttl=60) == 'new'
+        assert other.get_or_load(portal, 'owners:100', lambda: 'reloaded', ttl=60) == 'owners'
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Unit tests for AsyncHubSpotService and the async activities view
+"""
+
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from app.models import Log
+from app.services.rate_limiter import HubSpotRateLimitError
+from app.services.object_cache import object_cache
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('asgiref')
+
+from app.services.async_hubspot_service import AsyncHubSpotService
+
+@pytest.fixture(autouse=True)
+def service(app, chat_message, hubspot_token):
+    """The test user, session and message, a stubbed HubSpot token, fast backoff and an empty object cache"""
+    app.config['HUBSPOT_BACKOFF_BASE'] = 0.001
+    object_cache.clear()
+    yield
+    object_cache.clear()
+
+@pytest.fixture
+def hubspot():
+    """Stand-in HubSpot: queue ``(status, body, headers)`` answers in ``responses``; requests are recorded"""
+    state = {'responses': [], 'requests': []}
+
+    def handle(request):
+        state['requests'].append(request)
+        status, body, headers = state['responses'].pop(0) if len(state['responses']) > 1 else state['responses'][0]
+        return httpx.Response(status, json=body, headers=headers)
+
+    with patch.object(AsyncHubSpotService, 'get_client',
+                      side_effect=lambda: httpx.AsyncClient(transport=httpx.MockTransport(handle))):
+        yield state
+
+class TestAsyncHubSpotService:
+    """Test class for AsyncHubSpotService"""
+
+    def test_get_by_id_goes_through_object_cache(self, app, hubspot):
+        """Test that a second read of the same record is served from the object cache"""
+        hubspot['responses'] = [(200, {'id': '101', 'properties': {'email': 'a@example.com'}}, {})]
+
+        first = asyncio.run(AsyncHubSpotService.get_contact_by_id('101', user_id=1))
+        second = asyncio.run(AsyncHubSpotService.get_contact_by_id('101', user_id=1))
+
+        assert first == second
+        assert len(hubspot['requests']) == 1
+
+    def test_create_logs_success_as_create(self, app, hubspot):
+        """Test that a create is logged with operation 'create' and written through to the cache"""
+        hubspot['responses'] = [(201, {'id': '101', 'properties': {'email': 'a@example.com'}}, {})]
+
+        result = asyncio.run(AsyncHubSpotService.create_contact({'email': 'a@example.com'}, 1, 1, user_id=1))
+        asyncio.run(AsyncHubSpotService.get_contact_by_id('101', user_id=1))
+
+        assert result['success'] and result['hubspot_id'] == '101'
+        log = Log.query.one()
+        assert (log.sync_status, log.sync_operation, log.hubspot_id) == ('synced', 'create', '101')
+        assert len(hubspot['requests']) == 1
+
+    def test_429_is_retried(self, app, hubspot):
+        """Test that a 429 is backed off and retried"""
+        hubspot['responses'] = [(429, {}, {'Retry-After': '0'}), (200, {'results': []}, {})]
+
+        assert asyncio.run(AsyncHubSpotService.get_calls(user_id=1)) == {'results': []}
+        assert len(hubspot['requests']) == 2
+
+    def test_exhausted_429_on_write_is_logged_for_replay(self, app, hubspot):
+        """Test that running out of 429 retries raises and leaves a replayable failed log"""
+        app.config['HUBSPOT_MAX_RETRIES'] = 1
+        hubspot['responses'] = [(429, {}, {'Retry-After': '0'})]
+
+        with pytest.raises(HubSpotRateLimitError):
+            asyncio.run(AsyncHubSpotService.create_note({'hs_note_body': 'hi'}, session_id=1, message_id=1, user_id=1))
+
+        log = Log.query.one()
+        assert (log.sync_status, log.sync_object_type, log.sync_operation) == ('failed', 'notes', 'create')
+        assert len(hubspot['requests']) == 2
+
+    def test_error_response_is_logged(self, app, hubspot):
+        """Test that a rejected write returns the error and logs a failure that is not replayed"""
+        hubspot['responses'] = [(400, {'message': 'Property values were not valid'}, {})]
+
+        result = asyncio.run(AsyncHubSpotService.update_contact('101', {'email': 'bad'}, 1, 1, user_id=1))
+
+        assert not result['success'] and 'not valid' in result['error']
+        log = Log.query.one()
+        assert log.sync_status == 'failed' and log.sync_operation is None
+
+    def test_blocking_calls_run_off_the_event_loop(self, app, hubspot):
+        """Test that the token lookup and the audit log run on another thread than the event loop"""
+        hubspot['responses'] = [(201, {'id': '101', 'properties': {}}, {})]
+        threads = {}
+
+        def token(user_id=None):
+            threads['token'] = threading.get_ident()
+            return 'pat-test'
+
+        async def create():
+            threads['loop'] = threading.get_ident()
+            return await AsyncHubSpotService.create_contact({'email': 'a@example.com'}, 1, 1, user_id=1)
+
+        with patch('app.services.hubspot_service.HubSpotService.get_hubspot_token', side_effect=token):
+            assert asyncio.run(create())['success']
+
+        assert threads['token'] != threads['loop']
+
+class TestActivitiesView:
+    """Test class for GET /api/hubspot/activities/activities"""
+
+    def test_fetches_every_activity_type(self, app, hubspot, auth_headers):
+        """Test that type=all returns calls, meetings and emails from one request"""
+        hubspot['responses'] = [(200, {'results': [{'id': '1'}]}, {})]
+
+        response = app.test_client().get('/api/hubspot/activities/activities', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert set(response.get_json()) == {'calls', 'meetings', 'emails'}
+        assert sorted(request.url.path for request in hubspot['requests']) == [
+            '/crm/v3/objects/calls', '/crm/v3/objects/emails', '/crm/v3/objects/meetings']
+        assert Log.query.filter_by(log_type='communication').count() == 1
+
+    def test_unknown_type(self, app, hubspot, auth_headers):
+        """Test that an unknown activity type is rejected"""
+        response = app.test_client().get('/api/hubspot/activities/activities?type=visits', headers=auth_headers)
+
+        assert response.status_code == 400
+        assert hubspot['requests'] == []
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the single-pass request authentication stage
+"""
+
+import time
+import pytest
+import jwt
+from unittest.mock import patch
+from flask import Flask, g
+from app.core.auth_body import (
+    register_authentication, authenticate_from_body, claims_cache, get_current_user_id
+)
+
+SECRET = 'test-jwt-secret'
+
+@pytest.fixture
+def app():
+    """Bare app with only the authentication stage installed"""
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = SECRET
+    register_authentication(app)
+    claims_cache.clear()
+    yield app
+    claims_cache.clear()
+
+def _token(sub='42', exp_in=3600):
+    return jwt.encode({'sub': sub, 'exp': int(time.time()) + exp_in}, SECRET, algorithm='HS256')
+
+def _run_hook(app, **kwargs):
+    ctx = app.test_request_context('/', method='POST', **kwargs)
+    ctx.push()
+    app.preprocess_request()
+    return ctx
+
+class TestAuthenticateRequest:
+    """Test class for authenticate_request / authenticate_from_body"""
+
+    def test_token_from_body(self, app):
+        """Test that a body token resolves the user"""
+        ctx = _run_hook(app, json={'token': _token()})
+        try:
+            user_id, error_response, status_code = authenticate_from_body()
+            assert user_id == '42'
+            assert error_response is None
+            assert get_current_user_id() == '42'
+        finally:
+            ctx.pop()
+
+    def test_token_from_header(self, app):
+        """Test Authorization: Bearer fallback"""
+        ctx = _run_hook(app, headers={'Authorization': f'Bearer {_token()}'})
+        try:
+            assert authenticate_from_body()[0] == '42'
+        finally:
+            ctx.pop()
+
+    def test_missing_token(self, app):
+        """Test the 401 for requests without a token"""
+        ctx = _run_hook(app, json={'limit': 10})
+        try:
+            user_id, error_response, status_code = authenticate_from_body()
+            assert user_id is None
+            assert status_code == 401
+            assert error_response.get_json()['error'] == 'Token is required in request body'
+        finally:
+            ctx.pop()
+
+    def test_expired_token(self, app):
+        """Test that expired tokens are rejected and never cached"""
+        ctx = _run_hook(app, json={'token': _token(exp_in=-10)})
+        try:
+            _, error_response, status_code = authenticate_from_body()
+            assert status_code == 401
+            assert error_response.get_json()['error'] == 'Token has expired'
+            assert len(claims_cache) == 0
+        finally:
+            ctx.pop()
+
+    def test_bad_signature(self, app):
+        """Test that a token signed with another key is rejected"""
+        token = jwt.encode({'sub': '42', 'exp': int(time.time()) + 60}, 'other-secret', algorithm='HS256')
+        ctx = _run_hook(app, json={'token': token})
+        try:
+            assert authenticate_from_body()[2] == 401
+        finally:
+            ctx.pop()
+
+    def test_verified_claims_are_cached(self, app):
+        """Test that HS256 verification runs once per token"""
+        token = _token()
+        with patch('app.core.auth_body.jwt.decode', wraps=jwt.decode) as mock_decode:
+            for _ in range(3):
+                ctx = _run_hook(app, json={'token': token})
+                try:
+                    assert g.auth_user_id == '42'
+                finally:
+                    ctx.pop()
+
+        mock_decode.assert_called_once()
+        assert claims_cache.get_metrics()['hits'] == 2
+
+    def test_cache_is_scoped_to_secret(self, app):
+        """Test that claims verified under one secret are not reused under another"""
+        token = _token()
+        ctx = _run_hook(app, json={'token': token})
+        ctx.pop()
+
+        app.config['JWT_SECRET_KEY'] = 'rotated-secret'
+        ctx = _run_hook(app, json={'token': token})
+        try:
+            assert authenticate_from_body()[2] == 401
+        finally:
+            ctx.pop()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-memory name autocomplete and POST /api/hubspot/autocomplete
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from app.db.database import db
+from app.models import CrmRecord, CrmSyncState
+from app.services.autocomplete import autocomplete
+from app.services.crm_mirror import MirrorNotReady
+from app.services.hubspot_service import HubSpotService
+
+SYNCED_AT = datetime.utcnow() - timedelta(minutes=10)
+
+def _record(portal, hubspot_id, object_type, archived=False, synced_at=SYNCED_AT, **properties):
+    return CrmRecord(portal_key=portal, object_type=object_type, hubspot_id=str(hubspot_id),
+                     properties=json.dumps(properties), archived=archived, synced_at=synced_at)
+
+@pytest.fixture(autouse=True)
+def mirror(user, portal):
+    """Mirror with four contacts, two companies and one archived contact, and an empty index"""
+    autocomplete.clear()
+    db.session.add_all([
+        _record(portal, 1, 'contacts', firstname='Ahmed', lastname='Farouk', email='ahmed@acme.com'),
+        _record(portal, 2, 'contacts', firstname='Ahmed', lastname='Ali'),
+        _record(portal, 3, 'contacts', firstname='Sara', lastname='Ahmed'),
+        _record(portal, 4, 'contacts', firstname='José', lastname='García'),
+        _record(portal, 5, 'contacts', email='noname@example.com'),
+        _record(portal, 6, 'contacts', archived=True, firstname='Ahmed', lastname='Gone'),
+        _record(portal, 10, 'companies', name='Acme Trading', domain='acme.com'),
+        _record(portal, 11, 'companies', name='Ahmed & Sons'),
+    ])
+    for object_type in ('contacts', 'companies'):
+        db.session.add(CrmSyncState(portal_key=portal, object_type=object_type, last_synced_at=SYNCED_AT))
+    db.session.commit()
+    yield
+    autocomplete.clear()
+
+@pytest.fixture
+def matches(portal):
+    """``matches(prefix, **kwargs)``: (object_type, id) of each autocomplete result"""
+    def lookup(prefix, **kwargs):
+        return [(result['object_type'], result['id']) for result in autocomplete.lookup(portal, prefix, **kwargs)]
+    return lookup
+
+class TestAutocomplete:
+    """Test class for the per-portal name index"""
+
+    def test_prefix_and_ranking(self, app, matches):
+        """Test that names starting with the prefix come first (shortest first), then later-word matches"""
+        assert matches('ahmed') == [('contacts', '2'), ('companies', '11'), ('contacts', '1'), ('contacts', '3')]
+        assert matches('ahmed fa') == [('contacts', '1')]
+        assert matches('far') == [('contacts', '1')]
+        assert matches('zz') == []
+        assert matches('  ') == []
+
+    def test_names_are_normalized(self, app, matches, portal):
+        """Test case and accent folding, and the email fallback for contacts without a name"""
+        assert matches('JOSE GAR') == [('contacts', '4')]
+        assert matches('garcía') == [('contacts', '4')]
+        assert autocomplete.lookup(portal, 'noname')[0]['name'] == 'noname@example.com'
+
+    def test_object_types_and_limit(self, app, matches):
+        """Test filtering by object type and the result limit"""
+        assert matches('a', object_types=('companies',)) == [('companies', '10'), ('companies', '11')]
+        assert len(matches('a', limit=2)) == 2
+
+    def test_whole_names_scanned_before_later_words(self, app, monkeypatch, matches):
+        """Test that later-word keys sorting among the whole names do not use up the scan limit"""
+        monkeypatch.setattr('app.services.autocomplete.SCAN_LIMIT', 3)  # "ahmed" (Sara Ahmed) sorts before the whole names
+
+        assert matches('ahmed') == [('contacts', '2'), ('companies', '11'), ('contacts', '1'), ('contacts', '3')]
+
+    def test_writes_apply_at_once(self, app, matches):
+        """Test that creates, partial updates and deletes through HubSpotService update the index"""
+        matches('ahmed')  # build
+
+        HubSpotService._cache_written_object(
+            'contacts', {'id': '20', 'properties': {'firstname': 'Ahmad', 'lastname': 'Nour'}}, created=True)
+        HubSpotService._cache_written_object('contacts', {'id': '1', 'properties': {'lastname': 'Zaki'}})
+        HubSpotService._forget_object('contacts', '2')
+
+        assert matches('ahmad') == [('contacts', '20')]
+        assert matches('ahmed z') == [('contacts', '1')]
+        assert matches('farouk') == []
+        assert ('contacts', '2') not in matches('ahmed')
+
+    def test_catches_up_with_mirror_syncs(self, app, monkeypatch, matches, portal):
+        """Test that records written by a later mirror sync are applied, archived ones removed"""
+        matches('ahmed')  # build
+        monkeypatch.setattr(autocomplete, 'refresh_interval', 0)
+        later = SYNCED_AT + timedelta(minutes=5)
+        CrmRecord.query.filter_by(hubspot_id='2').update({'archived': True, 'synced_at': later})
+        record = CrmRecord.query.filter_by(hubspot_id='3').one()
+        record.properties, record.synced_at = json.dumps({'firstname': 'Sara', 'lastname': 'Mostafa'}), later
+        db.session.add(_record(portal, 7, 'contacts', synced_at=later, firstname='Ahmed', lastname='New'))
+        db.session.commit()
+
+        assert matches('ahmed') == [('contacts', '2'), ('companies', '11'), ('contacts', '1'), ('contacts', '3')]
+
+        CrmSyncState.query.filter_by(object_type='contacts').update({'last_synced_at': later})
+        db.session.commit()
+        assert matches('ahmed') == [('contacts', '7'), ('companies', '11'), ('contacts', '1')]
+        assert matches('mostafa') == [('contacts', '3')]
+
+    def test_requires_synced_mirror(self, app, portal):
+        """Test the error when the mirror never synced contacts or companies"""
+        CrmSyncState.query.delete()
+        db.session.commit()
+
+        with pytest.raises(MirrorNotReady):
+            autocomplete.lookup(portal, 'ahmed')
+
+class TestAutocompleteEndpoint:
+    """Test class for POST /api/hubspot/autocomplete"""
+
+    def test_autocomplete(self, app, access_token):
+        """Test the response shape"""
+        response = app.test_client().post('/api/hubspot/autocomplete', json={
+            'token': access_token, 'q': 'ahmed f', 'limit': 5
+        })
+
+        assert response.status_code == 200
+        assert response.get_json() == {
+            'results': [{'id': '1', 'object_type': 'contacts', 'name': 'Ahmed Farouk'}], 'source': 'local'
+        }
+
+    def test_validation_and_unsynced_mirror(self, app, access_token):
+        """Test the limit bound and the 409 before the mirror has synced"""
+        client = app.test_client()
+        response = client.post('/api/hubspot/autocomplete', json={'token': access_token, 'q': 'a', 'limit': 500})
+        assert response.status_code == 400
+
+        CrmSyncState.query.delete()
+        db.session.commit()
+        response = client.post('/api/hubspot/autocomplete', json={'token': access_token, 'q': 'a'})
+        assert response.status_code == 409
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the chunked, concurrent HubSpot batch engine
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from flask import Flask
+from app.services.hubspot_service import HubSpotService
+
+@pytest.fixture
+def app():
+    """Bare app context; HubSpot calls, the object cache and the log sink are patched"""
+    app = Flask(__name__)
+    app.config['HUBSPOT_BATCH_CHUNK_SIZE'] = 100
+    app.config['HUBSPOT_BATCH_CONCURRENCY'] = 4
+    with app.app_context():
+        with patch('app.services.hubspot_service.HubSpotService._cache_written_object'), \
+             patch('app.services.hubspot_service.log_sink') as mock_sink:
+            mock_sink.build_row.side_effect = lambda *args, **kwargs: (args, kwargs)
+            app.mock_sink = mock_sink
+            yield app
+
+def _created(payload):
+    """Fake batch/create: every input succeeds, ids follow the trace ids"""
+    response = Mock()
+    response.status_code = 201
+    response.json.return_value = {
+        'results': [{'id': f"id-{item['objectWriteTraceId']}", 'properties': item['properties']}
+                    for item in payload['inputs']]
+    }
+    return response
+
+class TestBatchEngine:
+    """Test class for HubSpotService.run_batch and the batch_* wrappers"""
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_inputs_are_chunked_to_100(self, mock_make_request, app):
+        """Test that 250 inputs become three requests and keep input order"""
+        mock_make_request.side_effect = lambda method, endpoint, payload, user_id=None: _created(payload)
+        contacts = [{'email': f'user{i}@example.com'} for i in range(250)]
+
+        result = HubSpotService.batch_create_contacts(contacts, user_id=1)
+
+        sizes = sorted(len(call.args[2]['inputs']) for call in mock_make_request.call_args_list)
+        assert sizes == [50, 100, 100]
+        assert result['chunks'] == 3
+        assert result['succeeded'] == 250
+        assert [item['id'] for item in result['results']] == [f'id-{i}' for i in range(250)]
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_one_bulk_log_write_per_batch(self, mock_make_request, app):
+        """Test that logs are written once, one row per item"""
+        mock_make_request.side_effect = lambda method, endpoint, payload, user_id=None: _created(payload)
+
+        HubSpotService.batch_create_deals([{'dealname': str(i)} for i in range(150)], 5, 6, user_id=1)
+
+        app.mock_sink.write_many.assert_called_once()
+        assert len(app.mock_sink.write_many.call_args.args[0]) == 150
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_partial_errors_are_placed_by_trace_id(self, mock_make_request, app):
+        """Test that a 207 response marks exactly the failed inputs"""
+        response = Mock()
+        response.status_code = 207
+        response.json.return_value = {
+            'results': [{'id': 'a'}, {'id': 'c'}],
+            'errors': [{'message': 'Property "x" does not exist', 'context': {'objectWriteTraceId': ['1']}}]
+        }
+        mock_make_request.return_value = response
+
+        result = HubSpotService.batch_create_notes([{'hs_note_body': n} for n in 'abc'])
+
+        assert [item['success'] for item in result['results']] == [True, False, True]
+        assert result['results'][1]['error'] == 'Property "x" does not exist'
+        assert result['results'][2]['id'] == 'c'
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_updates_are_matched_by_id(self, mock_make_request, app):
+        """Test that update results are paired by id, not position"""
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {'results': [{'id': '2'}, {'id': '1'}]}
+        mock_make_request.return_value = response
+
+        result = HubSpotService.batch_update_companies([{'id': 1, 'name': 'A'}, {'id': '2', 'name': 'B'}])
+
+        assert [item['id'] for item in result['results']] == ['1', '2']
+        sent = mock_make_request.call_args.args[2]['inputs']
+        assert sent[0] == {'id': '1', 'properties': {'name': 'A'}}
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_failed_chunk_fails_its_items_only(self, mock_make_request, app):
+        """Test that one rejected chunk does not sink the others"""
+        app.config['HUBSPOT_BATCH_CHUNK_SIZE'] = 2
+
+        def respond(method, endpoint, payload, user_id=None):
+            if payload['inputs'][0]['objectWriteTraceId'] == '2':
+                return Mock(status_code=400, text='bad chunk')
+            return _created(payload)
+        mock_make_request.side_effect = respond
+
+        result = HubSpotService.batch_create_tasks([{'hs_task_subject': str(i)} for i in range(4)])
+
+        assert [item['success'] for item in result['results']] == [True, True, False, False]
+        assert result['results'][2]['error'] == 'bad chunk'
+        assert result['success'] is False
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_associations_grouped_per_type_pair(self, mock_make_request, app):
+        """Test that associations go to one v4 endpoint per type pair"""
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {'results': [{'fromObjectId': 1, 'toObjectId': 2}]}
+        mock_make_request.return_value = response
+
+        result = HubSpotService.batch_create_associations([
+            {'from_object_type': 'contacts', 'from_object_id': '1', 'to_object_type': 'companies', 'to_object_id': '2'},
+            {'from_object_type': 'deals', 'from_object_id': '1', 'to_object_type': 'contacts', 'to_object_id': '2'}
+        ])
+
+        endpoints = sorted(call.args[1] for call in mock_make_request.call_args_list)
+        assert endpoints == [
+            '/crm/v4/associations/contacts/companies/batch/associate/default',
+            '/crm/v4/associations/deals/contacts/batch/associate/default'
+        ]
+        assert result['succeeded'] == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the trigger-maintained session and message counters
+"""
+
+import pytest
+from sqlalchemy import insert, text
+from app.db.database import db
+from app.db.counters import COUNTER_TRIGGERS, count_drift, repair_counters
+from app.db.migrations import run_migrations
+from app.models import ChatSession, ChatMessage, Log
+from app.services.log_sink import log_sink
+
+@pytest.fixture
+def chat_session(user):
+    """An active session of the test user"""
+    session = ChatSession(user_id=user.id, status='active')
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+def _message(session, text='hi'):
+    message = ChatMessage(session_id=session.id, message_text=text)
+    db.session.add(message)
+    db.session.commit()
+    return message
+
+class TestCounters:
+    """Test class for counter maintenance"""
+
+    def test_orm_inserts_and_deletes(self, chat_session):
+        """Test that ORM writes keep the counters and loaded objects current"""
+        session = chat_session
+        message = _message(session)
+        db.session.add_all([Log(user_id=1, session_id=session.id, chat_message_id=message.id, log_type='note')
+                            for _ in range(3)])
+        db.session.commit()
+
+        assert session.message_count == 1
+        assert session.log_count == 3
+        assert message.log_count == 3
+        assert message.to_dict()['has_logs'] is True
+
+        db.session.delete(Log.query.first())
+        db.session.commit()
+        assert session.log_count == 2
+        assert message.log_count == 2
+
+    def test_bulk_inserts_are_counted(self, chat_session):
+        """Test that log_sink's bulk INSERT (no ORM events) still updates the counters"""
+        session = chat_session
+        message = _message(session)
+        log_sink.write_many([log_sink.build_row(1, session.id, message.id, 'note') for _ in range(5)])
+
+        db.session.expire_all()
+        assert message.log_count == 5
+        assert session.log_count == 5
+        assert session.to_dict()['message_count'] == 1
+
+    def test_moving_a_log(self, chat_session):
+        """Test that re-pointing a log moves its count"""
+        session = chat_session
+        first, second = _message(session, 'a'), _message(session, 'b')
+        log = Log(user_id=1, session_id=session.id, chat_message_id=first.id, log_type='note')
+        db.session.add(log)
+        db.session.commit()
+
+        log.chat_message_id = second.id
+        db.session.commit()
+        db.session.expire_all()
+        assert (first.log_count, second.log_count) == (0, 1)
+
+    def test_cascade_delete_of_a_session(self, chat_session):
+        """Test that deleting a session with children leaves no broken counters"""
+        session = chat_session
+        message = _message(session)
+        db.session.add(Log(user_id=1, session_id=session.id, chat_message_id=message.id, log_type='note'))
+        db.session.commit()
+
+        db.session.delete(session)
+        db.session.commit()
+        assert ChatMessage.query.count() == 0
+        assert Log.query.count() == 0
+
+class TestRepair:
+    """Test class for recounting"""
+
+    def test_repair_fixes_drift(self, chat_session):
+        """Test that drifted counters are found and recomputed"""
+        session = chat_session
+        _message(session)
+        db.session.execute(text('UPDATE chat_sessions SET message_count = 42, log_count = 7'))
+        db.session.commit()
+
+        connection = db.session.connection()
+        assert count_drift(connection) == {
+            'chat_sessions.message_count': 1, 'chat_sessions.log_count': 1, 'chat_messages.log_count': 0
+        }
+        assert repair_counters(connection)['chat_sessions.message_count'] == 1
+        db.session.commit()
+
+        db.session.expire_all()
+        assert (session.message_count, session.log_count) == (1, 0)
+        assert not any(count_drift(db.session.connection()).values())
+
+    def test_migration_backfills_existing_rows(self, chat_session):
+        """Test that a database created before the triggers gets them and correct counts"""
+        session = chat_session
+        message = _message(session)
+        for name in COUNTER_TRIGGERS:
+            db.session.execute(text(f'DROP TRIGGER {name}'))
+        db.session.execute(insert(Log), [
+            log_sink.build_row(1, session.id, message.id, 'note') for _ in range(4)
+        ])
+        db.session.commit()
+
+        applied = run_migrations()
+        assert 'counter triggers' in applied
+        db.session.expire_all()
+        assert message.log_count == 4
+        assert session.log_count == 4
+        assert run_migrations() == []
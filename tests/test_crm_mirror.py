@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local CRM mirror
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app.db.database import db
+from app.models import CrmRecord, CrmSyncState
+from app.services.crm_mirror import crm_mirror, epoch_ms, SEARCH_LAG
+from app.services.hubspot_service import HubSpotService
+from app.services.object_cache import object_cache
+
+def _contact(contact_id, email, modified='2025-01-10T12:00:00.000Z'):
+    return {'id': str(contact_id), 'createdAt': '2025-01-01T00:00:00.000Z', 'updatedAt': modified,
+            'properties': {'email': email, 'lifecyclestage': 'lead', 'lastmodifieddate': modified}}
+
+class FakeHubSpot:
+    """Answers list, archived-list and search calls from in-memory record lists (``respond`` builds responses)"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.live = []
+        self.archived = []
+        self.modified = []
+        self.calls = []
+
+    def __call__(self, method, endpoint, data=None, params=None, user_id=None):
+        self.calls.append((method, endpoint, data, params))
+        if endpoint.endswith('/search'):
+            return self.respond(body={'results': self.modified})
+        if params and params.get('archived') == 'true':
+            return self.respond(body={'results': self.archived})
+        return self.respond(body={'results': self.live})
+
+@pytest.fixture(autouse=True)
+def mirror(user):
+    """The test user and an empty object cache"""
+    object_cache.clear()
+    yield
+    object_cache.clear()
+
+@pytest.fixture
+def hubspot(hubspot_response):
+    fake = FakeHubSpot(hubspot_response)
+    with patch('app.services.hubspot_service.HubSpotService.make_request', side_effect=fake):
+        yield fake
+
+def _state():
+    return CrmSyncState.query.filter_by(object_type='contacts').one()
+
+class TestCrmMirror:
+    """Test class for mirror syncs and mirror-backed reads"""
+
+    def test_full_sync_seeds_and_archives_missing(self, app, hubspot):
+        """Test the first sweep, and that a later full sweep archives records HubSpot no longer has"""
+        hubspot.live = [_contact(1, 'a@example.com'), _contact(2, 'b@example.com')]
+
+        result = crm_mirror.sync(1, object_types=['contacts'])['contacts']
+        assert result == {'mode': 'full', 'upserted': 2, 'archived': 0}
+        assert _state().last_full_sync_at is not None
+
+        hubspot.live = [_contact(1, 'a@example.com')]
+        result = crm_mirror.sync(1, object_types=['contacts'], full=True)['contacts']
+        assert result['archived'] == 1
+        assert CrmRecord.query.filter_by(hubspot_id='2').one().archived
+
+    def test_incremental_sync_pulls_changes_since_high_water_mark(self, app, hubspot):
+        """Test the search filter and that modified records are upserted"""
+        hubspot.live = [_contact(1, 'a@example.com')]
+        crm_mirror.sync(1, object_types=['contacts'])
+        high_water_mark = _state().high_water_mark
+
+        hubspot.modified = [_contact(1, 'new@example.com', modified=datetime.utcnow().isoformat() + 'Z'),
+                            _contact(3, 'c@example.com', modified=datetime.utcnow().isoformat() + 'Z')]
+        result = crm_mirror.sync(1, object_types=['contacts'])['contacts']
+
+        assert (result['mode'], result['upserted']) == ('incremental', 2)
+        search = next(call for call in hubspot.calls if call[1].endswith('/search'))
+        assert search[2]['filterGroups'][0]['filters'][0] == {
+            'propertyName': 'lastmodifieddate', 'operator': 'GTE', 'value': epoch_ms(high_water_mark - SEARCH_LAG)}
+        assert CrmRecord.query.filter_by(hubspot_id='1').one().to_record()['properties']['email'] == 'new@example.com'
+        assert CrmRecord.query.count() == 2
+
+    def test_delete_sweep(self, app, hubspot):
+        """Test that records in HubSpot's archived list are marked archived once the sweep is due"""
+        hubspot.live = [_contact(1, 'a@example.com'), _contact(2, 'b@example.com')]
+        crm_mirror.sync(1, object_types=['contacts'])
+        hubspot.archived = [{'id': '2'}]
+
+        assert crm_mirror.sync(1, object_types=['contacts'])['contacts']['archived'] == 0
+        _state().last_delete_sweep_at = datetime.utcnow() - timedelta(hours=2)
+        db.session.commit()
+        assert crm_mirror.sync(1, object_types=['contacts'])['contacts']['archived'] == 1
+
+        with pytest.raises(Exception, match='404'):
+            HubSpotService.get_contact_by_id('2', user_id=1, max_age=60)
+
+    def test_reads_served_from_fresh_mirror(self, app, hubspot):
+        """Test the max_age read mode, its staleness bound and property coverage"""
+        hubspot.live = [_contact(1, 'a@example.com')]
+        crm_mirror.sync(1, object_types=['contacts'])
+        calls = len(hubspot.calls)
+
+        record = HubSpotService.get_contact_by_id('1', user_id=1, properties=['email'], max_age=60)
+        assert record['properties']['email'] == 'a@example.com'
+        assert 'lifecyclestage' not in record['properties']
+        assert len(hubspot.calls) == calls
+
+        # Property the mirror does not keep
+        HubSpotService.get_contact_by_id('1', user_id=1, properties=['jobtitle'], max_age=60)
+        assert len(hubspot.calls) == calls + 1
+
+        # Mirror older than max_age
+        object_cache.clear()
+        _state().last_synced_at = datetime.utcnow() - timedelta(minutes=10)
+        db.session.commit()
+        HubSpotService.get_contact_by_id('1', user_id=1, properties=['email'], max_age=60)
+        assert len(hubspot.calls) == calls + 2
+
+    def test_reads_disabled_by_default(self, app, hubspot):
+        """Test that CRM_MIRROR_MAX_AGE=0 keeps reads live"""
+        hubspot.live = [_contact(1, 'a@example.com')]
+        crm_mirror.sync(1, object_types=['contacts'])
+        calls = len(hubspot.calls)
+
+        HubSpotService.get_contact_by_id('1', user_id=1)
+        assert len(hubspot.calls) == calls + 1
+
+    def test_reads_see_writes_made_through_the_app(self, app, hubspot, hubspot_response):
+        """Test that an update, a create and a delete are visible to mirror reads before the next sync"""
+        hubspot.live = [_contact(1, 'old@example.com'), _contact(2, 'b@example.com')]
+        crm_mirror.sync(1, object_types=['contacts'])
+        wanted = ['email', 'lifecyclestage']
+
+        with patch('app.services.hubspot_service.HubSpotService.make_request',
+                   return_value=hubspot_response(200, {
+                       'id': '1', 'updatedAt': '2025-01-11T00:00:00.000Z', 'properties': {'email': 'new@example.com'}
+                   })):
+            HubSpotService.update_contact('1', {'email': 'new@example.com'}, user_id=1)
+        with patch('app.services.hubspot_service.HubSpotService.make_request',
+                   return_value=hubspot_response(201, _contact(3, 'c@example.com'))):
+            HubSpotService.create_contact({'email': 'c@example.com'}, user_id=1)
+        with patch('app.services.hubspot_service.HubSpotService.make_request', return_value=hubspot_response(204)):
+            HubSpotService.delete_contact('2', user_id=1)
+        object_cache.clear()
+        calls = len(hubspot.calls)
+
+        updated = HubSpotService.get_contact_by_id('1', properties=wanted, user_id=1, max_age=300)
+        assert (updated['properties']['email'], updated['properties']['lifecyclestage']) == ('new@example.com', 'lead')
+        assert HubSpotService.get_contact_by_id('3', properties=wanted, user_id=1, max_age=300)['id'] == '3'
+        with pytest.raises(Exception, match='404'):
+            HubSpotService.get_contact_by_id('2', properties=wanted, user_id=1, max_age=300)
+        assert len(hubspot.calls) == calls
+
+    def test_sync_error_is_recorded(self, app, hubspot, hubspot_response):
+        """Test that a failed pull leaves the state usable and records the error"""
+        failed = hubspot_response(500, {'results': []}, 'boom')
+        with patch('app.services.hubspot_service.HubSpotService.make_request', return_value=failed):
+            result = crm_mirror.sync(1, object_types=['contacts'])['contacts']
+
+        assert 'error' in result
+        state = _state()
+        assert '500' in state.last_error
+        assert state.last_synced_at is None
+
+if __name__ == "__main__":
+    pytest.main([__file__])
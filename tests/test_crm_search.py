@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Unit tests for full-text search over the local CRM mirror
+"""
+
+import json
+import pytest
+from datetime import datetime
+from app.db.database import db
+from app.db.migrations import run_migrations
+from app.db.search import SEARCH_INDEXES, SEARCH_TRIGGERS, match_expression, search_ids, search_table
+from app.models import CrmRecord, CrmSyncState
+from app.services.crm_mirror import crm_mirror, MirrorNotReady
+
+def _record(portal, hubspot_id, object_type, **properties):
+    return CrmRecord(portal_key=portal, object_type=object_type, hubspot_id=str(hubspot_id),
+                     properties=json.dumps(properties), synced_at=datetime.utcnow())
+
+@pytest.fixture(autouse=True)
+def mirror(user, portal):
+    """Mirror with contacts, companies and notes for one portal (and a contact in another)"""
+    db.session.add_all([
+        _record(portal, 1, 'contacts', firstname='Ahmed', lastname='Ali', email='ahmed@example.com',
+                phone='+20 123 456 7890', company='Nile Trading'),
+        _record(portal, 2, 'contacts', firstname='Sara', lastname='Hassan', email='sara@ahmedco.com', company='Ahmed & Co'),
+        _record(portal, 3, 'contacts', firstname='José', lastname='García', email='jose@example.es'),
+        _record(portal, 4, 'companies', name='Nile Trading', domain='niletrading.com', phone='+20 2 555 0100'),
+        _record(portal, 5, 'notes', hs_note_body='<p>Called Ahmed about the renewal pricing</p>'),
+        _record('ffffffffffffffff', 6, 'contacts', firstname='Ahmed', lastname='Other'),
+    ])
+    for object_type in ('contacts', 'companies', 'notes'):
+        db.session.add(CrmSyncState(portal_key=portal, object_type=object_type, last_synced_at=datetime.utcnow()))
+    db.session.commit()
+
+@pytest.fixture
+def ids(portal):
+    """``ids(object_type, term, limit=10)``: ids of the local search results, best first"""
+    def search(object_type, term, limit=10):
+        return [record['id'] for record in crm_mirror.search(portal, object_type, term, limit=limit)['results']]
+    return search
+
+class TestCrmSearch:
+    """Test class for the crm_search_* indexes"""
+
+    def test_prefix_and_ranking(self, app, ids):
+        """Test prefix matching and that a name match outranks a company/email match"""
+        assert ids('contacts', 'ahm') == ['1', '2']
+        assert ids('contacts', 'ahmed ali') == ['1']
+
+    def test_fields(self, app, ids):
+        """Test email, phone, company, domain, accents and note body"""
+        assert ids('contacts', 'sara@ahmedco.com') == ['2']
+        assert ids('contacts', '01234567890') == ['1']
+        assert ids('contacts', '+20 123-456-7890') == ['1']
+        assert ids('contacts', 'jose garcia') == ['3']
+        assert ids('companies', 'niletrading') == ['4']
+        assert ids('notes', 'renewal pric') == ['5']
+
+    def test_broad_terms_ranked_among_newest_matches(self, app, portal):
+        """Test that a broad term is ranked within a window of its newest matches and reported as truncated"""
+        db.session.add(_record(portal, 7, 'contacts', firstname='Ahmed', lastname='Nabil'))
+        db.session.commit()
+        connection = db.session.connection()
+        ranked, truncated = search_ids(connection, portal, 'contacts', 'ahm', candidates=1)
+        assert [row_id for row_id, _ in ranked] == [7, 2] and truncated
+        ranked, truncated = search_ids(connection, portal, 'contacts', 'ahm', candidates=2)
+        assert [row_id for row_id, _ in ranked] == [7, 1, 2] and not truncated
+        assert crm_mirror.search(portal, 'contacts', 'ahm')['truncated'] is False
+
+    def test_best_match_outside_window(self, app, portal):
+        """Test that a name match is ranked even when newer email and company matches fill the window"""
+        db.session.add_all([_record(portal, 10 + i, 'contacts', firstname='Sara', email=f'sara{i}@ahmedco.com',
+                                    company='Ahmed & Co') for i in range(5)])
+        db.session.commit()
+        ranked, truncated = search_ids(db.session.connection(), portal, 'contacts', 'ahmed', limit=1, candidates=3)
+        assert [row_id for row_id, _ in ranked] == [1] and not truncated
+
+    def test_scoped_to_portal_and_type(self, app, ids):
+        """Test that other portals and object types are not returned"""
+        assert ids('companies', 'ahmed') == []
+        assert '6' not in ids('contacts', 'ahmed')
+
+    def test_index_follows_mirror_writes(self, app, ids):
+        """Test updates, archiving and deletes"""
+        record = CrmRecord.query.filter_by(hubspot_id='3').one()
+        record.properties = json.dumps({'firstname': 'Joseph', 'lastname': 'Garcia'})
+        db.session.commit()
+        assert ids('contacts', 'joseph') == ['3']
+        assert ids('contacts', 'jose@example') == []
+
+        record.archived = True
+        db.session.commit()
+        assert ids('contacts', 'joseph') == []
+
+        db.session.delete(CrmRecord.query.filter_by(hubspot_id='1').one())
+        db.session.commit()
+        assert ids('contacts', 'ahmed') == ['2']
+
+    def test_match_expression_escapes_syntax(self, app):
+        """Test that FTS5 operators in user input are treated as words"""
+        assert match_expression('ahmed OR "x" NEAR(') == '"ahmed" "or" "x" "near"*'
+        assert match_expression('sara@ahmedco.com') == '"sara ahmedco com"*'
+        assert match_expression('  ') is None
+
+    def test_migration_rebuilds_index(self, app, ids):
+        """Test that installing the index on an existing mirror indexes its records"""
+        for name in SEARCH_TRIGGERS:
+            db.session.execute(db.text(f'DROP TRIGGER {name}'))
+        for object_type in SEARCH_INDEXES:
+            db.session.execute(db.text(f'DROP TABLE {search_table(object_type)}'))
+        db.session.commit()
+
+        assert 'crm full-text search index' in run_migrations()
+        assert ids('contacts', 'ahm') == ['1', '2']
+
+    def test_requires_synced_mirror(self, app, portal):
+        """Test the error for an object type the mirror has not synced"""
+        CrmSyncState.query.filter_by(object_type='notes').delete()
+        db.session.commit()
+
+        with pytest.raises(MirrorNotReady):
+            crm_mirror.search(portal, 'notes', 'renewal')
+
+class TestSearchEndpoints:
+    """Test class for the source=local switch"""
+
+    def test_contacts_search_local(self, app, access_token):
+        """Test the existing request shape with source=local"""
+        response = app.test_client().post('/api/hubspot/contacts/contacts/search', json={
+            'token': access_token, 'search_term': 'ahmed', 'limit': 1, 'source': 'local'
+        })
+
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['source'] == 'local'
+        assert [record['id'] for record in data['results']] == ['1']
+        assert data['results'][0]['properties']['email'] == 'ahmed@example.com'
+
+    def test_unknown_source(self, app, access_token):
+        """Test validation of the source switch"""
+        response = app.test_client().post('/api/hubspot/companies/companies/search', json={
+            'token': access_token, 'search_term': 'nile', 'source': 'elsewhere'
+        })
+        assert response.status_code == 400
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pooled HubSpot HTTP session layer
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from app.services.http_pool import HubSpotSessionPool
+
+class TestHubSpotSessionPool:
+    """Test class for HubSpotSessionPool"""
+
+    def test_same_token_reuses_session(self):
+        """Test that one token always maps to one session"""
+        pool = HubSpotSessionPool()
+        assert pool.get_session('token-a') is pool.get_session('token-a')
+        assert pool.get_metrics()['sessions_created'] == 1
+
+    def test_tokens_get_separate_sessions(self):
+        """Test that each token gets its own session"""
+        pool = HubSpotSessionPool()
+        assert pool.get_session('token-a') is not pool.get_session('token-b')
+        assert pool.get_metrics()['sessions'] == 2
+
+    def test_least_recently_used_session_is_evicted(self):
+        """Test LRU eviction once max_sessions is exceeded"""
+        pool = HubSpotSessionPool(max_sessions=2)
+        first = pool.get_session('token-a')
+        pool.get_session('token-b')
+        pool.get_session('token-a')
+        pool.get_session('token-c')
+
+        assert pool.get_session('token-a') is first
+        assert pool.get_metrics()['sessions_evicted'] == 1
+
+    def test_sessions_reset_after_fork(self):
+        """Test that a forked worker does not reuse the parent's sessions"""
+        pool = HubSpotSessionPool()
+        parent_session = pool.get_session('token-a')
+
+        with patch('app.services.http_pool.os.getpid', return_value=pool._pid + 1):
+            assert pool.get_session('token-a') is not parent_session
+
+    def test_request_passes_timeout_and_counts(self):
+        """Test that requests go through the session with the given timeout"""
+        pool = HubSpotSessionPool()
+        mock_response = Mock(status_code=200)
+
+        with patch('requests.Session.request', return_value=mock_response) as mock_request:
+            response = pool.request('GET', 'https://api.hubapi.com/test', token='token-a', timeout=(1, 2))
+
+        assert response == mock_response
+        assert mock_request.call_args[1]['timeout'] == (1, 2)
+        metrics = pool.get_metrics()
+        assert metrics['requests_total'] == 1
+        assert metrics['in_flight'] == 0
+
+if __name__ == "__main__":
+    pytest.main([__file__])
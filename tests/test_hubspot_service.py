@@ -10,6 +10,7 @@ import sys
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from app.services.hubspot_service import HubSpotService
+from app.services.metadata_cache import metadata_cache
 
 class TestHubSpotService:
     """Test class for HubSpotService"""
@@ -50,7 +51,7 @@ class TestHubSpotService:
                 assert headers['Authorization'] == 'Bearer test-token'
                 assert headers['Content-Type'] == 'application/json'
 
-    @patch('app.services.hubspot_service.requests.request')
+    @patch('app.services.hubspot_service.http_pool.request')
     def test_make_request_success(self, mock_request):
         """Test successful API request"""
         mock_response = Mock()
@@ -65,7 +66,7 @@ class TestHubSpotService:
                 assert response == mock_response
                 mock_request.assert_called_once()
 
-    @patch('app.services.hubspot_service.requests.request')
+    @patch('app.services.hubspot_service.http_pool.request')
     def test_make_request_with_data(self, mock_request):
         """Test API request with data"""
         mock_response = Mock()
@@ -83,7 +84,7 @@ class TestHubSpotService:
                 call_args = mock_request.call_args
                 assert call_args[1]['json'] == test_data
 
-    @patch('app.services.hubspot_service.requests.request')
+    @patch('app.services.hubspot_service.http_pool.request')
     def test_make_request_with_params(self, mock_request):
         """Test API request with query parameters"""
         mock_response = Mock()
@@ -152,17 +153,23 @@ class TestHubSpotService:
             assert result['success'] is False
             assert 'error' in result
 
+    @patch('app.services.hubspot_service.HubSpotService.get_hubspot_token', return_value='pat-test')
+    @patch('app.services.hubspot_service.current_app')
     @patch('app.services.hubspot_service.HubSpotService.make_request')
-    def test_get_contact_properties(self, mock_make_request):
-        """Test getting contact properties"""
+    def test_get_contact_properties(self, mock_make_request, mock_app, mock_token):
+        """Test getting contact properties (served from the metadata cache on repeat)"""
+        metadata_cache.clear()
+        mock_app.config = {}
         mock_response = Mock()
         mock_response.status_code = 200
+        mock_response.json.return_value = {'results': [{'name': 'email'}]}
         mock_make_request.return_value = mock_response
 
-        response = HubSpotService.get_contact_properties()
+        first = HubSpotService.get_contact_properties()
+        second = HubSpotService.get_contact_properties()
 
-        assert response == mock_response
-        mock_make_request.assert_called_once_with('GET', '/crm/v3/properties/contacts')
+        assert first == second == {'results': [{'name': 'email'}]}
+        mock_make_request.assert_called_once_with('GET', '/crm/v3/properties/contacts', params=None, user_id=None)
 
     @patch('app.services.hubspot_service.HubSpotService.make_request')
     def test_get_deals(self, mock_make_request):
@@ -269,29 +276,39 @@ class TestHubSpotService:
         assert response == mock_response
         mock_make_request.assert_called_once_with('GET', '/crm/v3/objects/companies', params={'limit': 5})
 
+    @patch('app.services.hubspot_service.HubSpotService.get_hubspot_token', return_value='pat-test')
+    @patch('app.services.hubspot_service.current_app')
     @patch('app.services.hubspot_service.HubSpotService.make_request')
-    def test_get_owners(self, mock_make_request):
+    def test_get_owners(self, mock_make_request, mock_app, mock_token):
         """Test getting owners"""
+        metadata_cache.clear()
+        mock_app.config = {}
         mock_response = Mock()
         mock_response.status_code = 200
+        mock_response.json.return_value = {'results': []}
         mock_make_request.return_value = mock_response
 
         response = HubSpotService.get_owners(limit=10)
 
-        assert response == mock_response
-        mock_make_request.assert_called_once_with('GET', '/crm/v3/objects/owners', params={'limit': 10})
+        assert response == {'results': []}
+        mock_make_request.assert_called_once_with('GET', '/crm/v3/owners', params={'limit': 10}, user_id=None)
 
+    @patch('app.services.hubspot_service.HubSpotService.get_hubspot_token', return_value='pat-test')
+    @patch('app.services.hubspot_service.current_app')
     @patch('app.services.hubspot_service.HubSpotService.make_request')
-    def test_get_deal_pipelines(self, mock_make_request):
-        """Test getting deal pipelines"""
+    def test_get_deal_pipelines(self, mock_make_request, mock_app, mock_token):
+        """Test getting deal pipelines and deriving stages from them"""
+        metadata_cache.clear()
+        mock_app.config = {}
+        pipelines = {'results': [{'id': 'default', 'stages': [{'id': 'appointmentscheduled'}]}]}
         mock_response = Mock()
         mock_response.status_code = 200
+        mock_response.json.return_value = pipelines
         mock_make_request.return_value = mock_response
 
-        response = HubSpotService.get_deal_pipelines()
-
-        assert response == mock_response
-        mock_make_request.assert_called_once_with('GET', '/crm/v3/pipelines/deals')
+        assert HubSpotService.get_deal_pipelines() == pipelines
+        assert HubSpotService.get_deal_stages('default') == pipelines['results'][0]
+        mock_make_request.assert_called_once_with('GET', '/crm/v3/pipelines/deals', params=None, user_id=None)
 
     @patch('app.services.hubspot_service.HubSpotService.make_request')
     def test_get_contact_schemas(self, mock_make_request):
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for lead listing and lead analytics
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from app.config import TestingConfig
+from app.main import create_app
+from app.services.hubspot_service import HubSpotService, lead_analytics_cache
+
+def _response(contacts, after=None, status_code=200):
+    response = Mock(status_code=status_code, text='')
+    body = {'results': [{'id': str(i), 'properties': properties} for i, properties in enumerate(contacts, 1)]}
+    if after:
+        body['paging'] = {'next': {'after': after}}
+    response.json.return_value = body
+    return response
+
+def _contact(stage, status='NEW', source='WhatsApp'):
+    return {'lifecyclestage': stage, 'lead_status': status, 'lead_source': source}
+
+@pytest.fixture
+def app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        lead_analytics_cache.clear()
+        yield app
+        lead_analytics_cache.clear()
+
+class TestLeads:
+    """Test class for lead listing and analytics"""
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_get_leads_uses_search(self, mock_make_request, app):
+        """Test that filters go in a search body instead of ignored query params"""
+        mock_make_request.return_value = _response([_contact('lead')])
+
+        HubSpotService.get_leads(limit=20, user_id=1, after='40', lead_status='NEW')
+
+        method, endpoint, payload = mock_make_request.call_args.args
+        assert (method, endpoint) == ('POST', '/crm/v3/objects/contacts/search')
+        assert payload['filterGroups'][0]['filters'] == [
+            {'propertyName': 'lifecyclestage', 'operator': 'EQ', 'value': 'lead'},
+            {'propertyName': 'lead_status', 'operator': 'EQ', 'value': 'NEW'}
+        ]
+        assert (payload['limit'], payload['after']) == (20, '40')
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_analytics_funnel(self, mock_make_request, app):
+        """Test that lead counts cover the lead stage and the funnel every stage, across every page"""
+        mock_make_request.side_effect = [
+            _response([_contact('lead'), _contact('lead', source=None)], after='2'),
+            _response([_contact('opportunity', status='QUALIFIED'), _contact('customer', status='QUALIFIED')])
+        ]
+
+        analytics = HubSpotService.get_lead_analytics(user_id=1)
+
+        assert analytics['total_leads'] == 2
+        assert analytics['lead_statuses'] == {'NEW': 2}
+        assert analytics['lead_sources'] == {'WhatsApp': 1, 'UNKNOWN': 1}
+        reached = {step['stage']: step['reached'] for step in analytics['funnel']}
+        assert reached == {'lead': 4, 'marketingqualifiedlead': 2, 'salesqualifiedlead': 2,
+                           'opportunity': 2, 'customer': 1, 'evangelist': 0}
+        assert analytics['funnel'][1]['conversion_from_previous'] == 0.5
+        assert analytics['conversion_rate'] == 0.25
+        payload = mock_make_request.call_args_list[0].args[2]
+        assert payload['properties'] == ['lifecyclestage', 'lead_status', 'lead_source']
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_analytics_cached_per_user(self, mock_make_request, app):
+        """Test the per-user cache, refresh and invalidation on lead writes"""
+        mock_make_request.return_value = _response([_contact('lead')])
+
+        first = HubSpotService.get_lead_analytics(user_id=1)
+        assert HubSpotService.get_lead_analytics(user_id=1) is first
+        assert mock_make_request.call_count == 1
+
+        HubSpotService.get_lead_analytics(user_id=2)
+        HubSpotService.get_lead_analytics(user_id=1, refresh=True)
+        assert mock_make_request.call_count == 3
+
+        lead_analytics_cache.invalidate('1')
+        HubSpotService.get_lead_analytics(user_id=1)
+        assert mock_make_request.call_count == 4
+
+    @patch('app.services.hubspot_service.HubSpotService._cache_written_object')
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_qualify_lead_clears_cache(self, mock_make_request, mock_cache_written, app):
+        """Test that a stage change is visible on the next analytics call"""
+        mock_make_request.return_value = _response([_contact('lead')])
+        HubSpotService.get_lead_analytics(user_id=1)
+
+        mock_make_request.return_value = Mock(status_code=200, json=Mock(return_value={'id': '1', 'properties': {}}))
+        HubSpotService.qualify_lead('1', {}, user_id=1)
+
+        assert lead_analytics_cache.get('1') is None
+
+if __name__ == "__main__":
+    pytest.main([__file__])
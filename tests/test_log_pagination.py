@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Unit tests for keyset pagination of GET /api/logs
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.db.database import db
+from app.db.pagination import encode_cursor, decode_cursor, InvalidCursor
+from app.models import ChatSession, ChatMessage, Log
+
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def logs(user):
+    """30 logs spread over 3 messages, two of them sharing a timestamp"""
+    session = ChatSession(user_id=user.id, status='active')
+    db.session.add(session)
+    db.session.flush()
+    messages = [ChatMessage(session_id=session.id, message_text=f'm{i}') for i in range(3)]
+    db.session.add_all(messages)
+    db.session.flush()
+    for i in range(30):
+        db.session.add(Log(
+            user_id=user.id, session_id=session.id, chat_message_id=messages[i % 3].id,
+            log_type='contact' if i % 2 else 'deal', sync_status='synced' if i % 5 else 'failed',
+            created_at=START + timedelta(minutes=min(i, 20))  # logs 20..29 share a timestamp
+        ))
+    db.session.commit()
+
+def _get(app, headers, **params):
+    response = app.test_client().get('/api/logs', query_string=params, headers=headers)
+    return response.status_code, response.get_json()
+
+class TestCursor:
+    """Test class for cursor encoding"""
+
+    def test_round_trip(self):
+        """Test that a cursor decodes to its sort key"""
+        assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
+
+    def test_garbage_is_rejected(self):
+        """Test that an unreadable cursor raises InvalidCursor"""
+        with pytest.raises(InvalidCursor):
+            decode_cursor('not-a-cursor')
+
+@pytest.mark.usefixtures('logs')
+class TestGetLogs:
+    """Test class for GET /api/logs"""
+
+    def test_pages_cover_every_log_once(self, app, auth_headers):
+        """Test that following next_cursor returns every log once, newest first"""
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 7}
+            if cursor:
+                params['cursor'] = cursor
+            status, data = _get(app, auth_headers, **params)
+            assert status == 200
+            seen.extend(log['id'] for log in data['logs'])
+            cursor = data['next_cursor']
+            assert data['has_more'] == (cursor is not None)
+            if not cursor:
+                break
+
+        assert len(seen) == 30
+        assert len(set(seen)) == 30
+        with app.app_context():
+            expected = [log.id for log in Log.query.order_by(Log.created_at.desc(), Log.id.desc())]
+        assert seen == expected
+
+    def test_filters(self, app, auth_headers):
+        """Test log_type, sync_status and date range filters"""
+        _, data = _get(app, auth_headers, log_type='deal', sync_status='failed', limit=200)
+        assert data['total'] == 3
+        assert all(log['log_type'] == 'deal' and log['sync_status'] == 'failed' for log in data['logs'])
+
+        _, data = _get(app, auth_headers, since=(START + timedelta(minutes=5)).isoformat(),
+                       until=(START + timedelta(minutes=10)).isoformat())
+        assert data['total'] == 5
+
+    def test_embedded_message_counts(self, app, auth_headers):
+        """Test that embedded messages carry their log counts"""
+        _, data = _get(app, auth_headers, limit=3)
+        for log in data['logs']:
+            assert log['message']['log_count'] == 10
+            assert log['message']['has_logs'] is True
+
+    def test_query_count_does_not_grow_with_page_size(self, app, auth_headers):
+        """Test that a page costs a fixed number of queries"""
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                _get(app, auth_headers, limit=2)
+                small = len(statements)
+                statements.clear()
+                _get(app, auth_headers, limit=30)
+                large = len(statements)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+        assert large == small
+
+    def test_bad_arguments(self, app, auth_headers):
+        """Test 400s for an invalid cursor or date"""
+        assert _get(app, auth_headers, cursor='garbage')[0] == 400
+        assert _get(app, auth_headers, since='yesterday')[0] == 400
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the write-behind audit log sink
+"""
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy.exc import OperationalError
+from app.db.database import db
+from app.models import Log, User
+from app.services.log_sink import log_sink, LogSink
+
+LOCKED = OperationalError('INSERT INTO logs', {}, Exception('database is locked'))
+
+@pytest.fixture
+def app(app):
+    """The shared app, with the sink flushed before its tables are dropped"""
+    yield app
+    log_sink.flush()
+
+class TestLogSink:
+    """Test class for LogSink"""
+
+    def test_synchronous_write_is_visible_immediately(self, app):
+        """Test that synchronous mode inserts on write"""
+        log_sink.write(1, 1, 1, 'contact_action', hubspot_id='123', sync_status='synced')
+
+        log = Log.query.one()
+        assert log.hubspot_id == '123'
+        assert log.synced_at is not None
+
+    def test_buffered_write_waits_for_flush(self, app):
+        """Test that buffered mode defers the INSERT"""
+        app.config['LOG_SINK_SYNCHRONOUS'] = False
+        app.config['LOG_SINK_FLUSH_INTERVAL'] = 60
+        log_sink.write(1, 1, 1, 'deal', hubspot_id='456', sync_status='synced')
+
+        assert log_sink.get_metrics()['queued'] == 1
+        log_sink.flush()
+        assert Log.query.filter_by(hubspot_id='456').count() == 1
+
+    def test_write_many_and_extra_columns(self, app):
+        """Test bulk rows and lead/deal tracking columns"""
+        rows = [
+            log_sink.build_row(1, 1, 1, 'lead', hubspot_id=str(i), lead_status='NEW')
+            for i in range(5)
+        ]
+        log_sink.write_many(rows)
+
+        assert Log.query.filter_by(log_type='lead', lead_status='NEW').count() == 5
+
+    def test_failed_status_has_no_synced_at(self, app):
+        """Test that failed rows are not stamped as synced"""
+        log_sink.write(1, 1, 1, 'note', sync_status='failed', sync_error='boom')
+
+        log = Log.query.one()
+        assert log.sync_status == 'failed'
+        assert log.synced_at is None
+
+    def test_unknown_column_is_rejected(self, app):
+        """Test that typos in column names fail loudly"""
+        with pytest.raises(TypeError):
+            log_sink.write(1, 1, 1, 'note', not_a_column='x')
+
+    @patch.object(LogSink, '_ensure_thread')  # flushes only when the test says so
+    def test_bad_row_does_not_drop_the_batch(self, _thread, app):
+        """Test that a constraint violation only drops the offending row"""
+        app.config['LOG_SINK_SYNCHRONOUS'] = False
+        failed = log_sink.get_metrics()['failed']
+        log_sink.write_many([log_sink.build_row(1, 1, 1, 'note', hubspot_id='1'),
+                             log_sink.build_row(1, None, 1, 'note', hubspot_id='2'),
+                             log_sink.build_row(2, 1, 1, 'note', hubspot_id='3')])
+        log_sink.flush()
+
+        assert sorted(log.hubspot_id for log in Log.query.all()) == ['1', '3']
+        assert log_sink.get_metrics()['failed'] == failed + 1
+
+    @patch.object(LogSink, '_ensure_thread')  # flushes only when the test says so
+    def test_transient_error_is_retried(self, _thread, app):
+        """Test that a locked database re-queues the batch for the next flush"""
+        app.config['LOG_SINK_SYNCHRONOUS'] = False
+        log_sink.write(1, 1, 1, 'deal', hubspot_id='456')
+        with patch.object(LogSink, '_execute', side_effect=LOCKED):
+            log_sink.flush()
+
+        assert Log.query.count() == 0
+        assert log_sink.get_metrics()['queued'] == 1
+        log_sink.flush()
+        assert Log.query.filter_by(hubspot_id='456').count() == 1
+
+    @patch.object(LogSink, '_ensure_thread')  # flushes only when the test says so
+    def test_retries_are_bounded(self, _thread, app):
+        """Test that a batch is dropped after LOG_SINK_MAX_RETRIES retries"""
+        app.config.update(LOG_SINK_SYNCHRONOUS=False, LOG_SINK_MAX_RETRIES=1)
+        failed = log_sink.get_metrics()['failed']
+        log_sink.write(1, 1, 1, 'deal')
+        with patch.object(LogSink, '_execute', side_effect=LOCKED) as execute:
+            log_sink.flush()
+            log_sink.flush()
+
+        assert execute.call_count == 2
+        assert log_sink.get_metrics()['queued'] == 0
+        assert log_sink.get_metrics()['failed'] == failed + 1
+
+    def test_synchronous_write_raises_transient_error(self, app):
+        """Test that synchronous mode surfaces a locked database to the caller"""
+        with patch.object(LogSink, '_execute', side_effect=LOCKED):
+            with pytest.raises(OperationalError):
+                log_sink.write(1, 1, 1, 'note')
+
+    def test_synchronous_write_leaves_caller_session_alone(self, app):
+        """Test that a log write neither commits nor discards the caller's pending work"""
+        def pending_user(username):
+            db.session.add(User(name='Pending', username=username, password='testpass123',
+                                phone_number='+15551234567', hubspot_pat_token='test-token'))
+
+        pending_user('kept')
+        log_sink.write(1, None, 1, 'note')  # rejected row: NULL session_id
+        db.session.commit()
+        assert User.query.filter_by(username='kept').count() == 1
+
+        pending_user('discarded')
+        log_sink.write(1, 1, 1, 'note', hubspot_id='1')
+        db.session.rollback()
+        assert User.query.filter_by(username='discarded').count() == 0
+        assert Log.query.filter_by(hubspot_id='1').count() == 1
+
+    def test_unbound_sink_needs_app_context(self):
+        """Test that a sink without an app fails clearly outside an app context"""
+        with pytest.raises(RuntimeError, match='init_app'):
+            LogSink().write(1, 1, 1, 'note')
+
+if __name__ == "__main__":
+    pytest.main([__file__])
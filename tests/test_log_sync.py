@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the outbox replay of failed HubSpot writes
+"""
+
+import json
+import pytest
+import requests
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from urllib3.exceptions import NewConnectionError
+from app.db.database import db
+from app.models import Log
+from app.services.hubspot_service import HubSpotService
+from app.services.log_sync import log_sync
+from app.services.rate_limiter import HubSpotRateLimitError
+from app.services.object_cache import object_cache
+
+@pytest.fixture(autouse=True)
+def outbox(chat_message, hubspot_token):
+    """The test user, session and message, a stubbed HubSpot token and an empty object cache"""
+    object_cache.clear()
+
+@pytest.fixture
+def hubspot():
+    with patch('app.services.hubspot_service.HubSpotService.make_request') as mock_make_request:
+        yield mock_make_request
+
+def _make_due():
+    Log.query.update({Log.next_retry_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+class TestFailedWriteCapture:
+    """Test class for recording replayable failures"""
+
+    def test_server_error_is_queued_for_replay(self, app, hubspot, hubspot_response):
+        """Test that a 503 keeps the batch input and a retry time"""
+        hubspot.return_value = hubspot_response(503, text='unavailable')
+        HubSpotService.create_contact({'email': 'a@example.com'}, 1, 1, user_id=1)
+
+        log = Log.query.one()
+        assert log.sync_status == 'failed'
+        assert log.sync_object_type == 'contacts'
+        assert log.sync_operation == 'create'
+        assert json.loads(log.sync_payload) == {'properties': {'email': 'a@example.com'}}
+        assert log.sync_attempts == 1
+        assert log.next_retry_at > datetime.utcnow()
+
+    def test_validation_error_is_not_replayed(self, app, hubspot, hubspot_response):
+        """Test that a 400 is logged without replay instructions"""
+        hubspot.return_value = hubspot_response(400, text='bad email')
+        HubSpotService.create_contact({'email': 'nope'}, 1, 1, user_id=1)
+
+        log = Log.query.one()
+        assert log.sync_payload is None
+        assert log.next_retry_at is None
+
+    def test_exhausted_rate_limit_is_queued_for_replay(self, app, hubspot_response):
+        """Test that running out of 429 retries still leaves a replayable log"""
+        app.config.update(HUBSPOT_MAX_RETRIES=1, HUBSPOT_BACKOFF_BASE=0, HUBSPOT_BACKOFF_MAX=0)
+        throttled = hubspot_response(429, text='rate limited')
+        throttled.headers = {}
+        with patch('app.services.hubspot_service.http_pool.request', return_value=throttled) as request:
+            with pytest.raises(HubSpotRateLimitError):
+                HubSpotService.update_contact('7', {'lifecyclestage': 'lead'}, 1, 1, user_id=1)
+
+        assert request.call_count == 2
+        log = Log.query.one()
+        assert log.sync_status == 'failed'
+        assert log.sync_operation == 'update'
+        assert json.loads(log.sync_payload) == {'id': '7', 'properties': {'lifecyclestage': 'lead'}}
+        assert log.next_retry_at > datetime.utcnow()
+
+    def test_connect_timeout_is_queued_for_replay(self, app, hubspot):
+        """Test that a create that never reached HubSpot is logged for replay and the error reaches the caller"""
+        hubspot.side_effect = requests.ConnectTimeout('connect timed out')
+        with pytest.raises(requests.ConnectTimeout):
+            HubSpotService.create_note({'hs_note_body': 'hi'}, session_id=1, message_id=1, user_id=1)
+
+        log = Log.query.one()
+        assert log.sync_error == 'connect timed out'
+        assert (log.sync_object_type, log.sync_operation) == ('notes', 'create')
+        assert log.next_retry_at > datetime.utcnow()
+
+    def test_read_timeout_on_create_is_not_replayed(self, app, hubspot):
+        """Test that a create HubSpot may have applied is logged without replay instructions"""
+        hubspot.side_effect = requests.ReadTimeout('read timed out')
+        with pytest.raises(requests.ReadTimeout):
+            HubSpotService.create_note({'hs_note_body': 'hi'}, session_id=1, message_id=1, user_id=1)
+
+        log = Log.query.one()
+        assert log.sync_status == 'failed'
+        assert log.sync_payload is None and log.next_retry_at is None
+
+    def test_read_timeout_on_update_is_queued_for_replay(self, app, hubspot):
+        """Test that updates are idempotent and replayed after a read timeout"""
+        hubspot.side_effect = requests.ReadTimeout('read timed out')
+        with pytest.raises(requests.ReadTimeout):
+            HubSpotService.update_contact('7', {'firstname': 'Ann'}, 1, 1, user_id=1)
+
+        log = Log.query.one()
+        assert log.sync_operation == 'update'
+        assert log.next_retry_at > datetime.utcnow()
+
+    def test_resend_would_duplicate(self, hubspot_response):
+        """Test which failed creates HubSpot may have applied"""
+        refused = requests.ConnectionError(Mock(reason=NewConnectionError(None, 'Connection refused')))
+        assert not HubSpotService._resend_would_duplicate(refused)
+        assert not HubSpotService._resend_would_duplicate(HubSpotRateLimitError('limited'))
+        assert not HubSpotService._resend_would_duplicate(hubspot_response(503))
+        assert HubSpotService._resend_would_duplicate(requests.ConnectionError('Connection aborted'))
+        assert HubSpotService._resend_would_duplicate(hubspot_response(502))
+
+class TestLogSyncWorker:
+    """Test class for LogSyncWorker"""
+
+    def test_replays_creates_as_one_batch(self, app, hubspot, hubspot_response):
+        """Test that due creates go out in one batch call and become synced"""
+        hubspot.return_value = hubspot_response(503, text='unavailable')
+        HubSpotService.create_contact({'email': 'a@example.com'}, 1, 1, user_id=1)
+        HubSpotService.create_contact({'email': 'b@example.com'}, 1, 1, user_id=1)
+        _make_due()
+
+        hubspot.reset_mock()
+        hubspot.return_value = hubspot_response(201, {'results': [
+            {'id': '11', 'properties': {'email': 'a@example.com'}},
+            {'id': '12', 'properties': {'email': 'b@example.com'}}
+        ]})
+        assert log_sync.run_once(app) == 2
+
+        hubspot.assert_called_once()
+        assert hubspot.call_args[0][1] == '/crm/v3/objects/contacts/batch/create'
+        logs = Log.query.order_by(Log.id).all()
+        assert [log.sync_status for log in logs] == ['synced', 'synced']
+        assert [log.hubspot_id for log in logs] == ['11', '12']
+        assert all(log.next_retry_at is None and log.sync_attempts == 2 for log in logs)
+
+    def test_groups_by_operation(self, app, hubspot, hubspot_response):
+        """Test that updates and deletes are replayed through their own batch endpoints"""
+        hubspot.return_value = hubspot_response(500, text='error')
+        HubSpotService.update_contact('7', {'firstname': 'Ann'}, 1, 1, user_id=1)
+        HubSpotService.delete_company('9', 1, 1, user_id=1)
+        _make_due()
+
+        hubspot.reset_mock()
+        hubspot.side_effect = lambda method, endpoint, *args, **kwargs: (
+            hubspot_response(204) if endpoint.endswith('archive')
+            else hubspot_response(200, {'results': [{'id': '7', 'properties': {'firstname': 'Ann'}}]})
+        )
+        log_sync.run_once(app)
+
+        endpoints = sorted(call[0][1] for call in hubspot.call_args_list)
+        assert endpoints == ['/crm/v3/objects/companies/batch/archive', '/crm/v3/objects/contacts/batch/update']
+        assert {log.sync_status for log in Log.query.all()} == {'synced'}
+
+    def test_failure_backs_off_then_gives_up(self, app, hubspot, hubspot_response):
+        """Test rescheduling and the max-attempt cap"""
+        app.config['LOG_SYNC_MAX_ATTEMPTS'] = 3
+        hubspot.return_value = hubspot_response(503, text='unavailable')
+        HubSpotService.create_deal({'dealname': 'Big'}, session_id=1, message_id=1, user_id=1)
+
+        _make_due()
+        log_sync.run_once(app)
+        log = Log.query.one()
+        assert log.sync_attempts == 2
+        assert log.next_retry_at > datetime.utcnow()
+
+        _make_due()
+        log_sync.run_once(app)
+        log = Log.query.one()
+        assert log.sync_attempts == 3
+        assert log.next_retry_at is None
+        assert log_sync.run_once(app) == 0
+        assert log_sync.get_backlog()['exhausted'] == 1
+
+    def test_create_replay_that_may_have_applied_is_final(self, app, hubspot, hubspot_response):
+        """Test that a replayed create batch is not sent again after a read timeout"""
+        hubspot.return_value = hubspot_response(503, text='unavailable')
+        HubSpotService.create_deal({'dealname': 'Big'}, session_id=1, message_id=1, user_id=1)
+
+        _make_due()
+        hubspot.return_value = None
+        hubspot.side_effect = requests.ReadTimeout('read timed out')
+        log_sync.run_once(app)
+
+        log = Log.query.one()
+        assert (log.sync_status, log.sync_attempts) == ('failed', 2)
+        assert log.next_retry_at is None
+
+    def test_backlog_metrics(self, app, hubspot, hubspot_response):
+        """Test backlog counts"""
+        hubspot.return_value = hubspot_response(429, text='slow down')
+        HubSpotService.create_task({'hs_task_subject': 'Call'}, session_id=1, message_id=1, user_id=1)
+
+        backlog = log_sync.get_metrics()['backlog']
+        assert backlog['due'] == 0
+        assert backlog['scheduled_by_object_type'] == {'tasks': 1}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the portal-scoped HubSpot metadata cache
+"""
+
+import threading
+import pytest
+from unittest.mock import Mock
+from flask import Flask
+from app.services.metadata_cache import MetadataCache
+
+@pytest.fixture
+def app():
+    """Bare app so background refreshes have an application to push"""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+class TestMetadataCache:
+    """Test class for MetadataCache"""
+
+    def test_fresh_entry_is_served_from_cache(self, app):
+        """Test that the loader runs once within the TTL"""
+        cache = MetadataCache()
+        loader = Mock(return_value={'results': []})
+
+        for _ in range(3):
+            assert cache.get_or_load('portal-a', 'properties:contacts', loader, ttl=60) == {'results': []}
+
+        loader.assert_called_once()
+        assert cache.get_metrics()['hits'] == 2
+
+    def test_portals_are_isolated(self, app):
+        """Test that two portals never share an entry"""
+        cache = MetadataCache()
+        cache.get_or_load('portal-a', 'owners:10', lambda: 'a', ttl=60)
+
+        assert cache.get_or_load('portal-b', 'owners:10', lambda: 'b', ttl=60) == 'b'
+
+    def test_stale_entry_is_served_while_refreshing(self, app):
+        """Test stale-while-revalidate"""
+        cache = MetadataCache()
+        cache.get_or_load('portal-a', 'pipelines:deals', lambda: 'old', ttl=60)
+        cache._data[('portal-a', 'pipelines:deals')] = ('old', 0)  # pretend it was fetched long ago
+
+        assert cache.get_or_load('portal-a', 'pipelines:deals', lambda: 'new', ttl=1, stale_ttl=1e12) == 'old'
+        for thread in threading.enumerate():
+            if thread.name == 'hubspot-metadata-refresh':
+                thread.join(timeout=5)
+
+        assert cache._data[('portal-a', 'pipelines:deals')][0] == 'new'
+        assert cache.get_metrics()['background_refreshes'] == 1
+
+    def test_failed_load_is_not_cached(self, app):
+        """Test that errors propagate and leave nothing behind"""
+        cache = MetadataCache()
+        with pytest.raises(RuntimeError):
+            cache.get_or_load('portal-a', 'owners:10', Mock(side_effect=RuntimeError('boom')), ttl=60)
+
+        assert cache.get_metrics()['entries'] == 0
+
+    def test_invalidate_by_portal_and_prefix(self, app):
+        """Test manual invalidation"""
+        cache = MetadataCache()
+        for portal in ('portal-a', 'portal-b'):
+            cache.get_or_load(portal, 'properties:contacts', lambda: 1, ttl=60)
+            cache.get_or_load(portal, 'pipelines:deals', lambda: 2, ttl=60)
+
+        assert cache.invalidate(portal='portal-a', name='properties') == 1
+        assert cache.invalidate(name='pipelines') == 2
+        assert cache.get_metrics()['entries'] == 1
+
+    def test_recorded_invalidations_are_applied_once(self, app):
+        """Test that invalidations from other processes are replayed in order and throttled"""
+        cache = MetadataCache()
+        cache.get_or_load('portal-a', 'properties:contacts', lambda: 1, ttl=60)
+        cache.get_or_load('portal-b', 'properties:contacts', lambda: 2, ttl=60)
+        recorded = [(1, 'portal-a', 'properties'), (2, None, 'owners')]
+        load_since = Mock(side_effect=lambda since: [row for row in recorded if row[0] > since])
+
+        assert cache.apply_invalidations(load_since, interval=60) == 1
+        assert cache.apply_invalidations(load_since, interval=60) == 0  # within the interval
+        assert cache.apply_invalidations(load_since, interval=0) == 0  # nothing new since id 2
+
+        load_since.assert_called_with(2)
+        assert load_since.call_count == 2
+        assert cache.get_metrics()['remote_invalidations'] == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__])
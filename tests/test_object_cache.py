@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the HubSpot record cache behind get_*_by_id
+"""
+
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from app.services.object_cache import ObjectCache, object_cache
+from app.services.hubspot_service import HubSpotService
+
+CONTACT = {'id': '101', 'properties': {'email': 'a@example.com', 'firstname': 'Ann', 'hs_object_id': '101'}}
+
+@pytest.fixture
+def service():
+    """Patch token lookup so HubSpotService runs in a bare app with default config"""
+    object_cache.clear()
+    with Flask(__name__).app_context(), \
+         patch('app.services.hubspot_service.HubSpotService.get_hubspot_token', return_value='pat-test'), \
+         patch('app.services.hubspot_service.HubSpotService.make_request') as mock_make_request:
+        yield mock_make_request
+    object_cache.clear()
+
+class TestObjectCache:
+    """Test class for ObjectCache"""
+
+    def test_exact_property_set_hit(self):
+        """Test that a record is served back for the same property set"""
+        cache = ObjectCache()
+        cache.put('p', 'contacts', '101', CONTACT, ttl=60, properties=['firstname', 'email'])
+
+        assert cache.get('p', 'contacts', 101, ['email', 'firstname']) == ('hit', CONTACT)
+        assert cache.get('p', 'contacts', 101)[0] == 'miss'
+
+    def test_subset_is_projected(self):
+        """Test that a wider variant answers a narrower property request"""
+        cache = ObjectCache()
+        cache.put('p', 'contacts', '101', CONTACT, ttl=60)
+
+        status, record = cache.get('p', 'contacts', '101', ['email'])
+        assert status == 'hit'
+        assert record['properties'] == {'email': 'a@example.com', 'hs_object_id': '101'}
+
+    def test_expiry_and_not_found(self):
+        """Test TTL expiry and negative entries"""
+        cache = ObjectCache()
+        cache.put('p', 'deals', '1', {'id': '1', 'properties': {}}, ttl=-1)
+        assert cache.get('p', 'deals', '1')[0] == 'miss'
+
+        cache.put_not_found('p', 'deals', '2', 'gone', ttl=60)
+        assert cache.get('p', 'deals', '2') == ('not_found', 'gone')
+
+    def test_lru_bounds_and_footprint(self):
+        """Test record-count eviction and byte accounting"""
+        cache = ObjectCache()
+        cache.maxsize = 2
+        for object_id in ('1', '2', '3'):
+            cache.put('p', 'notes', object_id, {'id': object_id, 'properties': {}}, ttl=60)
+
+        metrics = cache.get_metrics()
+        assert metrics['objects'] == 2
+        assert metrics['evictions'] == 1
+        assert cache.get('p', 'notes', '1')[0] == 'miss'
+
+        cache.clear()
+        assert cache.get_metrics()['approx_bytes'] == 0
+
+class TestHubSpotServiceObjectCache:
+    """Test class for the read-through / write-through wiring in HubSpotService"""
+
+    def test_read_through(self, service, hubspot_response):
+        """Test that a second read does not call HubSpot"""
+        service.return_value = hubspot_response(200, CONTACT)
+
+        assert HubSpotService.get_contact_by_id('101') == CONTACT
+        assert HubSpotService.get_contact_by_id('101') == CONTACT
+        service.assert_called_once_with('GET', '/crm/v3/objects/contacts/101', user_id=None)
+
+    def test_create_populates_cache(self, service, hubspot_response):
+        """Test that a created record is readable without a GET"""
+        service.return_value = hubspot_response(201, CONTACT)
+        HubSpotService.create_contact({'email': 'a@example.com'})
+
+        assert HubSpotService.get_contact_by_id('101')['id'] == '101'
+        service.assert_called_once()
+
+    def test_delete_caches_not_found(self, service, hubspot_response):
+        """Test that a deleted record is answered as a 404 locally"""
+        service.return_value = hubspot_response(200, CONTACT)
+        HubSpotService.get_contact_by_id('101')
+
+        service.return_value = hubspot_response(204)
+        HubSpotService.delete_contact('101')
+
+        with pytest.raises(Exception, match='404'):
+            HubSpotService.get_contact_by_id('101')
+        assert service.call_count == 2
+
+    def test_404_is_negatively_cached(self, service, hubspot_response):
+        """Test negative caching of missing records"""
+        service.return_value = hubspot_response(404, text='not found')
+
+        for _ in range(2):
+            with pytest.raises(Exception, match='404'):
+                HubSpotService.get_deal_by_id('999')
+        service.assert_called_once()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
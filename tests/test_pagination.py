@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the cursor-following HubSpot iterators
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from app.services.hubspot_service import HubSpotService
+
+def _page(ids, after=None):
+    response = Mock()
+    response.status_code = 200
+    body = {'results': [{'id': str(i)} for i in ids]}
+    if after:
+        body['paging'] = {'next': {'after': after}}
+    response.json.return_value = body
+    return response
+
+class TestIterators:
+    """Test class for iter_pages / iter_objects / iter_search"""
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_iter_objects_follows_cursor(self, mock_make_request):
+        """Test that every page is fetched, passing the previous cursor"""
+        mock_make_request.side_effect = [_page([1, 2], after='2'), _page([3], after=None)]
+
+        ids = [record['id'] for record in HubSpotService.iter_contacts(page_size=2)]
+
+        assert ids == ['1', '2', '3']
+        second_params = mock_make_request.call_args_list[1].kwargs['params']
+        assert second_params['after'] == '2'
+        assert second_params['limit'] == 2
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_iterator_is_lazy(self, mock_make_request):
+        """Test that pages are only requested as records are consumed"""
+        mock_make_request.side_effect = [_page([1, 2], after='2'), _page([3])]
+
+        records = HubSpotService.iter_objects('deals', page_size=2)
+        assert mock_make_request.call_count == 0
+        next(records)
+        assert mock_make_request.call_count == 1
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_max_records_stops_early(self, mock_make_request):
+        """Test that max_records trims the last request and stops paging"""
+        mock_make_request.side_effect = [_page([1, 2], after='2'), _page([3], after='3')]
+
+        ids = [r['id'] for r in HubSpotService.iter_objects('notes', page_size=2, max_records=3)]
+
+        assert ids == ['1', '2', '3']
+        assert mock_make_request.call_args_list[1].kwargs['params']['limit'] == 1
+        assert mock_make_request.call_count == 2
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_properties_are_joined(self, mock_make_request):
+        """Test the properties query parameter"""
+        mock_make_request.return_value = _page([1])
+
+        list(HubSpotService.iter_objects('companies', properties=['name', 'domain']))
+
+        assert mock_make_request.call_args.kwargs['params']['properties'] == 'name,domain'
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_iter_search_sends_after_in_body(self, mock_make_request):
+        """Test search pagination"""
+        mock_make_request.side_effect = [_page([1], after='1'), _page([2])]
+
+        ids = [r['id'] for r in HubSpotService.iter_search('contacts', properties=['lead_status'])]
+
+        assert ids == ['1', '2']
+        assert mock_make_request.call_args_list[1].args[2]['after'] == '1'
+
+    @patch('app.services.hubspot_service.SEARCH_RESULT_LIMIT', 2)
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_iter_search_all_continues_past_the_search_limit(self, mock_make_request):
+        """Test that a full search window restarts from the last hs_object_id"""
+        mock_make_request.side_effect = [_page([1, 2], after='2'), _page([3])]
+
+        ids = [r['id'] for r in HubSpotService.iter_search_all(
+            'contacts', filter_groups=[{'filters': [{'propertyName': 'lifecyclestage', 'operator': 'EQ', 'value': 'lead'}]}]
+        )]
+
+        assert ids == ['1', '2', '3']
+        second = mock_make_request.call_args_list[1].args[2]
+        assert 'after' not in second
+        assert second['filterGroups'][0]['filters'][-1] == {'propertyName': 'hs_object_id', 'operator': 'GT', 'value': '2'}
+        assert second['sorts'] == [{'propertyName': 'hs_object_id', 'direction': 'ASCENDING'}]
+
+    @patch('app.services.hubspot_service.HubSpotService.make_request')
+    def test_error_is_raised(self, mock_make_request):
+        """Test that HubSpot errors surface from the iterator"""
+        error = Mock(status_code=500, text='boom')
+        mock_make_request.return_value = error
+
+        with pytest.raises(Exception, match='500'):
+            list(HubSpotService.iter_tasks())
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests for the hot query paths
+
+Seeds a few thousand rows, runs ANALYZE so the planner sees realistic
+statistics, and asserts that every hot query reads through an index
+instead of scanning its table.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, inspect, select, text
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.db.migrations import run_migrations
+from app.models import User, ChatSession, ChatMessage, Log, WebhookEvent
+
+USERS = 20
+SESSIONS_PER_USER = 10
+MESSAGES_PER_SESSION = 10
+START = datetime(2024, 1, 1)
+
+@pytest.fixture(scope='module')
+def app():
+    """App with a seeded database: 20 users, 200 sessions, 2000 messages, 4000 logs"""
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {'name': f'User {u}', 'username': f'user{u}', 'password_hash': 'x', 'phone_number': f'+1555000{u:04d}',
+             'phone_number_normalized': f'+1555000{u:04d}', 'hubspot_pat_token': 'token', 'is_active': True,
+             'created_at': START, 'updated_at': START}
+            for u in range(1, USERS + 1)
+        ])
+        db.session.execute(insert(ChatSession), [
+            {'user_id': u, 'status': 'active' if s == 0 else 'closed', 'started_at': START, 'created_at': START}
+            for u in range(1, USERS + 1) for s in range(SESSIONS_PER_USER)
+        ])
+        sessions = db.session.execute(select(ChatSession.id, ChatSession.user_id)).all()
+        db.session.execute(insert(ChatMessage), [
+            {'session_id': session_id, 'message_text': 'hi', 'timestamp': START + timedelta(minutes=m),
+             'created_at': START}
+            for session_id, _ in sessions for m in range(MESSAGES_PER_SESSION)
+        ])
+        messages = db.session.execute(
+            select(ChatMessage.id, ChatMessage.session_id, ChatSession.user_id).join(ChatSession)
+        ).all()
+        db.session.execute(insert(Log), [
+            {'user_id': user_id, 'session_id': session_id, 'chat_message_id': message_id,
+             'log_type': 'contact', 'sync_status': 'synced', 'hubspot_id': f'{message_id}{k}',
+             'created_at': START + timedelta(seconds=message_id * 2 + k), 'sync_attempts': 0}
+            for message_id, session_id, user_id in messages for k in range(2)
+        ])
+        db.session.execute(insert(WebhookEvent), [
+            {'payload': '{}', 'status': 'done', 'attempts': 1, 'received_at': START} for _ in range(500)
+        ])
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def _plan(statement):
+    """EXPLAIN QUERY PLAN detail lines for a SQLAlchemy statement"""
+    compiled = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return [row[3] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))]
+
+def _assert_indexed(statement):
+    plan = _plan(statement)
+    scans = [line for line in plan if line.startswith('SCAN') and 'INDEX' not in line]
+    assert not scans, f'full scan in plan: {plan}'
+    assert any('INDEX' in line or 'PRIMARY KEY' in line for line in plan), plan
+    return plan
+
+HOT_QUERIES = {
+    # GET /api/logs (first page, session filter) and ChatMessage.logs
+    'logs page': lambda: Log.query.filter_by(user_id=3).order_by(Log.created_at.desc(), Log.id.desc()).limit(51),
+    'logs page by session': lambda: Log.query.filter_by(user_id=3, session_id=25)
+        .order_by(Log.created_at.desc(), Log.id.desc()).limit(51),
+    'logs of a message': lambda: Log.query.filter_by(chat_message_id=5),
+    'logs by hubspot id': lambda: Log.query.filter_by(hubspot_id='120'),
+    'logs in date range': lambda: db.session.query(func.count(Log.id))
+        .filter(Log.created_at >= START + timedelta(hours=1), Log.created_at < START + timedelta(hours=2)),
+    # Outbox worker (app.services.log_sync)
+    'sync due rows': lambda: select(Log.id)
+        .where(Log.sync_status.in_(('pending', 'failed')), Log.next_retry_at <= START)
+        .order_by(Log.next_retry_at).limit(200),
+    'sync claimed rows': lambda: Log.query.filter_by(sync_claim='abc').order_by(Log.id),
+    # WhatsApp endpoints and ingestion
+    'session messages': lambda: ChatMessage.query.filter_by(session_id=25).order_by(ChatMessage.timestamp),
+    'messages today': lambda: db.session.query(func.count(ChatMessage.id))
+        .filter(ChatMessage.timestamp >= START + timedelta(days=1)),
+    'active sessions': lambda: db.session.query(func.count(ChatSession.id)).filter_by(status='active'),
+    'active session for senders': lambda: select(ChatSession.id, ChatSession.user_id)
+        .where(ChatSession.user_id.in_({1, 2}), ChatSession.status == 'active').order_by(ChatSession.id),
+    'user by phone': lambda: User.query.filter_by(phone_number_normalized='+15550000001'),
+    'sessions page': lambda: ChatSession.query.filter_by(user_id=3)
+        .order_by(ChatSession.created_at.desc(), ChatSession.id.desc()).limit(51),
+    'session messages page': lambda: ChatMessage.query.filter_by(session_id=25)
+        .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(51),
+    'claimed webhook events': lambda: WebhookEvent.query.filter_by(claim_token='abc').order_by(WebhookEvent.id),
+}
+
+class TestQueryPlans:
+    """Test class for index usage on the hot paths"""
+
+    @pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+    def test_hot_query_uses_an_index(self, app, name):
+        """Test that the query reads through an index"""
+        with app.app_context():
+            query = HOT_QUERIES[name]()
+            _assert_indexed(getattr(query, 'statement', query))
+
+    @pytest.mark.parametrize('name', ['logs page', 'sessions page', 'session messages page'])
+    def test_keyset_pages_need_no_sort(self, app, name):
+        """Test that newest-first pages come straight off their composite index"""
+        with app.app_context():
+            plan = _assert_indexed(HOT_QUERIES[name]().statement)
+        assert not any('TEMP B-TREE' in line for line in plan), plan
+
+class TestIndexMigrations:
+    """Test class for the migration steps behind the model indexes"""
+
+    def test_migrations_create_every_model_index(self):
+        """Test that an old database ends up with every index the models declare"""
+        app = create_app(TestingConfig)
+        with app.app_context():
+            db.create_all()
+            declared = {
+                (table.name, index.name)
+                for table in db.metadata.sorted_tables for index in table.indexes
+            }
+            for _, name in declared:
+                db.session.execute(text(f'DROP INDEX {name}'))
+            db.session.commit()
+
+            run_migrations()
+
+            inspector = inspect(db.engine)
+            present = {
+                (table, index['name'])
+                for table in inspector.get_table_names() for index in inspector.get_indexes(table)
+            }
+            assert declared <= present
+            assert run_migrations() == []
+            db.session.remove()
+            db.drop_all()
+
+class TestStartupMigrations:
+    """Test class for the schema upgrade run by create_app"""
+
+    def test_create_app_upgrades_an_old_database(self, tmp_path):
+        """Test that an app started on a database missing new columns and tables can query it"""
+        config = type('FileConfig', (TestingConfig,), {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'old.db'}",
+        })
+        old = create_app(config)
+        with old.app_context():
+            db.create_all()
+            db.session.add(User(name='Test User', username='testuser', password='testpass123',
+                                phone_number='+15551234567', hubspot_pat_token='test-token'))
+            db.session.commit()
+            db.session.execute(text('DROP INDEX ix_users_phone_number_normalized'))
+            db.session.execute(text('ALTER TABLE users DROP COLUMN phone_number_normalized'))
+            db.session.execute(text('DROP TABLE webhook_events'))
+            db.session.commit()
+            db.session.remove()
+            db.engine.dispose()
+
+        config.DB_AUTO_MIGRATE = True
+        app = create_app(config)
+        with app.app_context():
+            user = User.query.filter_by(username='testuser').one()
+            assert user.phone_number_normalized == '+15551234567'
+            assert inspect(db.engine).has_table('webhook_events')
+            db.session.remove()
+            db.engine.dispose()
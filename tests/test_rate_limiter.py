@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the HubSpot rate limiter and 429 backoff
+"""
+
+import os
+import pytest
+from unittest.mock import Mock, patch
+from flask import Flask
+from app.api.v1.hubspot.errors import error_response
+from app.services.hubspot_service import HubSpotService
+from app.services.rate_limiter import (
+    TokenBucketRateLimiter, HubSpotRateLimitError, backoff_delay, parse_retry_after
+)
+
+@pytest.fixture
+def limiter(tmp_path):
+    """Limiter with a 5 request / 10 second bucket"""
+    return TokenBucketRateLimiter(tmp_path / 'buckets.db', capacity=5, interval_seconds=10, max_wait=1)
+
+class TestTokenBucketRateLimiter:
+    """Test class for TokenBucketRateLimiter"""
+
+    def test_bucket_drains_then_asks_to_wait(self, limiter):
+        """Test that the sixth request in a burst has to wait"""
+        waits = [limiter.reserve('token-a') for _ in range(6)]
+        assert waits[:5] == [0.0] * 5
+        assert waits[5] > 0
+
+    def test_buckets_are_per_token(self, limiter):
+        """Test that one token draining does not affect another"""
+        for _ in range(5):
+            limiter.reserve('token-a')
+        assert limiter.reserve('token-b') == 0.0
+
+    def test_state_is_shared_between_instances(self, tmp_path):
+        """Test that two limiters on the same file share one bucket (as workers do)"""
+        first = TokenBucketRateLimiter(tmp_path / 'shared.db', capacity=2, interval_seconds=10)
+        second = TokenBucketRateLimiter(tmp_path / 'shared.db', capacity=2, interval_seconds=10)
+        first.reserve('token-a')
+        first.reserve('token-a')
+        assert second.reserve('token-a') > 0
+
+    def test_remaining_header_tightens_bucket(self, limiter):
+        """Test that X-HubSpot-RateLimit-Remaining lowers the local estimate"""
+        limiter.observe('token-a', {'X-HubSpot-RateLimit-Remaining': '0'})
+        assert limiter.reserve('token-a') > 0
+
+    def test_penalize_blocks_token(self, limiter):
+        """Test that a 429 penalty pauses the token"""
+        limiter.penalize('token-a', 5)
+        assert limiter.reserve('token-a') > 4
+
+    def test_acquire_gives_up_after_max_wait(self, limiter):
+        """Test that acquire raises instead of waiting forever"""
+        limiter.penalize('token-a', 30)
+        with pytest.raises(HubSpotRateLimitError):
+            limiter.acquire('token-a')
+
+class TestBackoff:
+    """Test class for backoff helpers"""
+
+    def test_parse_retry_after_seconds(self):
+        """Test delta-seconds Retry-After"""
+        assert parse_retry_after('3') == 3.0
+        assert parse_retry_after(None) is None
+
+    def test_backoff_honors_retry_after(self):
+        """Test that backoff never undercuts Retry-After"""
+        assert backoff_delay(0, retry_after='4', base=0.5) >= 4
+
+    def test_backoff_is_capped(self):
+        """Test exponential growth is capped"""
+        assert backoff_delay(20, base=0.5, cap=2) <= 2
+
+    @patch('app.services.hubspot_service.time.sleep')
+    @patch('app.services.hubspot_service.http_pool.request')
+    def test_make_request_retries_429(self, mock_request, mock_sleep):
+        """Test that make_request retries a 429 and returns the next response"""
+        throttled = Mock(status_code=429, headers={'Retry-After': '1'}, text='rate limited')
+        ok = Mock(status_code=200, headers={})
+        mock_request.side_effect = [throttled, ok]
+
+        app = Flask(__name__)
+        app.config.update(HUBSPOT_ACCESS_TOKEN='test-token', HUBSPOT_RATE_LIMIT_ENABLED=False)
+        with patch.dict(os.environ, {'HUBSPOT_ACCESS_TOKEN': 'test-token'}), app.app_context():
+            response = HubSpotService.make_request('GET', '/crm/v3/objects/contacts')
+
+        assert response == ok
+        assert mock_request.call_count == 2
+        assert mock_sleep.call_args[0][0] >= 1
+
+    @patch('app.services.hubspot_service.time.sleep')
+    @patch('app.services.hubspot_service.http_pool.request')
+    def test_make_request_raises_after_retries(self, mock_request, mock_sleep):
+        """Test that exhausted retries raise HubSpotRateLimitError"""
+        mock_request.return_value = Mock(status_code=429, headers={}, text='rate limited')
+
+        app = Flask(__name__)
+        app.config.update(HUBSPOT_ACCESS_TOKEN='test-token', HUBSPOT_RATE_LIMIT_ENABLED=False, HUBSPOT_MAX_RETRIES=2)
+        with app.app_context():
+            with pytest.raises(HubSpotRateLimitError):
+                HubSpotService.make_request('GET', '/crm/v3/objects/contacts')
+
+        assert mock_request.call_count == 3
+
+class TestErrorResponse:
+    """Test class for the HubSpot blueprints' error responses"""
+
+    def test_rate_limit_becomes_429(self):
+        """Test that exhausted retries answer 429 with Retry-After, other errors 500"""
+        app = Flask(__name__)
+        with app.app_context():
+            body, status, headers = error_response(HubSpotRateLimitError('slow down', retry_after=2.5))
+            assert (status, headers, body.get_json()['retry_after']) == (429, {'Retry-After': '3'}, 3)
+
+            body, status = error_response(ValueError('boom'))
+            assert (status, body.get_json()) == (500, {'error': 'boom'})
+
+if __name__ == "__main__":
+    pytest.main([__file__])
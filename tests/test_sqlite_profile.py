@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite connection profile and the single-writer queue
+"""
+
+import threading
+import pytest
+from sqlalchemy import text
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db, sqlite_pragmas, begin_write
+from app.db.writer import sqlite_writer
+from app.models import Log
+from app.services.log_sink import log_sink
+
+@pytest.fixture
+def file_app(tmp_path):
+    """App on a SQLite file with the single writer enabled"""
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        SQLITE_SINGLE_WRITER = True
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)'))
+        db.session.commit()
+        yield app
+        sqlite_writer.stop()
+        db.session.remove()
+        db.engine.dispose()
+
+def _insert(name):
+    return lambda connection: connection.execute(
+        text('INSERT INTO items (name) VALUES (:name) RETURNING id'), {'name': name}
+    ).scalar()
+
+class TestPragmas:
+    """Test class for the per-connection pragmas"""
+
+    def test_file_connections_use_the_profile(self, file_app):
+        """Test that new connections run in WAL with the configured pragmas"""
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        assert db.session.execute(text('PRAGMA cache_size')).scalar() == -65536
+
+    def test_blank_settings_are_skipped(self):
+        """Test that an empty setting leaves SQLite's default in place"""
+        names = [name for name, _ in sqlite_pragmas({'SQLITE_JOURNAL_MODE': '', 'SQLITE_MMAP_SIZE': 0})]
+        assert 'journal_mode' not in names
+        assert 'mmap_size' in names
+
+class TestTransactions:
+    """Test class for BEGIN handling on ordinary and write connections"""
+
+    def test_read_then_write_across_connections(self, file_app):
+        """Test that a plain connection can write after another one committed since its read"""
+        with db.engine.connect() as reader, db.engine.connect() as other:
+            reader.execute(text('SELECT COUNT(*) FROM items')).scalar()
+            other.execute(text("INSERT INTO items (name) VALUES ('other')"))
+            other.commit()
+            reader.execute(text("INSERT INTO items (name) VALUES ('reader')"))
+            reader.commit()
+
+        assert db.session.execute(text('SELECT COUNT(*) FROM items')).scalar() == 2
+
+    def test_begin_write_keeps_savepoints_inside_the_transaction(self, file_app):
+        """Test that releasing a savepoint does not commit a write transaction"""
+        begin_write(db.session)
+        with db.session.begin_nested():
+            db.session.execute(text("INSERT INTO items (name) VALUES ('a')"))
+        db.session.rollback()
+
+        assert db.session.execute(text('SELECT COUNT(*) FROM items')).scalar() == 0
+
+class TestSQLiteWriter:
+    """Test class for SQLiteWriter"""
+
+    def test_disabled_for_memory_databases(self):
+        """Test that an in-memory database keeps writing inline"""
+        app = create_app(type('MemoryConfig', (TestingConfig,), {'SQLITE_SINGLE_WRITER': True}))
+        assert app.extensions['sqlite_writer'].enabled is False
+
+    def test_run_returns_the_job_result(self, file_app):
+        """Test that a job's return value comes back to the caller"""
+        assert sqlite_writer.run(_insert('a'), timeout=5) == 1
+        assert db.session.execute(text('SELECT name FROM items')).scalar() == 'a'
+
+    def test_failing_job_is_isolated(self, file_app):
+        """Test that one failing job does not roll back the others in its commit"""
+        gate = threading.Event()
+        blocker = sqlite_writer.submit(lambda connection: gate.wait(5))
+        good = sqlite_writer.submit(_insert('kept'))
+        bad = sqlite_writer.submit(_insert(None))  # NOT NULL violation
+        gate.set()
+
+        assert blocker.result(5) is True
+        assert good.result(5) is not None
+        with pytest.raises(Exception):
+            bad.result(5)
+        assert db.session.execute(text('SELECT name FROM items')).scalars().all() == ['kept']
+
+    def test_concurrent_writes_are_group_committed(self, file_app):
+        """Test that writes from many threads all land, in fewer commits than jobs"""
+        before = sqlite_writer.get_metrics()
+        gate = threading.Event()
+        sqlite_writer.submit(lambda connection: gate.wait(5))
+        futures = []
+        threads = [threading.Thread(target=lambda i=i: futures.append(sqlite_writer.submit(_insert(f'row {i}'))))
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gate.set()
+        for future in futures:
+            future.result(5)
+
+        after = sqlite_writer.get_metrics()
+        assert db.session.execute(text('SELECT COUNT(*) FROM items')).scalar() == 20
+        assert after['transactions'] - before['transactions'] < after['jobs'] - before['jobs']
+
+    def test_log_sink_writes_through_the_writer(self, file_app):
+        """Test that log rows are inserted by the writer thread"""
+        jobs = sqlite_writer.jobs
+        log_sink.write(1, 1, 1, 'note', hubspot_id='1')
+
+        assert sqlite_writer.jobs == jobs + 1
+        assert Log.query.count() == 1
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the stats rollups and GET /api/stats/overview
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.db.migrations import run_migrations
+from app.db.rollups import ROLLUP_TRIGGERS, rebuild_rollups, prune_hourly
+from app.models import User, ChatSession, ChatMessage, Log, StatsRollup
+from app.services.log_sink import log_sink
+from app.services.stats_service import StatsService
+
+NOW = datetime.utcnow().replace(minute=30, second=0, microsecond=0)
+
+@pytest.fixture
+def app():
+    """App with two users; user 1 has a session, two messages and four logs of creates"""
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        users = [User(name=f'User {i}', username=f'user{i}', password='testpass123',
+                      phone_number=f'+1555123456{i}', hubspot_pat_token='test-token') for i in range(2)]
+        db.session.add_all(users)
+        db.session.flush()
+        session = ChatSession(user_id=users[0].id, status='active')
+        db.session.add(session)
+        db.session.flush()
+        messages = [ChatMessage(session_id=session.id, message_text=f'm{i}') for i in range(2)]
+        db.session.add_all(messages)
+        db.session.flush()
+        for log_type, status, created_at in (('contact', 'synced', NOW), ('deal', 'synced', NOW),
+                                             ('deal', 'failed', NOW), ('note', 'synced', NOW - timedelta(days=2))):
+            db.session.add(Log(user_id=users[0].id, session_id=session.id, chat_message_id=messages[0].id,
+                               log_type=log_type, sync_status=status, created_at=created_at, sync_operation='create'))
+        other = ChatSession(user_id=users[1].id, status='active')
+        db.session.add(other)
+        db.session.commit()
+        app.config['TEST_TOKEN'] = create_access_token(identity=str(users[0].id))
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def _rollup_rows():
+    return sorted(
+        (row.granularity, row.bucket_start, row.user_id, row.metric, row.log_type, row.sync_status, row.count)
+        for row in StatsRollup.query.filter(StatsRollup.count != 0)
+    )
+
+class TestRollups:
+    """Test class for trigger-maintained rollups"""
+
+    def test_overview_totals(self, app):
+        """Test per-user and global totals and breakdowns"""
+        overview = StatsService.get_overview(1, now=NOW)
+        user, everyone = overview['user'], overview['global']
+
+        assert (user['sessions'], user['messages'], user['logs']['total']) == (1, 2, 4)
+        assert user['logs']['by_type'] == {'contact': 1, 'deal': 2, 'note': 1}
+        assert user['logs']['by_status'] == {'synced': 3, 'failed': 1}
+        assert user['logs']['success_rate'] == 0.75
+        assert everyone['sessions'] == 2
+
+    def test_series(self, app):
+        """Test the daily HubSpot-object and hourly activity series"""
+        user = StatsService.get_overview(1, days=7, hours=1, now=NOW)['user']
+
+        assert [day['total'] for day in user['hubspot_objects_per_day']] == [1, 2]
+        assert user['hubspot_objects_per_day'][-1]['by_type'] == {'contact': 1, 'deal': 1}
+        assert user['logs_per_hour'] == [{'hour': NOW.replace(minute=0).isoformat(), 'count': 3}]
+
+    def test_status_change_moves_counts(self, app):
+        """Test that a failed log that later syncs is counted once, as synced"""
+        log = Log.query.filter_by(sync_status='failed').one()
+        log.mark_as_synced('123')
+        db.session.commit()
+
+        user = StatsService.get_overview(1, now=NOW)['user']
+        assert user['logs']['by_status'] == {'synced': 4, 'failed': 0}
+        assert user['logs']['success_rate'] == 1.0
+        assert user['hubspot_objects_per_day'][-1]['by_type'] == {'contact': 1, 'deal': 2}
+
+    def test_only_creates_count_as_objects(self, app):
+        """Test that reads, updates and WhatsApp message logs are not counted as HubSpot objects"""
+        session = ChatSession.query.filter_by(user_id=1).one()
+        log_sink.write_many([
+            log_sink.build_row(1, session.id, 1, 'contact_action', hubspot_id='search'),
+            log_sink.build_row(1, session.id, 1, 'contact_action', hubspot_id='7'),
+            log_sink.build_row(1, session.id, 1, 'whatsapp_message'),
+            log_sink.build_row(1, session.id, 1, 'contact_action', hubspot_id='7', sync_operation='update'),
+            log_sink.build_row(1, session.id, 1, 'contact_action', hubspot_id='8', sync_operation='create')
+        ])
+        user = StatsService.get_overview(1, now=datetime.utcnow())['user']
+
+        assert user['logs']['total'] == 9
+        assert user['hubspot_objects_per_day'][-1]['by_type']['contact_action'] == 1
+
+    def test_bulk_writes_and_deletes(self, app):
+        """Test bulk log_sink inserts and a cascading session delete"""
+        session = ChatSession.query.filter_by(user_id=1).one()
+        log_sink.write_many([log_sink.build_row(1, session.id, 1, 'note') for _ in range(3)])
+        assert StatsService.get_overview(1, now=NOW)['user']['logs']['total'] == 7
+
+        db.session.delete(session)
+        db.session.commit()
+        user = StatsService.get_overview(1, now=NOW)['user']
+        assert (user['sessions'], user['messages'], user['logs']['total']) == (0, 0, 0)
+
+    def test_rebuild_matches_triggers(self, app):
+        """Test that a full rebuild produces the same rows the triggers maintained"""
+        maintained = _rollup_rows()
+        rebuild_rollups(db.session.connection())
+        db.session.commit()
+        assert _rollup_rows() == maintained
+
+    def test_migration_backfills(self, app):
+        """Test that installing the triggers on an existing database backfills the rollups"""
+        maintained = _rollup_rows()
+        for name in ROLLUP_TRIGGERS:
+            db.session.execute(db.text(f'DROP TRIGGER {name}'))
+        db.session.execute(db.text('DELETE FROM stats_rollups'))
+        db.session.commit()
+
+        assert 'stats rollup triggers' in run_migrations()
+        assert _rollup_rows() == maintained
+
+    def test_one_row_per_maintained_grain(self, app):
+        """Test that a log touches its user's hourly and total rows only, plus a daily row for a synced create"""
+        session = ChatSession.query.filter_by(user_id=1).one()
+        db.session.execute(db.text('DELETE FROM stats_rollups'))
+        db.session.commit()
+
+        log_sink.write_many([log_sink.build_row(2, session.id, 1, 'note', sync_operation='create')])
+
+        rows = StatsRollup.query.all()
+        assert sorted((row.granularity, row.metric, row.user_id) for row in rows) == [
+            ('day', 'objects', 2), ('hour', 'logs', 2), ('total', 'logs', 2)
+        ]
+        overview = StatsService.get_overview(1, now=datetime.utcnow())
+        assert (overview['user']['logs']['total'], overview['global']['logs']['total']) == (0, 1)
+
+    def test_migration_replaces_outdated_triggers(self, app):
+        """Test that triggers from an older rollup layout are replaced and the rollups rebuilt"""
+        maintained = _rollup_rows()
+        db.session.execute(db.text('DROP TRIGGER trg_stats_sessions_insert'))
+        db.session.execute(db.text(
+            "CREATE TRIGGER trg_stats_sessions_insert AFTER INSERT ON chat_sessions BEGIN "
+            "INSERT INTO stats_rollups (granularity, bucket_start, user_id, metric, count) "
+            "VALUES ('total', '1970-01-01 00:00:00.000000', 0, 'sessions', 1); END"
+        ))
+        db.session.execute(db.text('CREATE TRIGGER trg_stats_retired AFTER DELETE ON logs BEGIN SELECT 1; END'))
+        db.session.commit()
+
+        assert 'stats rollup triggers' in run_migrations()
+        assert _rollup_rows() == maintained
+        triggers = set(db.session.execute(db.text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        assert 'trg_stats_retired' not in triggers
+        assert run_migrations() == []
+
+    def test_prune_hourly(self, app):
+        """Test that pruning drops old hourly rows only"""
+        removed = prune_hourly(db.session.connection(), NOW - timedelta(days=1))
+        db.session.commit()
+
+        assert removed == 1  # the 'note' log's hour
+        assert StatsService.get_overview(1, now=NOW)['user']['logs']['total'] == 4
+
+class TestOverviewEndpoint:
+    """Test class for GET /api/stats/overview"""
+
+    def test_overview(self, app):
+        """Test the response shape"""
+        response = app.test_client().get('/api/stats/overview?days=7',
+                                          headers={'Authorization': f"Bearer {app.config['TEST_TOKEN']}"})
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert (data['total_sessions'], data['total_messages'], data['total_logs']) == (1, 2, 4)
+        assert data['global']['sessions'] == 2
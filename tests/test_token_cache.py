@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-user HubSpot token cache
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from flask import Flask
+from app.db.database import db
+from app.models import User, TokenInvalidation
+from app.services.cache import TTLCache
+from app.services.hubspot_service import HubSpotService, hubspot_token_cache
+
+@pytest.fixture
+def bare_app():
+    """Bare app so get_hubspot_token has a config and ``g``"""
+    app = Flask(__name__)
+    app.config['HUBSPOT_TOKEN_CACHE_TTL'] = 300
+    hubspot_token_cache.clear()
+    yield app
+    hubspot_token_cache.clear()
+
+def _user(token):
+    user = MagicMock()
+    user.hubspot_pat_token = token
+    return user
+
+class TestTTLCache:
+    """Test class for TTLCache"""
+
+    def test_hit_miss_counters(self):
+        """Test that lookups are counted"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        assert cache.get('a') is None
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+
+        metrics = cache.get_metrics()
+        assert metrics['hits'] == 1
+        assert metrics['misses'] == 1
+
+    def test_expired_entry_is_a_miss(self):
+        """Test TTL expiry"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set('a', 1, ttl=-1)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test that the least recently used key is evicted"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get_metrics()['evictions'] == 1
+
+class TestHubSpotTokenCache:
+    """Test class for HubSpotService.get_hubspot_token caching"""
+
+    @patch('app.services.hubspot_service.User')
+    def test_one_db_lookup_across_requests(self, mock_user, bare_app):
+        """Test that the shared cache serves later requests"""
+        mock_user.query.get.return_value = _user('pat-1')
+
+        for _ in range(3):
+            with bare_app.test_request_context():
+                assert HubSpotService.get_hubspot_token(7) == 'pat-1'
+
+        mock_user.query.get.assert_called_once_with(7)
+
+    @patch('app.services.hubspot_service.User')
+    def test_request_memo_survives_cache_eviction(self, mock_user, bare_app):
+        """Test at most one lookup per request even if the shared entry is gone"""
+        mock_user.query.get.return_value = _user('pat-1')
+
+        with bare_app.test_request_context():
+            HubSpotService.get_hubspot_token(7)
+            hubspot_token_cache.clear()
+            HubSpotService.get_hubspot_token(7)
+
+        mock_user.query.get.assert_called_once()
+
+    @patch('app.services.hubspot_service.User')
+    def test_invalidate_forces_reload(self, mock_user, bare_app):
+        """Test that invalidation picks up a changed token"""
+        mock_user.query.get.return_value = _user('pat-old')
+        with bare_app.test_request_context():
+            assert HubSpotService.get_hubspot_token(7) == 'pat-old'
+
+        mock_user.query.get.return_value = _user('pat-new')
+        HubSpotService.invalidate_hubspot_token(7)
+
+        with bare_app.test_request_context():
+            assert HubSpotService.get_hubspot_token(7) == 'pat-new'
+        assert mock_user.query.get.call_count == 2
+
+    @patch('app.services.hubspot_service.User')
+    def test_missing_token_is_not_cached(self, mock_user, bare_app):
+        """Test that users without a token still raise"""
+        mock_user.query.get.return_value = None
+
+        with bare_app.test_request_context():
+            with pytest.raises(ValueError):
+                HubSpotService.get_hubspot_token(7)
+        assert len(hubspot_token_cache) == 0
+
+class TestTokenInvalidation:
+    """Test class for token changes made by another worker"""
+
+    @pytest.fixture
+    def db_app(self, app, user):
+        """The shared app; the test user's PAT is 'pat-old'"""
+        user.hubspot_pat_token = 'pat-old'
+        db.session.commit()
+        hubspot_token_cache.clear()
+        yield app
+        hubspot_token_cache.clear()
+
+    def test_change_in_another_worker_is_picked_up(self, db_app):
+        """Test that a recorded invalidation drops this process's cached token on its next check"""
+        with db_app.app_context(), db_app.test_request_context():  # fresh ``g`` per request
+            assert HubSpotService.get_hubspot_token(1) == 'pat-old'
+
+        # Another worker stores the new token and records the invalidation
+        User.query.get(1).hubspot_pat_token = 'pat-new'
+        db.session.add(TokenInvalidation(user_id=1))
+        db.session.commit()
+        hubspot_token_cache._invalidations_checked_at = None  # poll interval elapsed
+
+        with db_app.app_context(), db_app.test_request_context():
+            assert HubSpotService.get_hubspot_token(1) == 'pat-new'
+        assert hubspot_token_cache.get_metrics()['remote_invalidations'] == 1
+
+    def test_update_user_records_invalidation(self, db_app, auth_headers):
+        """Test that changing the PAT through PATCH /api/users/<id> is recorded for the other workers"""
+        other = TTLCache(maxsize=10, ttl=300)  # Stands in for another worker's cache
+        other.set('1', 'pat-old')
+
+        response = db_app.test_client().patch('/api/users/1', json={'hubspot_pat_token': 'pat-new'},
+                                              headers=auth_headers)
+
+        assert response.status_code == 200
+        assert TokenInvalidation.query.one().user_id == 1
+        other.apply_invalidations(HubSpotService._load_token_invalidations, interval=5)
+        assert other.get('1') is None
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the queued WhatsApp webhook
+"""
+
+import json
+import pytest
+from sqlalchemy import event
+from datetime import datetime, timedelta
+from app.db.database import db
+from app.models import ChatSession, ChatMessage, Log, WebhookEvent
+from app.services.cache import RecentIdFilter
+from app.core.security import SecurityService
+from app.services.whatsapp_service import WhatsAppService, webhook_workers, recent_message_ids, sender_cache
+
+@pytest.fixture(autouse=True)
+def whatsapp_caches():
+    """Empty message-id filter and sender cache for every test"""
+    recent_message_ids.clear()
+    sender_cache.clear()
+
+def _payload(*messages):
+    return json.dumps({'entry': [{'changes': [{'value': {'messages': list(messages)}}]}]})
+
+def _message(message_id, text='hello', sender='15551234567'):
+    return {'id': message_id, 'from': sender, 'timestamp': '1700000000', 'text': {'body': text}}
+
+class TestWebhookQueue:
+    """Test class for WhatsAppService and WebhookWorkerPool"""
+
+    def test_webhook_acknowledges_without_processing(self, app, user):
+        """Test that the POST only stores the raw body"""
+        body = _payload(_message('wamid.1'))
+        response = app.test_client().post('/api/whatsapp/webhook', data=body, content_type='application/json')
+
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'queued'
+        event = WebhookEvent.query.one()
+        assert event.status == 'pending'
+        assert event.payload == body
+        assert ChatMessage.query.count() == 0
+
+    def test_drain_processes_messages_in_one_session(self, app, user):
+        """Test that workers create the session, messages and logs"""
+        WhatsAppService.enqueue(_payload(_message('wamid.1'), _message('wamid.2', 'second')))
+        WhatsAppService.enqueue(_payload(_message('wamid.3')))
+
+        assert webhook_workers.drain(app) == 2
+        assert ChatSession.query.count() == 1
+        assert ChatMessage.query.count() == 3
+        assert Log.query.filter_by(log_type='whatsapp_message').count() == 3
+        assert {e.status for e in WebhookEvent.query.all()} == {'done'}
+
+    def test_bad_payload_is_retried_then_failed(self, app, user):
+        """Test that a failing event goes back to pending, after a backoff, until attempts run out"""
+        app.config['WEBHOOK_MAX_ATTEMPTS'] = 2
+        event_id = WhatsAppService.enqueue('not json')
+
+        webhook_workers.run_once(app)
+        event = db.session.get(WebhookEvent, event_id)
+        assert event.status == 'pending'
+        assert event.next_attempt_at >= datetime.utcnow() + timedelta(seconds=1)
+        assert webhook_workers.run_once(app) == 0  # not due yet
+
+        event.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        webhook_workers.run_once(app)
+        event = db.session.get(WebhookEvent, event_id)
+        assert event.status == 'failed'
+        assert event.attempts == 2
+        assert event.next_attempt_at is None
+        assert event.error
+
+    def test_retry_delay_is_bounded(self, app, user):
+        """Test that the backoff is at least the base and at most the cap"""
+        event_id = WhatsAppService.enqueue('not json')
+        event = db.session.get(WebhookEvent, event_id)
+        delays = []
+        for attempts in (1, 8):
+            event.attempts = attempts
+            started = datetime.utcnow()
+            WhatsAppService.process_batch([event], max_attempts=10, backoff_base=10, backoff_max=1000)
+            delays.append((event.next_attempt_at - started).total_seconds())
+
+        assert 10 <= delays[0] <= 21
+        assert 10 <= delays[1] <= 1001
+
+    def test_stale_claim_is_reclaimed(self, app, user):
+        """Test that events left 'processing' by a dead worker are picked up again"""
+        event_id = WhatsAppService.enqueue(_payload(_message('wamid.1')))
+        event = db.session.get(WebhookEvent, event_id)
+        event.status = 'processing'
+        event.claimed_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        claimed = WhatsAppService.claim_batch(10, visibility_timeout=60)
+        assert [e.id for e in claimed] == [event_id]
+        assert WhatsAppService.claim_batch(10, visibility_timeout=60) == []
+
+    def test_queue_metrics(self, app, user):
+        """Test queue depth reporting"""
+        WhatsAppService.enqueue(_payload(_message('wamid.1')))
+        metrics = webhook_workers.get_metrics()
+
+        assert metrics['queue']['pending'] == 1
+        assert metrics['queue']['oldest_pending_age_seconds'] >= 0
+
+class TestBatchIngestion:
+    """Test class for WhatsAppService.ingest_messages"""
+
+    def test_one_query_per_lookup_for_many_messages(self, app, user):
+        """Test that senders and sessions are resolved once per payload"""
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            stats = WhatsAppService.ingest_messages([_message(f'wamid.{i}') for i in range(20)])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert stats == {'stored': 20, 'duplicates': 0, 'unknown_sender': 0, 'failed': 0}
+        assert sum('FROM users' in sql for sql in statements) == 1
+        assert sum('FROM chat_sessions' in sql for sql in statements) == 1
+        assert Log.query.count() == 20
+
+    def test_bad_message_does_not_sink_the_payload(self, app, user):
+        """Test per-message isolation"""
+        bad = _message('wamid.bad')
+        bad['timestamp'] = 'yesterday'
+        stats = WhatsAppService.ingest_messages([
+            _message('wamid.1'), bad, _message('wamid.2', sender='19990000000'), _message('wamid.1')
+        ])
+
+        assert stats == {'stored': 1, 'duplicates': 1, 'unknown_sender': 1, 'failed': 1}
+        assert ChatMessage.query.count() == 1
+
+    def test_failed_message_leaves_event_for_retry(self, app, user):
+        """Test that an event with a failed message is retried without duplicating the rest"""
+        bad = _message('wamid.bad')
+        bad['timestamp'] = None
+        event_id = WhatsAppService.enqueue(_payload(_message('wamid.1'), bad))
+        webhook_workers.run_once(app)
+
+        event = db.session.get(WebhookEvent, event_id)
+        assert event.status == 'pending'
+        assert '1 of 2 messages failed' in event.error
+        assert ChatMessage.query.count() == 1
+
+class TestSenderResolution:
+    """Test class for E.164 normalization and the sender cache"""
+
+    def test_normalize_phone_number(self):
+        """Test the canonical form used for sender lookups"""
+        assert SecurityService.normalize_phone_number('15551234567') == '+15551234567'
+        assert SecurityService.normalize_phone_number('+1 (555) 123-4567') == '+15551234567'
+        assert SecurityService.normalize_phone_number('0044 20 7946 0958') == '+442079460958'
+        assert SecurityService.normalize_phone_number('whatsapp:+15551234567') == '+15551234567'
+        assert SecurityService.normalize_phone_number('12345') is None
+
+    def test_validate_phone_number_is_unchanged(self):
+        """Test that API input still has to be '+' and 10-15 digits (the normalizer is lookup-only)"""
+        assert SecurityService.validate_phone_number('+15551234567')
+        assert not SecurityService.validate_phone_number('15551234567')
+        assert not SecurityService.validate_phone_number('0044 20 7946 0958')
+        assert not SecurityService.validate_phone_number('not a number')
+
+    def test_formatted_stored_number_matches_bare_sender(self, app, user):
+        """Test that '+1 (555) ...' on the user matches WhatsApp's bare digits"""
+        user.phone_number = '+1 (555) 123-4567'
+        db.session.commit()
+
+        assert WhatsAppService.ingest_messages([_message('wamid.1')])['stored'] == 1
+
+    def test_warm_cache_needs_no_lookup_queries(self, app, user):
+        """Test that a known sender is resolved without touching users or chat_sessions"""
+        WhatsAppService.ingest_messages([_message('wamid.1')])
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            WhatsAppService.ingest_messages([_message('wamid.2')])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert not [sql for sql in statements if 'FROM users' in sql or 'FROM chat_sessions' in sql]
+        assert ChatMessage.query.count() == 2
+
+    def test_closed_session_is_not_reused(self, app, user):
+        """Test that closing a session invalidates the cached entry"""
+        WhatsAppService.ingest_messages([_message('wamid.1')])
+        session = ChatSession.query.one()
+        session.close_session()
+        db.session.commit()
+
+        WhatsAppService.ingest_messages([_message('wamid.2')])
+        assert ChatSession.query.filter_by(status='active').count() == 1
+        assert ChatSession.query.count() == 2
+
+    def test_phone_change_invalidates_sender(self, app, user):
+        """Test that a user's new number resolves and the old one stops resolving"""
+        WhatsAppService.ingest_messages([_message('wamid.1')])
+        user.phone_number = '+15559876543'
+        db.session.commit()
+
+        stats = WhatsAppService.ingest_messages([_message('wamid.2'), _message('wamid.3', sender='15559876543')])
+        assert stats['unknown_sender'] == 1
+        assert stats['stored'] == 1
+
+class TestMessageDeduplication:
+    """Test class for provider message id deduplication"""
+
+    def test_redelivery_is_filtered_in_memory(self, app, user):
+        """Test that a retried delivery is skipped before touching the database"""
+        filtered = recent_message_ids.get_metrics()['filtered']
+        body = _payload(_message('wamid.dup'))
+        WhatsAppService.enqueue(body)
+        WhatsAppService.enqueue(body)
+        webhook_workers.drain(app)
+
+        assert ChatMessage.query.filter_by(external_message_id='wamid.dup').count() == 1
+        assert Log.query.filter_by(log_type='whatsapp_message').count() == 1
+        assert recent_message_ids.get_metrics()['filtered'] == filtered + 1
+
+    def test_unique_index_catches_what_the_filter_forgot(self, app, user):
+        """Test that the database constraint is the durable check (e.g. after a restart)"""
+        WhatsAppService.enqueue(_payload(_message('wamid.dup')))
+        webhook_workers.drain(app)
+        recent_message_ids.clear()
+        caught = recent_message_ids.get_metrics()['caught_by_database']
+
+        WhatsAppService.enqueue(_payload(_message('wamid.dup'), _message('wamid.new')))
+        webhook_workers.drain(app)
+
+        assert ChatMessage.query.count() == 2
+        assert recent_message_ids.get_metrics()['caught_by_database'] == caught + 1
+        assert {e.status for e in WebhookEvent.query.all()} == {'done'}
+
+    def test_recent_id_filter_is_bounded(self):
+        """Test LRU eviction"""
+        ids = RecentIdFilter(maxsize=2)
+        ids.add('a')
+        ids.add('b')
+        assert 'a' in ids
+        ids.add('c')
+
+        assert 'b' not in ids
+        assert 'a' in ids
+        assert len(ids) == 2
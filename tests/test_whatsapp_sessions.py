@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the paginated WhatsApp session and message listings
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app.config import TestingConfig
+from app.main import create_app
+from app.db.database import db
+from app.models import User, ChatSession, ChatMessage
+
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def app():
+    """App with 5 sessions of 4 messages for one user, and one session of another user"""
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        users = [User(name=f'User {i}', username=f'user{i}', password='testpass123',
+                      phone_number=f'+1555123456{i}', hubspot_pat_token='test-token') for i in range(2)]
+        db.session.add_all(users)
+        db.session.flush()
+        for s in range(5):
+            session = ChatSession(user_id=users[0].id, status='active' if s == 4 else 'closed',
+                                  created_at=START + timedelta(hours=s))
+            db.session.add(session)
+            db.session.flush()
+            db.session.add_all([ChatMessage(session_id=session.id, message_text=f's{s} m{m}',
+                                            timestamp=START + timedelta(hours=s, minutes=m)) for m in range(4)])
+        db.session.add(ChatSession(user_id=users[1].id, status='active'))
+        db.session.commit()
+        app.config['TEST_TOKEN'] = create_access_token(identity=str(users[0].id))
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def _get(app, path, **params):
+    response = app.test_client().get(
+        path, query_string=params, headers={'Authorization': f"Bearer {app.config['TEST_TOKEN']}"}
+    )
+    return response.status_code, response.get_json()
+
+def _count_queries(app, fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    return len([statement for statement in statements if statement.lstrip().startswith('SELECT')])
+
+class TestSessionListing:
+    """Test class for GET /api/whatsapp/sessions"""
+
+    def test_pages_newest_first_with_counts(self, app):
+        """Test cursor paging, ordering and counter columns"""
+        status, first = _get(app, '/api/whatsapp/sessions', limit=3)
+        assert status == 200
+        assert first['has_more'] is True
+        assert [s['message_count'] for s in first['sessions']] == [4, 4, 4]
+        assert 'messages' not in first['sessions'][0]
+
+        _, second = _get(app, '/api/whatsapp/sessions', limit=3, cursor=first['next_cursor'])
+        assert second['next_cursor'] is None
+        ids = [s['id'] for s in first['sessions'] + second['sessions']]
+        assert ids == [5, 4, 3, 2, 1]
+
+    def test_status_filter(self, app):
+        """Test that status narrows the listing to the user's matching sessions"""
+        _, data = _get(app, '/api/whatsapp/sessions', status='active')
+        assert [s['id'] for s in data['sessions']] == [5]
+
+    def test_last_n_messages(self, app):
+        """Test that each session embeds its latest messages, oldest first"""
+        _, data = _get(app, '/api/whatsapp/sessions', include_last_n_messages=2)
+        for session in data['sessions']:
+            texts = [m['text'] for m in session['messages']]
+            prefix = texts[0].split()[0]
+            assert texts == [f'{prefix} m2', f'{prefix} m3']
+
+    def test_query_count_is_independent_of_page_size(self, app):
+        """Test that the page and its embedded messages take a fixed number of queries"""
+        small = _count_queries(app, lambda: _get(app, '/api/whatsapp/sessions', limit=1, include_last_n_messages=3))
+        large = _count_queries(app, lambda: _get(app, '/api/whatsapp/sessions', limit=5, include_last_n_messages=3))
+        assert small == large
+
+class TestSessionMessages:
+    """Test class for GET /api/whatsapp/sessions/<id>/messages"""
+
+    def test_pages_messages_newest_first(self, app):
+        """Test cursor paging through one session's messages"""
+        _, first = _get(app, '/api/whatsapp/sessions/1/messages', limit=3)
+        assert [m['text'] for m in first['messages']] == ['s0 m3', 's0 m2', 's0 m1']
+        assert first['message_count'] == 4
+
+        _, second = _get(app, '/api/whatsapp/sessions/1/messages', limit=3, cursor=first['next_cursor'])
+        assert [m['text'] for m in second['messages']] == ['s0 m0']
+        assert second['has_more'] is False
+
+    def test_other_users_session_is_hidden(self, app):
+        """Test that a session of another user is a 404"""
+        assert _get(app, '/api/whatsapp/sessions/6/messages')[0] == 404
+
+    def test_bad_cursor(self, app):
+        """Test that an unreadable cursor is a 400"""
+        assert _get(app, '/api/whatsapp/sessions/1/messages', cursor='garbage')[0] == 400